@@ -12,6 +12,8 @@ from app.models.employee import Employee
 from datetime import datetime, date, time, timedelta
 from sqlalchemy import or_, and_, func
 from app.routes.auth import require_auth
+from app.services.attendance_summary import generate_monthly_summaries
+from app.services.schedule_generator import CONFLICT_POLICIES, generate_schedules
 
 attendance_bp = Blueprint('attendance', __name__, url_prefix='/api/attendance')
 
@@ -919,40 +921,46 @@ def create_batch_schedules(user):
                 'message': '员工列表、开始日期和结束日期不能为空'
             }), 400
 
-        created_count = 0
-        skipped_count = 0
-        current_date = start_date
-
-        while current_date <= end_date:
-            is_rest = current_date.strftime('%Y-%m-%d') in rest_days or current_date.weekday() >= 5
-
-            for emp_id in employee_ids:
-                existing = Schedule.query.filter_by(
-                    employee_id=emp_id,
-                    schedule_date=current_date
-                ).first()
-
-                if existing:
-                    skipped_count += 1
-                    continue
-
-                schedule = Schedule(
-                    employee_id=emp_id,
-                    shift_id=shift_id if not is_rest else None,
-                    schedule_date=current_date,
-                    is_rest=is_rest,
-                    created_by=user.get('id')
-                )
-                db.session.add(schedule)
-                created_count += 1
+        pattern = data.get('pattern')  # 轮班序列，如 [1, 1, 2, 2, null, null]
+        conflict = data.get('conflict', 'skip')  # skip: 跳过已有排班; overwrite: 覆盖
+        if conflict not in CONFLICT_POLICIES:
+            return jsonify({
+                'success': False,
+                'message': f'冲突策略只能是 {", ".join(CONFLICT_POLICIES)}'
+            }), 400
 
-            current_date += timedelta(days=1)
+        if not isinstance(employee_ids, list) or (pattern is not None and not isinstance(pattern, list)):
+            return jsonify({
+                'success': False,
+                'message': '员工列表和轮班序列必须是数组'
+            }), 400
 
+        try:
+            stats = generate_schedules(
+                employee_ids, start_date, end_date,
+                shift_id=shift_id,
+                rest_days=rest_days,
+                pattern=pattern,
+                pattern_start=parse_date(data.get('pattern_start')),
+                stagger=data.get('stagger', 0),
+                conflict=conflict,
+                created_by=user.get('id')
+            )
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         db.session.commit()
 
+        message = f"批量排班完成，创建 {stats['created']} 条，跳过 {stats['skipped']} 条"
+        if conflict == 'overwrite':
+            message += f"，更新 {stats['updated']} 条"
         return jsonify({
             'success': True,
-            'message': f'批量排班完成，创建 {created_count} 条，跳过 {skipped_count} 条'
+            'message': message,
+            'data': stats
         }), 201
 
     except Exception as e:
@@ -1416,114 +1424,21 @@ def get_monthly_summary(user):
 @attendance_bp.route('/monthly-summary/generate', methods=['POST'])
 @require_auth
 def generate_monthly_summary(user):
-    """生成月度考勤汇总"""
+    """生成月度考勤汇总（incremental=true 时只重算记录有变化的员工）"""
     try:
         data = request.get_json()
         year = data.get('year', date.today().year)
         month = data.get('month', date.today().month)
         employee_ids = data.get('employee_ids')  # 如果为空则生成所有员工
+        incremental = bool(data.get('incremental', False))
 
-        # 确定日期范围
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = date(year, month + 1, 1) - timedelta(days=1)
-
-        # 获取员工列表
-        if employee_ids:
-            employees = Employee.query.filter(Employee.id.in_(employee_ids)).all()
-        else:
-            employees = Employee.query.filter_by(employment_status='Active').all()
-
-        generated_count = 0
-
-        for emp in employees:
-            # 检查是否已有汇总
-            existing = MonthlyAttendanceSummary.query.filter_by(
-                employee_id=emp.id,
-                year=year,
-                month=month
-            ).first()
-
-            if existing and existing.is_locked:
-                continue  # 跳过已锁定的汇总
-
-            # 获取该员工当月的考勤记录
-            records = AttendanceRecord.query.filter(
-                and_(
-                    AttendanceRecord.employee_id == emp.id,
-                    AttendanceRecord.attendance_date >= start_date,
-                    AttendanceRecord.attendance_date <= end_date
-                )
-            ).all()
-
-            # 统计数据
-            actual_work_days = len([r for r in records if r.check_in_time and r.check_out_time])
-            late_records = [r for r in records if r.is_late]
-            early_leave_records = [r for r in records if r.is_early_leave]
-            absent_records = [r for r in records if r.is_absent]
-
-            total_work_hours = sum(r.work_hours or 0 for r in records)
-            total_overtime_hours = sum(r.overtime_hours or 0 for r in records)
-
-            # 获取加班记录
-            overtime_requests = OvertimeRequest.query.filter(
-                and_(
-                    OvertimeRequest.employee_id == emp.id,
-                    OvertimeRequest.overtime_date >= start_date,
-                    OvertimeRequest.overtime_date <= end_date,
-                    OvertimeRequest.status == 'approved'
-                )
-            ).all()
-
-            workday_ot = sum(o.actual_hours or o.planned_hours for o in overtime_requests if o.overtime_type == 'workday')
-            weekend_ot = sum(o.actual_hours or o.planned_hours for o in overtime_requests if o.overtime_type == 'weekend')
-            holiday_ot = sum(o.actual_hours or o.planned_hours for o in overtime_requests if o.overtime_type == 'holiday')
-
-            if existing:
-                # 更新现有汇总
-                existing.actual_work_days = actual_work_days
-                existing.late_count = len(late_records)
-                existing.late_minutes_total = sum(r.late_minutes for r in late_records)
-                existing.early_leave_count = len(early_leave_records)
-                existing.early_leave_minutes_total = sum(r.early_leave_minutes for r in early_leave_records)
-                existing.absent_days = len(absent_records)
-                existing.actual_hours = round(total_work_hours, 2)
-                existing.overtime_hours = round(total_overtime_hours, 2)
-                existing.workday_overtime_hours = round(workday_ot, 2)
-                existing.weekend_overtime_hours = round(weekend_ot, 2)
-                existing.holiday_overtime_hours = round(holiday_ot, 2)
-                existing.updated_at = datetime.utcnow()
-            else:
-                # 创建新汇总
-                summary = MonthlyAttendanceSummary(
-                    employee_id=emp.id,
-                    year=year,
-                    month=month,
-                    work_days=22,  # 默认工作日，可根据实际情况调整
-                    actual_work_days=actual_work_days,
-                    late_count=len(late_records),
-                    late_minutes_total=sum(r.late_minutes for r in late_records),
-                    early_leave_count=len(early_leave_records),
-                    early_leave_minutes_total=sum(r.early_leave_minutes for r in early_leave_records),
-                    absent_days=len(absent_records),
-                    standard_hours=176,  # 默认标准工时
-                    actual_hours=round(total_work_hours, 2),
-                    overtime_hours=round(total_overtime_hours, 2),
-                    workday_overtime_hours=round(workday_ot, 2),
-                    weekend_overtime_hours=round(weekend_ot, 2),
-                    holiday_overtime_hours=round(holiday_ot, 2)
-                )
-                db.session.add(summary)
-
-            generated_count += 1
-
+        stats = generate_monthly_summaries(year, month, employee_ids, incremental=incremental)
         db.session.commit()
 
         return jsonify({
             'success': True,
-            'message': f'已生成 {generated_count} 条月度汇总'
+            'message': f"已生成 {stats['generated']} 条月度汇总",
+            'data': stats
         }), 200
 
     except Exception as e:
@@ -3,8 +3,9 @@ from app import db
 from app.models.employee import Employee
 from app.models.base_data import Department, Position, Team, Factory
 from datetime import datetime
-from sqlalchemy import or_, and_
 from app.routes.auth import require_auth, require_admin
+from app.services.employee_query import apply_search, employee_query, parse_fields, serialize_employees
+from app.services.employee_importer import EmployeeImporter, IMPORT_MODES
 from functools import wraps
 import sys
 import os
@@ -22,6 +23,7 @@ employees_bp = Blueprint('employees', __name__, url_prefix='/api')
 # Constants
 MAX_PAGE_SIZE = 100  # P1-9: Maximum pagination limit
 VALID_EMPLOYMENT_STATUS = ['Active', 'Resigned', 'Terminated', 'On Leave']
+IMPORT_MAX_ERRORS = 500  # 导入接口最多返回的错误行数
 
 # P2-14: Error message sanitization
 def safe_error_message(operation: str, error: Exception) -> str:
@@ -160,8 +162,14 @@ def get_employees(user):
     - department: filter by department
     - employment_status: filter by employment status
     - include_deleted: include soft-deleted records (admin only)
+    - fields: comma-separated fields to return, e.g. id,empNo,name,department (default: all)
     """
     try:
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         # P1-9: Enforce pagination limit
@@ -174,23 +182,13 @@ def get_employees(user):
         include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
 
         # Build query - exclude soft-deleted by default
-        query = Employee.query
+        query = employee_query(fields)
         if not (include_deleted and is_admin(user.role)):
             query = query.filter(Employee.deleted_at.is_(None))
 
         # Apply search filter
         if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                or_(
-                    Employee.empNo.like(search_term),
-                    Employee.name.like(search_term),
-                    Employee.department.like(search_term),
-                    Employee.title.like(search_term),
-                    Employee.email.like(search_term),
-                    Employee.phone.like(search_term)
-                )
-            )
+            query = apply_search(query, search)
 
         # Apply department filter
         if department_filter:
@@ -216,7 +214,7 @@ def get_employees(user):
 
         return jsonify({
             'success': True,
-            'data': [emp.to_dict() for emp in pagination.items],
+            'data': serialize_employees(pagination.items, fields),
             'pagination': {
                 'total': pagination.total,
                 'page': pagination.page,
@@ -233,6 +231,41 @@ def get_employees(user):
             'message': safe_error_message('获取员工列表', e)
         }), 500
 
+@employees_bp.route('/employees/batch', methods=['GET'])
+@require_auth
+def get_employees_batch(user):
+    """Get multiple employees by ID in one request (?ids=1,2,3[&fields=id,name])"""
+    try:
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+        ids = []
+        for part in request.args.get('ids', '').split(','):
+            part = part.strip()
+            if part.isdigit():
+                ids.append(int(part))
+        ids = list(dict.fromkeys(ids))[:MAX_PAGE_SIZE]
+        if not ids:
+            return jsonify({'success': True, 'data': []}), 200
+
+        query = employee_query(fields).filter(Employee.id.in_(ids))
+        if not is_admin(user.role):
+            query = query.filter(Employee.deleted_at.is_(None))
+
+        return jsonify({
+            'success': True,
+            'data': serialize_employees(query.all(), fields)
+        }), 200
+
+    except Exception as e:
+        logger.error(f'Error fetching employees batch: {str(e)}')
+        return jsonify({
+            'success': False,
+            'message': '获取员工信息失败'
+        }), 500
+
 @employees_bp.route('/employees/<int:id>', methods=['GET'])
 @require_auth
 def get_employee(id, user):
@@ -722,15 +755,82 @@ def restore_employee(id, user):
             'message': '恢复员工失败，请稍后重试'
         }), 500
 
+@employees_bp.route('/employees/import', methods=['POST'])
+@require_auth
+@require_hr_admin
+def import_employees(user):
+    """
+    Import employees from an .xlsx file (Admin only)
+    Form fields:
+    - file: .xlsx workbook (first row is the header)
+    - sheet: sheet name (default: first sheet)
+    - header_row: header row number (default: 1)
+    - mode: upsert (default, insert or update by empNo) / insert (skip existing empNo)
+    - factory_id: factory for all imported rows
+    - dry_run: true to validate only
+    """
+    try:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return jsonify({'success': False, 'message': '请上传 Excel 文件'}), 400
+        if not upload.filename.lower().endswith('.xlsx'):
+            return jsonify({'success': False, 'message': '仅支持 .xlsx 文件'}), 400
+
+        mode = request.form.get('mode', 'upsert')
+        if mode not in IMPORT_MODES:
+            return jsonify({'success': False, 'message': f'导入模式只能是 {", ".join(IMPORT_MODES)}'}), 400
+        dry_run = request.form.get('dry_run', 'false').lower() == 'true'
+        factory_id = request.form.get('factory_id', type=int)
+
+        importer = EmployeeImporter(
+            defaults={'factory_id': factory_id} if factory_id else None,
+            mode=mode,
+            dry_run=dry_run
+        )
+        report = importer.import_file(
+            upload.stream,
+            sheet=request.form.get('sheet') or None,
+            header_row=request.form.get('header_row', 1, type=int)
+        )
+
+        if not dry_run:
+            AuditService.log(
+                action_type=AuditService.ACTION_DATA_CREATE,
+                user_id=user.id,
+                username=user.username,
+                resource_type='employee',
+                resource_id='import',
+                description=f'导入员工: {upload.filename} ({report.summary()})',
+                status='success',
+                module='hr'
+            )
+
+        return jsonify({
+            'success': True,
+            'message': report.summary(),
+            'data': report.to_dict(max_errors=IMPORT_MAX_ERRORS)
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': safe_error_message('导入员工', e)
+        }), 500
+
 @employees_bp.route('/employees/list', methods=['POST'])
 @require_auth
 def list_employees(user):
     """
     Legacy support: Get employees list with POST method
-    Accepts JSON body with optional filters
+    Accepts JSON body with optional filters (fields: list of fields to return)
     """
     try:
         data = request.get_json() or {}
+        try:
+            fields = parse_fields(data.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
 
         page = data.get('page', 1)
         per_page = data.get('per_page', 10)
@@ -742,21 +842,11 @@ def list_employees(user):
         status_filter = data.get('employment_status', '').strip()
 
         # Build query - exclude soft-deleted
-        query = Employee.query.filter(Employee.deleted_at.is_(None))
+        query = employee_query(fields).filter(Employee.deleted_at.is_(None))
 
         # Apply search filter
         if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                or_(
-                    Employee.empNo.like(search_term),
-                    Employee.name.like(search_term),
-                    Employee.department.like(search_term),
-                    Employee.title.like(search_term),
-                    Employee.email.like(search_term),
-                    Employee.phone.like(search_term)
-                )
-            )
+            query = apply_search(query, search)
 
         # Apply department filter
         if department_filter:
@@ -774,7 +864,7 @@ def list_employees(user):
 
         return jsonify({
             'success': True,
-            'data': [emp.to_dict() for emp in pagination.items],
+            'data': serialize_employees(pagination.items, fields),
             'pagination': {
                 'total': pagination.total,
                 'page': pagination.page,
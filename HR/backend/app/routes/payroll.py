@@ -10,10 +10,16 @@ from app.models.payroll import (
     TaxBracket, SocialInsuranceRate, PayItemType, PayrollStatus,
     init_default_pay_items, init_default_tax_brackets
 )
-from app.models.attendance import MonthlyAttendanceSummary
+from app.services.payroll_engine import calculate_payrolls
 from datetime import datetime, date
 from functools import wraps
-import uuid
+import os
+import sys
+
+# 添加 shared 模块路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+
+from shared.sequence import get_allocator
 
 payroll_bp = Blueprint('payroll', __name__, url_prefix='/api/payroll')
 
@@ -40,18 +46,24 @@ def require_auth(f):
 
 
 # ============ 辅助函数 ============
-def generate_payroll_no():
-    """生成工资单号 GZ-YYYYMMDD-XXXX"""
+def _next_daily_no(prefix, column):
+    """生成 {prefix}-YYYYMMDD-XXXX 格式的当天流水号"""
     today = datetime.now().strftime('%Y%m%d')
-    random_suffix = uuid.uuid4().hex[:4].upper()
-    return f"GZ-{today}-{random_suffix}"
+    no_prefix = f"{prefix}-{today}-"
+
+    def max_seq():
+        # 当天计数器首次创建时，跳过已有单号（旧单号为随机后缀，只取纯数字的）
+        suffixes = [no[len(no_prefix):] for (no,) in
+                    db.session.query(column).filter(column.like(f'{no_prefix}%'))]
+        return max((int(s) for s in suffixes if s.isdigit()), default=0)
+
+    seq = get_allocator(db.engine).next_value(prefix, today, seed=max_seq)
+    return f"{no_prefix}{seq:04d}"
 
 
 def generate_adjustment_no():
     """生成调整单号 TZ-YYYYMMDD-XXXX"""
-    today = datetime.now().strftime('%Y%m%d')
-    random_suffix = uuid.uuid4().hex[:4].upper()
-    return f"TZ-{today}-{random_suffix}"
+    return _next_daily_no('TZ', SalaryAdjustment.adjustment_no)
 
 
 def parse_date(date_str):
@@ -64,29 +76,6 @@ def parse_date(date_str):
         return None
 
 
-def calculate_tax(taxable_income, year=None):
-    """计算个人所得税（累计预扣法简化版）"""
-    # 获取适用的税率表
-    brackets = TaxBracket.query.filter(
-        TaxBracket.is_active == True
-    ).order_by(TaxBracket.min_income).all()
-
-    if not brackets:
-        return 0
-
-    # 找到适用的税率档次
-    for bracket in brackets:
-        max_income = bracket.max_income if bracket.max_income else float('inf')
-        if taxable_income <= max_income:
-            tax = taxable_income * (bracket.tax_rate / 100) - bracket.quick_deduction
-            return max(0, tax)
-
-    # 超过最高档次
-    last_bracket = brackets[-1]
-    tax = taxable_income * (last_bracket.tax_rate / 100) - last_bracket.quick_deduction
-    return max(0, tax)
-
-
 # ============ 薪资结构 API ============
 @payroll_bp.route('/structures', methods=['GET'])
 @require_auth
@@ -636,7 +625,7 @@ def get_payroll(id):
 @payroll_bp.route('/calculate', methods=['POST'])
 @require_auth
 def calculate_payroll():
-    """计算工资"""
+    """计算工资（dry_run=true 时只试算不保存）"""
     try:
         data = request.get_json()
 
@@ -645,148 +634,34 @@ def calculate_payroll():
         employee_ids = data.get('employee_ids', [])
         department_id = data.get('department_id')
         factory_id = data.get('factory_id')
+        dry_run = bool(data.get('dry_run', False))
 
         if not year or not month:
             return jsonify({'error': '年份和月份为必填项'}), 400
 
-        # 获取要计算工资的员工列表
-        query = Employee.query.filter(Employee.employment_status == 'Active')
-
-        if employee_ids:
-            query = query.filter(Employee.id.in_(employee_ids))
-        if department_id:
-            query = query.filter(Employee.department_id == department_id)
-        if factory_id:
-            query = query.filter(Employee.factory_id == factory_id)
-
-        employees = query.all()
+        results, errors, stats = calculate_payrolls(
+            year, month,
+            employee_ids=employee_ids,
+            department_id=department_id,
+            factory_id=factory_id,
+            dry_run=dry_run,
+            salary_overrides=data.get('salary_overrides') if dry_run else None,
+            tax_brackets=data.get('tax_brackets') if dry_run else None,
+        )
 
-        if not employees:
+        if not results and not errors and not stats['locked']:
             return jsonify({'error': '未找到符合条件的员工'}), 404
 
-        results = []
-        errors = []
-
-        for emp in employees:
-            try:
-                # 获取员工薪资配置
-                salary_config = EmployeeSalary.query.filter_by(
-                    employee_id=emp.id,
-                    is_current=True
-                ).first()
-
-                if not salary_config:
-                    errors.append(f'员工 {emp.name}({emp.empNo}) 未配置薪资信息')
-                    continue
-
-                # 检查是否已存在该月工资单
-                existing = Payroll.query.filter_by(
-                    employee_id=emp.id,
-                    year=year,
-                    month=month
-                ).first()
-
-                if existing:
-                    payroll = existing
-                else:
-                    payroll = Payroll(
-                        payroll_no=generate_payroll_no(),
-                        employee_id=emp.id,
-                        year=year,
-                        month=month
-                    )
-
-                # 获取考勤汇总
-                attendance = MonthlyAttendanceSummary.query.filter_by(
-                    employee_id=emp.id,
-                    year=year,
-                    month=month
-                ).first()
-
-                # 计算基本薪资
-                payroll.base_salary = salary_config.base_salary
-                payroll.position_salary = salary_config.position_salary
-                payroll.performance_salary = salary_config.performance_salary
-
-                # 计算补贴
-                payroll.housing_allowance = salary_config.housing_allowance
-                payroll.transport_allowance = salary_config.transport_allowance
-                payroll.meal_allowance = salary_config.meal_allowance
-                payroll.other_allowance = (salary_config.phone_allowance +
-                                           salary_config.other_allowance)
-                payroll.allowances = (payroll.housing_allowance + payroll.transport_allowance +
-                                      payroll.meal_allowance + payroll.other_allowance)
-
-                # 处理考勤
-                if attendance:
-                    payroll.work_days = attendance.work_days
-                    payroll.actual_work_days = attendance.actual_work_days
-                    payroll.overtime_hours = attendance.overtime_hours
-
-                    # 计算加班费 (假设加班费率为1.5倍)
-                    daily_rate = salary_config.base_salary / 21.75  # 月计薪天数
-                    hourly_rate = daily_rate / 8
-                    payroll.overtime_pay = attendance.overtime_hours * hourly_rate * 1.5
-
-                    # 计算缺勤扣款
-                    absent_days = payroll.work_days - payroll.actual_work_days
-                    if absent_days > 0:
-                        payroll.absence_deduction = absent_days * daily_rate
-
-                    # 迟到扣款
-                    payroll.late_deduction = attendance.late_count * 20  # 假设每次迟到扣20元
-                else:
-                    payroll.work_days = 21.75
-                    payroll.actual_work_days = 21.75
-                    payroll.overtime_hours = 0
-                    payroll.overtime_pay = 0
-                    payroll.absence_deduction = 0
-                    payroll.late_deduction = 0
-
-                # 社保公积金
-                payroll.social_insurance = salary_config.social_insurance
-                payroll.housing_fund = salary_config.housing_fund
-
-                # 汇总扣款
-                payroll.deductions = (payroll.absence_deduction + payroll.late_deduction +
-                                      payroll.leave_deduction + payroll.other_deduction)
-
-                # 计算应发工资
-                payroll.gross_salary = (payroll.base_salary + payroll.position_salary +
-                                        payroll.performance_salary + payroll.overtime_pay +
-                                        payroll.allowances + payroll.bonus +
-                                        payroll.performance_bonus - payroll.deductions)
-
-                # 计算应税收入 (扣除五险一金和起征点5000)
-                payroll.taxable_income = max(0, payroll.gross_salary -
-                                             payroll.social_insurance -
-                                             payroll.housing_fund - 5000)
-
-                # 计算个税
-                payroll.tax = calculate_tax(payroll.taxable_income)
-
-                # 计算实发工资
-                payroll.net_salary = (payroll.gross_salary - payroll.social_insurance -
-                                      payroll.housing_fund - payroll.tax)
-
-                # 更新状态
-                payroll.status = 'calculated'
-                payroll.calculated_at = datetime.now()
-
-                if not existing:
-                    db.session.add(payroll)
-
-                results.append(payroll.to_dict())
-
-            except Exception as e:
-                errors.append(f'员工 {emp.name}({emp.empNo}) 计算失败: {str(e)}')
-
-        db.session.commit()
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
 
         return jsonify({
-            'message': f'成功计算 {len(results)} 人工资',
+            'message': f"{'试算' if dry_run else '成功计算'} {len(results)} 人工资",
             'results': results,
-            'errors': errors
+            'errors': errors,
+            'data': stats
         })
     except Exception as e:
         db.session.rollback()
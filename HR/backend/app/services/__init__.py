@@ -0,0 +1,3 @@
+"""
+业务计算服务（供路由调用，不依赖请求上下文）
+"""
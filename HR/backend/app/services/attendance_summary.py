@@ -0,0 +1,230 @@
+"""
+月度考勤汇总引擎（集合化计算）
+
+按员工分组的聚合查询一次算出所有员工的汇总，再批量写入，
+替代逐员工查询考勤记录、加班记录并逐行插入/更新：
+
+    1. 一次查询当月已有汇总（跳过已锁定的）
+    2. 考勤记录按员工 GROUP BY 聚合（出勤天数、迟到/早退/缺勤、工时）
+    3. 已批准加班按员工、加班类型 GROUP BY 聚合
+    4. 已有汇总按主键批量 UPDATE，新汇总批量 INSERT
+
+增量模式只重算上次生成之后考勤或加班记录有变化（updated_at 晚于汇总的 updated_at）
+以及还没有汇总的员工。删除记录不会被检测到，删除后请使用全量模式。
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func, insert, update
+
+from app import db
+from app.models.attendance import AttendanceRecord, OvertimeRequest, MonthlyAttendanceSummary
+from app.models.employee import Employee
+
+# IN 列表分批大小（SQLite 旧版本参数上限 999）
+CHUNK_SIZE = 900
+
+DEFAULT_WORK_DAYS = 22
+DEFAULT_STANDARD_HOURS = 176
+OVERTIME_FIELDS = {
+    'workday': 'workday_overtime_hours',
+    'weekend': 'weekend_overtime_hours',
+    'holiday': 'holiday_overtime_hours',
+}
+
+
+def month_range(year, month):
+    start_date = date(year, month, 1)
+    if month == 12:
+        end_date = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    return start_date, end_date
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+
+def _scoped(query, column, employee_ids, active_subquery):
+    """按员工范围过滤：全体在职员工用子查询，指定员工分批 IN"""
+    if employee_ids is None:
+        yield query.filter(column.in_(active_subquery))
+    else:
+        for chunk in _chunks(employee_ids):
+            yield query.filter(column.in_(chunk))
+
+
+def _record_aggregates(start_date, end_date, employee_ids, active_subquery):
+    """考勤记录按员工聚合"""
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    def sum_if(condition, value):
+        return func.coalesce(func.sum(case((condition, func.coalesce(value, 0)), else_=0)), 0)
+
+    query = db.session.query(
+        AttendanceRecord.employee_id,
+        count_if(AttendanceRecord.check_in_time.isnot(None) & AttendanceRecord.check_out_time.isnot(None)),
+        count_if(AttendanceRecord.is_late.is_(True)),
+        sum_if(AttendanceRecord.is_late.is_(True), AttendanceRecord.late_minutes),
+        count_if(AttendanceRecord.is_early_leave.is_(True)),
+        sum_if(AttendanceRecord.is_early_leave.is_(True), AttendanceRecord.early_leave_minutes),
+        count_if(AttendanceRecord.is_absent.is_(True)),
+        func.coalesce(func.sum(AttendanceRecord.work_hours), 0),
+        func.coalesce(func.sum(AttendanceRecord.overtime_hours), 0),
+    ).filter(
+        AttendanceRecord.attendance_date >= start_date,
+        AttendanceRecord.attendance_date <= end_date,
+    ).group_by(AttendanceRecord.employee_id)
+
+    result = {}
+    for scoped in _scoped(query, AttendanceRecord.employee_id, employee_ids, active_subquery):
+        for emp_id, work_days, late, late_min, early, early_min, absent, hours, ot_hours in scoped:
+            result[emp_id] = {
+                'actual_work_days': int(work_days),
+                'late_count': int(late),
+                'late_minutes_total': int(late_min),
+                'early_leave_count': int(early),
+                'early_leave_minutes_total': int(early_min),
+                'absent_days': int(absent),
+                'actual_hours': round(float(hours), 2),
+                'overtime_hours': round(float(ot_hours), 2),
+            }
+    return result
+
+
+def _overtime_aggregates(start_date, end_date, employee_ids, active_subquery):
+    """已批准加班按员工、加班类型聚合（实际时长为空或 0 时按计划时长）"""
+    hours = func.coalesce(func.nullif(OvertimeRequest.actual_hours, 0), OvertimeRequest.planned_hours)
+    query = db.session.query(
+        OvertimeRequest.employee_id,
+        OvertimeRequest.overtime_type,
+        func.coalesce(func.sum(hours), 0),
+    ).filter(
+        OvertimeRequest.overtime_date >= start_date,
+        OvertimeRequest.overtime_date <= end_date,
+        OvertimeRequest.status == 'approved',
+    ).group_by(OvertimeRequest.employee_id, OvertimeRequest.overtime_type)
+
+    result = {}
+    for scoped in _scoped(query, OvertimeRequest.employee_id, employee_ids, active_subquery):
+        for emp_id, overtime_type, total in scoped:
+            field = OVERTIME_FIELDS.get(overtime_type)
+            if field:
+                result.setdefault(emp_id, {})[field] = round(float(total), 2)
+    return result
+
+
+def _changed_employees(start_date, end_date, existing, targets, scope_ids, active_subquery):
+    """增量模式：记录在汇总生成之后有变化的员工，以及还没有汇总的员工"""
+    last_change = {}
+    for model, date_column in ((AttendanceRecord, AttendanceRecord.attendance_date),
+                               (OvertimeRequest, OvertimeRequest.overtime_date)):
+        query = db.session.query(model.employee_id, func.max(model.updated_at)).filter(
+            date_column >= start_date, date_column <= end_date
+        ).group_by(model.employee_id)
+        for scoped in _scoped(query, model.employee_id, scope_ids, active_subquery):
+            for emp_id, updated_at in scoped:
+                if updated_at and (emp_id not in last_change or updated_at > last_change[emp_id]):
+                    last_change[emp_id] = updated_at
+
+    changed = set()
+    for emp_id in targets:
+        summary = existing.get(emp_id)
+        if summary is None:
+            changed.add(emp_id)
+        elif emp_id in last_change and (summary.updated_at is None or last_change[emp_id] > summary.updated_at):
+            changed.add(emp_id)
+    return changed
+
+
+def generate_monthly_summaries(year, month, employee_ids=None, incremental=False):
+    """
+    生成月度考勤汇总（调用方负责提交事务）
+
+    Args:
+        year, month: 汇总月份
+        employee_ids: 指定员工ID列表，为空时生成所有在职员工
+        incremental: 只重算有变化或缺少汇总的员工
+
+    Returns:
+        dict: generated（生成条数）, created, updated, locked（跳过的锁定汇总）, unchanged（增量跳过）
+    """
+    start_date, end_date = month_range(year, month)
+    # 以开始时间作为汇总的 updated_at，计算期间修改的记录会在下次增量时被重算
+    run_at = datetime.utcnow()
+
+    active_subquery = db.session.query(Employee.id).filter(
+        Employee.employment_status == 'Active'
+    ).scalar_subquery()
+    if employee_ids:
+        target_ids = [r[0] for r in db.session.query(Employee.id).filter(Employee.id.in_(employee_ids))]
+        scope_ids = target_ids
+    else:
+        target_ids = [r[0] for r in db.session.query(Employee.id).filter(Employee.employment_status == 'Active')]
+        scope_ids = None
+
+    existing = {
+        s.employee_id: s for s in db.session.query(
+            MonthlyAttendanceSummary.id,
+            MonthlyAttendanceSummary.employee_id,
+            MonthlyAttendanceSummary.is_locked,
+            MonthlyAttendanceSummary.updated_at,
+        ).filter(
+            MonthlyAttendanceSummary.year == year,
+            MonthlyAttendanceSummary.month == month,
+        )
+    }
+
+    locked = {emp_id for emp_id, s in existing.items() if s.is_locked}
+    targets = [emp_id for emp_id in target_ids if emp_id not in locked]
+    unchanged = 0
+    if incremental:
+        changed = _changed_employees(start_date, end_date, existing, targets, scope_ids, active_subquery)
+        unchanged = len(targets) - len(changed)
+        targets = [emp_id for emp_id in targets if emp_id in changed]
+        # 变化的员工通常很少，改为按员工ID过滤聚合
+        scope_ids = targets
+
+    if not targets:
+        return {'generated': 0, 'created': 0, 'updated': 0, 'locked': len(locked & set(target_ids)),
+                'unchanged': unchanged}
+
+    records = _record_aggregates(start_date, end_date, scope_ids, active_subquery)
+    overtime = _overtime_aggregates(start_date, end_date, scope_ids, active_subquery)
+
+    inserts, updates = [], []
+    for emp_id in targets:
+        values = {
+            'actual_work_days': 0, 'late_count': 0, 'late_minutes_total': 0,
+            'early_leave_count': 0, 'early_leave_minutes_total': 0, 'absent_days': 0,
+            'actual_hours': 0, 'overtime_hours': 0,
+            'workday_overtime_hours': 0, 'weekend_overtime_hours': 0, 'holiday_overtime_hours': 0,
+            'updated_at': run_at,
+        }
+        values.update(records.get(emp_id, {}))
+        values.update(overtime.get(emp_id, {}))
+        summary = existing.get(emp_id)
+        if summary is not None:
+            values['id'] = summary.id
+            updates.append(values)
+        else:
+            values.update(employee_id=emp_id, year=year, month=month,
+                          work_days=DEFAULT_WORK_DAYS, standard_hours=DEFAULT_STANDARD_HOURS,
+                          leave_days=0, is_locked=False, created_at=run_at)
+            inserts.append(values)
+
+    if updates:
+        db.session.execute(update(MonthlyAttendanceSummary), updates)
+    if inserts:
+        db.session.execute(insert(MonthlyAttendanceSummary), inserts)
+
+    return {
+        'generated': len(targets),
+        'created': len(inserts),
+        'updated': len(updates),
+        'locked': len(locked & set(target_ids)),
+        'unchanged': unchanged,
+    }
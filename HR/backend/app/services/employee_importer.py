@@ -0,0 +1,356 @@
+"""
+员工 Excel 导入管道（流式、分批）
+
+替代导入脚本中 pandas 整表读入 + 逐行查重 + 逐行插入的做法:
+
+    1. openpyxl read_only 流式读取，内存中只保留当前批次（CHUNK_SIZE 行）
+    2. 每批校验：必填项、日期、字段长度、文件内工号重复
+    3. 部门/职位/团队名称一次预加载，按名称补全 department_id 等外键
+    4. 每批一次查询已有工号（和身份证号），按工号批量 UPDATE / INSERT，每批提交一次
+    5. 逐行错误报告（行号、工号、原因），可导出 CSV
+
+用法:
+    importer = EmployeeImporter(defaults={'factory_id': factory.id})
+    report = importer.import_file('list.xlsx')
+    print(report.summary())
+    report.write_errors('import_errors.csv')
+
+.xls 等 openpyxl 不支持的格式可自行读取后调用 import_rows(迭代 (行号, {表头: 值}))。
+"""
+import csv
+import os
+from datetime import date, datetime
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.models.base_data import Department, Position, Team
+from app.models.employee import Employee
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+CHUNK_SIZE = int(os.getenv('EMPLOYEE_IMPORT_CHUNK_SIZE', 1000))
+
+IMPORT_MODES = ('upsert', 'insert')
+
+# 表头（去掉空白和换行）-> 员工字段
+DEFAULT_COLUMN_MAP = {
+    '工号': 'empNo',
+    '员工编号': 'empNo',
+    '姓名': 'name',
+    '性别': 'gender',
+    '出生年月': 'birth_date',
+    '出生日期': 'birth_date',
+    '身份证号码': 'id_card',
+    '身份证号': 'id_card',
+    '联系电话': 'phone',
+    '电话': 'phone',
+    '邮箱': 'email',
+    '民族': 'nationality',
+    '学历': 'education',
+    '籍贯': 'native_place',
+    '银行卡': 'bank_card',
+    '制卡': 'has_card',
+    '薪资制': 'salary_type',
+    '住宿情况': 'accommodation',
+    '部门': 'department',
+    '职位': 'title',
+    '组别': 'team',
+    '班组': 'team',
+    '入厂时间': 'hire_date',
+    '入职日期': 'hire_date',
+    '离职日期': 'resignation_date',
+    '雇佣状态': 'employment_status',
+    '身份证地址': 'home_address',
+    '家庭住址': 'home_address',
+    '紧急联系人姓名': 'emergency_contact',
+    '紧急联络人电话': 'emergency_phone',
+    '备注': 'remark',
+}
+
+DATE_FIELDS = ('birth_date', 'hire_date', 'resignation_date', 'contract_start_date', 'contract_end_date')
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y%m%d', '%d/%m/%Y', '%d-%m-%Y')
+REQUIRED_FIELDS = ('empNo', 'name')
+# 名称字段 -> (外键字段, 维度模型)
+DIMENSION_FIELDS = {
+    'department': ('department_id', Department),
+    'title': ('position_id', Position),
+    'team': ('team_id', Team),
+}
+DIMENSION_ID_FIELDS = {id_field for id_field, _ in DIMENSION_FIELDS.values()}
+
+
+def normalize_header(value):
+    return ''.join(str(value).split()) if value is not None else ''
+
+
+def _clean(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def parse_date(value):
+    """解析日期（datetime / date / 多种格式字符串），无法解析时抛出 ValueError"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip().replace('.', '-')
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'无法识别的日期: {value}')
+
+
+def iter_xlsx_rows(source, sheet=None, header_row=1):
+    """
+    流式读取 xlsx，逐行产出 (Excel 行号, {规范化表头: 值})
+
+    Args:
+        source: 文件路径或可 seek 的文件对象
+        sheet: 工作表名，默认第一个
+        header_row: 表头所在行（1 起）
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise RuntimeError('openpyxl 未安装，无法读取 Excel 文件')
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        headers = None
+        for row_number, values in enumerate(worksheet.iter_rows(min_row=header_row, values_only=True),
+                                            start=header_row):
+            if headers is None:
+                headers = [normalize_header(v) for v in values]
+                continue
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield row_number, {h: v for h, v in zip(headers, values) if h}
+    finally:
+        workbook.close()
+
+
+class ImportReport:
+    """导入结果与逐行错误"""
+
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []   # [{'row', 'empNo', 'message'}]
+
+    def add_error(self, row, emp_no, message):
+        self.errors.append({'row': row, 'empNo': emp_no, 'message': message})
+
+    def summary(self):
+        return (f'共 {self.total} 行: 新增 {self.created}, 更新 {self.updated}, '
+                f'跳过 {self.skipped}, 错误 {len(self.errors)}')
+
+    def to_dict(self, max_errors=None):
+        return {
+            'total': self.total,
+            'created': self.created,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'error_count': len(self.errors),
+            'errors': self.errors[:max_errors] if max_errors else self.errors,
+        }
+
+    def write_errors(self, path):
+        """错误报告导出为 CSV（Excel 可直接打开）"""
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=['row', 'empNo', 'message'])
+            writer.writeheader()
+            writer.writerows(self.errors)
+
+
+class EmployeeImporter:
+    """员工导入器（需在应用上下文中使用）"""
+
+    def __init__(self, column_map=None, defaults=None, transforms=None, mode='upsert',
+                 chunk_size=CHUNK_SIZE, check_id_card=True, dry_run=False):
+        """
+        Args:
+            column_map: 表头 -> 员工字段，默认 DEFAULT_COLUMN_MAP
+            defaults: 每行都设置的字段，如 {'factory_id': 2, 'employment_status': 'Active'}
+            transforms: 字段 -> 函数，对清洗后的值做转换（如雇佣状态归并）
+            mode: upsert 按工号新增或更新；insert 只新增，已有工号跳过
+            check_id_card: 身份证号已属于其他工号时报错
+            dry_run: 只校验不写库
+        """
+        if mode not in IMPORT_MODES:
+            raise ValueError(f'不支持的导入模式: {mode}')
+        self.column_map = {normalize_header(k): v for k, v in (column_map or DEFAULT_COLUMN_MAP).items()}
+        self.defaults = defaults or {}
+        self.transforms = transforms or {}
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.check_id_card = check_id_card
+        self.dry_run = dry_run
+        self._lengths = {c.name: c.type.length for c in Employee.__table__.columns
+                         if getattr(c.type, 'length', None)}
+        self._dimensions = None
+
+    def import_file(self, source, sheet=None, header_row=1):
+        return self.import_rows(iter_xlsx_rows(source, sheet, header_row))
+
+    def import_rows(self, rows):
+        """导入 (行号, {表头: 值}) 迭代器，返回 ImportReport"""
+        report = ImportReport()
+        self._dimensions = {
+            name: {n: i for i, n in db.session.query(model.id, model.name)}
+            for name, (_, model) in DIMENSION_FIELDS.items()
+        }
+        seen = set()
+        chunk = []
+        for row_number, raw in rows:
+            report.total += 1
+            values = self._validate(row_number, raw, report, seen)
+            if values is not None:
+                chunk.append((row_number, values))
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk, report)
+                chunk = []
+        if chunk:
+            self._write_chunk(chunk, report)
+        return report
+
+    def _validate(self, row_number, raw, report, seen):
+        """清洗并校验一行，失败时记录错误并返回 None"""
+        values = {}
+        for header, value in raw.items():
+            field = self.column_map.get(normalize_header(header))
+            if field and field not in values:
+                values[field] = _clean(value)
+
+        if values.get('empNo') is not None:
+            values['empNo'] = str(values['empNo'])
+        emp_no = values.get('empNo')
+        problems = [f'{field} 为必填项' for field in REQUIRED_FIELDS if values.get(field) is None]
+
+        for field in DATE_FIELDS:
+            if field in values:
+                try:
+                    values[field] = parse_date(values[field])
+                except ValueError as e:
+                    problems.append(f'{field}: {e}')
+
+        for field, transform in self.transforms.items():
+            if field in values:
+                values[field] = transform(values[field])
+
+        for field, value in values.items():
+            if isinstance(value, (int, float)) and field in self._lengths:
+                values[field] = value = str(value)
+            limit = self._lengths.get(field)
+            if limit and isinstance(value, str) and len(value) > limit:
+                problems.append(f'{field} 超过 {limit} 个字符')
+
+        if emp_no is not None:
+            if emp_no in seen:
+                problems.append('文件内工号重复')
+            seen.add(emp_no)
+
+        if problems:
+            report.add_error(row_number, emp_no, '; '.join(problems))
+            return None
+
+        # 名称能匹配到基础数据时补全外键，匹配不到时清空外键，只保留名称文本
+        for name, (id_field, _) in DIMENSION_FIELDS.items():
+            if values.get(name) is not None and id_field not in values:
+                values[id_field] = self._dimensions[name].get(values[name])
+        for field, value in self.defaults.items():
+            values.setdefault(field, value)
+        return values
+
+    def _write_chunk(self, chunk, report):
+        """一批行：查已有工号/身份证号，批量更新和插入，提交"""
+        emp_nos = [values['empNo'] for _, values in chunk]
+        existing = dict(db.session.query(Employee.empNo, Employee.id).filter(Employee.empNo.in_(emp_nos)))
+
+        id_card_owner = {}
+        if self.check_id_card:
+            id_cards = [values['id_card'] for _, values in chunk if values.get('id_card')]
+            if id_cards:
+                id_card_owner = dict(db.session.query(Employee.id_card, Employee.empNo)
+                                     .filter(Employee.id_card.in_(id_cards)))
+
+        inserts, updates = [], []
+        now = datetime.utcnow()
+        for row_number, values in chunk:
+            emp_no = values['empNo']
+            owner = id_card_owner.get(values.get('id_card'))
+            if owner is not None and owner != emp_no:
+                report.add_error(row_number, emp_no, f'身份证号已被工号 {owner} 使用')
+                continue
+            if values.get('id_card'):
+                id_card_owner[values['id_card']] = emp_no
+
+            if emp_no in existing:
+                if self.mode == 'insert':
+                    report.skipped += 1
+                    continue
+                # 空单元格不覆盖已有数据
+                row = {k: v for k, v in values.items() if v is not None or k in DIMENSION_ID_FIELDS}
+                updates.append((row_number, dict(row, id=existing[emp_no], updated_at=now)))
+            else:
+                row = dict(values, created_at=now, updated_at=now)
+                row.setdefault('employment_status', 'Active')
+                row.setdefault('is_blacklisted', False)
+                inserts.append((row_number, row))
+
+        if self.dry_run:
+            report.updated += len(updates)
+            report.created += len(inserts)
+            return
+
+        try:
+            self._execute(updates, inserts)
+            db.session.commit()
+            report.updated += len(updates)
+            report.created += len(inserts)
+        except DBAPIError:
+            # 批量写入失败时逐行重试，定位出错的行
+            db.session.rollback()
+            for kind, items in (('updated', updates), ('created', inserts)):
+                for row_number, values in items:
+                    try:
+                        self._execute(*(([(row_number, values)], []) if kind == 'updated'
+                                        else ([], [(row_number, values)])))
+                        db.session.commit()
+                        setattr(report, kind, getattr(report, kind) + 1)
+                    except DBAPIError as e:
+                        db.session.rollback()
+                        report.add_error(row_number, values['empNo'], str(e.orig))
+
+    @staticmethod
+    def _group_by_keys(items):
+        """批量语句要求每行字段相同，按字段集合分组"""
+        groups = {}
+        for _, values in items:
+            groups.setdefault(frozenset(values), []).append(values)
+        return groups.values()
+
+    def _execute(self, updates, inserts):
+        for group in self._group_by_keys(updates):
+            db.session.execute(update(Employee), group)
+        for group in self._group_by_keys(inserts):
+            db.session.execute(insert(Employee).execution_options(render_nulls=True), group)
@@ -0,0 +1,258 @@
+"""
+员工列表查询与序列化
+
+Employee.to_dict 通过 department_ref / position_ref / team_ref / factory_ref
+懒加载部门、职位、团队、工厂名称，列表每页 1 + 4N 次查询。这里:
+
+    - 部门、职位、团队、工厂等小维度表整表缓存在进程内，按 id 查名称
+    - fields= 稀疏字段投影：只加载需要的列（load_only），只输出需要的键
+    - 列表接口查询次数与每页条数无关（分页 2 次 + 维度表版本检查）
+
+维度缓存按版本失效:
+    - 本进程内通过 ORM 修改维度表时立即失效（mapper 事件）
+    - 其他进程的修改按 DIMENSION_CACHE_CHECK_INTERVAL 秒检查一次各表的
+      (行数, 最大 updated_at) 版本，变化时重新加载
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event, func, literal, or_, select, union_all
+from sqlalchemy.orm import load_only
+
+from app import db
+from app.models.base_data import Department, Factory, Position, Team
+from app.models.employee import Employee
+
+DIMENSION_CACHE_CHECK_INTERVAL = float(os.getenv('DIMENSION_CACHE_CHECK_INTERVAL', 5))
+
+# 维度名 -> (模型, 缓存的列)
+DIMENSIONS = {
+    'department': (Department, ('name',)),
+    'position': (Position, ('name',)),
+    'team': (Team, ('name',)),
+    'factory': (Factory, ('name', 'city')),
+}
+
+
+class DimensionCache:
+    """小维度表进程内缓存（线程安全）"""
+
+    def __init__(self, check_interval=DIMENSION_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._tables = {}      # 维度名 -> {id: {列: 值}}
+        self._versions = {}    # 维度名 -> (行数, 最大 updated_at)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self, name=None):
+        """丢弃缓存（name 为空时丢弃全部），下次访问时重新加载"""
+        with self._lock:
+            if name is None:
+                self._tables.clear()
+                self._versions.clear()
+            else:
+                self._tables.pop(name, None)
+                self._versions.pop(name, None)
+
+    def _current_versions(self):
+        """一次查询取得各维度表的版本"""
+        selects = [
+            select(literal(name).label('name'), func.count().label('rows'),
+                   func.max(model.updated_at).label('updated_at')).select_from(model)
+            for name, (model, _) in DIMENSIONS.items()
+        ]
+        return {row.name: (row.rows, row.updated_at) for row in db.session.execute(union_all(*selects))}
+
+    def _check_versions(self):
+        now = time.monotonic()
+        if not self._tables or now - self._checked_at < self.check_interval:
+            return
+        versions = self._current_versions()
+        with self._lock:
+            self._checked_at = now
+            for name, version in versions.items():
+                if self._versions.get(name) != version:
+                    self._tables.pop(name, None)
+                    self._versions.pop(name, None)
+
+    def ensure(self, names):
+        """加载缺失的维度表（每张表一次查询，版本一次查询）"""
+        self._check_versions()
+        missing = [name for name in names if name not in self._tables]
+        if not missing:
+            return
+        versions = self._current_versions()
+        loaded = {}
+        for name in missing:
+            model, columns = DIMENSIONS[name]
+            rows = db.session.query(model.id, *[getattr(model, c) for c in columns])
+            loaded[name] = {row[0]: dict(zip(columns, row[1:])) for row in rows}
+        with self._lock:
+            if not self._tables:
+                self._checked_at = time.monotonic()
+            for name, table in loaded.items():
+                self._tables[name] = table
+                self._versions[name] = versions.get(name)
+
+    def get(self, name):
+        """{id: {列: 值}}"""
+        table = self._tables.get(name)
+        if table is None:
+            self.ensure([name])
+            table = self._tables.get(name, {})
+        return table
+
+    def lookup(self, name, id_, column='name'):
+        if id_ is None:
+            return None
+        row = self.get(name).get(id_)
+        return row[column] if row else None
+
+
+dimension_cache = DimensionCache()
+
+
+def _register_invalidation(name, model):
+    def invalidate(mapper, connection, target):
+        dimension_cache.invalidate(name)
+
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, event_name, invalidate)
+
+
+for _name, (_model, _) in DIMENSIONS.items():
+    _register_invalidation(_name, _model)
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+
+def _datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def _plain(column):
+    return (column,), lambda emp: getattr(emp, column)
+
+
+def _formatted(column, fmt):
+    return (column,), lambda emp: fmt(getattr(emp, column))
+
+
+def _dimension(name, id_column, legacy_column=None, column='name'):
+    columns = (id_column,) + ((legacy_column,) if legacy_column else ())
+
+    def value(emp):
+        result = dimension_cache.lookup(name, getattr(emp, id_column), column)
+        if result is None and legacy_column:
+            return getattr(emp, legacy_column)
+        return result
+    return columns, value
+
+
+# 输出键 -> (需要加载的列, 取值函数)，键和取值与 Employee.to_dict 一致
+EMPLOYEE_FIELDS = {
+    'id': _plain('id'),
+    'empNo': _plain('empNo'),
+    'name': _plain('name'),
+    'gender': _plain('gender'),
+    'birth_date': _formatted('birth_date', _date),
+    'id_card': _plain('id_card'),
+    'phone': _plain('phone'),
+    'email': _plain('email'),
+    'nationality': _plain('nationality'),
+    'education': _plain('education'),
+    'native_place': _plain('native_place'),
+    'bank_card': _plain('bank_card'),
+    'has_card': _plain('has_card'),
+    'salary_type': _plain('salary_type'),
+    'accommodation': _plain('accommodation'),
+    'department_id': _plain('department_id'),
+    'position_id': _plain('position_id'),
+    'team_id': _plain('team_id'),
+    'factory_id': _plain('factory_id'),
+    'department': _dimension('department', 'department_id', 'department'),
+    'title': _dimension('position', 'position_id', 'title'),
+    'team': _dimension('team', 'team_id', 'team'),
+    'factory': _dimension('factory', 'factory_id'),
+    'factory_city': _dimension('factory', 'factory_id', column='city'),
+    'hire_date': _formatted('hire_date', _date),
+    'employment_status': _plain('employment_status'),
+    'resignation_date': _formatted('resignation_date', _date),
+    'contract_type': _plain('contract_type'),
+    'contract_start_date': _formatted('contract_start_date', _date),
+    'contract_end_date': _formatted('contract_end_date', _date),
+    'base_salary': _plain('base_salary'),
+    'performance_salary': _plain('performance_salary'),
+    'total_salary': _plain('total_salary'),
+    'home_address': _plain('home_address'),
+    'emergency_contact': _plain('emergency_contact'),
+    'emergency_phone': _plain('emergency_phone'),
+    'remark': _plain('remark'),
+    'is_blacklisted': _plain('is_blacklisted'),
+    'blacklist_reason': _plain('blacklist_reason'),
+    'blacklist_date': _formatted('blacklist_date', _date),
+    'created_at': _formatted('created_at', _datetime),
+    'updated_at': _formatted('updated_at', _datetime),
+    'deleted_at': _formatted('deleted_at', _datetime),
+    'deleted_by': _plain('deleted_by'),
+}
+
+
+# 需要维度表的输出键 -> 维度名
+DIMENSION_OF_FIELD = {'department': 'department', 'title': 'position', 'team': 'team',
+                      'factory': 'factory', 'factory_city': 'factory'}
+
+
+def parse_fields(raw):
+    """
+    解析 fields 参数（逗号分隔字符串或列表），为空返回 None 表示全部字段
+
+    Raises:
+        ValueError: 包含未知字段
+    """
+    if not raw:
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    fields = list(dict.fromkeys(f.strip() for f in raw if f and f.strip()))
+    unknown = [f for f in fields if f not in EMPLOYEE_FIELDS]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}")
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def employee_query(fields=None):
+    """员工查询，指定字段时只加载需要的列"""
+    query = Employee.query
+    if fields:
+        columns = {c for f in fields for c in EMPLOYEE_FIELDS[f][0]}
+        query = query.options(load_only(*[getattr(Employee, c) for c in sorted(columns)]))
+    return query
+
+
+def apply_search(query, search):
+    """关键字模糊匹配工号、姓名、部门、职位、邮箱、电话"""
+    search_term = f'%{search}%'
+    return query.filter(
+        or_(
+            Employee.empNo.like(search_term),
+            Employee.name.like(search_term),
+            Employee.department.like(search_term),
+            Employee.title.like(search_term),
+            Employee.email.like(search_term),
+            Employee.phone.like(search_term)
+        )
+    )
+
+
+def serialize_employees(employees, fields=None):
+    """批量序列化员工，名称取自维度缓存，不触发关系懒加载"""
+    fields = fields or list(EMPLOYEE_FIELDS)
+    dimension_cache.ensure({DIMENSION_OF_FIELD[f] for f in fields if f in DIMENSION_OF_FIELD})
+    getters = [(f, EMPLOYEE_FIELDS[f][1]) for f in fields]
+    return [{f: getter(emp) for f, getter in getters} for emp in employees]
@@ -0,0 +1,158 @@
+"""
+批量排班引擎
+
+一次查询出日期范围内已有排班，在内存中比对后分批批量写入，
+替代逐个 (员工, 日期) 查询已有排班并逐行插入：
+
+    1. 按员工分批 IN 查询范围内已有排班
+    2. 按班次规则生成每个 (员工, 日期) 的目标排班
+    3. 与已有排班比对，新排班分批 INSERT，需要覆盖的按主键分批 UPDATE
+
+班次规则:
+    - 默认: 工作日使用 shift_id，周末和 rest_days 休息（与原批量排班一致）
+    - pattern: 按天循环的班次序列，None 表示休息，如早早中中休休
+      [1, 1, 2, 2, None, None]；从 pattern_start 起算，
+      stagger 使第 i 名员工错开 i * stagger 天，实现轮班
+    - rest_days 中的日期总是休息
+
+冲突策略（员工当天已有排班时）:
+    - skip: 保留已有排班（默认）
+    - overwrite: 以新规则覆盖班次和休息标记，内容相同的不写
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+
+from app import db
+from app.models.attendance import Schedule
+
+# IN 列表分批大小（SQLite 旧版本参数上限 999）
+CHUNK_SIZE = 900
+# 每条批量写入语句的行数
+WRITE_CHUNK_SIZE = 5000
+
+CONFLICT_POLICIES = ('skip', 'overwrite')
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _to_int(value, field):
+    """请求 JSON 中的 ID 可能是字符串，统一转为 int；非整数抛 ValueError"""
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise ValueError(f'{field} 必须是整数: {value!r}')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} 必须是整数: {value!r}') from None
+
+
+def _date_range(start_date, end_date):
+    days = (end_date - start_date).days + 1
+    return [start_date + timedelta(days=i) for i in range(max(0, days))]
+
+
+def _planner(shift_id, rest_days, pattern, pattern_start, stagger):
+    """返回 plan(员工序号, 日期) -> 班次ID（None 表示休息）"""
+    rest_days = {str(d) for d in rest_days or ()}
+
+    if pattern:
+        length = len(pattern)
+
+        def plan(index, day):
+            if day.strftime('%Y-%m-%d') in rest_days:
+                return None
+            return pattern[((day - pattern_start).days + index * stagger) % length]
+    else:
+        def plan(index, day):
+            if day.strftime('%Y-%m-%d') in rest_days or day.weekday() >= 5:
+                return None
+            return shift_id
+    return plan
+
+
+def _existing_schedules(employee_ids, start_date, end_date):
+    """{(员工ID, 日期): (排班ID, 班次ID, 是否休息)}"""
+    existing = {}
+    for chunk in _chunks(employee_ids):
+        for row in db.session.query(
+            Schedule.id, Schedule.employee_id, Schedule.schedule_date, Schedule.shift_id, Schedule.is_rest
+        ).filter(
+            Schedule.employee_id.in_(chunk),
+            Schedule.schedule_date >= start_date,
+            Schedule.schedule_date <= end_date,
+        ):
+            existing[(row.employee_id, row.schedule_date)] = (row.id, row.shift_id, bool(row.is_rest))
+    return existing
+
+
+def generate_schedules(employee_ids, start_date, end_date, shift_id=None, rest_days=None,
+                       pattern=None, pattern_start=None, stagger=0, conflict='skip', created_by=None):
+    """
+    批量生成排班（调用方负责提交事务）
+
+    Args:
+        employee_ids: 员工ID列表（pattern 轮班按列表顺序错开）
+        start_date, end_date: 排班日期范围（含首尾）
+        shift_id: 默认规则下工作日使用的班次
+        rest_days: 休息日期列表，格式 'YYYY-MM-DD'
+        pattern: 按天循环的班次ID序列，None 表示休息
+        pattern_start: pattern 第一天对应的日期，默认 start_date
+        stagger: 相邻员工错开的天数
+        conflict: 已有排班的处理方式，'skip' 或 'overwrite'
+
+    员工ID、班次ID、pattern 中的班次ID 统一转为 int（字符串 ID 与已有排班比对不上会重复排班），
+    非整数值抛 ValueError
+
+    Returns:
+        dict: created, updated, skipped（保留的已有排班）, unchanged（覆盖时内容相同）
+    """
+    if conflict not in CONFLICT_POLICIES:
+        raise ValueError(f'不支持的冲突策略: {conflict}')
+
+    employee_ids = list(dict.fromkeys(_to_int(emp_id, '员工ID') for emp_id in employee_ids))
+    if shift_id is not None:
+        shift_id = _to_int(shift_id, '班次ID')
+    if pattern:
+        pattern = [None if value is None else _to_int(value, '轮班序列班次ID') for value in pattern]
+    stagger = _to_int(stagger or 0, '错开天数')
+    days = _date_range(start_date, end_date)
+    plan = _planner(shift_id, rest_days, pattern, pattern_start or start_date, stagger)
+    existing = _existing_schedules(employee_ids, start_date, end_date)
+    now = datetime.utcnow()
+
+    inserts, updates = [], []
+    skipped = unchanged = 0
+    for index, emp_id in enumerate(employee_ids):
+        for day in days:
+            target = plan(index, day)
+            is_rest = target is None
+            current = existing.get((emp_id, day))
+            if current is None:
+                inserts.append({
+                    'employee_id': emp_id, 'shift_id': target, 'schedule_date': day,
+                    'is_rest': is_rest, 'is_holiday': False,
+                    'created_by': created_by, 'created_at': now, 'updated_at': now,
+                })
+            elif conflict == 'skip':
+                skipped += 1
+            elif current[1:] == (target, is_rest):
+                unchanged += 1
+            else:
+                updates.append({'id': current[0], 'shift_id': target, 'is_rest': is_rest, 'updated_at': now})
+
+    for chunk in _chunks(updates, WRITE_CHUNK_SIZE):
+        db.session.execute(update(Schedule), chunk)
+    # render_nulls: 休息日 shift_id 为空，否则会按空值列不同拆成许多小批次
+    for chunk in _chunks(inserts, WRITE_CHUNK_SIZE):
+        db.session.execute(insert(Schedule).execution_options(render_nulls=True), chunk)
+
+    return {
+        'created': len(inserts),
+        'updated': len(updates),
+        'skipped': skipped,
+        'unchanged': unchanged,
+    }
@@ -6,8 +6,6 @@
 """
 import sys
 import os
-import pandas as pd
-from datetime import datetime
 
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(__file__))
@@ -15,6 +13,7 @@ sys.path.insert(0, os.path.dirname(__file__))
 from app import create_app, db
 from app.models.employee import Employee
 from app.models.base_data import Factory, Department, Position, Team
+from app.services.employee_importer import EmployeeImporter
 
 
 def clean_employment_status(status):
@@ -23,7 +22,7 @@ def clean_employment_status(status):
     - 临时工：合并"本厂临时工"和"中介临时工"
     - 实习生：合并所有实习生类型
     """
-    if not status or pd.isna(status):
+    if not status:
         return 'Active'
 
     status_str = str(status).strip()
@@ -91,19 +90,10 @@ def clear_test_data(app):
 
 
 def import_employees(app, excel_file):
-    """从Excel导入员工数据"""
+    """从Excel导入员工数据（流式读取，按工号分批批量写入）"""
     with app.app_context():
         print(f"\n从 {excel_file} 导入员工数据...")
 
-        # 读取Excel文件
-        try:
-            df = pd.read_excel(excel_file)
-            print(f"✓ 读取到 {len(df)} 行数据")
-            print(f"✓ 列名: {list(df.columns)}")
-        except Exception as e:
-            print(f"✗ 读取Excel文件失败: {e}")
-            return
-
         # 获取东莞工厂ID
         dongguan = Factory.query.filter_by(code='DG').first()
         if not dongguan:
@@ -112,62 +102,25 @@ def import_employees(app, excel_file):
 
         print(f"✓ 使用工厂: {dongguan.name} (ID: {dongguan.id})")
 
-        # 导入数据
-        success_count = 0
-        error_count = 0
-
-        for index, row in df.iterrows():
-            try:
-                # 提取数据（根据实际Excel列名调整）
-                emp_data = {
-                    'empNo': str(row.get('工号', f'EMP{index+1:04d}')).strip(),
-                    'name': str(row.get('姓名', '')).strip(),
-                    'gender': str(row.get('性别', '')).strip() if pd.notna(row.get('性别')) else None,
-                    'department': str(row.get('部门', '')).strip() if pd.notna(row.get('部门')) else None,
-                    'title': str(row.get('职位', '')).strip() if pd.notna(row.get('职位')) else None,
-                    'team': str(row.get('班组', '')).strip() if pd.notna(row.get('班组')) else None,
-                    'employment_status': clean_employment_status(row.get('雇佣状态', 'Active')),
-                    'factory_id': dongguan.id,  # 所有员工都属于东莞工厂
-                }
-
-                # 处理入职日期
-                hire_date = row.get('入职日期')
-                if pd.notna(hire_date):
-                    if isinstance(hire_date, str):
-                        try:
-                            emp_data['hire_date'] = datetime.strptime(hire_date, '%Y-%m-%d').date()
-                        except:
-                            pass
-                    elif hasattr(hire_date, 'date'):
-                        emp_data['hire_date'] = hire_date.date()
-
-                # 跳过空姓名的记录
-                if not emp_data['name']:
-                    continue
-
-                # 创建员工记录
-                employee = Employee(**emp_data)
-                db.session.add(employee)
-                success_count += 1
-
-                if success_count % 10 == 0:
-                    print(f"  已处理 {success_count} 条记录...")
-
-            except Exception as e:
-                error_count += 1
-                print(f"✗ 第 {index+1} 行导入失败: {e}")
-                continue
-
-        # 提交到数据库
+        importer = EmployeeImporter(
+            defaults={'factory_id': dongguan.id},  # 所有员工都属于东莞工厂
+            transforms={'employment_status': clean_employment_status},
+        )
         try:
-            db.session.commit()
-            print(f"\n✓ 导入完成!")
-            print(f"  成功: {success_count} 条")
-            print(f"  失败: {error_count} 条")
-            print(f"  工厂: {dongguan.name}")
+            report = importer.import_file(excel_file)
         except Exception as e:
             db.session.rollback()
-            print(f"✗ 提交数据库失败: {e}")
+            print(f"✗ 导入失败: {e}")
+            return
+
+        print(f"\n✓ 导入完成! {report.summary()}")
+        print(f"  工厂: {dongguan.name}")
+        if report.errors:
+            error_file = os.path.splitext(excel_file)[0] + '_errors.csv'
+            report.write_errors(error_file)
+            for error in report.errors[:20]:
+                print(f"  ✗ 第 {error['row']} 行 ({error['empNo']}): {error['message']}")
+            print(f"  错误明细已写入: {error_file}")
 
 
 def main():
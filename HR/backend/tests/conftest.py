@@ -4,6 +4,9 @@ Pytest configuration and shared fixtures
 
 import pytest
 import os
+from flask import Flask
+
+from app import db
 
 
 @pytest.fixture(scope='session', autouse=True)
@@ -11,3 +14,15 @@ def setup_test_environment():
     """Setup test environment variables"""
     os.environ['FLASK_ENV'] = 'testing'
     os.environ['TESTING'] = 'True'
+
+
+@pytest.fixture
+def app(tmp_path):
+    """独立 SQLite 库的 Flask 应用（已建表，测试在应用上下文内执行）；各测试文件用 seed 写入数据"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'hr.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,162 @@
+"""
+月度考勤汇总引擎回归测试：与原逐员工汇总逻辑逐项比对（迟到、早退、缺勤、加班）
+Run with: pytest tests/test_attendance_summary.py -v
+"""
+
+import time as _time
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import and_, insert
+
+from app import db
+from app.models import Employee
+from app.models.attendance import AttendanceRecord, MonthlyAttendanceSummary, OvertimeRequest
+from app.services.attendance_summary import generate_monthly_summaries, month_range
+
+YEAR, MONTH = 2025, 3
+FIELDS = ('actual_work_days', 'late_count', 'late_minutes_total', 'early_leave_count',
+          'early_leave_minutes_total', 'absent_days', 'actual_hours', 'overtime_hours',
+          'workday_overtime_hours', 'weekend_overtime_hours', 'holiday_overtime_hours')
+
+
+def day(d):
+    return date(YEAR, MONTH, d)
+
+
+def record(emp_id, d, absent=False, late=0, early=0, check_out=True, work_hours=8.0, overtime_hours=0):
+    check_in = None if absent else datetime.combine(day(d), time(8, 0)) + timedelta(minutes=late)
+    return {
+        'employee_id': emp_id, 'attendance_date': day(d),
+        'check_in_time': check_in,
+        'check_out_time': check_in + timedelta(hours=9) if check_in and check_out else None,
+        'is_late': bool(late), 'late_minutes': late,
+        'is_early_leave': bool(early), 'early_leave_minutes': early,
+        'is_absent': absent,
+        'work_hours': 0 if absent else work_hours,
+        'overtime_hours': overtime_hours,
+    }
+
+
+def overtime(emp_id, overtime_date, overtime_type, planned, actual, status='approved'):
+    return {
+        'employee_id': emp_id, 'overtime_date': overtime_date, 'overtime_type': overtime_type,
+        'start_time': time(18), 'end_time': time(21), 'planned_hours': planned, 'actual_hours': actual,
+        'reason': 'test', 'status': status,
+    }
+
+
+@pytest.fixture(autouse=True)
+def seed(app):
+    db.session.execute(insert(Employee), [
+        {'empNo': 'E1', 'name': '员工1', 'employment_status': 'Active'},
+        {'empNo': 'E2', 'name': '员工2', 'employment_status': 'Active'},
+        {'empNo': 'E3', 'name': '员工3', 'employment_status': 'Resigned'},
+        {'empNo': 'E4', 'name': '员工4', 'employment_status': 'Active'},  # 当月无记录
+    ])
+    db.session.execute(insert(AttendanceRecord), [
+        record(1, 3),
+        record(1, 4, late=15, work_hours=7.75),
+        record(1, 5, early=30, work_hours=7.5, overtime_hours=1.5),
+        record(1, 6, absent=True),
+        record(1, 7, check_out=False, work_hours=0),  # 漏打卡：不计出勤天数
+        record(2, 3, late=5, early=10, work_hours=7.25),
+        record(2, 4, absent=True),
+        record(2, 5, late=40, work_hours=7.33, overtime_hours=2),
+        record(3, 3, late=20),
+        record(1, 28, work_hours=8.5),
+        {**record(1, 3), 'attendance_date': date(YEAR, MONTH - 1, 28)},  # 上月记录不计入
+    ])
+    db.session.execute(insert(OvertimeRequest), [
+        overtime(1, day(5), 'workday', 2, 0),       # 实际时长为 0 时按计划时长
+        overtime(1, day(8), 'weekend', 3, 2.5),
+        overtime(1, day(9), 'weekend', 2, None),
+        overtime(1, day(10), 'holiday', 4, 4, status='pending'),
+        overtime(2, day(20), 'holiday', 8, 7.5),
+        overtime(2, date(YEAR, MONTH + 1, 1), 'workday', 2, 2),
+    ])
+    db.session.commit()
+
+
+def legacy_summarize(year, month):
+    """原逐员工汇总逻辑（只计算，不写库）"""
+    start_date, end_date = month_range(year, month)
+    results = {}
+    for emp in Employee.query.filter_by(employment_status='Active').all():
+        records = AttendanceRecord.query.filter(and_(
+            AttendanceRecord.employee_id == emp.id,
+            AttendanceRecord.attendance_date >= start_date,
+            AttendanceRecord.attendance_date <= end_date
+        )).all()
+        late = [r for r in records if r.is_late]
+        early = [r for r in records if r.is_early_leave]
+        approved = OvertimeRequest.query.filter(and_(
+            OvertimeRequest.employee_id == emp.id,
+            OvertimeRequest.overtime_date >= start_date,
+            OvertimeRequest.overtime_date <= end_date,
+            OvertimeRequest.status == 'approved'
+        )).all()
+        values = dict(
+            actual_work_days=len([r for r in records if r.check_in_time and r.check_out_time]),
+            late_count=len(late),
+            late_minutes_total=sum(r.late_minutes for r in late),
+            early_leave_count=len(early),
+            early_leave_minutes_total=sum(r.early_leave_minutes for r in early),
+            absent_days=len([r for r in records if r.is_absent]),
+            actual_hours=round(sum(r.work_hours or 0 for r in records), 2),
+            overtime_hours=round(sum(r.overtime_hours or 0 for r in records), 2),
+            **{f'{t}_overtime_hours': round(sum(o.actual_hours or o.planned_hours for o in approved
+                                                if o.overtime_type == t), 2)
+               for t in ('workday', 'weekend', 'holiday')}
+        )
+        results[emp.id] = tuple(values[f] for f in FIELDS)
+    return results
+
+
+def summaries():
+    db.session.expire_all()
+    return {s.employee_id: tuple(getattr(s, f) for f in FIELDS) for s in
+            MonthlyAttendanceSummary.query.filter_by(year=YEAR, month=MONTH)}
+
+
+def test_matches_per_employee_summary(app):
+    expected = legacy_summarize(YEAR, MONTH)
+    stats = generate_monthly_summaries(YEAR, MONTH)
+    db.session.commit()
+
+    assert stats == {'generated': 3, 'created': 3, 'updated': 0, 'locked': 0, 'unchanged': 0}
+    assert summaries() == expected
+    # 抽查：迟到、早退、缺勤、漏打卡和加班换算
+    emp1 = dict(zip(FIELDS, expected[1]))
+    assert (emp1['actual_work_days'], emp1['late_count'], emp1['late_minutes_total']) == (4, 1, 15)
+    assert (emp1['early_leave_count'], emp1['early_leave_minutes_total'], emp1['absent_days']) == (1, 30, 1)
+    assert (emp1['workday_overtime_hours'], emp1['weekend_overtime_hours'], emp1['holiday_overtime_hours']) == \
+        (2, 4.5, 0)
+    emp2 = dict(zip(FIELDS, expected[2]))
+    assert (emp2['late_count'], emp2['late_minutes_total'], emp2['early_leave_count'], emp2['absent_days']) == \
+        (2, 45, 1, 1)
+    assert expected[4] == (0,) * len(FIELDS)
+
+
+def test_update_locked_and_incremental(app):
+    generate_monthly_summaries(YEAR, MONTH)
+    db.session.commit()
+    MonthlyAttendanceSummary.query.filter_by(employee_id=2).update({'is_locked': True})
+    db.session.commit()
+
+    # 修改记录后增量重算：只重算有变化的员工，已锁定的保留
+    _time.sleep(0.01)
+    AttendanceRecord.query.filter_by(employee_id=1, attendance_date=day(3)).update(
+        {'is_late': True, 'late_minutes': 12, 'updated_at': datetime.utcnow()})
+    AttendanceRecord.query.filter_by(employee_id=2, attendance_date=day(3)).update({'is_absent': True})
+    db.session.commit()
+    locked_before = summaries()[2]
+
+    stats = generate_monthly_summaries(YEAR, MONTH, incremental=True)
+    db.session.commit()
+    assert stats == {'generated': 1, 'created': 0, 'updated': 1, 'locked': 1, 'unchanged': 1}
+
+    expected = legacy_summarize(YEAR, MONTH)
+    result = summaries()
+    assert result[1] == expected[1] and result[4] == expected[4]
+    assert result[2] == locked_before != expected[2]
@@ -0,0 +1,83 @@
+"""
+员工 Excel 导入管道单元测试
+Run with: pytest tests/test_employee_importer.py -v
+"""
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app import db
+from app.models import Employee
+from app.models.base_data import Department
+from app.services.employee_importer import EmployeeImporter
+
+openpyxl = pytest.importorskip('openpyxl')
+
+HEADER = ['工号', '姓名', '性别', '部门', '入厂时间', '联系电话', '身份证号码', '薪资\n制']
+
+
+@pytest.fixture(autouse=True)
+def seed(app):
+    db.session.execute(insert(Department), [{'code': 'PRD', 'name': '生产部'}])
+    db.session.execute(insert(Employee), [
+        {'empNo': '1001', 'name': '旧名字', 'phone': '111', 'employment_status': 'Active'},
+        {'empNo': '9999', 'name': '已有', 'id_card': 'ID-TAKEN', 'employment_status': 'Active'},
+    ])
+    db.session.commit()
+
+
+def write_workbook(path, rows):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('员工')
+    sheet.append(['东莞厂员工名单'])
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def test_import_upserts_and_reports_errors(app, tmp_path):
+    path = write_workbook(tmp_path / 'emp.xlsx', [
+        [1001, '张三', '男', '生产部', datetime(2020, 3, 1), None, None, '计件'],       # 更新，电话留空不覆盖
+        [1002, '李四', '女', '行政部', '2021.05.06', 13800138000, 'ID-2', '计时'],      # 新增，部门未匹配
+        [None, '无工号', None, None, None, None, None, None],                          # 缺工号
+        [1003, '王五', None, None, '不是日期', None, None, None],                       # 日期错误
+        [1002, '重复', None, None, None, None, None, None],                             # 文件内重复
+        [1004, '赵六', None, None, None, None, 'ID-TAKEN', None],                       # 身份证号冲突
+        [None, None, None, None, None, None, None, None],                               # 空行忽略
+        [1005, '孙七', None, '生产部', None, None, None, None],
+    ])
+
+    report = EmployeeImporter(defaults={'factory_id': 3}, chunk_size=2).import_file(
+        str(path), sheet='员工', header_row=2)
+
+    assert (report.total, report.created, report.updated) == (7, 2, 1)
+    assert [(e['row'], e['empNo']) for e in report.errors] == [(5, None), (6, '1003'), (7, '1002'), (8, '1004')]
+    assert '日期' in report.errors[1]['message']
+
+    employees = {e.empNo: e for e in Employee.query}
+    assert employees['1001'].name == '张三' and employees['1001'].phone == '111'
+    assert employees['1001'].department_id == 1 and employees['1001'].salary_type == '计件'
+    assert employees['1001'].hire_date == date(2020, 3, 1)
+    assert employees['1002'].phone == '13800138000' and employees['1002'].hire_date == date(2021, 5, 6)
+    assert employees['1002'].department == '行政部' and employees['1002'].department_id is None
+    assert employees['1005'].factory_id == 3 and employees['1005'].employment_status == 'Active'
+    assert '1004' not in employees
+
+
+def test_insert_mode_and_dry_run(app, tmp_path):
+    path = write_workbook(tmp_path / 'emp.xlsx', [
+        [1001, '张三', None, None, None, None, None, None],
+        [2001, '新人', None, None, None, None, None, None],
+    ])
+
+    report = EmployeeImporter(dry_run=True).import_file(str(path), header_row=2)
+    assert (report.created, report.updated) == (1, 1)
+    assert Employee.query.count() == 2
+
+    report = EmployeeImporter(mode='insert').import_file(str(path), header_row=2)
+    assert (report.created, report.updated, report.skipped) == (1, 0, 1)
+    assert Employee.query.filter_by(empNo='1001').one().name == '旧名字'
@@ -0,0 +1,101 @@
+"""
+员工列表查询层单元测试：查询次数不随每页条数增长、字段投影、维度缓存失效
+Run with: pytest tests/test_employee_query.py -v
+"""
+
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import event, insert
+
+from app import db
+from app.models import Employee
+from app.models.base_data import Department, Factory, Position, Team
+from app.routes import employees as employee_routes
+from app.services.employee_query import dimension_cache, serialize_employees
+
+
+class AdminUser:
+    id = 1
+    role = 'admin'
+
+
+@pytest.fixture(autouse=True)
+def seed(app):
+    for model, prefix in ((Department, 'D'), (Position, 'P'), (Team, 'T'), (Factory, 'F')):
+        db.session.execute(insert(model), [{'code': f'{prefix}{i}', 'name': f'{prefix}-name-{i}'}
+                                           for i in range(1, 6)])
+    db.session.execute(insert(Employee), [{
+        'empNo': f'E{i:04d}', 'name': f'员工{i}', 'employment_status': 'Active',
+        'department_id': i % 5 + 1 if i % 4 else None, 'department': f'legacy-{i}',
+        'position_id': i % 5 + 1, 'team_id': i % 5 + 1, 'factory_id': i % 3 + 1 if i % 2 else None,
+        'hire_date': date(2020, 1, 1),
+    } for i in range(1, 61)])
+    db.session.commit()
+    dimension_cache.invalidate()
+
+
+@pytest.fixture
+def query_counter(app):
+    counter = []
+    listener = lambda *args: counter.append(args[2])  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    yield counter
+    event.remove(db.engine, 'before_cursor_execute', listener)
+
+
+def call(app, view, path):
+    with app.test_request_context(path):
+        response, status = view.__wrapped__(user=AdminUser())
+    return status, json.loads(response.get_data())
+
+
+def test_list_query_count_is_constant(app, query_counter):
+    call(app, employee_routes.get_employees, '/api/employees?per_page=1')  # 预热维度缓存
+
+    counts = {}
+    for per_page in (5, 50):
+        query_counter.clear()
+        status, body = call(app, employee_routes.get_employees, f'/api/employees?per_page={per_page}')
+        assert status == 200 and len(body['data']) == per_page
+        counts[per_page] = len(query_counter)
+    assert counts[5] == counts[50] <= 3
+
+    query_counter.clear()
+    status, body = call(app, employee_routes.get_employees_batch, '/api/employees/batch?ids=' +
+                        ','.join(str(i) for i in range(1, 41)))
+    assert status == 200 and len(body['data']) == 40 and len(query_counter) <= 2
+
+
+def test_serialized_rows_match_to_dict(app):
+    employees = Employee.query.order_by(Employee.id).all()
+    assert serialize_employees(employees) == [emp.to_dict() for emp in employees]
+
+
+def test_fields_projection(app, query_counter):
+    status, body = call(app, employee_routes.get_employees,
+                        '/api/employees?per_page=3&fields=empNo,department,factory')
+    assert status == 200
+    assert all(set(row) == {'id', 'empNo', 'department', 'factory'} for row in body['data'])
+    items_sql = [sql for sql in query_counter if 'FROM employees' in sql and 'count(' not in sql]
+    assert items_sql and 'home_address' not in items_sql[-1]
+
+    status, body = call(app, employee_routes.get_employees, '/api/employees?fields=name,salary_secret')
+    assert status == 400 and 'salary_secret' in body['message']
+
+
+def test_dimension_cache_invalidated_on_change(app):
+    employee = db.session.get(Employee, 1)
+    assert serialize_employees([employee], ['department'])[0]['department'] == 'D-name-2'
+
+    db.session.get(Department, 2).name = '研发部'
+    db.session.commit()
+    assert serialize_employees([employee], ['department'])[0]['department'] == '研发部'
+
+    # 其他进程的修改（不经过本进程 ORM 事件）按版本检查发现
+    dimension_cache.check_interval = 0
+    db.session.execute(Department.__table__.update().where(Department.id == 2).values(
+        name='制造部', updated_at=date(2030, 1, 1)))
+    db.session.commit()
+    assert serialize_employees([employee], ['department'])[0]['department'] == '制造部'
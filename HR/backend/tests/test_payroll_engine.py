@@ -0,0 +1,176 @@
+"""
+批量工资计算引擎回归测试：与原逐员工计算逻辑逐项比对
+Run with: pytest tests/test_payroll_engine.py -v
+"""
+
+import random
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from app import db
+from app.models import Employee
+from app.models.attendance import MonthlyAttendanceSummary
+from app.models.payroll import EmployeeSalary, Payroll, TaxBracket, init_default_tax_brackets
+from app.services.payroll_engine import RESULT_FIELDS, TaxTable, calculate_payrolls
+
+YEAR, MONTH = 2025, 3
+
+
+@pytest.fixture(autouse=True)
+def seed(app):
+    init_default_tax_brackets()
+
+
+def legacy_tax(taxable_income):
+    """原 calculate_tax：每次查询税率表逐档比较"""
+    brackets = TaxBracket.query.filter(TaxBracket.is_active == True).order_by(TaxBracket.min_income).all()
+    if not brackets:
+        return 0
+    for bracket in brackets:
+        max_income = bracket.max_income if bracket.max_income else float('inf')
+        if taxable_income <= max_income:
+            return max(0, taxable_income * (bracket.tax_rate / 100) - bracket.quick_deduction)
+    last_bracket = brackets[-1]
+    return max(0, taxable_income * (last_bracket.tax_rate / 100) - last_bracket.quick_deduction)
+
+
+def legacy_calculate(year, month):
+    """原逐员工计算逻辑（只计算，不写库）"""
+    results = {}
+    for emp in Employee.query.filter(Employee.employment_status == 'Active').all():
+        salary = EmployeeSalary.query.filter_by(employee_id=emp.id, is_current=True).first()
+        if not salary:
+            continue
+        existing = Payroll.query.filter_by(employee_id=emp.id, year=year, month=month).first()
+        attendance = MonthlyAttendanceSummary.query.filter_by(employee_id=emp.id, year=year, month=month).first()
+        p = {f: getattr(existing, f) if existing else 0
+             for f in ('bonus', 'performance_bonus', 'leave_deduction', 'other_deduction')}
+        p.update(base_salary=salary.base_salary, position_salary=salary.position_salary,
+                 performance_salary=salary.performance_salary,
+                 housing_allowance=salary.housing_allowance, transport_allowance=salary.transport_allowance,
+                 meal_allowance=salary.meal_allowance,
+                 other_allowance=salary.phone_allowance + salary.other_allowance)
+        p['allowances'] = (p['housing_allowance'] + p['transport_allowance'] +
+                           p['meal_allowance'] + p['other_allowance'])
+        p['absence_deduction'] = 0
+        if attendance:
+            p['work_days'] = attendance.work_days
+            p['actual_work_days'] = attendance.actual_work_days
+            p['overtime_hours'] = attendance.overtime_hours
+            daily_rate = salary.base_salary / 21.75
+            hourly_rate = daily_rate / 8
+            p['overtime_pay'] = attendance.overtime_hours * hourly_rate * 1.5
+            absent_days = p['work_days'] - p['actual_work_days']
+            if absent_days > 0:
+                p['absence_deduction'] = absent_days * daily_rate
+            p['late_deduction'] = attendance.late_count * 20
+        else:
+            p.update(work_days=21.75, actual_work_days=21.75, overtime_hours=0, overtime_pay=0, late_deduction=0)
+        p['social_insurance'] = salary.social_insurance
+        p['housing_fund'] = salary.housing_fund
+        p['deductions'] = (p['absence_deduction'] + p['late_deduction'] +
+                           p['leave_deduction'] + p['other_deduction'])
+        p['gross_salary'] = (p['base_salary'] + p['position_salary'] + p['performance_salary'] +
+                             p['overtime_pay'] + p['allowances'] + p['bonus'] +
+                             p['performance_bonus'] - p['deductions'])
+        p['taxable_income'] = max(0, p['gross_salary'] - p['social_insurance'] - p['housing_fund'] - 5000)
+        p['tax'] = legacy_tax(p['taxable_income'])
+        p['net_salary'] = p['gross_salary'] - p['social_insurance'] - p['housing_fund'] - p['tax']
+        results[emp.id] = p
+    return results
+
+
+def seed(employees, rng):
+    db.session.execute(insert(Employee), [
+        {'empNo': f'E{i:05d}', 'name': f'员工{i}', 'employment_status': 'Active' if i % 25 else 'Resigned'}
+        for i in range(1, employees + 1)
+    ])
+    db.session.execute(insert(EmployeeSalary), [{
+        'employee_id': i,
+        'base_salary': rng.choice([3000, 6500, 12000, 30000, 80000, 150000]) + rng.randint(0, 999),
+        'position_salary': rng.choice([0, 500, 2000]),
+        'performance_salary': rng.choice([0, 1000, 5000]),
+        'housing_allowance': rng.choice([0, 300]),
+        'transport_allowance': rng.choice([0, 200]),
+        'meal_allowance': rng.choice([0, 150.5]),
+        'phone_allowance': rng.choice([0, 100]),
+        'other_allowance': rng.choice([0, 88.8]),
+        'social_insurance': rng.choice([0, 420.5, 1100]),
+        'housing_fund': rng.choice([0, 300, 1200]),
+        'effective_date': date(2024, 1, 1),
+        'is_current': True,
+    } for i in range(1, employees + 1) if i % 40])  # 部分员工未配置薪资
+    db.session.execute(insert(MonthlyAttendanceSummary), [{
+        'employee_id': i, 'year': YEAR, 'month': MONTH,
+        'work_days': 22, 'actual_work_days': rng.choice([22, 22, 21, 19.5, 23]),
+        'late_count': rng.choice([0, 0, 1, 3]), 'overtime_hours': rng.choice([0, 0, 4.5, 12]),
+    } for i in range(1, employees + 1) if i % 7])  # 部分员工没有考勤汇总
+    db.session.commit()
+
+
+def test_matches_per_employee_calculation(app):
+    rng = random.Random(16)
+    seed(300, rng)
+    # 部分员工已有工资单，带手工录入的奖金和扣款
+    db.session.execute(insert(Payroll), [{
+        'payroll_no': f'OLD-{i}', 'employee_id': i, 'year': YEAR, 'month': MONTH, 'status': 'draft',
+        'bonus': rng.choice([0, 800]), 'performance_bonus': rng.choice([0, 1500]),
+        'leave_deduction': rng.choice([0, 120]), 'other_deduction': rng.choice([0, 50]),
+    } for i in range(1, 301, 3)])
+    db.session.commit()
+
+    expected = legacy_calculate(YEAR, MONTH)
+    results, errors, stats = calculate_payrolls(YEAR, MONTH)
+    db.session.commit()
+
+    assert {r['employee_id'] for r in results} == set(expected)
+    for result in results:
+        for field in RESULT_FIELDS:
+            assert result[field] == pytest.approx(expected[result['employee_id']][field], abs=1e-6), field
+    assert len(errors) == stats['missing_salary'] > 0
+    assert stats['updated'] == sum(1 for r in results if r['payroll_no'].startswith('OLD-'))
+    assert stats['created'] + stats['updated'] == len(results)
+
+    # 写入的工资单与返回结果一致，新单号连续且不重复
+    saved = {p.employee_id: p for p in Payroll.query.filter_by(year=YEAR, month=MONTH)}
+    for result in results:
+        payroll = saved[result['employee_id']]
+        assert payroll.id == result['id'] and payroll.payroll_no == result['payroll_no']
+        assert payroll.net_salary == pytest.approx(result['net_salary']) and payroll.status == 'calculated'
+    new_nos = [r['payroll_no'] for r in results if not r['payroll_no'].startswith('OLD-')]
+    assert len(set(new_nos)) == len(new_nos) == stats['created']
+
+
+def test_dry_run_and_locked_payrolls(app):
+    seed(50, random.Random(3))
+    calculate_payrolls(YEAR, MONTH)
+    db.session.commit()
+    Payroll.query.filter_by(employee_id=1).update({'status': 'paid', 'net_salary': 1.0})
+    db.session.commit()
+    before = {p.employee_id: (p.net_salary, p.calculated_at) for p in Payroll.query}
+
+    # 试算：加薪 + 调整税率，不写库
+    results, _, stats = calculate_payrolls(
+        YEAR, MONTH, dry_run=True,
+        salary_overrides={2: {'base_salary': 100000}},
+        tax_brackets=[{'min_income': 0, 'max_income': None, 'tax_rate': 10, 'quick_deduction': 0}],
+    )
+    db.session.rollback()
+    assert stats['locked'] == 1 and 1 not in {r['employee_id'] for r in results}
+    emp2 = next(r for r in results if r['employee_id'] == 2)
+    assert emp2['base_salary'] == 100000 and emp2['tax'] == pytest.approx(emp2['taxable_income'] * 0.1)
+    assert {p.employee_id: (p.net_salary, p.calculated_at) for p in Payroll.query} == before
+
+    # 已发放的工资单不会被重算
+    calculate_payrolls(YEAR, MONTH)
+    db.session.commit()
+    assert db.session.get(Payroll, 1).net_salary == 1.0
+
+
+def test_tax_table_picks_first_matching_bracket():
+    table = TaxTable([(36000, 144000, 10, 2520), (0, 36000, 3, 0), (144000, None, 20, 16920)])
+    assert table.compute([0, 36000, 36000.01, 200000]) == pytest.approx(
+        [0, 1080, 36000.01 * 0.1 - 2520, 200000 * 0.2 - 16920])
+    assert TaxTable([]).compute([5000]) == [0]
@@ -0,0 +1,103 @@
+"""
+批量排班引擎单元测试
+Run with: pytest tests/test_schedule_generator.py -v
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app import db
+from app.models import Employee
+from app.models.attendance import Schedule, Shift
+from app.services.schedule_generator import generate_schedules
+
+MONDAY = date(2025, 3, 3)
+
+
+@pytest.fixture(autouse=True)
+def seed(app):
+    db.session.execute(insert(Employee), [
+        {'empNo': f'E{i}', 'name': f'员工{i}', 'employment_status': 'Active'} for i in range(1, 4)
+    ])
+    db.session.execute(insert(Shift), [
+        {'name': name, 'code': name, 'start_time': time(h), 'end_time': time(h + 8)}
+        for name, h in (('DAY', 8), ('MID', 14))
+    ])
+    db.session.commit()
+
+
+def schedules():
+    return {(s.employee_id, s.schedule_date): (s.shift_id, s.is_rest) for s in Schedule.query}
+
+
+def test_default_rule_skips_existing(app):
+    db.session.add(Schedule(employee_id=1, schedule_date=MONDAY, shift_id=2))
+    db.session.commit()
+
+    stats = generate_schedules([1, 2], MONDAY, MONDAY + timedelta(days=6), shift_id=1,
+                               rest_days=['2025-03-05'])
+    db.session.commit()
+
+    assert stats == {'created': 13, 'updated': 0, 'skipped': 1, 'unchanged': 0}
+    result = schedules()
+    assert result[(1, MONDAY)] == (2, False)  # 已有排班保留
+    assert result[(2, MONDAY)] == (1, False)
+    assert result[(2, MONDAY + timedelta(days=2))] == (None, True)  # rest_days
+    assert result[(2, MONDAY + timedelta(days=5))] == (None, True)  # 周六
+
+
+def test_rotation_with_overwrite(app):
+    generate_schedules([1, 2, 3], MONDAY, MONDAY + timedelta(days=5), shift_id=1)
+    db.session.commit()
+
+    pattern = [1, 2, None]
+    stats = generate_schedules([1, 2, 3], MONDAY, MONDAY + timedelta(days=5), pattern=pattern,
+                               stagger=1, conflict='overwrite')
+    db.session.commit()
+
+    result = schedules()
+    for index, emp_id in enumerate([1, 2, 3]):
+        for offset in range(6):
+            shift_id = pattern[(offset + index) % 3]
+            assert result[(emp_id, MONDAY + timedelta(days=offset))] == (shift_id, shift_id is None)
+    assert stats['created'] == 0 and stats['updated'] + stats['unchanged'] == 18 and stats['unchanged'] > 0
+
+    # 重复执行内容相同，不再写入
+    stats = generate_schedules([1, 2, 3], MONDAY, MONDAY + timedelta(days=5), pattern=pattern,
+                               stagger=1, conflict='overwrite')
+    assert stats == {'created': 0, 'updated': 0, 'skipped': 0, 'unchanged': 18}
+
+
+def test_unknown_conflict_policy(app):
+    with pytest.raises(ValueError):
+        generate_schedules([1], MONDAY, MONDAY, shift_id=1, conflict='merge')
+
+
+def test_string_ids_are_normalized(app):
+    generate_schedules([1], MONDAY, MONDAY + timedelta(days=2), shift_id=1)
+    db.session.commit()
+
+    # 请求 JSON 中的字符串 ID 与已有排班视为同一员工，不重复排班
+    stats = generate_schedules(['1', '2', 2], MONDAY, MONDAY + timedelta(days=2), pattern=['2', None, 1],
+                               stagger='1', conflict='overwrite')
+    db.session.commit()
+
+    assert stats['created'] == 3 and stats['updated'] + stats['unchanged'] == 3
+    assert Schedule.query.count() == 6
+    result = schedules()
+    assert result[(1, MONDAY)] == (2, False) and result[(2, MONDAY)] == (None, True)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'employee_ids': ['abc']},
+    {'employee_ids': [1.5]},
+    {'employee_ids': [1], 'pattern': [1, 'x']},
+    {'employee_ids': [1], 'shift_id': 'DAY'},
+])
+def test_invalid_ids_rejected(app, kwargs):
+    kwargs.setdefault('shift_id', 1)
+    with pytest.raises(ValueError):
+        generate_schedules(kwargs.pop('employee_ids'), MONDAY, MONDAY, **kwargs)
+    assert Schedule.query.count() == 0
@@ -39,6 +39,7 @@ from routes.sessions import sessions_bp
 from routes.announcements import announcements_bp
 from routes.recycle_bin import recycle_bin_bp
 from routes.chat import chat_bp
+from routes.push import push_bp
 from routes.templates import templates_bp
 from routes.export import export_bp
 from routes.email_integration import email_integration_bp
@@ -113,6 +114,7 @@ app.register_blueprint(sessions_bp)
 app.register_blueprint(announcements_bp)
 app.register_blueprint(recycle_bin_bp)
 app.register_blueprint(chat_bp)
+app.register_blueprint(push_bp)
 app.register_blueprint(templates_bp)
 app.register_blueprint(export_bp)
 app.register_blueprint(email_integration_bp)
@@ -40,14 +40,14 @@ Base = declarative_base()
 def init_db():
     """Initialize database - create all tables"""
     from models.project import Project
-    from models.project_phase import ProjectPhase
+    from models.project_phase import ProjectPhase, ProgressRollup
     from models.task import Task
     from models.project_file import ProjectFile
     from models.project_member import ProjectMember
     from models.project_notification import ProjectNotification
     from models.issue import Issue
     from models.file_share_link import FileShareLink
-    from models.project_message import ProjectMessage, MessageReadStatus
+    from models.project_message import ProjectMessage, MessageReadStatus, ChatUnreadCounter
     from models.file_index import FileIndex
 
     Base.metadata.create_all(bind=engine)
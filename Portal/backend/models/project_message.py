@@ -1,7 +1,7 @@
 """
 Project Message Model - 项目聊天消息模型
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Enum, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Enum, JSON, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from models import Base
@@ -77,3 +77,27 @@ class MessageReadStatus(Base):
             'last_read_message_id': self.last_read_message_id,
             'last_read_at': self.last_read_at.isoformat() if self.last_read_at else None,
         }
+
+
+class ChatUnreadCounter(Base):
+    """项目聊天未读计数表（发送消息时累加、标记已读时清零，替代逐项目 count 查询）"""
+    __tablename__ = 'chat_unread_counters'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'project_id', name='uq_chat_unread_user_project'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True, comment='用户ID')
+    project_id = Column(Integer, ForeignKey('projects.id', ondelete='CASCADE'), nullable=False, index=True, comment='项目ID')
+    unread_count = Column(Integer, default=0, nullable=False, comment='未读消息数')
+    last_message_id = Column(Integer, comment='最后一条未读消息ID')
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'project_id': self.project_id,
+            'unread_count': self.unread_count,
+            'last_message_id': self.last_message_id,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
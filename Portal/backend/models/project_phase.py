@@ -2,7 +2,7 @@
 ProjectPhase Model - 项目阶段模型
 按业务流程：客户订单 → 报价 → 采购 → 生产 → 质检 → 出货 → 签收
 """
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, ForeignKey, Enum, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from models import Base
@@ -150,3 +150,32 @@ class ProjectPhase(Base):
 
     def __repr__(self):
         return f"<ProjectPhase {self.name} (Order {self.phase_order})>"
+
+
+class ProgressRollup(Base):
+    """进度聚合表（任务变更时按差量维护，替代每次重算整个项目）
+
+    phase_id=0 为项目级汇总（项目下全部任务），其余为对应阶段下的任务汇总
+    """
+    __tablename__ = 'progress_rollups'
+    __table_args__ = (
+        UniqueConstraint('project_id', 'phase_id', name='uq_progress_rollup_project_phase'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey('projects.id', ondelete='CASCADE'), nullable=False, index=True, comment='项目ID')
+    phase_id = Column(Integer, nullable=False, default=0, comment='阶段ID(0=项目级汇总)')
+    task_count = Column(Integer, default=0, nullable=False, comment='任务数')
+    weight_total = Column(Integer, default=0, nullable=False, comment='Σ任务权重')
+    weighted_sum = Column(Integer, default=0, nullable=False, comment='Σ(完成百分比×权重)')
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+    def to_dict(self):
+        return {
+            'project_id': self.project_id,
+            'phase_id': self.phase_id,
+            'task_count': self.task_count,
+            'weight_total': self.weight_total,
+            'weighted_sum': self.weighted_sum,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
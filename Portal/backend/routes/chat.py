@@ -3,7 +3,6 @@
 提供项目级聊天和任务评论功能
 """
 from flask import Blueprint, request, jsonify
-from sqlalchemy import func, or_, and_
 from datetime import datetime
 import logging
 import re
@@ -19,6 +18,7 @@ from models.project import Project
 from models.task import Task
 from models.project_message import ProjectMessage, MessageReadStatus
 from models.project_member import ProjectMember
+from services import realtime_service
 
 logger = logging.getLogger(__name__)
 
@@ -156,9 +156,16 @@ def send_project_message(project_id):
         )
 
         session.add(message)
+        session.flush()
+
+        # 未读计数与消息同一事务更新
+        participants = realtime_service.get_project_participants(session, project_id)
+        realtime_service.increment_unread(session, project_id, message.id, participants - {user_id})
         session.commit()
         session.refresh(message)
 
+        realtime_service.publish(participants | {user_id}, 'chat.message', message.to_dict())
+
         # TODO: 如果有 @提醒，发送通知
         if mentions:
             logger.info(f"Message {message.id} mentions users: {mentions}")
@@ -304,6 +311,10 @@ def edit_message(message_id):
         session.commit()
         session.refresh(message)
 
+        if message.task_id is None:
+            participants = realtime_service.get_project_participants(session, message.project_id)
+            realtime_service.publish(participants, 'chat.message_updated', message.to_dict())
+
         return jsonify({
             'message': '消息已更新',
             'data': message.to_dict()
@@ -337,9 +348,17 @@ def delete_message(message_id):
         if message.sender_id != user_id and not is_admin:
             return jsonify({'error': '没有删除权限'}), 403
 
+        was_deleted = message.is_deleted
         message.is_deleted = True
+        if message.task_id is None and not was_deleted:
+            realtime_service.decrement_unread(session, message)
         session.commit()
 
+        if message.task_id is None:
+            participants = realtime_service.get_project_participants(session, message.project_id)
+            realtime_service.publish(participants, 'chat.message_deleted',
+                                     {'id': message.id, 'project_id': message.project_id})
+
         return jsonify({'message': '消息已删除'}), 200
 
     except Exception as e:
@@ -392,8 +411,12 @@ def mark_as_read(project_id):
             )
             session.add(read_status)
 
+        realtime_service.reset_unread(session, user_id, project_id)
         session.commit()
 
+        # 同一用户的其他标签页同步清零
+        realtime_service.publish([user_id], 'chat.read', {'project_id': project_id, 'unread_count': 0})
+
         return jsonify({
             'message': '已标记已读',
             'last_read_message_id': latest_message.id
@@ -418,58 +441,8 @@ def get_unread_summary():
     try:
         user_id = user.get('user_id') or user.get('id')
 
-        # 获取用户参与的项目
-        member_projects = session.query(ProjectMember.project_id).filter_by(
-            user_id=user_id
-        ).subquery()
-
-        # 获取用户创建的项目
-        created_projects = session.query(Project.id).filter_by(
-            created_by_id=user_id
-        ).subquery()
-
-        # 合并所有相关项目
-        all_projects = session.query(Project).filter(
-            or_(
-                Project.id.in_(member_projects),
-                Project.id.in_(created_projects)
-            ),
-            Project.deleted_at == None
-        ).all()
-
-        unread_by_project = []
-        total_unread = 0
-
-        for project in all_projects:
-            # 获取已读状态
-            read_status = session.query(MessageReadStatus).filter_by(
-                user_id=user_id,
-                project_id=project.id
-            ).first()
-
-            last_read_id = read_status.last_read_message_id if read_status else 0
-
-            # 统计未读消息数
-            unread_count = session.query(func.count(ProjectMessage.id)).filter(
-                ProjectMessage.project_id == project.id,
-                ProjectMessage.task_id == None,
-                ProjectMessage.is_deleted == False,
-                ProjectMessage.id > (last_read_id or 0),
-                ProjectMessage.sender_id != user_id  # 排除自己发送的
-            ).scalar() or 0
-
-            if unread_count > 0:
-                unread_by_project.append({
-                    'project_id': project.id,
-                    'project_name': project.name,
-                    'unread_count': unread_count
-                })
-                total_unread += unread_count
-
-        return jsonify({
-            'total_unread': total_unread,
-            'by_project': unread_by_project
-        }), 200
+        # 未读计数表增量维护，一次查询得到所有项目的未读数
+        return jsonify(realtime_service.get_unread_summary(session, user_id)), 200
 
     except Exception as e:
         logger.error(f"Get unread summary failed: {e}")
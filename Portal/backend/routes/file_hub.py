@@ -2,7 +2,7 @@
 File Hub API Routes - 文件中心API
 提供跨系统文件的统一查询、上传、下载功能
 """
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file
 from werkzeug.utils import secure_filename
 from models import SessionLocal
 from models.file_index import FileIndex, FileStatus, FILE_CATEGORIES, FILE_CATEGORY_GROUPS, SOURCE_SYSTEMS
@@ -12,7 +12,6 @@ import sys
 import os
 import hashlib
 import logging
-import zipfile
 import io
 import tempfile
 
@@ -21,6 +20,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 from shared.auth import verify_token
 from shared.auth.models import User, AuthSessionLocal, init_auth_db
 from shared.file_storage_v2 import EnterpriseFileStorage
+from shared.zip_stream import ZipEntry, stream_zip, unique_names, archive_limiter, ZIP_MAX_TOTAL_BYTES
 
 # Initialize auth database for user queries
 init_auth_db()
@@ -72,7 +72,7 @@ def get_files():
         page = request.args.get('page', 1, type=int)
         page_size = request.args.get('page_size', 20, type=int)
         query = request.args.get('query', '')
-        sort_by = request.args.get('sort_by', 'created_at')
+        sort_by = request.args.get('sort_by')  # 有关键词时默认按相关度
         sort_order = request.args.get('sort_order', 'desc')
 
         # 构建筛选条件
@@ -354,27 +354,38 @@ def batch_download():
     try:
         service = FileIndexService(db)
 
-        # 创建临时ZIP文件
-        zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for file_id in file_ids:
-                file_index = service.get_by_id(file_id)
-                if file_index and os.path.exists(file_index.file_path):
-                    # 使用文件名作为ZIP内的文件名
-                    zip_file.write(file_index.file_path, file_index.file_name)
+        files = []
+        for file_id in file_ids:
+            file_index = service.get_by_id(file_id)
+            if file_index and file_index.file_path and os.path.exists(file_index.file_path):
+                files.append(file_index)
+
+        if not files:
+            return jsonify({'success': False, 'error': '没有可下载的文件'}), 404
+
+        # 使用文件名作为ZIP内的文件名（重名追加序号）
+        entries = [
+            ZipEntry(arcname, file_index.file_path)
+            for arcname, file_index in zip(unique_names(f.file_name for f in files), files)
+        ]
+        if sum(entry.size for entry in entries) > ZIP_MAX_TOTAL_BYTES:
+            return jsonify({
+                'success': False,
+                'error': f'打包文件总大小超过限制（{ZIP_MAX_TOTAL_BYTES // (1024 * 1024)}MB）'
+            }), 413
 
-        zip_buffer.seek(0)
+        if not archive_limiter.acquire():
+            return jsonify({'success': False, 'error': '打包下载任务较多，请稍后重试'}), 429
 
         # 生成下载文件名
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         zip_filename = f'files_{timestamp}.zip'
 
-        return send_file(
-            zip_buffer,
+        # 流式返回 ZIP（边读边发，不在内存中拼装）
+        return Response(
+            archive_limiter.wrap(stream_zip(entries)),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=zip_filename
+            headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
         )
 
     except Exception as e:
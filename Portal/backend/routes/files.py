@@ -5,7 +5,7 @@ Files API Routes - 文件管理API
 使用企业级文件存储系统 (shared/file_storage_v2.py)
 存储路径: storage/active/portal/{YYYY}/{MM}/projects/{project_id}/{category}/
 """
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, send_file
 from werkzeug.utils import secure_filename
 from models import SessionLocal
 from models.project import Project
@@ -22,12 +22,16 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 from shared.auth import verify_token
 from shared.auth.models import User, AuthSessionLocal, init_auth_db
 from shared.file_storage_v2 import (
+    CHUNKED_UPLOAD_PART_SIZE,
     EnterpriseFileStorage,
     FileAccessLogger,
     FileActionType,
     log_file_action,
     get_file_history as get_storage_file_history
 )
+from shared.zip_stream import ZipEntry, stream_zip, unique_names, archive_limiter, ZIP_MAX_TOTAL_BYTES
+
+from services.file_preview_service import content_hash, get_thumbnail, schedule_thumbnail, supports_thumbnail
 
 # 文件索引服务 - 同步到文件中心
 try:
@@ -50,6 +54,17 @@ access_logger = FileAccessLogger(storage)
 # 文件大小限制 (50MB)
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB in bytes
 
+# 文件类型筛选（file_type 参数）对应的 MIME 类型
+FILE_TYPE_PATTERNS = {
+    'pdf': ['application/pdf'],
+    'image': ['image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/webp'],
+    'doc': ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
+    'excel': ['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'],
+    'ppt': ['application/vnd.ms-powerpoint', 'application/vnd.openxmlformats-officedocument.presentationml.presentation'],
+    'text': ['text/plain'],
+    'archive': ['application/zip', 'application/x-rar-compressed', 'application/x-7z-compressed']
+}
+
 
 def get_current_user():
     """从请求头获取当前用户"""
@@ -252,6 +267,86 @@ def get_project_files(project_id):
         session.close()
 
 
+def _register_project_upload(session, user, project, entity_id, result, content_type=None,
+                             category='documents', original_language='zh',
+                             is_chinese_version=False, remark=''):
+    """上传完成后创建项目文件记录、记录上传日志并同步文件中心索引"""
+    user_id = user.get('user_id') or user.get('id')
+    username = user.get('username', 'unknown')
+
+    # Create file record in database
+    project_file = ProjectFile(
+        project_id=project.id,
+        file_name=result['original_name'],
+        file_path=result['path'],
+        file_url=result['url'],
+        file_size=result['size'],
+        file_type=content_type or 'application/octet-stream',
+        md5_hash=result['md5'],
+        category=category,
+        is_chinese_version=is_chinese_version,
+        original_language=original_language,
+        version='1.0',
+        is_latest_version=True,
+        uploaded_by_id=user_id,
+        remark=remark
+    )
+
+    session.add(project_file)
+    session.commit()
+    session.refresh(project_file)
+
+    # 记录文件上传日志
+    access_logger.log_action(
+        file_id=result.get('file_id', str(project_file.id)),
+        action_type='upload',
+        system='portal',
+        entity_type='projects',
+        entity_id=entity_id,
+        user_id=user_id,
+        username=username,
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get('User-Agent', ''),
+        details={
+            'file_name': result['original_name'],
+            'file_size': result['size'],
+            'category': category,
+            'version': '1.0'
+        }
+    )
+
+    logger.info(f"File uploaded: {result['path']} by user {username}")
+
+    # 同步到文件中心索引（异步，不影响主流程）
+    try:
+        file_index_service = get_file_index_service(session)
+        if file_index_service:
+            file_index_service.index_file(
+                source_system='portal',
+                source_table='project_files',
+                source_id=project_file.id,
+                file_name=result['original_name'],
+                file_path=result['path'],
+                file_category=category,
+                file_url=result.get('url'),
+                file_size=result['size'],
+                file_type=content_type,
+                project_id=project.id,
+                project_no=project.project_id,
+                customer_name=getattr(project, 'customer_name', None),
+                uploaded_by=user_id,
+                uploaded_by_name=user.get('full_name') or username,
+            )
+            logger.info(f"[FileIndex] 项目文件已索引: file_id={project_file.id}")
+    except Exception as idx_err:
+        logger.warning(f"[FileIndex] 项目文件索引异常: {idx_err}")
+
+    # 后台预生成缩略图
+    schedule_thumbnail(project_file)
+
+    return project_file
+
+
 @files_bp.route('/upload', methods=['POST'])
 def upload_file():
     """上传文件
@@ -288,9 +383,6 @@ def upload_file():
         if not project:
             return jsonify({'error': '项目不存在'}), 404
 
-        # Read file
-        file_bytes = file.read()
-
         # Get form data
         category = request.form.get('category', 'documents')
         original_language = request.form.get('original_language', 'zh')
@@ -302,11 +394,11 @@ def upload_file():
 
         # Get user info for metadata
         user_id = user.get('user_id') or user.get('id')
-        username = user.get('username', 'unknown')
 
         # Save file using enterprise storage (entity-based organization)
+        # 直接传入上传流，分块写入并计算哈希，不把整个文件读入内存
         result = storage.save_file(
-            file_bytes=file_bytes,
+            file_bytes=file.stream,
             original_filename=secure_filename(file.filename),
             system='portal',
             entity_type='projects',
@@ -314,7 +406,7 @@ def upload_file():
             category=category,
             version='1.0',
             language=original_language,
-            owner_id=user_id,
+            uploaded_by=str(user_id),
             tags=[category, project.name] if project.name else [category],
             description=remark
         )
@@ -322,83 +414,197 @@ def upload_file():
         if not result.get('success', True):
             return jsonify({'error': result.get('error', '文件保存失败')}), 500
 
-        # Create file record in database
-        project_file = ProjectFile(
-            project_id=int(project_id),
-            file_name=result['original_filename'],
-            file_path=result['path'],
-            file_url=result['url'],
-            file_size=result['size'],
-            file_type=file.content_type or 'application/octet-stream',
-            md5_hash=result['md5'],
+        project_file = _register_project_upload(
+            session, user, project, entity_id, result,
+            content_type=file.content_type,
             category=category,
-            is_chinese_version=is_chinese_version,
             original_language=original_language,
-            version='1.0',
-            is_latest_version=True,
-            uploaded_by_id=user_id,
+            is_chinese_version=is_chinese_version,
             remark=remark
         )
 
-        session.add(project_file)
-        session.commit()
-        session.refresh(project_file)
+        return jsonify(project_file.to_dict()), 201
 
-        # 记录文件上传日志
-        access_logger.log_action(
-            file_id=result.get('file_id', str(project_file.id)),
-            action_type='upload',
+    except Exception as e:
+        session.rollback()
+        logger.error(f"File upload failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
+
+
+@files_bp.route('/upload/chunked', methods=['POST'])
+def init_chunked_upload():
+    """创建分片上传会话（大文件断点续传）
+
+    请求体:
+        file_name, total_size, project_id: 必填
+        chunk_size, category, original_language, is_chinese_version, remark, sha256: 可选
+
+    返回 upload_id、chunk_size、total_chunks；随后按序号 PUT 各分片，
+    中断后可用 GET 查询缺失的分片继续上传，最后 POST complete 合并。
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': '未授权'}), 401
+
+    data = request.get_json() or {}
+    file_name = secure_filename(data.get('file_name') or '')
+    if not file_name:
+        return jsonify({'error': '文件名为空'}), 400
+    if not data.get('project_id'):
+        return jsonify({'error': '缺少项目ID'}), 400
+
+    try:
+        project_id = int(data['project_id'])
+        total_size = int(data.get('total_size') or 0)
+        chunk_size = int(data['chunk_size']) if data.get('chunk_size') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': '项目ID、文件大小和分片大小必须是整数'}), 400
+    if total_size <= 0:
+        return jsonify({'error': '文件大小必须大于 0'}), 400
+    if chunk_size is not None and not 0 < chunk_size <= CHUNKED_UPLOAD_PART_SIZE:
+        return jsonify({'error': f'分片大小必须在 1 ~ {CHUNKED_UPLOAD_PART_SIZE} 字节之间'}), 400
+
+    session = SessionLocal()
+    try:
+        project = session.query(Project).filter_by(id=project_id).first()
+        if not project:
+            return jsonify({'error': '项目不存在'}), 404
+    finally:
+        session.close()
+
+    category = data.get('category', 'documents')
+    result = storage.create_chunked_upload(
+        original_filename=file_name,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        category=category,
+        sha256=data.get('sha256'),
+        extra={
+            'project_id': project_id,
+            'user_id': user.get('user_id') or user.get('id'),
+            'content_type': data.get('content_type'),
+            'category': category,
+            'original_language': data.get('original_language', 'zh'),
+            'is_chinese_version': bool(data.get('is_chinese_version', False)),
+            'remark': data.get('remark', '')
+        }
+    )
+    if not result.get('success'):
+        return jsonify({'error': result.get('error')}), 400
+    return jsonify(result), 201
+
+
+def _get_own_upload(upload_id, user):
+    """获取当前用户的分片上传会话"""
+    status = storage.get_upload_status(upload_id)
+    if not status.get('success'):
+        return None, (jsonify({'error': status.get('error')}), 404)
+    if status['extra'].get('user_id') != (user.get('user_id') or user.get('id')):
+        return None, (jsonify({'error': '无权访问该上传'}), 403)
+    return status, None
+
+
+@files_bp.route('/upload/chunked/<upload_id>', methods=['GET'])
+def get_chunked_upload(upload_id):
+    """查询分片上传进度（返回已收到和缺失的分片序号）"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': '未授权'}), 401
+
+    status, error = _get_own_upload(upload_id, user)
+    if error:
+        return error
+    return jsonify({key: status[key] for key in (
+        'upload_id', 'filename', 'total_size', 'chunk_size', 'total_chunks',
+        'received', 'missing', 'complete'
+    )})
+
+
+@files_bp.route('/upload/chunked/<upload_id>/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    """上传一个分片（请求体为分片原始字节，可重复上传）"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': '未授权'}), 401
+
+    _, error = _get_own_upload(upload_id, user)
+    if error:
+        return error
+
+    result = storage.save_upload_chunk(upload_id, index, request.stream)
+    if not result.get('success'):
+        return jsonify({'error': result.get('error')}), 400
+    return jsonify(result)
+
+
+@files_bp.route('/upload/chunked/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    """合并分片并登记为项目文件"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': '未授权'}), 401
+
+    status, error = _get_own_upload(upload_id, user)
+    if error:
+        return error
+    extra = status['extra']
+
+    session = SessionLocal()
+    try:
+        project = session.query(Project).filter_by(id=extra['project_id']).first()
+        if not project:
+            return jsonify({'error': '项目不存在'}), 404
+        entity_id = project.project_id if project.project_id else f"PRJ-{project.id}"
+        category = extra.get('category') or 'documents'
+
+        result = storage.complete_chunked_upload(
+            upload_id,
             system='portal',
             entity_type='projects',
             entity_id=entity_id,
-            user_id=user_id,
-            username=username,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent', ''),
-            details={
-                'file_name': result['original_filename'],
-                'file_size': result['size'],
-                'category': category,
-                'version': '1.0'
-            }
+            category=category,
+            version='1.0',
+            language=extra.get('original_language'),
+            uploaded_by=str(extra.get('user_id')),
+            tags=[category, project.name] if project.name else [category],
+            description=extra.get('remark')
         )
+        if not result.get('success'):
+            return jsonify({'error': result.get('error'), 'missing': result.get('missing')}), 400
 
-        logger.info(f"File uploaded: {result['path']} by user {username}")
-
-        # 同步到文件中心索引（异步，不影响主流程）
-        try:
-            file_index_service = get_file_index_service(session)
-            if file_index_service:
-                file_index_service.index_file(
-                    source_system='portal',
-                    source_table='project_files',
-                    source_id=project_file.id,
-                    file_name=result['original_filename'],
-                    file_path=result['path'],
-                    file_category=category,
-                    file_url=result.get('url'),
-                    file_size=result['size'],
-                    file_type=file.content_type,
-                    project_id=int(project_id),
-                    project_no=project.project_id,
-                    customer_name=getattr(project, 'customer_name', None),
-                    uploaded_by=user_id,
-                    uploaded_by_name=user.get('full_name') or username,
-                )
-                logger.info(f"[FileIndex] 项目文件已索引: file_id={project_file.id}")
-        except Exception as idx_err:
-            logger.warning(f"[FileIndex] 项目文件索引异常: {idx_err}")
-
+        project_file = _register_project_upload(
+            session, user, project, entity_id, result,
+            content_type=extra.get('content_type'),
+            category=category,
+            original_language=extra.get('original_language', 'zh'),
+            is_chinese_version=extra.get('is_chinese_version', False),
+            remark=extra.get('remark', '')
+        )
         return jsonify(project_file.to_dict()), 201
 
     except Exception as e:
         session.rollback()
-        logger.error(f"File upload failed: {str(e)}")
+        logger.error(f"Chunked upload complete failed: {str(e)}")
         return jsonify({'error': str(e)}), 500
     finally:
         session.close()
 
 
+@files_bp.route('/upload/chunked/<upload_id>', methods=['DELETE'])
+def abort_chunked_upload(upload_id):
+    """取消分片上传"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': '未授权'}), 401
+
+    _, error = _get_own_upload(upload_id, user)
+    if error:
+        return error
+    return jsonify(storage.abort_chunked_upload(upload_id))
+
+
 @files_bp.route('/upload-inline', methods=['POST'])
 def upload_inline_file():
     """上传内联文件（用于富文本编辑器中的图片和附件）
@@ -439,9 +645,6 @@ def upload_inline_file():
             return jsonify({'error': '只允许上传图片文件 (jpg, png, gif, webp, bmp)'}), 400
 
     try:
-        # Read file
-        file_bytes = file.read()
-
         # Get user info
         user_id = user.get('user_id') or user.get('id')
         username = user.get('username', 'unknown')
@@ -453,14 +656,14 @@ def upload_inline_file():
 
         # Save file using enterprise storage
         result = storage.save_file(
-            file_bytes=file_bytes,
+            file_bytes=file.stream,
             original_filename=unique_filename,
             system='portal',
             entity_type='inline',
             entity_id=f"user-{user_id}",
             category=file_type,
             version='1.0',
-            owner_id=user_id,
+            uploaded_by=str(user_id),
             tags=[file_type, 'inline'],
             description=f"Inline {file_type} uploaded by {username}"
         )
@@ -570,9 +773,6 @@ def upload_file_version(file_id):
         project = session.query(Project).filter_by(id=original_file.project_id).first()
         entity_id = project.project_id if project and project.project_id else f"PRJ-{original_file.project_id}"
 
-        # Read file
-        file_bytes = file.read()
-
         # Calculate new version number
         parts = original_file.version.split('.')
         major, minor = int(parts[0]), int(parts[1])
@@ -585,7 +785,7 @@ def upload_file_version(file_id):
 
         # Save new version using enterprise storage
         result = storage.save_file(
-            file_bytes=file_bytes,
+            file_bytes=file.stream,
             original_filename=secure_filename(file.filename),
             system='portal',
             entity_type='projects',
@@ -593,7 +793,7 @@ def upload_file_version(file_id):
             category=original_file.category,
             version=new_version,
             language=original_file.original_language,
-            owner_id=user_id,
+            uploaded_by=str(user_id),
             tags=[original_file.category, f'version:{new_version}'],
             description=f"Version {new_version}: {remark}" if remark else f"Version {new_version}"
         )
@@ -607,7 +807,7 @@ def upload_file_version(file_id):
         # Create new version file record
         new_file = ProjectFile(
             project_id=original_file.project_id,
-            file_name=result['original_filename'],
+            file_name=result['original_name'],
             file_path=result['path'],
             file_url=result['url'],
             file_size=result['size'],
@@ -640,7 +840,7 @@ def upload_file_version(file_id):
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent', ''),
             details={
-                'file_name': result['original_filename'],
+                'file_name': result['original_name'],
                 'file_size': result['size'],
                 'old_version': original_file.version,
                 'new_version': new_version,
@@ -659,7 +859,7 @@ def upload_file_version(file_id):
                     source_system='portal',
                     source_table='project_files',
                     source_id=new_file.id,
-                    file_name=result['original_filename'],
+                    file_name=result['original_name'],
                     file_path=result['path'],
                     file_category=original_file.category,
                     file_url=result.get('url'),
@@ -684,6 +884,9 @@ def upload_file_version(file_id):
         except Exception as idx_err:
             logger.warning(f"[FileIndex] 项目文件版本索引异常: {idx_err}")
 
+        # 后台预生成缩略图
+        schedule_thumbnail(new_file)
+
         return jsonify(new_file.to_dict()), 201
 
     except Exception as e:
@@ -929,6 +1132,20 @@ def set_file_as_latest(file_id):
 
         logger.info(f"File version set as latest: file_id={file_id}, version={target_file.version} by user {username}")
 
+        # 同步文件中心索引的最新版本标记
+        try:
+            file_index_service = get_file_index_service(session)
+            if file_index_service:
+                for f in sibling_files:
+                    file_index_service.update_index(
+                        source_system='portal',
+                        source_table='project_files',
+                        source_id=f.id,
+                        is_latest_version=f.id == target_file.id,
+                    )
+        except Exception as idx_err:
+            logger.warning(f"[FileIndex] 更新最新版本索引异常: {idx_err}")
+
         return jsonify({
             'message': '版本设置成功',
             'file': file_to_dict_with_uploader(target_file, get_user_info(target_file.uploaded_by_id)),
@@ -1422,12 +1639,77 @@ def get_project_files_history(project_id):
 # 文件搜索 API (P1-1)
 # ============================================================
 
+def _search_project_files_in_index(session, q, uploader_id=None, category=None, file_type=None,
+                                   date_from=None, date_to=None, project_id=None, only_latest=True,
+                                   include_deleted=False, sort_by=None, sort_order='desc',
+                                   page=1, page_size=20):
+    """在文件中心全文索引中搜索项目文件
+
+    Returns:
+        (当前页 ProjectFile 列表, 总数)；索引不可用或条件无法在索引内完成时返回 None
+    """
+    if file_type and file_type not in FILE_TYPE_PATTERNS:
+        return None
+    file_index_service = get_file_index_service(session)
+    if not file_index_service or not hasattr(file_index_service, 'search_index_ids'):
+        return None
+
+    facets = {'system': 'portal', 'table': 'project_files'}
+    if uploader_id:
+        facets['uploader'] = uploader_id
+    if category:
+        facets['category'] = category
+    if file_type:
+        facets['type'] = FILE_TYPE_PATTERNS[file_type]
+    if project_id:
+        facets['project'] = project_id
+    if only_latest:
+        facets['latest'] = True
+    exclude_facets = None if include_deleted else {'status': 'deleted'}
+
+    start_date = end_date = None
+    try:
+        if date_from:
+            start_date = datetime.strptime(date_from, '%Y-%m-%d').strftime('%Y-%m-%d')
+        if date_to:
+            from datetime import timedelta
+            end_date = (datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    except ValueError:
+        pass
+
+    try:
+        found = file_index_service.search_index_ids(
+            q, facets=facets, exclude_facets=exclude_facets,
+            start_date=start_date, end_date=end_date,
+            sort_by=sort_by, sort_order=sort_order, page=page, page_size=page_size
+        )
+    except Exception as e:
+        logger.warning(f"[FileSearch] 全文检索失败，回退到数据库查询: {e}")
+        return None
+    if found is None:
+        return None
+
+    hits, total = found
+    ids = [hit['source_id'] for hit in hits]
+    if not ids:
+        return [], total
+
+    # 按主键取回当前页，并用数据库状态复核（防止索引滞后）
+    query = session.query(ProjectFile).filter(ProjectFile.id.in_(ids))
+    if not include_deleted:
+        query = query.filter(ProjectFile.deleted_at == None)
+    if only_latest:
+        query = query.filter(ProjectFile.is_latest_version == True)
+    rows = {f.id: f for f in query.all()}
+    return [rows[i] for i in ids if i in rows], total
+
+
 @files_bp.route('/search', methods=['GET'])
 def search_files():
     """搜索文件
 
     Query参数:
-        - q: 搜索关键词（搜索文件名）
+        - q: 搜索关键词（文件名、分类、项目、上传者、正文；全文索引可用时按相关度排序）
         - uploader_id: 按上传者ID筛选
         - category: 文件分类筛选
         - file_type: 文件类型筛选（如 pdf, image, doc 等）
@@ -1438,7 +1720,7 @@ def search_files():
         - include_deleted: 包含已删除文件 (默认false)
         - page: 页码 (默认1)
         - page_size: 每页数量 (默认20, 最大100)
-        - sort_by: 排序字段 (created_at, file_name, file_size, 默认created_at)
+        - sort_by: 排序字段 (created_at, file_name, file_size, 默认created_at；有关键词时默认按相关度)
         - sort_order: 排序方向 (asc, desc, 默认desc)
     """
     user = get_current_user()
@@ -1465,84 +1747,88 @@ def search_files():
         sort_by = request.args.get('sort_by', 'created_at')
         sort_order = request.args.get('sort_order', 'desc')
 
-        # 构建查询
-        query = session.query(ProjectFile)
-
-        # 默认排除已删除文件
-        if not include_deleted:
-            query = query.filter(ProjectFile.deleted_at == None)
-
-        # 关键词搜索（文件名模糊匹配）
+        # 关键词搜索优先使用全文索引（按相关度排序，过滤条件在索引内完成）
+        files = None
         if q:
-            search_pattern = f'%{q}%'
-            query = query.filter(ProjectFile.file_name.ilike(search_pattern))
-
-        # 上传者筛选
-        if uploader_id:
-            query = query.filter(ProjectFile.uploaded_by_id == uploader_id)
-
-        # 分类筛选
-        if category:
-            query = query.filter(ProjectFile.category == category)
-
-        # 文件类型筛选
-        if file_type:
-            file_type_patterns = {
-                'pdf': ['application/pdf'],
-                'image': ['image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/webp'],
-                'doc': ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
-                'excel': ['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'],
-                'ppt': ['application/vnd.ms-powerpoint', 'application/vnd.openxmlformats-officedocument.presentationml.presentation'],
-                'text': ['text/plain'],
-                'archive': ['application/zip', 'application/x-rar-compressed', 'application/x-7z-compressed']
-            }
+            indexed = _search_project_files_in_index(
+                session, q, uploader_id=uploader_id, category=category, file_type=file_type,
+                date_from=date_from, date_to=date_to, project_id=project_id,
+                only_latest=only_latest, include_deleted=include_deleted,
+                sort_by=request.args.get('sort_by'), sort_order=sort_order,
+                page=page, page_size=page_size
+            )
+            if indexed is not None:
+                files, total = indexed
+
+        if files is None:
+            # 构建查询
+            query = session.query(ProjectFile)
+
+            # 默认排除已删除文件
+            if not include_deleted:
+                query = query.filter(ProjectFile.deleted_at == None)
+
+            # 关键词搜索（文件名模糊匹配）
+            if q:
+                search_pattern = f'%{q}%'
+                query = query.filter(ProjectFile.file_name.ilike(search_pattern))
+
+            # 上传者筛选
+            if uploader_id:
+                query = query.filter(ProjectFile.uploaded_by_id == uploader_id)
+
+            # 分类筛选
+            if category:
+                query = query.filter(ProjectFile.category == category)
+
+            # 文件类型筛选
+            if file_type:
+                if file_type in FILE_TYPE_PATTERNS:
+                    from sqlalchemy import or_
+                    type_filters = [ProjectFile.file_type == t for t in FILE_TYPE_PATTERNS[file_type]]
+                    query = query.filter(or_(*type_filters))
+                else:
+                    # 自定义类型，直接匹配
+                    query = query.filter(ProjectFile.file_type.ilike(f'%{file_type}%'))
+
+            # 日期范围筛选
+            if date_from:
+                from datetime import datetime as dt
+                try:
+                    from_date = dt.strptime(date_from, '%Y-%m-%d')
+                    query = query.filter(ProjectFile.created_at >= from_date)
+                except ValueError:
+                    pass
 
-            if file_type in file_type_patterns:
-                from sqlalchemy import or_
-                type_filters = [ProjectFile.file_type == t for t in file_type_patterns[file_type]]
-                query = query.filter(or_(*type_filters))
+            if date_to:
+                from datetime import datetime as dt, timedelta
+                try:
+                    to_date = dt.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
+                    query = query.filter(ProjectFile.created_at < to_date)
+                except ValueError:
+                    pass
+
+            # 项目筛选
+            if project_id:
+                query = query.filter(ProjectFile.project_id == project_id)
+
+            # 只显示最新版本
+            if only_latest:
+                query = query.filter(ProjectFile.is_latest_version == True)
+
+            # 获取总数
+            total = query.count()
+
+            # 排序
+            sort_column = getattr(ProjectFile, sort_by, ProjectFile.created_at)
+            if sort_order == 'asc':
+                query = query.order_by(sort_column.asc())
             else:
-                # 自定义类型，直接匹配
-                query = query.filter(ProjectFile.file_type.ilike(f'%{file_type}%'))
-
-        # 日期范围筛选
-        if date_from:
-            from datetime import datetime as dt
-            try:
-                from_date = dt.strptime(date_from, '%Y-%m-%d')
-                query = query.filter(ProjectFile.created_at >= from_date)
-            except ValueError:
-                pass
-
-        if date_to:
-            from datetime import datetime as dt, timedelta
-            try:
-                to_date = dt.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-                query = query.filter(ProjectFile.created_at < to_date)
-            except ValueError:
-                pass
-
-        # 项目筛选
-        if project_id:
-            query = query.filter(ProjectFile.project_id == project_id)
-
-        # 只显示最新版本
-        if only_latest:
-            query = query.filter(ProjectFile.is_latest_version == True)
-
-        # 获取总数
-        total = query.count()
-
-        # 排序
-        sort_column = getattr(ProjectFile, sort_by, ProjectFile.created_at)
-        if sort_order == 'asc':
-            query = query.order_by(sort_column.asc())
-        else:
-            query = query.order_by(sort_column.desc())
+                query = query.order_by(sort_column.desc())
 
-        # 分页
-        offset = (page - 1) * page_size
-        files = query.offset(offset).limit(page_size).all()
+            # 分页
+            offset = (page - 1) * page_size
+            files = query.offset(offset).limit(page_size).all()
 
         # 批量获取上传者信息
         user_ids = [f.uploaded_by_id for f in files]
@@ -1663,6 +1949,20 @@ def batch_delete_files():
 
         logger.info(f"Batch delete by {username}: deleted={len(deleted)}, failed={len(failed)}")
 
+        # 从文件中心移除索引
+        try:
+            file_index_service = get_file_index_service(session)
+            if file_index_service:
+                for item in deleted:
+                    file_index_service.remove_from_index(
+                        source_system='portal',
+                        source_table='project_files',
+                        source_id=item['id'],
+                        soft_delete=True
+                    )
+        except Exception as idx_err:
+            logger.warning(f"[FileIndex] 批量移除项目文件索引异常: {idx_err}")
+
         return jsonify({
             'message': f'批量删除完成',
             'deleted': deleted,
@@ -1706,10 +2006,6 @@ def batch_download_files():
 
     session = SessionLocal()
     try:
-        import zipfile
-        import tempfile
-        from flask import send_file
-
         user_id = user.get('user_id') or user.get('id')
         username = user.get('username', 'unknown')
 
@@ -1722,48 +2018,61 @@ def batch_download_files():
         if not files:
             return jsonify({'error': '没有可下载的文件'}), 404
 
-        # 创建临时 ZIP 文件
-        temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-        temp_zip_path = temp_zip.name
-
-        with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file in files:
-                if file.file_path and os.path.exists(file.file_path):
-                    # 使用文件名作为ZIP内的名称
-                    arcname = file.file_name
-                    zipf.write(file.file_path, arcname)
-
-                    # 记录下载日志
-                    try:
-                        project = session.query(Project).filter_by(id=file.project_id).first()
-                        entity_id = project.project_no if project else f"PRJ-{file.project_id}"
-                        access_logger.log_action(
-                            file_id=str(file.id),
-                            action_type='download',
-                            system='portal',
-                            entity_type='projects',
-                            entity_id=entity_id,
-                            user_id=user_id,
-                            username=username,
-                            ip_address=request.remote_addr,
-                            user_agent=request.headers.get('User-Agent', ''),
-                            details={
-                                'file_name': file.file_name,
-                                'batch_download': True
-                            }
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to log download for file {file.id}: {e}")
+        files = [f for f in files if f.file_path and os.path.exists(f.file_path)]
+        if not files:
+            return jsonify({'error': '没有可下载的文件'}), 404
 
-        logger.info(f"Batch download by {username}: {len(files)} files")
+        # 使用文件名作为ZIP内的名称（重名追加序号）
+        entries = [
+            ZipEntry(arcname, file.file_path)
+            for arcname, file in zip(unique_names(f.file_name for f in files), files)
+        ]
+        total_size = sum(entry.size for entry in entries)
+        if total_size > ZIP_MAX_TOTAL_BYTES:
+            return jsonify({
+                'error': f'打包文件总大小超过限制（{ZIP_MAX_TOTAL_BYTES // (1024 * 1024)}MB）'
+            }), 413
+
+        projects = {
+            p.id: p for p in session.query(Project).filter(
+                Project.id.in_({f.project_id for f in files})
+            ).all()
+        }
 
-        # 返回 ZIP 文件
+        if not archive_limiter.acquire():
+            return jsonify({'error': '打包下载任务较多，请稍后重试'}), 429
+
+        # 记录下载日志
+        for file in files:
+            try:
+                project = projects.get(file.project_id)
+                entity_id = project.project_no if project else f"PRJ-{file.project_id}"
+                access_logger.log_action(
+                    file_id=str(file.id),
+                    action_type='download',
+                    system='portal',
+                    entity_type='projects',
+                    entity_id=entity_id,
+                    user_id=user_id,
+                    username=username,
+                    ip_address=request.remote_addr,
+                    user_agent=request.headers.get('User-Agent', ''),
+                    details={
+                        'file_name': file.file_name,
+                        'batch_download': True
+                    }
+                )
+            except Exception as e:
+                logger.warning(f"Failed to log download for file {file.id}: {e}")
+
+        logger.info(f"Batch download by {username}: {len(files)} files, {total_size} bytes")
+
+        # 流式返回 ZIP（边读边发，不生成临时文件）
         zip_filename = f'batch_download_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
-        return send_file(
-            temp_zip_path,
-            as_attachment=True,
-            download_name=zip_filename,
-            mimetype='application/zip'
+        return Response(
+            archive_limiter.wrap(stream_zip(entries)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
         )
 
     except Exception as e:
@@ -1777,6 +2086,21 @@ def batch_download_files():
 # 文件预览 API (P1-2)
 # ============================================================
 
+def _send_thumbnail(file):
+    """返回缓存的缩略图（带 ETag，未修改时 304），不支持或生成失败返回 None"""
+    try:
+        thumbnail = get_thumbnail(file, request.args.get('size'))
+    except Exception as e:
+        logger.warning(f"Thumbnail generation failed for file {file.id}: {e}")
+        return None
+    if thumbnail is None:
+        return None
+    path, etag = thumbnail
+    response = send_file(path, mimetype='image/jpeg', etag=etag, max_age=86400)
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
 @files_bp.route('/<int:file_id>/preview', methods=['GET'])
 def preview_file(file_id):
     """获取文件预览
@@ -1788,7 +2112,8 @@ def preview_file(file_id):
     - Office: 不支持直接预览，返回下载链接
 
     Query参数:
-        - thumb: 是否返回缩略图 (仅图片, 默认false)
+        - thumb: 是否返回缩略图 (图片/PDF 首页, 默认false)
+        - size: 缩略图长边像素 (128/256/512/1024, 默认256)
     """
     user = get_current_user()
     if not user:
@@ -1809,24 +2134,27 @@ def preview_file(file_id):
         # 获取文件类型
         file_type = file.file_type or ''
         file_ext = os.path.splitext(file.file_name)[1].lower() if file.file_name else ''
+        thumb = request.args.get('thumb', 'false').lower() == 'true'
 
         # 图片预览
         if file_type.startswith('image/') or file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp']:
-            # 是否返回缩略图
-            thumb = request.args.get('thumb', 'false').lower() == 'true'
-
             if thumb:
-                # 生成缩略图（简化实现，直接返回原图）
-                # 实际生产中可以使用 Pillow 生成缩略图
-                pass
+                thumbnail = _send_thumbnail(file)
+                if thumbnail is not None:
+                    return thumbnail
 
             return send_file(
                 file.file_path,
                 mimetype=file_type or 'image/jpeg'
             )
 
-        # PDF 预览
+        # PDF 预览（缩略图为首页栅格图）
         if file_type == 'application/pdf' or file_ext == '.pdf':
+            if thumb:
+                thumbnail = _send_thumbnail(file)
+                if thumbnail is not None:
+                    return thumbnail
+
             return send_file(
                 file.file_path,
                 mimetype='application/pdf'
@@ -1835,18 +2163,28 @@ def preview_file(file_id):
         # 文本文件预览
         text_extensions = ['.txt', '.md', '.json', '.xml', '.csv', '.log', '.py', '.js', '.html', '.css']
         if file_ext in text_extensions or file_type.startswith('text/'):
+            # 内容未变化时直接返回 304，不再读取文件
+            etag = f"text-{content_hash(file)}"
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
             try:
                 with open(file.file_path, 'r', encoding='utf-8') as f:
                     content = f.read(100000)  # 限制读取 100KB
 
-                return jsonify({
+                response = jsonify({
                     'file_id': file_id,
                     'file_name': file.file_name,
                     'file_type': file_type,
                     'content_type': 'text',
                     'content': content,
                     'truncated': len(content) >= 100000
-                }), 200
+                })
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response, 200
             except UnicodeDecodeError:
                 return jsonify({
                     'file_id': file_id,
@@ -1916,6 +2254,8 @@ def get_preview_info(file_id):
             preview_info['supports_preview'] = True
             preview_info['preview_type'] = 'pdf'
             preview_info['preview_url'] = f'/api/files/{file_id}/preview'
+            if supports_thumbnail(file):
+                preview_info['thumbnail_url'] = f'/api/files/{file_id}/preview?thumb=true'
 
         # 文本
         elif file_ext in ['.txt', '.md', '.json', '.xml', '.csv', '.log', '.py', '.js', '.html', '.css'] or file_type.startswith('text/'):
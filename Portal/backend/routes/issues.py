@@ -5,6 +5,7 @@ from flask import Blueprint, request, jsonify
 from models import SessionLocal
 from models.issue import Issue, IssueType, IssueSeverity, IssueStatus
 from models.project_notification import ProjectNotification, NotificationType
+from services import realtime_service
 from datetime import datetime
 import sys
 import os
@@ -140,6 +141,7 @@ def create_issue():
             )
             session.add(notification)
             session.commit()
+            realtime_service.publish_notification(session, notification)
 
         return jsonify(issue.to_dict()), 201
 
@@ -262,6 +264,7 @@ def resolve_issue(issue_id):
             )
             session.add(notification)
             session.commit()
+            realtime_service.publish_notification(session, notification)
 
         return jsonify(issue.to_dict()), 200
 
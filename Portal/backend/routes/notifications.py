@@ -4,6 +4,7 @@ Notifications API Routes - 通知管理API
 from flask import Blueprint, request, jsonify
 from models import SessionLocal
 from models.project_notification import ProjectNotification, NotificationType
+from services import realtime_service
 from datetime import datetime
 import sys
 import os
@@ -123,6 +124,11 @@ def mark_as_read(notification_id):
         session.commit()
         session.refresh(notification)
 
+        realtime_service.publish([user_id], 'notification.read', {
+            'id': notification_id,
+            'unread_count': realtime_service.count_unread_notifications(session, user_id)
+        })
+
         return jsonify(notification.to_dict()), 200
 
     except Exception as e:
@@ -153,6 +159,8 @@ def mark_all_as_read():
 
         session.commit()
 
+        realtime_service.publish([user_id], 'notification.all_read', {'unread_count': 0})
+
         return jsonify({'message': '所有通知已标记为已读'}), 200
 
     except Exception as e:
@@ -184,6 +192,11 @@ def delete_notification(notification_id):
         session.delete(notification)
         session.commit()
 
+        realtime_service.publish([user_id], 'notification.deleted', {
+            'id': notification_id,
+            'unread_count': realtime_service.count_unread_notifications(session, user_id)
+        })
+
         return jsonify({'message': '通知已删除'}), 200
 
     except Exception as e:
@@ -247,6 +260,8 @@ def create_notification(
         session.commit()
         session.refresh(notification)
 
+        realtime_service.publish_notification(session, notification)
+
         return notification
 
     except Exception as e:
@@ -0,0 +1,81 @@
+"""
+实时推送 API Routes
+SSE 长连接，推送聊天消息、未读数和通知变化（事件类型见 services/realtime_service.py）
+"""
+from flask import Blueprint, Response, request, jsonify
+import logging
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from shared.auth import verify_token
+from shared.push_hub import sse_stream
+
+from models import SessionLocal
+from services import realtime_service
+
+logger = logging.getLogger(__name__)
+
+push_bp = Blueprint('push', __name__, url_prefix='/api/push')
+
+
+def get_current_user():
+    """获取当前用户（EventSource 无法设置请求头，支持 ?token= 参数）"""
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        token = auth_header.split(' ', 1)[1]
+    else:
+        token = request.args.get('token')
+    if not token:
+        return None
+    payload = verify_token(token)
+    return payload if payload else None
+
+
+@push_bp.route('/stream', methods=['GET'])
+def stream():
+    """建立推送连接
+
+    首次连接先发送未读快照，之后只推送增量事件；
+    断线重连时浏览器自动携带 Last-Event-ID，补发期间错过的事件（无法补发时重新发送快照）。
+    """
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': '未授权'}), 401
+
+    user_id = user.get('user_id') or user.get('id')
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+    hub = realtime_service.get_push_hub()
+    # 先订阅再查询快照，快照之后的变化都会进入订阅队列
+    sub, replay = hub.subscribe(user_id, last_event_id)
+
+    snapshot = None
+    if not last_event_id or replay is None:
+        session = SessionLocal()
+        try:
+            snapshot = realtime_service.build_snapshot(session, user_id)
+        except Exception as e:
+            hub.unsubscribe(sub)
+            logger.error(f"Build push snapshot failed: {e}")
+            return jsonify({'error': str(e)}), 500
+        finally:
+            session.close()
+
+    return Response(
+        sse_stream(hub, sub, replay, snapshot),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # 禁用 nginx 缓冲
+        }
+    )
+
+
+@push_bp.route('/stats', methods=['GET'])
+def stats():
+    """推送连接统计"""
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': '未授权'}), 401
+    return jsonify(realtime_service.get_push_hub().stats()), 200
@@ -5,6 +5,7 @@ from flask import Blueprint, request, jsonify, send_file
 from models import SessionLocal
 from models.task import Task, TaskStatus
 from models.project import Project
+from services.progress_calculator import ProgressCalculator
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import sys
@@ -254,6 +255,7 @@ def create_task():
         )
 
         session.add(task)
+        ProgressCalculator.apply_task_change(session, None, task)
         session.commit()
         session.refresh(task)
 
@@ -279,6 +281,8 @@ def update_task(task_id):
         if not task:
             return jsonify({'error': '任务不存在'}), 404
 
+        before = ProgressCalculator.task_state(task)
+
         # Update fields
         updateable_fields = [
             'title', 'description', 'attachments', 'assigned_to_id', 'depends_on_task_id',
@@ -313,6 +317,8 @@ def update_task(task_id):
                 task.status = 'completed'
                 task.completed_at = datetime.now()
 
+        ProgressCalculator.apply_task_change(session, before, task)
+
         session.commit()
         session.refresh(task)
 
@@ -417,12 +423,18 @@ def batch_update_tasks():
         updates = data['updates']
 
         tasks = session.query(Task).filter(Task.id.in_(task_ids)).all()
+        before = [ProgressCalculator.task_state(task) for task in tasks]
 
         for task in tasks:
             for key, value in updates.items():
                 if hasattr(task, key):
                     setattr(task, key, value)
 
+        # 合并差量，每个阶段/项目只重算一次
+        ProgressCalculator.apply_task_changes(
+            session, zip(before, (ProgressCalculator.task_state(task) for task in tasks))
+        )
+
         session.commit()
 
         return jsonify({
@@ -451,7 +463,9 @@ def delete_task(task_id):
 
         # TODO: 检查用户是否有删除权限
 
+        before = ProgressCalculator.task_state(task)
         session.delete(task)
+        ProgressCalculator.apply_task_change(session, before, None)
         session.commit()
 
         return jsonify({'message': '任务已删除'}), 200
@@ -535,6 +549,7 @@ def update_task_progress(task_id):
         if not task:
             return jsonify({'error': '任务不存在'}), 404
 
+        before = ProgressCalculator.task_state(task)
         task.completion_percentage = progress
 
         # 如果达到100%，自动设置为完成状态
@@ -544,9 +559,8 @@ def update_task_progress(task_id):
         elif progress > 0 and task.status.value == 'pending':
             task.status = 'in_progress'
 
-        # 更新阶段和项目进度
-        from services.progress_calculator import ProgressCalculator
-        ProgressCalculator.update_all_progress(session, task.project_id)
+        # 增量更新阶段和项目进度
+        ProgressCalculator.apply_task_change(session, before, task)
 
         session.commit()
         session.refresh(task)
@@ -584,12 +598,12 @@ def move_task_to_phase(task_id):
             if phase.project_id != task.project_id:
                 return jsonify({'error': '阶段不属于当前项目'}), 400
 
+        before = ProgressCalculator.task_state(task)
         old_phase_id = task.phase_id
         task.phase_id = phase_id
 
         # 更新进度
-        from services.progress_calculator import ProgressCalculator
-        ProgressCalculator.update_all_progress(session, task.project_id)
+        ProgressCalculator.apply_task_change(session, before, task)
 
         session.commit()
         session.refresh(task)
@@ -629,6 +643,7 @@ def update_task_status(task_id):
         if not task:
             return jsonify({'error': '任务不存在'}), 404
 
+        before = ProgressCalculator.task_state(task)
         old_status = task.status.value if hasattr(task.status, 'value') else str(task.status)
         task.status = new_status
 
@@ -640,8 +655,7 @@ def update_task_status(task_id):
             task.completion_percentage = 10  # 开始时设置初始进度
 
         # 更新进度
-        from services.progress_calculator import ProgressCalculator
-        ProgressCalculator.update_all_progress(session, task.project_id)
+        ProgressCalculator.apply_task_change(session, before, task)
 
         session.commit()
         session.refresh(task)
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+DocTranslateService - 文档翻译后台任务
+基于 shared/job_queue.py（SQLite 持久化队列），上传请求只负责入队，
+由工作线程逐页并发翻译，任务状态重启后仍可查询，多个进程共用同一个队列文件。
+
+流程:
+    prepare    PDF 每页渲染为 PNG 存入任务目录，按图片内容哈希生成缓存键
+    unit       逐页调用翻译（并发数受 DOC_TRANSLATE_MAX_CONCURRENCY 限制），每页完成即写入检查点
+    finalize   按页序生成带译文的 PDF，清理页面图片
+
+相同页面（重复上传、同一文档内重复页）按内容哈希命中翻译缓存，不再调用翻译。
+
+独立 worker 进程（可启动多个）:
+    cd Portal/backend && python -m services.doc_translate_service worker --concurrency 4
+
+配置:
+    DOC_TRANSLATE_DB=...                    队列数据库（默认 translated_docs/_jobs/jobs.db）
+    DOC_TRANSLATE_WORKERS=2                 Web 进程内的工作线程数（0 表示只由独立 worker 执行）
+    DOC_TRANSLATE_MAX_CONCURRENCY=4         所有进程同时翻译的页数上限
+"""
+import os
+import sys
+import shutil
+import hashlib
+import logging
+import subprocess
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from shared.job_queue import JobQueue, UnitSpec, WorkerPool
+
+logger = logging.getLogger(__name__)
+
+JOB_KIND = 'doc_translate'
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'translated_docs')
+JOBS_DIR = os.path.join(OUTPUT_DIR, '_jobs')
+DOC_TRANSLATE_DB = os.getenv('DOC_TRANSLATE_DB') or os.path.join(JOBS_DIR, 'jobs.db')
+DOC_TRANSLATE_WORKERS = int(os.getenv('DOC_TRANSLATE_WORKERS', 2))
+DOC_TRANSLATE_MAX_CONCURRENCY = int(os.getenv('DOC_TRANSLATE_MAX_CONCURRENCY', 4))
+
+# 提示词或渲染参数变化时递增，使旧的翻译缓存失效
+PROMPT_VERSION = 1
+ALLOWED_LANGS = {'中文', '英文', '日文', 'English', 'Chinese', 'Japanese'}
+
+_queue = None
+_pool = None
+_lock = threading.Lock()
+
+
+class TranslationError(Exception):
+    """单页翻译失败（由队列重试）"""
+
+
+def extract_pdf_pages_as_images(pdf_path, output_dir):
+    """将PDF每页渲染为图片文件"""
+    import fitz  # PyMuPDF
+
+    pages = []
+    doc = fitz.open(pdf_path)
+    try:
+        for i, page in enumerate(doc):
+            # 2倍缩放获取高清图片
+            pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))
+            img_data = pix.tobytes("png")
+            path = os.path.join(output_dir, f'page_{i + 1:04d}.png')
+            with open(path, 'wb') as f:
+                f.write(img_data)
+            pages.append({
+                'page': i + 1,
+                'path': path,
+                'width': pix.width,
+                'height': pix.height,
+                'sha256': hashlib.sha256(img_data).hexdigest(),
+            })
+    finally:
+        doc.close()
+    return pages
+
+
+def translate_image_with_claude(img_path, page_num, target_lang='中文'):
+    """使用Claude翻译图片中的文字，失败时抛出 TranslationError"""
+    # 安全修复：验证 target_lang 只能是预定义的语言
+    if target_lang not in ALLOWED_LANGS:
+        target_lang = '中文'  # 默认为中文
+
+    prompt = f'''这是一份日本购买仕样书（采购规格书）的第{page_num}页。
+
+请将图片中的所有日文内容翻译成{target_lang}，包括：
+1. 标题、表头
+2. 正文内容、说明文字
+3. 表格中的文字
+4. 注释、备注
+5. 图表中的标注
+
+翻译要求：
+- 保持专业术语准确（如：めっき=电镀、外観=外观、寸法=尺寸）
+- 保持原文的结构和逻辑
+- 对于检验标准、判定基准等重要内容要准确翻译
+- 如果有等级划分（如Lv.1、Lv.2等），保留原标记并翻译说明
+
+直接输出翻译内容，不需要任何解释或前言。'''
+
+    prompt_path = None
+    try:
+        # 将 prompt 写入临时文件，避免命令注入
+        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.txt', delete=False) as f:
+            f.write(prompt)
+            prompt_path = f.name
+
+        # 安全修复：避免 shell=True，使用 PowerShell 列表参数
+        # 从文件读取 prompt 内容，避免命令行参数注入
+        result = subprocess.run(
+            ['powershell', '-Command',
+             f'$prompt = Get-Content -Raw -Path "{prompt_path}"; claude -p $prompt "{img_path}"'],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            timeout=300,  # 5分钟超时
+            shell=False  # 安全：不使用 shell
+        )
+    except subprocess.TimeoutExpired:
+        raise TranslationError(f"第{page_num}页翻译超时")
+    except OSError as e:
+        raise TranslationError(f"第{page_num}页翻译错误: {e}")
+    finally:
+        if prompt_path and os.path.exists(prompt_path):
+            os.unlink(prompt_path)
+
+    if not result.stdout.strip():
+        raise TranslationError(f"第{page_num}页翻译失败: {result.stderr.strip()[:200]}")
+    return result.stdout.strip()
+
+
+def create_translated_pdf(images, translations, output_path):
+    """创建带翻译的PDF文件"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Image as RLImage, Paragraph, Spacer, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.lib.units import mm
+
+    # 注册中文字体
+    try:
+        pdfmetrics.registerFont(TTFont('SimHei', 'C:/Windows/Fonts/simhei.ttf'))
+        pdfmetrics.registerFont(TTFont('SimSun', 'C:/Windows/Fonts/simsun.ttc'))
+    except Exception:
+        pass  # 字体注册失败时使用默认字体
+
+    # 创建PDF
+    doc = SimpleDocTemplate(
+        output_path,
+        pagesize=A4,
+        leftMargin=15*mm,
+        rightMargin=15*mm,
+        topMargin=15*mm,
+        bottomMargin=15*mm
+    )
+
+    # 样式
+    styles = getSampleStyleSheet()
+    style_title = ParagraphStyle(
+        'PageTitle',
+        parent=styles['Heading2'],
+        fontName='SimHei',
+        fontSize=14,
+        textColor='#1a5490',
+        spaceAfter=10
+    )
+    style_trans = ParagraphStyle(
+        'Translation',
+        parent=styles['Normal'],
+        fontName='SimSun',
+        fontSize=10,
+        leading=16,
+        spaceAfter=20
+    )
+
+    story = []
+    page_width = A4[0] - 30*mm
+
+    for i, (img_info, translation) in enumerate(zip(images, translations)):
+        # 页面标题
+        story.append(Paragraph(f"第 {img_info['page']} 页", style_title))
+
+        # 原图
+        img = RLImage(img_info['path'])
+
+        # 计算图片尺寸，适应页面宽度
+        aspect = img_info['height'] / img_info['width']
+        display_w = min(page_width, 180*mm)
+        display_h = display_w * aspect
+
+        # 如果太高，按高度限制
+        max_h = 120*mm
+        if display_h > max_h:
+            display_h = max_h
+            display_w = display_h / aspect
+
+        img.drawWidth = display_w
+        img.drawHeight = display_h
+        story.append(img)
+        story.append(Spacer(1, 10))
+
+        # 翻译内容
+        story.append(Paragraph("<b>【中文翻译】</b>", style_title))
+        # 处理翻译文本中的换行
+        trans_text = translation.replace('\n', '<br/>')
+        story.append(Paragraph(trans_text, style_trans))
+
+        # 分页（最后一页不需要）
+        if i < len(images) - 1:
+            story.append(PageBreak())
+
+    doc.build(story)
+    return output_path
+
+
+class DocTranslateHandler:
+    """shared/job_queue 任务处理器"""
+
+    def __init__(self, translate=translate_image_with_claude):
+        self.translate = translate
+
+    def prepare(self, job):
+        payload = job['payload']
+        pages_dir = os.path.join(job_dir(job['id']), 'pages')
+        os.makedirs(pages_dir, exist_ok=True)
+        pages = extract_pdf_pages_as_images(payload['pdf_path'], pages_dir)
+        return [
+            UnitSpec(page, cache_key=f"{JOB_KIND}:v{PROMPT_VERSION}:{payload['target_lang']}:{page['sha256']}")
+            for page in pages
+        ]
+
+    def run_unit(self, job, unit):
+        page = unit['payload']
+        return self.translate(page['path'], page['page'], job['payload']['target_lang'])
+
+    def finalize(self, job, units):
+        payload = job['payload']
+        pages = [u['payload'] for u in units]
+        translations = [
+            u['result'] if u['status'] == 'done' else f"[第{u['payload']['page']}页翻译失败]"
+            for u in units
+        ]
+        output_filename = f"{os.path.splitext(payload['filename'])[0]}_中文版_{job['id']}.pdf"
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
+        create_translated_pdf(pages, translations, output_path)
+        return {
+            'output_path': output_path,
+            'output_filename': output_filename,
+            'failed_pages': [u['payload']['page'] for u in units if u['status'] != 'done'],
+        }
+
+    def cleanup(self, job):
+        # 结果已写入队列，译文 PDF 已包含页面图片，清理任务目录
+        shutil.rmtree(job_dir(job['id']), ignore_errors=True)
+
+
+def job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                _queue = JobQueue(DOC_TRANSLATE_DB, max_running=DOC_TRANSLATE_MAX_CONCURRENCY)
+    return _queue
+
+
+def ensure_workers(concurrency=None):
+    """启动本进程的工作线程（已启动或配置为 0 时忽略）"""
+    global _pool
+    concurrency = DOC_TRANSLATE_WORKERS if concurrency is None else concurrency
+    if concurrency <= 0:
+        return None
+    with _lock:
+        if _pool is None or not _pool.running:
+            _pool = WorkerPool(get_job_queue(), {JOB_KIND: DocTranslateHandler()}, concurrency=concurrency)
+            _pool.start()
+    return _pool
+
+
+def submit(file_storage, target_lang='中文'):
+    """保存上传的 PDF 并入队，返回任务 ID"""
+    queue = get_job_queue()
+    job_id = os.urandom(6).hex()
+    directory = job_dir(job_id)
+    os.makedirs(directory, exist_ok=True)
+    pdf_path = os.path.join(directory, 'source.pdf')
+    file_storage.save(pdf_path)
+
+    queue.enqueue(JOB_KIND, {
+        'pdf_path': pdf_path,
+        'filename': file_storage.filename,
+        'target_lang': target_lang if target_lang in ALLOWED_LANGS else '中文',
+    }, job_id=job_id)
+    ensure_workers()
+    return job_id
+
+
+def get_job(job_id):
+    job = get_job_queue().get_job(job_id)
+    return job if job and job['kind'] == JOB_KIND else None
+
+
+def list_jobs(limit=100):
+    return get_job_queue().list_jobs(JOB_KIND, limit)
+
+
+def main():
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description='文档翻译任务')
+    sub = parser.add_subparsers(dest='command', required=True)
+    worker = sub.add_parser('worker', help='启动独立 worker 进程')
+    worker.add_argument('--concurrency', type=int, default=DOC_TRANSLATE_MAX_CONCURRENCY)
+    sub.add_parser('stats', help='队列统计')
+    purge = sub.add_parser('purge', help='删除已结束的旧任务记录')
+    purge.add_argument('--days', type=float, default=30)
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        logging.basicConfig(level=logging.INFO)
+        pool = ensure_workers(args.concurrency)
+        print(f"[DocTranslate] worker 已启动，并发 {args.concurrency}，队列 {DOC_TRANSLATE_DB}")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            pool.stop()
+    elif args.command == 'stats':
+        print(json.dumps(get_job_queue().stats(), ensure_ascii=False))
+    else:
+        print(f"删除 {get_job_queue().purge(args.days * 86400)} 个任务")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,57 @@
 """
 FileIndexService - 文件中心索引服务
 提供文件索引、查询、统计等功能
+关键词搜索使用全文索引（services/file_search_index.py），未启用或未构建时回退到 LIKE 查询
 """
 import os
 import hashlib
-from datetime import datetime
+import logging
+from datetime import date, datetime, timedelta
 from sqlalchemy import func, or_, and_, desc
 from sqlalchemy.orm import Session
 from models.file_index import FileIndex, FileStatus, FILE_CATEGORIES, SOURCE_SYSTEMS
 
+logger = logging.getLogger(__name__)
+
+try:
+    from services import file_search_index
+except ImportError as e:
+    logger.warning(f"[FileSearch] 全文索引不可用: {e}")
+    file_search_index = None
+
+# 可按索引属性排序的字段
+INDEX_SORT_FIELDS = ('created_at', 'uploaded_at', 'file_name', 'file_size')
+
+
+def _parse_bound(value):
+    """日期/时间或其字符串转换为 (datetime, 是否只有日期)，无法解析返回 (None, False)"""
+    if isinstance(value, datetime):
+        return value, False
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day), True
+    try:
+        text = str(value).strip()
+        return datetime.fromisoformat(text), len(text) <= 10
+    except ValueError:
+        logger.warning(f"[FileIndex] 无法解析的日期条件: {value}")
+        return None, False
+
+
+def _upload_range(start_date=None, end_date=None):
+    """
+    上传时间范围统一为 [下限, 上限)，数据库查询与全文索引共用
+
+    start_date / end_date 均包含在内；end_date 只有日期时包含当天全天，
+    带时间时包含该秒（索引中的时间精确到秒）。
+    """
+    low = _parse_bound(start_date)[0] if start_date else None
+    high = None
+    if end_date:
+        high, date_only = _parse_bound(end_date)
+        if high is not None:
+            high = high + timedelta(days=1) if date_only else high.replace(microsecond=0) + timedelta(seconds=1)
+    return low, high
+
 
 class FileIndexService:
     """文件索引服务类"""
@@ -75,6 +118,7 @@ class FileIndexService:
         self.db.add(file_index)
         self.db.commit()
         self.db.refresh(file_index)
+        self._sync_search_index(file_index, extract=True)
 
         return file_index
 
@@ -101,6 +145,7 @@ class FileIndexService:
 
         self.db.commit()
         self.db.refresh(file_index)
+        self._sync_search_index(file_index, extract='file_path' in updates)
 
         return file_index
 
@@ -124,12 +169,27 @@ class FileIndexService:
         if soft_delete:
             file_index.status = FileStatus.DELETED
             self.db.commit()
+            self._sync_search_index(file_index)
         else:
+            file_id = file_index.id
             self.db.delete(file_index)
             self.db.commit()
+            self._sync_search_index(None, removed_id=file_id)
 
         return True
 
+    def _sync_search_index(self, file_index: FileIndex, extract: bool = False, removed_id: int = None):
+        """同步全文索引（失败不影响主流程，可通过重建修复）"""
+        if file_search_index is None:
+            return
+        try:
+            if removed_id is not None:
+                file_search_index.remove_file(removed_id)
+            else:
+                file_search_index.sync_file(file_index, extract=extract)
+        except Exception as e:
+            logger.warning(f"[FileSearch] 全文索引同步失败: {e}")
+
     def get_by_id(self, file_id: int) -> FileIndex:
         """根据ID获取文件"""
         return self.db.query(FileIndex).filter(
@@ -152,12 +212,14 @@ class FileIndexService:
         filters: dict = None,
         page: int = 1,
         page_size: int = 20,
-        sort_by: str = 'created_at',
+        sort_by: str = None,
         sort_order: str = 'desc'
     ) -> dict:
         """
         搜索文件
 
+        有关键词且全文索引可用时走索引（默认按相关度排序），否则使用数据库 LIKE 查询。
+
         Args:
             query: 搜索关键词
             filters: 筛选条件 {
@@ -175,11 +237,17 @@ class FileIndexService:
             }
             page: 页码
             page_size: 每页数量
-            sort_by: 排序字段
+            sort_by: 排序字段（有关键词时默认按相关度，否则默认 created_at）
             sort_order: 排序方向 (asc/desc)
         """
         filters = filters or {}
 
+        if query:
+            result = self._search_with_index(query, filters, page, page_size, sort_by, sort_order)
+            if result is not None:
+                return result
+        sort_by = sort_by or 'created_at'
+
         # 基础查询
         base_query = self.db.query(FileIndex).filter(
             FileIndex.status == FileStatus.ACTIVE
@@ -234,11 +302,12 @@ class FileIndexService:
         if filters.get('po_number'):
             base_query = base_query.filter(FileIndex.po_number.like(f"%{filters['po_number']}%"))
 
-        if filters.get('start_date'):
-            base_query = base_query.filter(FileIndex.uploaded_at >= filters['start_date'])
+        start, end = _upload_range(filters.get('start_date'), filters.get('end_date'))
+        if start:
+            base_query = base_query.filter(FileIndex.uploaded_at >= start)
 
-        if filters.get('end_date'):
-            base_query = base_query.filter(FileIndex.uploaded_at <= filters['end_date'])
+        if end:
+            base_query = base_query.filter(FileIndex.uploaded_at < end)
 
         # 统计总数
         total = base_query.count()
@@ -262,6 +331,114 @@ class FileIndexService:
             'total_pages': (total + page_size - 1) // page_size
         }
 
+    def _get_search_index(self):
+        if file_search_index is None:
+            return None
+        index = file_search_index.get_file_search_index()
+        if index is None or not file_search_index.is_index_ready(index):
+            return None
+        return index
+
+    def search_index_ids(
+        self,
+        query: str,
+        facets: dict = None,
+        exclude_facets: dict = None,
+        field_queries: dict = None,
+        start_date=None,
+        end_date=None,
+        sort_by: str = None,
+        sort_order: str = 'desc',
+        page: int = 1,
+        page_size: int = 20
+    ):
+        """
+        在全文索引中检索，过滤条件在索引内完成
+
+        Args:
+            facets: 等值过滤 {system/table/category/project/uploader/type/latest/status/...: 值或列表}
+            exclude_facets: 排除条件
+            field_queries: 限定字段的关键词 {tags/project/...: 关键词}
+            start_date / end_date: 上传时间范围（均包含，规则见 _upload_range）
+
+        Returns:
+            ([{'id', 'score', 'source_table', 'source_id'}], total)；索引不可用时返回 None
+        """
+        index = self._get_search_index()
+        if index is None:
+            return None
+
+        ranges = {}
+        start, end = _upload_range(start_date, end_date)
+        if start or end:
+            ranges['uploaded_at'] = (
+                file_search_index.format_time(start),
+                file_search_index.format_time(end)
+            )
+        return index.search(
+            query,
+            field_queries=field_queries,
+            facets=facets,
+            exclude_facets=exclude_facets,
+            ranges=ranges,
+            sort_by=sort_by if sort_by in INDEX_SORT_FIELDS else None,
+            sort_desc=sort_order != 'asc',
+            limit=page_size,
+            offset=(page - 1) * page_size,
+            columns=('source_table', 'source_id')
+        )
+
+    def _search_with_index(self, query, filters, page, page_size, sort_by, sort_order):
+        """全文索引检索，返回与 search 相同的结构；索引不可用时返回 None"""
+        facet_filters = {
+            'source_system': 'system',
+            'file_category': 'category',
+            'order_no': 'order',
+            'project_id': 'project',
+            'project_no': 'project_no',
+            'supplier_id': 'supplier',
+            'customer_id': 'customer',
+        }
+        facets = {}
+        for key, facet in facet_filters.items():
+            if filters.get(key):
+                facets[facet] = filters[key]
+
+        field_queries = {}
+        part_terms = ' '.join(filter(None, [filters.get('part_number'), filters.get('po_number')]))
+        if part_terms:
+            field_queries['tags'] = part_terms
+
+        try:
+            # 非活跃文件很少，排除比要求 status_active 求交的代价小
+            found = self.search_index_ids(
+                query, facets=facets, field_queries=field_queries,
+                exclude_facets={'status': [FileStatus.DELETED.value, FileStatus.ARCHIVED.value]},
+                start_date=filters.get('start_date'), end_date=filters.get('end_date'),
+                sort_by=sort_by, sort_order=sort_order, page=page, page_size=page_size
+            )
+        except Exception as e:
+            logger.warning(f"[FileSearch] 全文检索失败，回退到数据库查询: {e}")
+            return None
+        if found is None:
+            return None
+
+        hits, total = found
+        ids = [hit['id'] for hit in hits]
+        rows = {
+            row.id: row for row in
+            self.db.query(FileIndex).filter(FileIndex.id.in_(ids)).all()
+        } if ids else {}
+        items = [rows[i].to_dict() for i in ids if i in rows]
+
+        return {
+            'items': items,
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total + page_size - 1) // page_size
+        }
+
     def get_by_order(self, order_no: str) -> list:
         """按订单号获取文件列表"""
         files = self.db.query(FileIndex).filter(
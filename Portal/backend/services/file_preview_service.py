@@ -0,0 +1,83 @@
+"""
+FilePreviewService - 文件预览图服务
+基于 shared/rendition_cache.py，为项目文件生成并缓存缩略图（图片）和首页预览图（PDF），
+供 /api/files/<id>/preview?thumb=true&size=256 使用。
+
+缓存按文件 MD5 + 尺寸命名，存放在 {存储根目录}/_renditions，超过预算按最近使用淘汰。
+上传完成后在后台预生成默认尺寸，文件夹网格视图首次打开即可命中。
+
+配置:
+    RENDITION_CACHE_DIR=...           缓存目录（默认 {存储根目录}/_renditions）
+    RENDITION_CACHE_MAX_BYTES=...     缓存总大小上限（默认 1GB）
+    RENDITION_PREGENERATE=true        上传后预生成缩略图
+"""
+import os
+import sys
+import hashlib
+import logging
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from shared.rendition_cache import (
+    RenditionCache, RENDITION_SIZES, normalize_size, rendition_kind, pregenerate
+)
+from shared.file_storage_v2 import DEFAULT_STORAGE_PATH
+
+logger = logging.getLogger(__name__)
+
+RENDITION_CACHE_DIR = os.getenv('RENDITION_CACHE_DIR') or os.path.join(DEFAULT_STORAGE_PATH, '_renditions')
+PREGENERATE = os.getenv('RENDITION_PREGENERATE', 'true').lower() == 'true'
+PREGENERATE_SIZES = (RENDITION_SIZES[1],)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_rendition_cache() -> RenditionCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RenditionCache(RENDITION_CACHE_DIR)
+    return _cache
+
+
+def content_hash(file) -> str:
+    """文件内容标识：优先使用上传时记录的 MD5，否则用路径 + 大小 + 修改时间"""
+    if getattr(file, 'md5_hash', None):
+        return file.md5_hash
+    stat = os.stat(file.file_path)
+    return hashlib.md5(f"{file.file_path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+
+
+def supports_thumbnail(file) -> bool:
+    return rendition_kind(file.file_name, file.file_type) is not None
+
+
+def get_thumbnail(file, size=None):
+    """
+    获取缩略图
+
+    Returns:
+        (缓存文件路径, ETag)；文件类型不支持时返回 None
+    """
+    kind = rendition_kind(file.file_name, file.file_type)
+    if kind is None:
+        return None
+    size = normalize_size(size)
+    digest = content_hash(file)
+    path = get_rendition_cache().get_or_render(digest, file.file_path, kind, size)
+    return path, f"{digest}-{kind}-{size}"
+
+
+def schedule_thumbnail(file):
+    """上传完成后后台预生成缩略图"""
+    if not PREGENERATE or not file.file_path:
+        return
+    kind = rendition_kind(file.file_name, file.file_type)
+    if kind is None:
+        return
+    try:
+        pregenerate(get_rendition_cache(), content_hash(file), file.file_path, kind, PREGENERATE_SIZES)
+    except Exception as e:
+        logger.warning(f"[Preview] 预生成缩略图失败 {file.file_name}: {e}")
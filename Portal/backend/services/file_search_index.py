@@ -0,0 +1,249 @@
+"""
+FileSearchIndex - 文件中心全文检索索引
+基于 shared/search_index.py（SQLite FTS5），为 file_index 表建立倒排索引，
+替代 FileIndexService.search 与 /api/files/search 的多列 LIKE 全表扫描。
+
+索引字段: 文件名、标签（分类名称/扩展名/品番号/订单号）、项目（项目编号/客户/供应商）、
+         上传者、文件正文（PDF/文本，可选）
+索引随 FileIndexService 的 index_file / update_index / remove_from_index 增量更新。
+首次启用或索引损坏时重建:
+    cd Portal/backend && python -m services.file_search_index rebuild [--content]
+
+配置:
+    FILE_SEARCH_ENGINE=fts5|db          检索引擎（默认 fts5；db 为旧的 LIKE 查询）
+    FILE_SEARCH_INDEX_PATH=...          索引文件（默认 {存储根目录}/_index/file_search.db）
+    FILE_SEARCH_EXTRACT_CONTENT=true    新文件索引时提取正文
+"""
+import os
+import sys
+import logging
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from shared.search_index import FTS5Index
+from shared.file_storage_v2 import DEFAULT_STORAGE_PATH
+
+from models.file_index import FileIndex, FileStatus, FILE_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+SEARCH_ENGINE = os.getenv('FILE_SEARCH_ENGINE', 'fts5').lower()
+SEARCH_INDEX_PATH = os.getenv('FILE_SEARCH_INDEX_PATH') or \
+    os.path.join(DEFAULT_STORAGE_PATH, '_index', 'file_search.db')
+EXTRACT_CONTENT = os.getenv('FILE_SEARCH_EXTRACT_CONTENT', 'true').lower() == 'true'
+CONTENT_MAX_CHARS = int(os.getenv('FILE_SEARCH_CONTENT_MAX_CHARS', 20000))
+CONTENT_MAX_PAGES = int(os.getenv('FILE_SEARCH_CONTENT_MAX_PAGES', 10))
+
+TEXT_EXTENSIONS = {'txt', 'csv', 'md', 'log', 'json', 'xml'}
+
+# 字段与 BM25 权重
+SEARCH_FIELDS = ('name', 'tags', 'project', 'uploader', 'content')
+SEARCH_WEIGHTS = (8.0, 3.0, 3.0, 2.0, 1.0)
+SEARCH_ATTRS = {
+    'source_table': 'TEXT',
+    'source_id': 'INTEGER',
+    'uploaded_at': 'TEXT',
+    'created_at': 'TEXT',
+    'file_name': 'TEXT',
+    'file_size': 'INTEGER',
+}
+
+READY_KEY = 'built_at'
+
+_index = None
+_index_ready = False
+_index_lock = threading.Lock()
+
+
+def get_file_search_index():
+    """获取全文索引（未启用 fts5 或 SQLite 不支持 FTS5 时返回 None）"""
+    global _index
+    if SEARCH_ENGINE != 'fts5':
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if not FTS5Index.available():
+                    logger.warning("[FileSearch] 当前 SQLite 不支持 FTS5，使用数据库 LIKE 查询")
+                    return None
+                _index = FTS5Index(SEARCH_INDEX_PATH, SEARCH_FIELDS, SEARCH_WEIGHTS, SEARCH_ATTRS,
+                                   name='file_search')
+    return _index
+
+
+def is_index_ready(index) -> bool:
+    """索引是否已完整构建（未重建前检索仍走数据库，增量更新照常写入）"""
+    global _index_ready
+    if not _index_ready and index is not None:
+        _index_ready = index.get_meta(READY_KEY) is not None
+    return _index_ready
+
+
+def extract_text(file_path: str, extension: str = None) -> str:
+    """提取文件正文（PDF 前若干页、文本文件），失败返回空字符串"""
+    if not file_path or not os.path.isfile(file_path):
+        return ''
+    extension = (extension or os.path.splitext(file_path)[1].lstrip('.')).lower()
+    try:
+        if extension in TEXT_EXTENSIONS:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read(CONTENT_MAX_CHARS)
+        if extension == 'pdf':
+            try:
+                import fitz  # PyMuPDF
+            except ImportError:
+                return ''
+            parts, size = [], 0
+            with fitz.open(file_path) as doc:
+                for page in doc.pages(0, min(CONTENT_MAX_PAGES, doc.page_count)):
+                    text = page.get_text()
+                    parts.append(text)
+                    size += len(text)
+                    if size >= CONTENT_MAX_CHARS:
+                        break
+            return ''.join(parts)[:CONTENT_MAX_CHARS]
+    except Exception as e:
+        logger.warning(f"[FileSearch] 提取正文失败 {file_path}: {e}")
+    return ''
+
+
+def format_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def build_document(file_index: FileIndex, content: str = None) -> tuple:
+    """
+    file_index 记录转换为索引文档 (doc_id, fields, facets, attrs)
+
+    content 为 None 时保留索引中已有的正文。
+    """
+    category = FILE_CATEGORIES.get(file_index.file_category, {})
+    fields = {
+        'name': file_index.file_name,
+        'tags': ' '.join(filter(None, [
+            category.get('zh'), category.get('ja'), category.get('en'),
+            file_index.file_extension, file_index.part_number,
+            file_index.order_no, file_index.po_number,
+        ])),
+        'project': ' '.join(filter(None, [
+            file_index.project_no, file_index.customer_name, file_index.supplier_name,
+        ])),
+        'uploader': file_index.uploaded_by_name,
+    }
+    if content is not None:
+        fields['content'] = content
+
+    status = file_index.status.value if isinstance(file_index.status, FileStatus) else file_index.status
+    facets = {
+        'system': file_index.source_system,
+        'table': file_index.source_table,
+        'category': file_index.file_category,
+        'project': file_index.project_id,
+        'project_no': file_index.project_no,
+        'supplier': file_index.supplier_id,
+        'customer': file_index.customer_id,
+        'order': file_index.order_no,
+        'uploader': file_index.uploaded_by,
+        'type': file_index.file_type,
+        'latest': file_index.is_latest_version is not False,
+        'status': status or FileStatus.ACTIVE.value,
+    }
+    attrs = {
+        'source_table': file_index.source_table,
+        'source_id': file_index.source_id,
+        'uploaded_at': format_time(file_index.uploaded_at or file_index.created_at),
+        'created_at': format_time(file_index.created_at),
+        'file_name': file_index.file_name,
+        'file_size': file_index.file_size or 0,
+    }
+    return file_index.id, fields, facets, attrs
+
+
+def sync_file(file_index: FileIndex, extract: bool = False):
+    """索引单个文件（extract=True 时提取正文，否则保留已有正文）"""
+    index = get_file_search_index()
+    if index is None or file_index is None:
+        return
+    content = None
+    if extract and EXTRACT_CONTENT:
+        content = extract_text(file_index.file_path, file_index.file_extension)
+    index.upsert(*build_document(file_index, content))
+
+
+def remove_file(file_id: int):
+    """从索引删除（file_index 记录被物理删除时）"""
+    index = get_file_search_index()
+    if index is not None:
+        index.delete(file_id)
+
+
+def rebuild_search_index(db, batch_size: int = 1000, extract: bool = False) -> int:
+    """
+    从 file_index 表全量重建索引
+
+    Args:
+        db: 数据库会话
+        batch_size: 每批写入条数
+        extract: 是否提取文件正文（较慢）
+
+    Returns:
+        索引的文件数
+    """
+    index = get_file_search_index()
+    if index is None:
+        raise RuntimeError('全文索引未启用（FILE_SEARCH_ENGINE 不是 fts5 或 SQLite 不支持 FTS5）')
+
+    index.clear()
+    total, last_id = 0, 0
+    while True:
+        rows = db.query(FileIndex).filter(FileIndex.id > last_id) \
+            .order_by(FileIndex.id).limit(batch_size).all()
+        if not rows:
+            break
+        docs = []
+        for row in rows:
+            content = extract_text(row.file_path, row.file_extension) if extract else ''
+            docs.append(build_document(row, content))
+        index.upsert_many(docs)
+        total += len(rows)
+        last_id = rows[-1].id
+        db.expunge_all()
+        logger.info(f"[FileSearch] 已索引 {total} 个文件")
+
+    index.optimize()
+    index.set_meta(READY_KEY, datetime.now().isoformat())
+    return total
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='文件中心全文索引')
+    parser.add_argument('command', choices=['rebuild', 'stats'])
+    parser.add_argument('--content', action='store_true', help='提取 PDF/文本文件正文')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    index = get_file_search_index()
+    if args.command == 'stats':
+        if index is None:
+            print('全文索引未启用')
+            return
+        print(f"索引文件: {SEARCH_INDEX_PATH}")
+        print(f"文档数: {index.count()}")
+        print(f"构建时间: {index.get_meta(READY_KEY) or '未构建'}")
+        return
+
+    from models import SessionLocal
+    db = SessionLocal()
+    try:
+        total = rebuild_search_index(db, args.batch_size, args.content)
+        print(f"索引重建完成: {total} 个文件")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
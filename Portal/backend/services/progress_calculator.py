@@ -4,11 +4,61 @@
 计算公式:
 - 阶段进度 = Σ(任务完成% × 任务权重) / Σ(任务权重)
 - 项目进度 = 各阶段完成度的平均值（无阶段时直接从任务计算）
+
+增量汇总:
+- progress_rollups 表按阶段/项目保存 Σ权重、Σ(完成%×权重)，任务变更时只把差量
+  累加到所属阶段和项目两行，再由这两行算出百分比，耗时与项目任务数无关
+- 批量变更先合并差量，每个阶段/项目只更新一次
+- 汇总行缺失时（首次部署、历史数据）按需从任务表重建该行
+- 校验任务定期比对任务表的分组汇总并修复偏差:
+    cd Portal/backend && python -m services.progress_calculator verify [--project-id N] [--dry-run]
+
+用法（路由中）:
+    before = ProgressCalculator.task_state(task)
+    ...修改 task...
+    ProgressCalculator.apply_task_change(session, before, task)   # 删除时传 None
 """
 import logging
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
 logger = logging.getLogger(__name__)
 
+PROJECT_BUCKET = 0  # progress_rollups.phase_id=0 表示项目级汇总
+
+
+class TaskState(NamedTuple):
+    """任务中影响进度的字段快照"""
+    project_id: int
+    phase_id: Optional[int]
+    weight: int
+    completion: int
+
+
+def _status_value(obj):
+    status = obj.status
+    return status.value if hasattr(status, 'value') else str(status)
+
+
+def _percent(weighted_sum, weight_total):
+    return round(weighted_sum / weight_total) if weight_total else 0
+
+
+def _task_aggregates(session, *criteria):
+    """任务表分组汇总: (project_id, phase_id, 任务数, Σ权重, Σ完成%×权重)"""
+    from models.task import Task
+
+    weight = func.coalesce(func.nullif(Task.weight, 0), 1)
+    return session.query(
+        Task.project_id,
+        Task.phase_id,
+        func.count(Task.id),
+        func.coalesce(func.sum(weight), 0),
+        func.coalesce(func.sum(func.coalesce(Task.completion_percentage, 0) * weight), 0),
+    ).filter(*criteria).group_by(Task.project_id, Task.phase_id).all()
+
 
 class ProgressCalculator:
     """进度计算器"""
@@ -101,47 +151,274 @@ class ProgressCalculator:
     @staticmethod
     def update_all_progress(session, project_id):
         """
-        更新项目及其所有阶段的进度
+        全量重算项目及其所有阶段的进度（同时重建汇总行）
 
-        触发时机：任务完成/进度更新时调用
+        任务变更请使用 apply_task_change，此方法用于导入、修复等需要全量重算的场景
 
         Args:
             session: SQLAlchemy session
             project_id: 项目ID
         """
-        from models.project import Project
-        from models.project_phase import ProjectPhase
+        try:
+            ProgressCalculator.verify_rollups(session, [project_id])
+        except Exception as e:
+            logger.error(f"Failed to update progress for project {project_id}: {e}")
+            raise
+
+    # ---------- 增量汇总 ----------
+
+    @staticmethod
+    def task_state(task):
+        """记录任务修改前的进度字段，传给 apply_task_change"""
+        if task is None:
+            return None
+        return TaskState(task.project_id, task.phase_id or None,
+                         task.weight or 1, task.completion_percentage or 0)
+
+    @staticmethod
+    def apply_task_change(session, before, task):
+        """
+        单个任务变更后增量更新阶段和项目进度
+
+        Args:
+            session: SQLAlchemy session
+            before: 修改前的 task_state(task)，新建任务传 None
+            task: 修改后的任务，删除任务传 None
+        """
+        after = ProgressCalculator.task_state(task)
+        ProgressCalculator.apply_task_changes(session, [(before, after)])
+
+    @staticmethod
+    def apply_task_changes(session, changes):
+        """
+        批量应用任务变更：合并差量，每个阶段/项目只更新一次
+
+        Args:
+            session: SQLAlchemy session
+            changes: [(修改前 TaskState 或 None, 修改后 TaskState 或 None), ...]
+        """
+        from models.project_phase import ProgressRollup
+
+        deltas = {}
+
+        def accumulate(state, sign):
+            buckets = (PROJECT_BUCKET, state.phase_id) if state.phase_id else (PROJECT_BUCKET,)
+            for bucket in buckets:
+                delta = deltas.setdefault((state.project_id, bucket), [0, 0, 0])
+                delta[0] += sign
+                delta[1] += sign * state.weight
+                delta[2] += sign * state.weight * state.completion
+
+        for before, after in changes:
+            if before == after:
+                continue
+            if before is not None:
+                accumulate(before, -1)
+            if after is not None:
+                accumulate(after, 1)
+        if not deltas:
+            return
+
+        # 任务变更先写入，汇总行缺失时按任务表重建（已包含本次变更）
+        session.flush()
+        for (project_id, bucket), delta in deltas.items():
+            if not any(delta):
+                continue
+            if not ProgressCalculator._add_delta(session, project_id, bucket, delta):
+                ProgressCalculator._rebuild_rollup(session, project_id, bucket, delta)
+
+        ProgressCalculator._refresh(
+            session,
+            {project_id for project_id, _ in deltas},
+            {bucket for _, bucket in deltas if bucket != PROJECT_BUCKET},
+        )
+
+    @staticmethod
+    def _add_delta(session, project_id, bucket, delta):
+        """汇总行累加差量 (任务数, Σ权重, Σ完成%×权重)，返回更新行数"""
+        from models.project_phase import ProgressRollup
+
+        count, weight, weighted = delta
+        return session.query(ProgressRollup).filter_by(
+            project_id=project_id, phase_id=bucket
+        ).update({
+            ProgressRollup.task_count: ProgressRollup.task_count + count,
+            ProgressRollup.weight_total: ProgressRollup.weight_total + weight,
+            ProgressRollup.weighted_sum: ProgressRollup.weighted_sum + weighted,
+        }, synchronize_session=False)
 
+    @staticmethod
+    def _rebuild_rollup(session, project_id, bucket, delta=None):
+        """
+        从任务表重建单个汇总行
+
+        并发请求同时首次创建同一行时唯一约束冲突：回滚到保存点，沿用对方创建的行，
+        本次变更的差量 delta（对方统计时看不到）再累加上去
+        """
+        from models.project_phase import ProgressRollup
+        from models.task import Task
+
+        criteria = [Task.project_id == project_id]
+        if bucket != PROJECT_BUCKET:
+            criteria.append(Task.phase_id == bucket)
+        rows = _task_aggregates(session, *criteria)
+
+        row = ProgressRollup(
+            project_id=project_id,
+            phase_id=bucket,
+            task_count=sum(r[2] for r in rows),
+            weight_total=sum(int(r[3]) for r in rows),
+            weighted_sum=sum(int(r[4]) for r in rows),
+        )
         try:
-            # 1. 更新所有阶段的进度
-            phases = session.query(ProjectPhase).filter_by(project_id=project_id).all()
-            for phase in phases:
-                phase.completion_percentage = ProgressCalculator.calculate_phase_progress(
-                    session, phase.id
-                )
+            with session.begin_nested():
+                session.add(row)
+            return row
+        except IntegrityError:
+            logger.info(f"Progress rollup project={project_id} phase={bucket} created concurrently, reusing it")
+        if delta:
+            ProgressCalculator._add_delta(session, project_id, bucket, delta)
+        return session.query(ProgressRollup).filter_by(
+            project_id=project_id, phase_id=bucket
+        ).populate_existing().one()
+
+    @staticmethod
+    def _refresh(session, project_ids, phase_ids):
+        """根据汇总行更新阶段完成度和项目进度（查询数与任务数无关）"""
+        from models.project import Project
+        from models.project_phase import ProjectPhase, ProgressRollup
+
+        project_ids = list(project_ids)
+        rollups = {
+            (r.project_id, r.phase_id): r
+            for r in session.query(ProgressRollup).filter(
+                ProgressRollup.project_id.in_(project_ids),
+                ProgressRollup.phase_id.in_([PROJECT_BUCKET, *phase_ids])
+            ).populate_existing()
+        }
+
+        def rollup(project_id, bucket):
+            row = rollups.get((project_id, bucket))
+            if row is None:
+                row = rollups[(project_id, bucket)] = ProgressCalculator._rebuild_rollup(
+                    session, project_id, bucket)
+            return row
+
+        if phase_ids:
+            for phase in session.query(ProjectPhase).filter(ProjectPhase.id.in_(phase_ids)):
+                row = rollup(phase.project_id, phase.id)
+                phase.completion_percentage = _percent(row.weighted_sum, row.weight_total)
+        session.flush()
+
+        phase_totals = {
+            project_id: (count, int(total or 0))
+            for project_id, count, total in session.query(
+                ProjectPhase.project_id,
+                func.count(ProjectPhase.id),
+                func.sum(func.coalesce(ProjectPhase.completion_percentage, 0)),
+            ).filter(ProjectPhase.project_id.in_(project_ids)).group_by(ProjectPhase.project_id)
+        }
+
+        for project in session.query(Project).filter(Project.id.in_(project_ids)):
+            if project.id in phase_totals:
+                count, total = phase_totals[project.id]
+                progress = round(total / count)
+            else:
+                # 无阶段时直接从任务计算
+                row = rollup(project.id, PROJECT_BUCKET)
+                progress = _percent(row.weighted_sum, row.weight_total)
+            ProgressCalculator._set_project_progress(project, progress)
+
+    @staticmethod
+    def _set_project_progress(project, progress):
+        old_progress = project.progress_percentage
+        project.progress_percentage = progress
+
+        # 自动更新项目状态
+        status = _status_value(project)
+        if progress == 100:
+            if status != 'completed':
+                project.status = 'completed'
+                logger.info(f"Project {project.id} auto-completed (progress=100%)")
+        elif progress > 0 and status == 'planning':
+            project.status = 'in_progress'
+            logger.info(f"Project {project.id} auto-started (progress>0%)")
+
+        if old_progress != progress:
+            logger.debug(f"Project {project.id} progress updated: {old_progress}% -> {progress}%")
+
+    @staticmethod
+    def verify_rollups(session, project_ids=None):
+        """
+        校验并修复汇总行：按任务表分组汇总比对，修正偏差后重算阶段和项目进度
+
+        Args:
+            session: SQLAlchemy session（由调用方提交或回滚）
+            project_ids: 项目ID列表，None 表示全部项目
+
+        Returns:
+            dict: 校验统计
+        """
+        from models.project import Project
+        from models.project_phase import ProjectPhase, ProgressRollup
+        from models.task import Task
 
-            # 2. 更新项目总进度
-            project = session.query(Project).filter_by(id=project_id).first()
-            if project:
-                old_progress = project.progress_percentage
-                project.progress_percentage = ProgressCalculator.calculate_project_progress(
-                    session, project_id
+        if project_ids is None:
+            project_ids = [r[0] for r in session.query(Project.id)]
+        project_ids = list(project_ids)
+        if not project_ids:
+            return {'projects': 0, 'rollups': 0, 'repaired': 0, 'phases_changed': 0, 'projects_changed': 0}
+
+        expected = {}
+        for project_id, phase_id, count, weight, weighted in _task_aggregates(
+                session, Task.project_id.in_(project_ids)):
+            buckets = (PROJECT_BUCKET, phase_id) if phase_id else (PROJECT_BUCKET,)
+            for bucket in buckets:
+                totals = expected.setdefault((project_id, bucket), [0, 0, 0])
+                totals[0] += count
+                totals[1] += int(weight)
+                totals[2] += int(weighted)
+
+        stored = {
+            (r.project_id, r.phase_id): r
+            for r in session.query(ProgressRollup).filter(
+                ProgressRollup.project_id.in_(project_ids)
+            ).populate_existing()
+        }
+
+        repaired = 0
+        for key in set(expected) | set(stored):
+            count, weight, weighted = expected.get(key, (0, 0, 0))
+            row = stored.get(key)
+            if row is None:
+                session.add(ProgressRollup(project_id=key[0], phase_id=key[1], task_count=count,
+                                           weight_total=weight, weighted_sum=weighted))
+            elif (row.task_count, row.weight_total, row.weighted_sum) != (count, weight, weighted):
+                logger.warning(
+                    f"Progress rollup drift project={key[0]} phase={key[1]}: "
+                    f"stored=({row.task_count}, {row.weight_total}, {row.weighted_sum}) "
+                    f"actual=({count}, {weight}, {weighted})"
                 )
+                row.task_count, row.weight_total, row.weighted_sum = count, weight, weighted
+            else:
+                continue
+            repaired += 1
+        session.flush()
 
-                # 3. 自动更新项目状态
-                if project.progress_percentage == 100:
-                    if project.status.value != 'completed':
-                        project.status = 'completed'
-                        logger.info(f"Project {project_id} auto-completed (progress=100%)")
-                elif project.progress_percentage > 0 and project.status.value == 'planning':
-                    project.status = 'in_progress'
-                    logger.info(f"Project {project_id} auto-started (progress>0%)")
+        phases = session.query(ProjectPhase).filter(ProjectPhase.project_id.in_(project_ids)).all()
+        projects = session.query(Project).filter(Project.id.in_(project_ids)).all()
+        phase_before = {p.id: p.completion_percentage for p in phases}
+        project_before = {p.id: p.progress_percentage for p in projects}
 
-                logger.debug(f"Project {project_id} progress updated: {old_progress}% -> {project.progress_percentage}%")
+        ProgressCalculator._refresh(session, project_ids, {p.id for p in phases})
 
-        except Exception as e:
-            logger.error(f"Failed to update progress for project {project_id}: {e}")
-            raise
+        return {
+            'projects': len(project_ids),
+            'rollups': len(set(expected) | set(stored)),
+            'repaired': repaired,
+            'phases_changed': sum(1 for p in phases if p.completion_percentage != phase_before[p.id]),
+            'projects_changed': sum(1 for p in projects if p.progress_percentage != project_before[p.id]),
+        }
 
     @staticmethod
     def get_progress_detail(session, project_id):
@@ -198,16 +475,16 @@ class ProgressCalculator:
 
         # 任务统计
         total_tasks = len(tasks)
-        completed_tasks = sum(1 for t in tasks if t.status.value == 'completed' if hasattr(t.status, 'value') else str(t.status) == 'completed')
-        in_progress_tasks = sum(1 for t in tasks if t.status.value == 'in_progress' if hasattr(t.status, 'value') else str(t.status) == 'in_progress')
-        blocked_tasks = sum(1 for t in tasks if t.status.value == 'blocked' if hasattr(t.status, 'value') else str(t.status) == 'blocked')
+        completed_tasks = sum(1 for t in tasks if _status_value(t) == 'completed')
+        in_progress_tasks = sum(1 for t in tasks if _status_value(t) == 'in_progress')
+        blocked_tasks = sum(1 for t in tasks if _status_value(t) == 'blocked')
 
         return {
             'project': {
                 'id': project.id,
                 'name': project.name,
                 'progress_percentage': project.progress_percentage or 0,
-                'status': project.status.value if hasattr(project.status, 'value') else str(project.status)
+                'status': _status_value(project)
             },
             'phases': phase_details,
             'unassigned_tasks': unassigned_tasks,
@@ -219,3 +496,31 @@ class ProgressCalculator:
                 'pending_tasks': total_tasks - completed_tasks - in_progress_tasks - blocked_tasks
             }
         }
+
+
+def main():
+    import argparse
+    import json
+    from models import SessionLocal
+
+    parser = argparse.ArgumentParser(description='项目进度汇总')
+    sub = parser.add_subparsers(dest='command', required=True)
+    verify = sub.add_parser('verify', help='校验并修复进度汇总（建议每日定时执行）')
+    verify.add_argument('--project-id', type=int, action='append', help='只校验指定项目，可重复')
+    verify.add_argument('--dry-run', action='store_true', help='只报告偏差，不写入')
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        stats = ProgressCalculator.verify_rollups(session, args.project_id)
+        if args.dry_run:
+            session.rollback()
+        else:
+            session.commit()
+        print(json.dumps(stats, ensure_ascii=False))
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
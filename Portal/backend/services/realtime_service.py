@@ -0,0 +1,288 @@
+"""
+RealtimeService - 聊天与通知实时推送
+基于 shared/push_hub.py（SSE），替代前端对未读数和新消息的定时轮询。
+
+- 未读计数: chat_unread_counters 表随消息发送/删除、标记已读增量维护，
+  未读汇总由逐项目两次查询改为一次查询；缺计数行的项目（上线前的数据）
+  在首次发送消息或查询未读汇总时按消息表统计回填
+- 推送事件（/api/push/stream）:
+    snapshot                  连接时的未读快照 {notifications_unread, chat_unread}
+    chat.message              新项目消息（项目成员和创建者）
+    chat.message_updated      消息编辑
+    chat.message_deleted      消息删除
+    chat.read                 当前用户在某项目已读 {project_id, unread_count: 0}
+    notification.created      新通知 {notification, unread_count}
+    notification.read         通知已读 {id, unread_count}
+    notification.all_read     全部已读 {unread_count: 0}
+    notification.deleted      通知删除 {id, unread_count}
+    reset                     无法续传，客户端需重新拉取快照
+
+全量回填或校正计数（可选，缺行时会自动按需回填）:
+    cd Portal/backend && python -m services.realtime_service rebuild-counters
+
+配置:
+    PUSH_REDIS_ENABLED=false   多进程部署时通过 Redis 广播事件
+"""
+import os
+import sys
+import logging
+import threading
+
+from sqlalchemy import func, or_, and_
+from sqlalchemy.exc import IntegrityError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from shared.push_hub import PushHub
+
+from models.project import Project
+from models.project_member import ProjectMember
+from models.project_message import ProjectMessage, MessageReadStatus, ChatUnreadCounter
+from models.project_notification import ProjectNotification
+
+logger = logging.getLogger(__name__)
+
+PUSH_REDIS_ENABLED = os.getenv('PUSH_REDIS_ENABLED', 'false').lower() == 'true'
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_push_hub() -> PushHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                redis_client = None
+                if PUSH_REDIS_ENABLED:
+                    try:
+                        import redis
+                        from shared.cache_config import cache_config
+                        # 订阅连接长期阻塞读取，不能设置 socket_timeout
+                        redis_client = redis.from_url(cache_config.redis_url, decode_responses=True,
+                                                      health_check_interval=30)
+                        redis_client.ping()
+                    except Exception as e:
+                        logger.warning(f"[Push] Redis 不可用，仅推送本进程连接: {e}")
+                        redis_client = None
+                _hub = PushHub(redis_client=redis_client)
+    return _hub
+
+
+def publish(user_ids, event_type: str, data=None):
+    """推送事件（失败只记录，不影响业务）"""
+    try:
+        get_push_hub().publish(user_ids, event_type, data)
+    except Exception as e:
+        logger.warning(f"[Push] 推送 {event_type} 失败: {e}")
+
+
+# ==================== 项目成员 ====================
+
+def get_project_participants(session, project_id: int) -> set:
+    """项目聊天参与者：项目成员 + 项目创建者"""
+    rows = session.query(ProjectMember.user_id).filter(ProjectMember.project_id == project_id).all()
+    user_ids = {r[0] for r in rows}
+    created_by = session.query(Project.created_by_id).filter(Project.id == project_id).scalar()
+    if created_by:
+        user_ids.add(created_by)
+    return user_ids
+
+
+# ==================== 未读计数 ====================
+
+def _bump_unread(session, project_id: int, message_id: int, user_ids) -> int:
+    """已有计数行的参与者未读数 +1，返回更新行数"""
+    return session.query(ChatUnreadCounter).filter(
+        ChatUnreadCounter.project_id == project_id,
+        ChatUnreadCounter.user_id.in_(user_ids)
+    ).update({
+        ChatUnreadCounter.unread_count: ChatUnreadCounter.unread_count + 1,
+        ChatUnreadCounter.last_message_id: message_id,
+    }, synchronize_session=False)
+
+
+def _count_unread(session, project_id: int, user_ids) -> dict:
+    """按消息和已读状态统计未读数 {user_id: (未读数, 最后一条未读消息ID)}"""
+    last_read = dict(session.query(MessageReadStatus.user_id, MessageReadStatus.last_read_message_id).filter(
+        MessageReadStatus.project_id == project_id,
+        MessageReadStatus.user_id.in_(user_ids)
+    ).all())
+    messages = session.query(ProjectMessage.id, ProjectMessage.sender_id).filter(
+        ProjectMessage.project_id == project_id,
+        ProjectMessage.task_id == None,
+        ProjectMessage.is_deleted == False,
+        ProjectMessage.id > min([last_read.get(uid) or 0 for uid in user_ids])
+    ).all()
+
+    counts = {}
+    for uid in user_ids:
+        since = last_read.get(uid) or 0
+        unread = [mid for mid, sender in messages if mid > since and sender != uid]
+        counts[uid] = (len(unread), max(unread) if unread else None)
+    return counts
+
+
+def _missing_counter_users(session, project_id: int, user_ids) -> set:
+    existing = {r[0] for r in session.query(ChatUnreadCounter.user_id).filter(
+        ChatUnreadCounter.project_id == project_id,
+        ChatUnreadCounter.user_id.in_(user_ids)
+    ).all()}
+    return set(user_ids) - existing
+
+
+def _create_counters(session, project_id: int, user_ids, on_conflict=None) -> None:
+    """
+    按消息表统计并创建计数行（上线前的数据在首次用到时回填）
+
+    并发请求同时创建同一行时唯一约束冲突，回滚到保存点后调用 on_conflict(user_id)
+    """
+    for uid, (count, last_id) in _count_unread(session, project_id, user_ids).items():
+        try:
+            with session.begin_nested():
+                session.add(ChatUnreadCounter(user_id=uid, project_id=project_id,
+                                              unread_count=count, last_message_id=last_id))
+        except IntegrityError:
+            if on_conflict:
+                on_conflict(uid)
+
+
+def increment_unread(session, project_id: int, message_id: int, user_ids) -> None:
+    """新消息：参与者（不含发送者）未读数 +1（调用方负责提交，消息须已 flush）"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    if _bump_unread(session, project_id, message_id, user_ids) < len(user_ids):
+        # 统计包含本条消息；另一请求先建了行时，本条消息照常 +1
+        _create_counters(session, project_id, _missing_counter_users(session, project_id, user_ids),
+                         on_conflict=lambda uid: _bump_unread(session, project_id, message_id, [uid]))
+
+
+def decrement_unread(session, message: ProjectMessage) -> None:
+    """删除消息：尚未读到该消息的参与者未读数 -1（调用方负责提交）"""
+    read_past = session.query(MessageReadStatus.user_id).filter(
+        MessageReadStatus.project_id == message.project_id,
+        MessageReadStatus.last_read_message_id >= message.id
+    )
+    session.query(ChatUnreadCounter).filter(
+        ChatUnreadCounter.project_id == message.project_id,
+        ChatUnreadCounter.user_id != message.sender_id,
+        ChatUnreadCounter.unread_count > 0,
+        ~ChatUnreadCounter.user_id.in_(read_past)
+    ).update({ChatUnreadCounter.unread_count: ChatUnreadCounter.unread_count - 1},
+             synchronize_session=False)
+
+
+def reset_unread(session, user_id: int, project_id: int) -> None:
+    """标记已读：未读数清零（调用方负责提交）"""
+    session.query(ChatUnreadCounter).filter(
+        ChatUnreadCounter.user_id == user_id,
+        ChatUnreadCounter.project_id == project_id
+    ).update({ChatUnreadCounter.unread_count: 0}, synchronize_session=False)
+
+
+def recount_project(session, project_id: int) -> None:
+    """按消息和已读状态重新统计项目未读数（回填或校正，调用方负责提交）"""
+    participants = get_project_participants(session, project_id)
+    session.query(ChatUnreadCounter).filter(
+        ChatUnreadCounter.project_id == project_id
+    ).delete(synchronize_session=False)
+    if not participants:
+        return
+
+    session.add_all([
+        ChatUnreadCounter(user_id=uid, project_id=project_id, unread_count=count, last_message_id=last_id)
+        for uid, (count, last_id) in _count_unread(session, project_id, participants).items()
+    ])
+
+
+def rebuild_unread_counters(session) -> int:
+    """全量回填未读计数，返回处理的项目数"""
+    project_ids = [r[0] for r in session.query(Project.id).filter(Project.deleted_at == None).all()]
+    for project_id in project_ids:
+        recount_project(session, project_id)
+    session.commit()
+    return len(project_ids)
+
+
+def backfill_user_counters(session, user_id: int) -> int:
+    """为用户参与但还没有计数行的项目回填计数（调用方负责提交），返回回填的项目数"""
+    missing = session.query(Project.id).filter(
+        Project.deleted_at == None,
+        or_(
+            Project.created_by_id == user_id,
+            Project.id.in_(session.query(ProjectMember.project_id).filter(ProjectMember.user_id == user_id))
+        ),
+        ~Project.id.in_(session.query(ChatUnreadCounter.project_id).filter(ChatUnreadCounter.user_id == user_id))
+    ).all()
+    for (project_id,) in missing:
+        # 其他请求同时回填了同一行时以已有行为准
+        _create_counters(session, project_id, [user_id])
+    return len(missing)
+
+
+def get_unread_summary(session, user_id: int) -> dict:
+    """用户各项目聊天未读数（一次查询；缺计数行的项目先回填并提交）"""
+    if backfill_user_counters(session, user_id):
+        session.commit()
+    rows = session.query(ChatUnreadCounter.project_id, Project.name, ChatUnreadCounter.unread_count).join(
+        Project, Project.id == ChatUnreadCounter.project_id
+    ).filter(
+        ChatUnreadCounter.user_id == user_id,
+        ChatUnreadCounter.unread_count > 0,
+        Project.deleted_at == None,
+        or_(
+            Project.created_by_id == user_id,
+            Project.id.in_(session.query(ProjectMember.project_id).filter(ProjectMember.user_id == user_id))
+        )
+    ).order_by(ChatUnreadCounter.project_id).all()
+
+    by_project = [
+        {'project_id': project_id, 'project_name': name, 'unread_count': count}
+        for project_id, name, count in rows
+    ]
+    return {
+        'total_unread': sum(p['unread_count'] for p in by_project),
+        'by_project': by_project
+    }
+
+
+def count_unread_notifications(session, user_id: int) -> int:
+    return session.query(func.count(ProjectNotification.id)).filter(
+        and_(ProjectNotification.recipient_id == user_id, ProjectNotification.is_read == False)
+    ).scalar() or 0
+
+
+def publish_notification(session, notification: ProjectNotification) -> None:
+    """推送新通知（附带接收者最新未读数）"""
+    publish([notification.recipient_id], 'notification.created', {
+        'notification': notification.to_dict(),
+        'unread_count': count_unread_notifications(session, notification.recipient_id)
+    })
+
+
+def build_snapshot(session, user_id: int) -> dict:
+    """推送连接建立时的快照"""
+    return {
+        'notifications_unread': count_unread_notifications(session, user_id),
+        'chat_unread': get_unread_summary(session, user_id),
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='聊天未读计数')
+    parser.add_argument('command', choices=['rebuild-counters'])
+    parser.parse_args()
+
+    from models import SessionLocal
+    session = SessionLocal()
+    try:
+        total = rebuild_unread_counters(session)
+        print(f"未读计数回填完成: {total} 个项目")
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
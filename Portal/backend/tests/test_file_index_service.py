@@ -0,0 +1,61 @@
+"""
+文件中心检索测试：全文索引与数据库查询的上传时间范围一致（结束日期包含当天）
+Run with: pytest tests/test_file_index_service.py -v
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.file_index import FileIndex
+from services import file_search_index
+from services.file_index_service import FileIndexService
+from shared.search_index import FTS5Index
+
+UPLOADS = {
+    1: datetime(2024, 5, 1, 9, 0, 0),
+    2: datetime(2024, 5, 1, 23, 59, 59, 500000),
+    3: datetime(2024, 5, 2, 0, 0, 0),
+}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    if not FTS5Index.available():
+        pytest.skip('SQLite 不支持 FTS5')
+    engine = create_engine(f"sqlite:///{tmp_path / 'portal.db'}")
+    FileIndex.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    for file_id, uploaded_at in UPLOADS.items():
+        session.add(FileIndex(
+            id=file_id, source_system='portal', source_table='documents', source_id=file_id,
+            file_name=f'drawing-{file_id}.pdf', file_path=f'/tmp/{file_id}.pdf', file_category='other',
+            uploaded_at=uploaded_at, created_at=uploaded_at
+        ))
+    session.commit()
+
+    index = FTS5Index(str(tmp_path / 'search.db'), file_search_index.SEARCH_FIELDS,
+                      file_search_index.SEARCH_WEIGHTS, file_search_index.SEARCH_ATTRS, name='file_search')
+    monkeypatch.setattr(file_search_index, 'get_file_search_index', lambda: index)
+    monkeypatch.setattr(file_search_index, 'is_index_ready', lambda index: True)
+    file_search_index.rebuild_search_index(session)
+    yield FileIndexService(session)
+    session.close()
+
+
+def found_ids(service, query, **filters):
+    return sorted(item['id'] for item in service.search(query, filters=filters, page_size=10)['items'])
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'end_date': '2024-05-01'}, [1, 2]),
+    ({'start_date': '2024-05-01', 'end_date': '2024-05-01'}, [1, 2]),
+    ({'start_date': '2024-05-02'}, [3]),
+    ({'end_date': '2024-05-01 09:00:00'}, [1]),
+    ({'start_date': '2024-05-01 09:00:01', 'end_date': '2024-05-02'}, [2, 3]),
+])
+def test_index_and_database_agree_on_date_range(service, filters, expected):
+    assert found_ids(service, None, **filters) == expected       # 数据库查询
+    assert found_ids(service, 'drawing', **filters) == expected  # 全文索引
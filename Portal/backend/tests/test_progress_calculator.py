@@ -0,0 +1,127 @@
+"""
+进度增量汇总测试：新建、移动阶段、删除和批量变更后，增量结果与从任务表全量重算一致；
+汇总行并发首次创建时不报错且差量不丢失
+Run with: pytest tests/test_progress_calculator.py -v
+"""
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+from models.project import Project
+from models.project_phase import ProgressRollup, ProjectPhase
+from models.task import Task
+from services.progress_calculator import PROJECT_BUCKET, ProgressCalculator
+
+TABLES = [Project, ProjectPhase, Task, ProgressRollup]
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'portal.db'}")
+    # 删除任务时 ORM 会加载任务的关联表（通知等）
+    related = [rel.target for rel in inspect(Task).relationships]
+    Base.metadata.create_all(engine, tables=[model.__table__ for model in TABLES] + related)
+    session = sessionmaker(bind=engine)()
+    session.add_all([Project(id=1, project_no='P-1', name='项目1', created_by_id=1),
+                     Project(id=2, project_no='P-2', name='无阶段项目', created_by_id=1)])
+    session.add_all([ProjectPhase(id=i, project_id=1, phase_type=p['phase_type'], phase_order=p['phase_order'],
+                                  name=p['name'])
+                     for i, p in enumerate(ProjectPhase.get_default_phases()[:3], 1)])
+    session.commit()
+    yield session
+    session.close()
+
+
+def create(session, task_no, project_id=1, phase_id=1, weight=1, completion=0):
+    task = Task(project_id=project_id, task_no=task_no, title=task_no, created_by_id=1, phase_id=phase_id,
+                weight=weight, completion_percentage=completion)
+    session.add(task)
+    ProgressCalculator.apply_task_change(session, None, task)
+    session.commit()
+    return task
+
+
+def update(session, task, **changes):
+    before = ProgressCalculator.task_state(task)
+    for key, value in changes.items():
+        setattr(task, key, value)
+    ProgressCalculator.apply_task_change(session, before, task)
+    session.commit()
+
+
+def snapshot(session):
+    session.expire_all()
+    return (
+        # 全量重算会为没有任务的阶段补全零行，与缺行等价
+        {(r.project_id, r.phase_id): (r.task_count, r.weight_total, r.weighted_sum)
+         for r in session.query(ProgressRollup) if r.task_count or r.weight_total or r.weighted_sum},
+        {p.id: p.completion_percentage for p in session.query(ProjectPhase)},
+        {p.id: p.progress_percentage for p in session.query(Project)},
+    )
+
+
+def assert_matches_full_recompute(session):
+    incremental = snapshot(session)
+    stats = ProgressCalculator.verify_rollups(session)
+    session.commit()
+    assert (stats['repaired'], stats['phases_changed'], stats['projects_changed']) == (0, 0, 0)
+    assert snapshot(session) == incremental
+    return incremental
+
+
+def test_create_move_and_delete(session):
+    a = create(session, 'T1', weight=2, completion=50)
+    b = create(session, 'T2', phase_id=2, weight=3, completion=100)
+    rollups, phases, projects = assert_matches_full_recompute(session)
+    assert rollups[(1, PROJECT_BUCKET)] == (2, 5, 400)
+    assert phases == {1: 50, 2: 100, 3: 0} and projects[1] == 50
+
+    update(session, a, phase_id=2, completion_percentage=80)  # 移到另一个阶段并修改完成度
+    rollups, phases, _ = assert_matches_full_recompute(session)
+    assert (1, 1) not in rollups and phases == {1: 0, 2: 92, 3: 0}
+
+    update(session, b, phase_id=None)  # 移出阶段：只计入项目级汇总
+    assert_matches_full_recompute(session)
+
+    before = ProgressCalculator.task_state(a)
+    session.delete(a)
+    ProgressCalculator.apply_task_change(session, before, None)
+    session.commit()
+    rollups, phases, _ = assert_matches_full_recompute(session)
+    assert rollups[(1, PROJECT_BUCKET)] == (1, 3, 300) and phases[2] == 0
+
+
+def test_batch_changes(session):
+    tasks = [create(session, f'T{i}', phase_id=i % 3 + 1, weight=i % 4 + 1, completion=i * 10) for i in range(6)]
+    create(session, 'N1', project_id=2, phase_id=None, weight=2, completion=40)
+    assert_matches_full_recompute(session)
+
+    changes = []
+    for task, updates in [(tasks[0], {'completion_percentage': 100}), (tasks[1], {'phase_id': 3, 'weight': 5}),
+                          (tasks[2], {'completion_percentage': 0, 'phase_id': 1}), (tasks[3], {})]:
+        before = ProgressCalculator.task_state(task)
+        for key, value in updates.items():
+            setattr(task, key, value)
+        changes.append((before, ProgressCalculator.task_state(task)))
+    changes.append((ProgressCalculator.task_state(tasks[4]), None))
+    session.delete(tasks[4])
+    added = Task(project_id=2, task_no='N2', title='N2', created_by_id=1, weight=1, completion_percentage=100)
+    session.add(added)
+    session.flush()
+    changes.append((None, ProgressCalculator.task_state(added)))
+
+    ProgressCalculator.apply_task_changes(session, changes)
+    session.commit()
+    _, _, projects = assert_matches_full_recompute(session)
+    assert projects[2] == 60
+
+
+def test_concurrent_rollup_creation_keeps_delta(session):
+    create(session, 'T1', weight=2, completion=50)
+    # 另一请求已建好该行（统计时看不到本次变更），本次插入冲突后按差量累加
+    row = ProgressCalculator._rebuild_rollup(session, 1, 1, delta=(1, 3, 150))
+    session.commit()
+    assert (row.task_count, row.weight_total, row.weighted_sum) == (2, 5, 250)
+    assert session.query(ProgressRollup).filter_by(project_id=1, phase_id=1).count() == 1
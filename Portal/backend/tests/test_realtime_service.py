@@ -0,0 +1,89 @@
+"""
+聊天未读计数测试：增量维护与按消息表统计一致、缺计数行时回填、并发创建计数行不报错
+Run with: pytest tests/test_realtime_service.py -v
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+from models.project import Project
+from models.project_member import ProjectMember
+from models.project_message import ChatUnreadCounter, MessageReadStatus, ProjectMessage
+from models.project_phase import ProjectPhase
+from models.task import Task
+from services import realtime_service
+
+TABLES = [Project, ProjectPhase, Task, ProjectMember, ProjectMessage, MessageReadStatus, ChatUnreadCounter]
+OWNER, MEMBER, OTHER = 1, 2, 3
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'portal.db'}")
+    Base.metadata.create_all(engine, tables=[model.__table__ for model in TABLES])
+    session = sessionmaker(bind=engine)()
+    session.add(Project(id=1, project_no='P-1', name='项目1', created_by_id=OWNER))
+    session.add_all([ProjectMember(project_id=1, user_id=MEMBER), ProjectMember(project_id=1, user_id=OTHER)])
+    session.commit()
+    yield session
+    session.close()
+
+
+def send(session, sender_id, counted=True):
+    message = ProjectMessage(project_id=1, sender_id=sender_id, sender_name=f'u{sender_id}', content='hi')
+    session.add(message)
+    session.flush()
+    if counted:
+        participants = realtime_service.get_project_participants(session, 1)
+        realtime_service.increment_unread(session, 1, message.id, participants - {sender_id})
+    session.commit()
+    return message
+
+
+def unread(session, user_id):
+    return {p['project_id']: p['unread_count'] for p in realtime_service.get_unread_summary(session, user_id)['by_project']}
+
+
+def test_first_message_backfills_existing_unread(session):
+    # 计数表上线前的消息（未维护计数）
+    send(session, OWNER, counted=False)
+    send(session, MEMBER, counted=False)
+
+    send(session, OWNER)
+    rows = {c.user_id: c.unread_count for c in session.query(ChatUnreadCounter)}
+    assert rows == {MEMBER: 2, OTHER: 3}
+
+
+def test_summary_backfills_without_manual_rebuild(session):
+    first = send(session, OWNER, counted=False)
+    send(session, MEMBER, counted=False)
+    session.add(MessageReadStatus(user_id=OTHER, project_id=1, last_read_message_id=first.id))
+    session.commit()
+
+    assert unread(session, OWNER) == {1: 1}
+    assert unread(session, OTHER) == {1: 1}
+    assert unread(session, MEMBER) == {1: 1}
+    # 回填后计数行存在（含 0 未读），再次查询不再回填
+    assert realtime_service.backfill_user_counters(session, MEMBER) == 0
+
+    send(session, OWNER)
+    assert unread(session, MEMBER) == {1: 2}
+
+
+def test_concurrent_counter_creation_is_retried_as_update(session):
+    send(session, OWNER)
+    assert session.query(ChatUnreadCounter).filter_by(user_id=MEMBER).one().unread_count == 1
+
+    # 另一请求在检查之后、插入之前建了同一计数行：唯一约束冲突，回滚保存点后改为 +1
+    message = ProjectMessage(project_id=1, sender_id=OWNER, sender_name='u1', content='hi')
+    session.add(message)
+    session.flush()
+    realtime_service._create_counters(
+        session, 1, [MEMBER],
+        on_conflict=lambda uid: realtime_service._bump_unread(session, 1, message.id, [uid]))
+    session.commit()
+
+    counter = session.query(ChatUnreadCounter).filter_by(user_id=MEMBER).one()
+    assert (counter.unread_count, counter.last_message_id) == (2, message.id)
@@ -24,6 +24,7 @@ import {
   CloseOutlined
 } from '@ant-design/icons'
 import { chatAPI } from '../../services/api'
+import { isPushSupported, subscribePush } from '../../services/push'
 import { useAuth } from '../../contexts/AuthContext'
 import dayjs from 'dayjs'
 import relativeTime from 'dayjs/plugin/relativeTime'
@@ -151,6 +152,8 @@ export default function ProjectChat({ projectId, collapsed = false, onCollapse }
   const [editingMessage, setEditingMessage] = useState(null)
   const messagesEndRef = useRef(null)
   const pollingRef = useRef(null)
+  const messagesRef = useRef(messages)
+  messagesRef.current = messages
 
   const currentUserId = user?.user_id || user?.id
 
@@ -188,12 +191,38 @@ export default function ProjectChat({ projectId, collapsed = false, onCollapse }
     }
   }, [projectId, collapsed, fetchMessages])
 
-  // 轮询新消息 (活跃视图每3秒)
+  // 实时接收新消息（推送），不支持 SSE 时退回轮询 (活跃视图每3秒)
   useEffect(() => {
     if (collapsed || !projectId) return
 
+    if (isPushSupported()) {
+      const isCurrentProject = (data) => data.project_id === projectId && !data.task_id
+      const unsubscribers = [
+        subscribePush('chat.message', (data) => {
+          if (!isCurrentProject(data)) return
+          // 自己发送的消息已在发送成功后加入列表
+          setMessages(prev => prev.some(m => m.id === data.id) ? prev : [...prev, data])
+          if (data.sender_id !== currentUserId) {
+            chatAPI.markAsRead(projectId).catch(() => {})
+          }
+        }),
+        subscribePush('chat.message_updated', (data) => {
+          if (!isCurrentProject(data)) return
+          setMessages(prev => prev.map(m => m.id === data.id ? data : m))
+        }),
+        subscribePush('chat.message_deleted', (data) => {
+          if (data.project_id !== projectId) return
+          setMessages(prev => prev.filter(m => m.id !== data.id))
+        }),
+        // 断线无法续传时重新加载
+        subscribePush('snapshot', () => fetchMessages()),
+      ]
+      return () => unsubscribers.forEach((unsubscribe) => unsubscribe())
+    }
+
     pollingRef.current = setInterval(() => {
-      const lastMessageId = messages.length > 0 ? messages[messages.length - 1].id : null
+      const current = messagesRef.current
+      const lastMessageId = current.length > 0 ? current[current.length - 1].id : null
       if (lastMessageId) {
         fetchMessages(lastMessageId)
       }
@@ -204,7 +233,7 @@ export default function ProjectChat({ projectId, collapsed = false, onCollapse }
         clearInterval(pollingRef.current)
       }
     }
-  }, [collapsed, projectId, messages, fetchMessages])
+  }, [collapsed, projectId, currentUserId, fetchMessages])
 
   // 滚动到底部
   useEffect(() => {
@@ -229,7 +258,9 @@ export default function ProjectChat({ projectId, collapsed = false, onCollapse }
         message.success('消息已更新')
       } else {
         const response = await chatAPI.sendProjectMessage(projectId, { content })
-        setMessages(prev => [...prev, response.data.data])
+        const sent = response.data.data
+        // 推送可能先于响应到达
+        setMessages(prev => prev.some(m => m.id === sent.id) ? prev : [...prev, sent])
       }
       setInputValue('')
     } catch (err) {
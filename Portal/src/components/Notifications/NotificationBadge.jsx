@@ -2,6 +2,9 @@ import { useState, useEffect } from 'react'
 import { Badge } from 'antd'
 import { BellOutlined } from '@ant-design/icons'
 import { notificationAPI } from '../../services/api'
+import { isPushSupported, subscribePush } from '../../services/push'
+
+const NOTIFICATION_EVENTS = ['notification.created', 'notification.read', 'notification.all_read', 'notification.deleted']
 
 export default function NotificationBadge() {
   const [unreadCount, setUnreadCount] = useState(0)
@@ -9,9 +12,20 @@ export default function NotificationBadge() {
   useEffect(() => {
     fetchUnreadCount()
 
-    // Poll for new notifications every 30 seconds
-    const interval = setInterval(fetchUnreadCount, 30000)
-    return () => clearInterval(interval)
+    // 不支持 SSE 时退回轮询（每 30 秒）
+    if (!isPushSupported()) {
+      const interval = setInterval(fetchUnreadCount, 30000)
+      return () => clearInterval(interval)
+    }
+
+    // 推送：连接时的快照 + 通知变化事件（均带最新未读数）
+    const unsubscribers = [
+      subscribePush('snapshot', (data) => setUnreadCount(data.notifications_unread)),
+      ...NOTIFICATION_EVENTS.map((type) =>
+        subscribePush(type, (data) => setUnreadCount(data.unread_count))
+      ),
+    ]
+    return () => unsubscribers.forEach((unsubscribe) => unsubscribe())
   }, [])
 
   const fetchUnreadCount = async () => {
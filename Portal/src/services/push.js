@@ -0,0 +1,81 @@
+// 实时推送（SSE）
+// 全站共用一条 /api/push/stream 连接，替代通知未读数和聊天消息的定时轮询。
+// 连接时收到 snapshot（未读快照），之后只收增量事件；断线由浏览器按 Last-Event-ID 自动续传。
+
+const API_BASE = import.meta.env.VITE_API_BASE_URL || '/api'
+
+const EVENT_TYPES = [
+  'snapshot',
+  'reset',
+  'chat.message',
+  'chat.message_updated',
+  'chat.message_deleted',
+  'chat.read',
+  'notification.created',
+  'notification.read',
+  'notification.all_read',
+  'notification.deleted',
+]
+
+const listeners = new Map()
+let source = null
+
+export const isPushSupported = () => typeof window !== 'undefined' && 'EventSource' in window
+
+function dispatch(type, data) {
+  const handlers = listeners.get(type)
+  if (handlers) handlers.forEach((handler) => handler(data))
+}
+
+function connect() {
+  const token = localStorage.getItem('token')
+  if (!token || source) return
+
+  source = new EventSource(`${API_BASE}/push/stream?token=${encodeURIComponent(token)}`)
+  EVENT_TYPES.forEach((type) => {
+    source.addEventListener(type, (e) => {
+      let data = null
+      try {
+        data = JSON.parse(e.data)
+      } catch (err) {
+        return
+      }
+      if (type === 'reset') {
+        // 无法续传：重新建立连接获取快照
+        disconnect()
+        connect()
+        return
+      }
+      dispatch(type, data)
+    })
+  })
+}
+
+function disconnect() {
+  if (source) {
+    source.close()
+    source = null
+  }
+}
+
+/**
+ * 订阅推送事件
+ * @param {string} type 事件类型
+ * @param {Function} handler 回调 (data) => void
+ * @returns {Function} 取消订阅
+ */
+export function subscribePush(type, handler) {
+  if (!listeners.has(type)) listeners.set(type, new Set())
+  listeners.get(type).add(handler)
+
+  if (isPushSupported()) connect()
+
+  return () => {
+    const handlers = listeners.get(type)
+    if (handlers) {
+      handlers.delete(handler)
+      if (handlers.size === 0) listeners.delete(type)
+    }
+    if (listeners.size === 0) disconnect()
+  }
+}
@@ -3,6 +3,8 @@
 批次和序列号管理模型
 用于追踪物料的批次和序列号信息
 """
+import os
+import sys
 from datetime import datetime, date
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
@@ -13,6 +15,11 @@ from sqlalchemy.dialects.mysql import JSON
 
 from app import db
 
+# 添加 shared 模块路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+
+from shared.sequence import get_allocator
+
 
 class BatchStatus(enum.Enum):
     """批次状态枚举"""
@@ -200,20 +207,19 @@ class BatchMaster(db.Model):
         else:
             batch_prefix = f"BAT-{today}-"
 
-        # 获取最大编号
-        last = cls.query.filter(
-            cls.batch_no.like(f"{batch_prefix}%")
-        ).order_by(cls.batch_no.desc()).first()
-
-        if last:
+        def max_seq():
+            # 当天计数器首次创建时，从已有批次号的最大编号继续
+            last = cls.query.filter(
+                cls.batch_no.like(f"{batch_prefix}%")
+            ).order_by(cls.batch_no.desc()).first()
             try:
-                last_num = int(last.batch_no.split("-")[-1])
-                new_num = last_num + 1
-            except:
-                new_num = 1
-        else:
-            new_num = 1
+                return int(last.batch_no.split("-")[-1]) if last else 0
+            except ValueError:
+                return 0
 
+        new_num = get_allocator(db.engine).next_value(
+            f"BATCH:{batch_prefix[:-10]}", today, seed=max_seq
+        )
         return f"{batch_prefix}{new_num:04d}"
 
     def update_status(self):
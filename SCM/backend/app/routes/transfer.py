@@ -1,6 +1,8 @@
 # SCM 库存转移路由
 # Transfer Order API Routes
 
+import os
+import sys
 from flask import Blueprint, request, jsonify
 from datetime import datetime, date
 from decimal import Decimal
@@ -14,29 +16,35 @@ from app.models.transfer import (
 from app.models.material import Material, Warehouse, StorageBin, Inventory
 from app.models.inventory import InventoryTx
 
-transfer_bp = Blueprint('transfer', __name__, url_prefix='/api/transfer')
+# 添加 shared 模块路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
 
+from shared.sequence import get_allocator
+
+transfer_bp = Blueprint('transfer', __name__, url_prefix='/api/transfer')
 
-def generate_order_no():
-    """生成转移单号 TR-YYYYMMDD-XXXX"""
-    today = datetime.now().strftime('%Y%m%d')
-    prefix = f'TR-{today}-'
 
-    # 查找今天最大的单号
+def _max_order_seq(prefix):
+    """已有转移单的当天最大流水号（仅在当天计数器创建时调用一次）"""
     last_order = TransferOrder.query.filter(
         TransferOrder.order_no.like(f'{prefix}%')
     ).order_by(TransferOrder.order_no.desc()).first()
 
     if last_order:
         try:
-            last_num = int(last_order.order_no.split('-')[-1])
-            next_num = last_num + 1
+            return int(last_order.order_no.split('-')[-1])
         except (ValueError, IndexError):
-            next_num = 1
-    else:
-        next_num = 1
+            return 0
+    return 0
+
+
+def generate_order_no():
+    """生成转移单号 TR-YYYYMMDD-XXXX"""
+    today = datetime.now().strftime('%Y%m%d')
+    prefix = f'TR-{today}-'
 
-    return f'{prefix}{next_num:04d}'
+    seq = get_allocator(db.engine).next_value('TR', today, seed=lambda: _max_order_seq(prefix))
+    return f'{prefix}{seq:04d}'
 
 
 # ==================== 转移单 CRUD ====================
@@ -10,6 +10,9 @@ import os
 
 # 添加shared模块路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from shared.sequence import get_allocator
 
 try:
     from auth_middleware import requires_auth, success_response, error_response, paginated_response
@@ -49,17 +52,14 @@ def generate_shipment_no():
     today = datetime.now().strftime('%Y%m%d')
     prefix = f'SHM{today}'
 
-    # 查询今天最大的单号
-    last_shipment = Shipment.query.filter(
-        Shipment.shipment_no.like(f'{prefix}%')
-    ).order_by(Shipment.shipment_no.desc()).first()
-
-    if last_shipment:
-        last_seq = int(last_shipment.shipment_no[-4:])
-        new_seq = last_seq + 1
-    else:
-        new_seq = 1
+    def max_seq():
+        # 当天计数器首次创建时，从已有单号的最大流水号继续
+        last_shipment = Shipment.query.filter(
+            Shipment.shipment_no.like(f'{prefix}%')
+        ).order_by(Shipment.shipment_no.desc()).first()
+        return int(last_shipment.shipment_no[-4:]) if last_shipment else 0
 
+    new_seq = get_allocator(db.engine).next_value('SHM', today, seed=max_seq)
     return f'{prefix}{new_seq:04d}'
 
 
@@ -36,6 +36,12 @@ module.exports = {
       interpreter: './venv/bin/python3',
       env: { PORT: 5001 }
     },
+    {
+      name: 'caigou-ocr',
+      cwd: './采购/backend',
+      script: 'ocr_server.py',
+      interpreter: './venv/bin/python3'
+    },
     {
       name: 'crm-backend',
       cwd: './CRM/backend',
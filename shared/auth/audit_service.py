@@ -1,11 +1,15 @@
 """
 Audit Service - Centralized audit logging for all subsystems
 P2-22: 添加审计日志备用记录机制
+异步批量写入: 审计事件进入内存队列，由后台线程批量插入数据库
 """
 import logging
 import os
+import atexit
+import queue
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from functools import wraps
 from flask import request, g
 import json
@@ -24,9 +28,24 @@ AUDIT_BACKUP_DIR = os.getenv('AUDIT_BACKUP_DIR', '/tmp/jzc_audit_backup')
 AUDIT_BACKUP_MAX_SIZE = int(os.getenv('AUDIT_BACKUP_MAX_SIZE', 10 * 1024 * 1024))  # 10MB
 AUDIT_BACKUP_MAX_FILES = int(os.getenv('AUDIT_BACKUP_MAX_FILES', 5))
 
+# 异步批量写入配置
+AUDIT_ASYNC_ENABLED = os.getenv('AUDIT_ASYNC_ENABLED', 'true').lower() in ('true', '1', 'yes')
+AUDIT_QUEUE_MAX_SIZE = int(os.getenv('AUDIT_QUEUE_MAX_SIZE', 10000))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 200))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1.0))  # 秒
+AUDIT_ENQUEUE_TIMEOUT = float(os.getenv('AUDIT_ENQUEUE_TIMEOUT', 0.05))  # 队列满时最长等待（秒）
+RECOVER_BATCH_SIZE = 500
+
 # 线程锁，确保文件写入安全
 _backup_lock = threading.Lock()
 
+# AuditLog 可写入的字段
+_AUDIT_COLUMNS = (
+    'user_id', 'username', 'action_type', 'resource_type', 'resource_id',
+    'description', 'ip_address', 'user_agent', 'request_method', 'request_path',
+    'request_body', 'status', 'error_message', 'module', 'created_at'
+)
+
 
 def _ensure_backup_dir():
     """确保备用日志目录存在"""
@@ -99,6 +118,185 @@ def _write_backup_audit(audit_data: Dict) -> bool:
         return False
 
 
+def _write_backup_audits(audit_list: List[Dict]) -> bool:
+    """
+    批量将审计事件写入备用文件（队列溢出或批量写库失败时使用）
+    """
+    if not audit_list:
+        return True
+    if not _ensure_backup_dir():
+        return False
+
+    try:
+        with _backup_lock:
+            _rotate_backup_files()
+
+            backup_file = _get_backup_file_path()
+            backup_time = datetime.utcnow().isoformat()
+            with open(backup_file, 'a', encoding='utf-8') as f:
+                for audit_data in audit_list:
+                    audit_data['_backup_time'] = backup_time
+                    audit_data['_recovered'] = False
+                    f.write(json.dumps(audit_data, ensure_ascii=False, default=str) + '\n')
+
+            logger.warning(f"P2-22: {len(audit_list)} 条审计事件已写入备用文件: {backup_file}")
+            return True
+    except Exception as e:
+        logger.critical(f"P2-22: 审计备用写入也失败: {e}")
+        return False
+
+
+def _audit_row(audit_data: Dict) -> Dict:
+    """将审计数据转换为 AuditLog 插入行"""
+    row = {col: audit_data.get(col) for col in _AUDIT_COLUMNS}
+    created_at = row.get('created_at')
+    if isinstance(created_at, str):
+        row['created_at'] = datetime.fromisoformat(created_at)
+    elif created_at is None:
+        row['created_at'] = datetime.utcnow()
+    return row
+
+
+def _bulk_insert_audits(session, audit_list: List[Dict]):
+    """批量插入审计记录（单条 INSERT ... VALUES 多行，executemany）"""
+    from sqlalchemy import insert
+    session.execute(insert(AuditLog), [_audit_row(data) for data in audit_list])
+
+
+class AuditWriter:
+    """
+    审计日志异步批量写入器
+
+    - 有界内存队列，请求线程只做入队
+    - 后台线程按数量（AUDIT_BATCH_SIZE）或时间（AUDIT_FLUSH_INTERVAL）阈值批量插入
+    - 队列满时短暂等待（背压），仍然满则直接溢出到 JSONL 备用文件
+    - 批量写库失败时整批写入 JSONL 备用文件，由 recover_backup_audits 恢复
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = AUDIT_QUEUE_MAX_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+        enqueue_timeout: float = AUDIT_ENQUEUE_TIMEOUT
+    ):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.stats = {'enqueued': 0, 'written': 0, 'batches': 0, 'spilled': 0}
+
+    def _ensure_started(self):
+        """懒启动后台线程；fork 后的子进程会重新创建队列和线程"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._stopping.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, audit_data: Dict) -> bool:
+        """
+        提交审计事件
+
+        Returns:
+            是否进入队列（False 表示已溢出到备用文件）
+        """
+        self._ensure_started()
+        try:
+            self._queue.put(audit_data, timeout=self.enqueue_timeout)
+            self.stats['enqueued'] += 1
+            return True
+        except queue.Full:
+            self.stats['spilled'] += 1
+            if not _write_backup_audit(audit_data):
+                logger.critical(f"P2-22: 审计记录丢失 - 队列已满且备用存储失败: {audit_data.get('action_type')}")
+            return False
+
+    def _drain(self, first: Dict) -> List[Dict]:
+        """从队列收集一批数据，直到数量或时间阈值"""
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            batch = self._drain(first)
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_batch(self, batch: List[Dict]):
+        session = auth_models.AuthSessionLocal()
+        try:
+            _bulk_insert_audits(session, batch)
+            session.commit()
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+        except Exception as e:
+            logger.error(f"Failed to bulk write {len(batch)} audit logs to database: {e}")
+            session.rollback()
+            self.stats['spilled'] += len(batch)
+            if not _write_backup_audits(batch):
+                logger.critical(f"P2-22: {len(batch)} 条审计记录丢失 - 数据库和备用存储都失败")
+        finally:
+            session.close()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待队列中已提交的事件全部写入（用于测试和进程退出）"""
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """停止后台线程，剩余事件写入后返回"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+# 全局异步写入器
+audit_writer = AuditWriter()
+atexit.register(audit_writer.stop)
+
+
 def recover_backup_audits() -> Dict[str, Any]:
     """
     P2-22: 从备用文件恢复审计记录到数据库
@@ -109,68 +307,69 @@ def recover_backup_audits() -> Dict[str, Any]:
     result = {'success': False, 'recovered': 0, 'failed': 0, 'errors': []}
     backup_file = _get_backup_file_path()
 
-    if not os.path.exists(backup_file):
+    recovering_file = f"{backup_file}.recovering"
+
+    if not os.path.exists(backup_file) and not os.path.exists(recovering_file):
         result['success'] = True
         result['message'] = '无待恢复的审计记录'
         return result
 
+    # 先把备用文件移走再处理，避免恢复期间写入的新记录被覆盖
+    # （上次恢复中断时，先处理遗留的 .recovering 文件）
+    with _backup_lock:
+        if not os.path.exists(recovering_file):
+            os.rename(backup_file, recovering_file)
+
     session = auth_models.AuthSessionLocal()
-    recovered_lines = []
     failed_lines = []
 
     try:
-        with open(backup_file, 'r', encoding='utf-8') as f:
+        with open(recovering_file, 'r', encoding='utf-8') as f:
             lines = f.readlines()
 
+        pending = []  # [(行号, 原始行, 审计数据)]
         for i, line in enumerate(lines):
             try:
                 audit_data = json.loads(line.strip())
-
-                # 跳过已恢复的记录
-                if audit_data.get('_recovered'):
-                    recovered_lines.append(line)
-                    continue
-
-                # 移除备份元数据
-                audit_data.pop('_backup_time', None)
-                audit_data.pop('_recovered', None)
-
-                # 创建审计记录
-                audit = AuditLog(
-                    user_id=audit_data.get('user_id'),
-                    username=audit_data.get('username'),
-                    action_type=audit_data.get('action_type'),
-                    resource_type=audit_data.get('resource_type'),
-                    resource_id=audit_data.get('resource_id'),
-                    description=audit_data.get('description'),
-                    ip_address=audit_data.get('ip_address'),
-                    user_agent=audit_data.get('user_agent'),
-                    request_method=audit_data.get('request_method'),
-                    request_path=audit_data.get('request_path'),
-                    request_body=audit_data.get('request_body'),
-                    status=audit_data.get('status'),
-                    error_message=audit_data.get('error_message'),
-                    module=audit_data.get('module'),
-                    created_at=datetime.fromisoformat(audit_data['created_at']) if audit_data.get('created_at') else datetime.utcnow()
-                )
-                session.add(audit)
-                session.commit()
-
-                # 标记为已恢复
-                audit_data['_recovered'] = True
-                recovered_lines.append(json.dumps(audit_data, ensure_ascii=False, default=str) + '\n')
-                result['recovered'] += 1
-
             except Exception as e:
                 result['failed'] += 1
                 result['errors'].append(f"行 {i + 1}: {str(e)}")
                 failed_lines.append(line)
+                continue
+
+            # 跳过已恢复的记录
+            if audit_data.get('_recovered'):
+                continue
+            pending.append((i, line, audit_data))
+
+        for start in range(0, len(pending), RECOVER_BATCH_SIZE):
+            chunk = pending[start:start + RECOVER_BATCH_SIZE]
+            try:
+                _bulk_insert_audits(session, [data for _, _, data in chunk])
+                session.commit()
+                result['recovered'] += len(chunk)
+                continue
+            except Exception:
                 session.rollback()
 
-        # 重写备用文件（只保留未恢复的记录）
+            # 整批失败时逐条重试，定位具体失败的记录
+            for i, line, audit_data in chunk:
+                try:
+                    _bulk_insert_audits(session, [audit_data])
+                    session.commit()
+                    result['recovered'] += 1
+                except Exception as e:
+                    result['failed'] += 1
+                    result['errors'].append(f"行 {i + 1}: {str(e)}")
+                    failed_lines.append(line)
+                    session.rollback()
+
+        # 未恢复的记录追加回备用文件
         with _backup_lock:
-            with open(backup_file, 'w', encoding='utf-8') as f:
-                f.writelines(failed_lines)
+            if failed_lines:
+                with open(backup_file, 'a', encoding='utf-8') as f:
+                    f.writelines(failed_lines)
+            os.remove(recovering_file)
 
         result['success'] = True
         logger.info(f"P2-22: 审计记录恢复完成 - 成功: {result['recovered']}, 失败: {result['failed']}")
@@ -194,7 +393,10 @@ def get_backup_status() -> Dict[str, Any]:
         'backup_file': backup_file,
         'exists': os.path.exists(backup_file),
         'pending_count': 0,
-        'file_size': 0
+        'file_size': 0,
+        'async_enabled': AUDIT_ASYNC_ENABLED,
+        'queue_depth': audit_writer.queue_depth(),
+        'writer_stats': dict(audit_writer.stats)
     }
 
     if result['exists']:
@@ -362,6 +564,10 @@ class AuditService:
             error_message: Error message if failed
             module: Which subsystem (portal, hr, crm, etc.)
             request_body: Request body dict (will be sanitized)
+
+        Returns:
+            The persisted AuditLog in synchronous mode; None in async mode
+            (AUDIT_ASYNC_ENABLED), where the event is written in a later batch.
         """
         # P2-22: 构建审计数据（用于数据库和备用存储）
         audit_data = {
@@ -382,25 +588,14 @@ class AuditService:
             'created_at': datetime.utcnow().isoformat()
         }
 
+        if AUDIT_ASYNC_ENABLED:
+            # 异步批量写入：请求线程只入队，不等待数据库
+            audit_writer.submit(audit_data)
+            return None
+
         session = auth_models.AuthSessionLocal()
         try:
-            audit = AuditLog(
-                user_id=user_id,
-                username=username,
-                action_type=action_type,
-                resource_type=resource_type,
-                resource_id=str(resource_id) if resource_id else None,
-                description=description,
-                ip_address=audit_data['ip_address'],
-                user_agent=audit_data['user_agent'],
-                request_method=audit_data['request_method'],
-                request_path=audit_data['request_path'],
-                request_body=audit_data['request_body'],
-                status=status,
-                error_message=error_message,
-                module=module,
-                created_at=datetime.utcnow()
-            )
+            audit = AuditLog(**_audit_row(audit_data))
             session.add(audit)
             session.commit()
             return audit
@@ -418,6 +613,11 @@ class AuditService:
         finally:
             session.close()
 
+    @staticmethod
+    def flush(timeout: float = 10.0) -> bool:
+        """Wait until queued audit events are written (async mode)"""
+        return audit_writer.flush(timeout)
+
     @staticmethod
     def log_login(
         user_id: int,
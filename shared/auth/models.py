@@ -360,7 +360,7 @@ class AuditLog(Base):
     """Audit log for tracking user operations"""
     __tablename__ = 'audit_logs'
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)  # SQLite 仅 INTEGER 主键自增
     user_id = Column(Integer, nullable=True, index=True)  # 操作用户 ID
     username = Column(String(50), nullable=True)  # 操作用户名（冗余存储）
 
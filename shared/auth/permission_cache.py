@@ -0,0 +1,231 @@
+"""
+跨进程权限缓存
+
+每个进程内按用户缓存编译好的权限集合（frozenset），权限检查为纯内存查找。
+缓存按"代数"（generation）做版本控制：角色/权限变更时代数加一并广播，
+所有 gunicorn/PM2 worker 收到后丢弃本地缓存。
+
+广播方式:
+- Redis 可用: INCR 代数键 + PUBLISH 通知，订阅线程实时更新；
+  同时按间隔轮询代数键，防止漏收消息
+- Redis 不可用: 代数写入共享的标记文件，按间隔检查文件内容
+
+Redis 可用时编译结果还会写入共享缓存（键中带代数），
+同一代数下一个 worker 编译后其他 worker 直接复用，不再查询认证库。
+"""
+import os
+import time
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from ..cache_config import cache_config, cache_get, cache_set
+except ImportError:  # shared 不在导入路径上时退化为单机模式
+    cache_config = None
+    cache_get = cache_set = None
+
+
+class PermissionSet:
+    """编译后的用户权限集合（不可变）"""
+
+    __slots__ = ('codes', 'role_codes', 'modules', 'is_super', 'generation', 'created_at')
+
+    def __init__(self, codes: Iterable[str], role_codes: Iterable[str], generation: int):
+        self.codes = frozenset(codes)
+        self.role_codes = tuple(role_codes)
+        self.modules = frozenset(code.split(':', 1)[0] for code in self.codes if ':' in code)
+        self.is_super = '*' in self.codes
+        self.generation = generation
+        self.created_at = time.time()
+
+    def has(self, code: str) -> bool:
+        return self.is_super or code in self.codes
+
+    def has_any(self, codes: Iterable[str]) -> bool:
+        return self.is_super or not self.codes.isdisjoint(codes)
+
+    def has_all(self, codes: Iterable[str]) -> bool:
+        return self.is_super or self.codes.issuperset(codes)
+
+    def has_module(self, module: str) -> bool:
+        return self.is_super or module in self.modules
+
+    def to_dict(self) -> Dict:
+        return {'codes': sorted(self.codes), 'roles': list(self.role_codes)}
+
+    @classmethod
+    def from_dict(cls, data: Dict, generation: int) -> 'PermissionSet':
+        return cls(data.get('codes') or [], data.get('roles') or [], generation)
+
+
+class PermissionCache:
+    """带代数版本控制的进程内权限缓存"""
+
+    CHANNEL = 'rbac:invalidate'
+    GENERATION_KEY = 'rbac:generation'
+
+    def __init__(self, ttl: int = 300, check_interval: float = None, stamp_file: str = None):
+        self.ttl = ttl
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.getenv('RBAC_CACHE_CHECK_INTERVAL', 5)
+        )
+        self.stamp_file = stamp_file or os.getenv(
+            'RBAC_CACHE_STAMP_FILE',
+            os.path.join(tempfile.gettempdir(), 'jzc_rbac_generation')
+        )
+        self._local: Dict[int, PermissionSet] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._last_check = 0.0
+        self._subscriber = None
+
+    # ---------- 代数同步 ----------
+
+    def _redis(self):
+        if cache_config is None or not cache_config.is_available():
+            return None
+        return cache_config.client
+
+    def _redis_key(self, key: str) -> str:
+        return f"{cache_config.prefix}:{key}"
+
+    def _read_stamp(self) -> int:
+        try:
+            with open(self.stamp_file, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_stamp(self, generation: int):
+        tmp_path = f"{self.stamp_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(str(generation))
+            os.replace(tmp_path, self.stamp_file)
+        except OSError as e:
+            print(f"权限缓存标记文件写入失败: {e}")
+
+    def _read_shared_generation(self) -> int:
+        client = self._redis()
+        if client is not None:
+            try:
+                return int(client.get(self._redis_key(self.GENERATION_KEY)) or 0)
+            except Exception as e:
+                print(f"权限缓存代数读取失败: {e}")
+        return self._read_stamp()
+
+    def _apply_generation(self, generation: int):
+        """采用新的代数，丢弃本地缓存"""
+        with self._lock:
+            if generation != self._generation:
+                self._generation = generation
+                self._local.clear()
+
+    def _ensure_subscriber(self, client):
+        """启动 Redis 订阅线程（每个进程一个）"""
+        if self._subscriber is not None and self._subscriber.is_alive():
+            return
+
+        def listen():
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._redis_key(self.CHANNEL))
+                for message in pubsub.listen():
+                    try:
+                        self._apply_generation(int(message['data']))
+                    except (TypeError, ValueError):
+                        continue
+            except Exception as e:
+                # 订阅断开时依靠轮询兜底，下次检查时重新订阅
+                print(f"权限缓存订阅中断: {e}")
+
+        self._subscriber = threading.Thread(target=listen, name='rbac-cache-subscriber', daemon=True)
+        self._subscriber.start()
+
+    def current_generation(self) -> int:
+        """获取当前代数（按间隔与共享存储同步，其余时间为内存读取）"""
+        now = time.time()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            client = self._redis()
+            if client is not None:
+                self._ensure_subscriber(client)
+            self._apply_generation(self._read_shared_generation())
+        return self._generation
+
+    def bump(self) -> int:
+        """代数加一并广播给所有进程"""
+        generation = None
+        client = self._redis()
+        if client is not None:
+            try:
+                generation = client.incr(self._redis_key(self.GENERATION_KEY))
+                client.publish(self._redis_key(self.CHANNEL), generation)
+            except Exception as e:
+                print(f"权限缓存失效广播失败: {e}")
+                generation = None
+
+        if generation is None:
+            # 使用纳秒时间戳，避免多个进程同时加一时写入相同代数
+            generation = max(time.time_ns(), self._read_stamp() + 1)
+        self._write_stamp(generation)
+        self._apply_generation(generation)
+        return generation
+
+    # ---------- 缓存读写 ----------
+
+    def _shared_key(self, generation: int, user_id: int) -> str:
+        return f"rbac:perms:{generation}:{user_id}"
+
+    def get(self, user_id: int) -> Optional[PermissionSet]:
+        generation = self.current_generation()
+        entry = self._local.get(user_id)
+        if entry is not None and entry.generation == generation \
+                and time.time() - entry.created_at < self.ttl:
+            return entry
+
+        if cache_get is not None and self._redis() is not None:
+            data = cache_get(self._shared_key(generation, user_id))
+            if data:
+                entry = PermissionSet.from_dict(data, generation)
+                with self._lock:
+                    if generation == self._generation:
+                        self._local[user_id] = entry
+                return entry
+        return None
+
+    def put(self, user_id: int, codes: Iterable[str], role_codes: List[str],
+            generation: int) -> PermissionSet:
+        """
+        写入编译结果
+
+        generation 必须是开始编译前读取的代数：编译期间若发生变更，
+        结果会以旧代数保存，不会被新代数的读取使用。
+        """
+        entry = PermissionSet(codes, role_codes, generation)
+        with self._lock:
+            if generation == self._generation:
+                self._local[user_id] = entry
+        if cache_set is not None and self._redis() is not None:
+            cache_set(self._shared_key(generation, user_id), entry.to_dict(), self.ttl)
+        return entry
+
+    def invalidate(self, user_id: Optional[int] = None) -> int:
+        """
+        使缓存失效并广播
+
+        单个用户的角色变更也会推进全局代数：变更很少发生，
+        而共享缓存按代数复用，其他用户只需从共享缓存重新加载一次。
+        """
+        with self._lock:
+            if user_id is not None:
+                self._local.pop(user_id, None)
+        return self.bump()
+
+    def stats(self) -> Dict:
+        return {
+            'generation': self._generation,
+            'local_entries': len(self._local),
+            'backend': 'redis' if self._redis() is not None else 'file',
+        }
@@ -2,11 +2,10 @@
 RBAC Service - Role-Based Access Control Service
 Provides permission checking and role management functions
 """
-from typing import List, Dict, Any, Optional, Set, Tuple
+from typing import List, Dict, Any, Optional, FrozenSet
 from functools import wraps
 from flask import request, jsonify, g
 import json
-import time
 
 from .models import User, AuthSessionLocal
 from .rbac_models import (
@@ -14,6 +13,7 @@ from .rbac_models import (
     role_permissions, user_roles, role_menus
 )
 from .jwt_utils import verify_token
+from .permission_cache import PermissionCache, PermissionSet
 
 
 class RBACService:
@@ -22,24 +22,16 @@ class RBACService:
     # P2-23: 缓存 TTL 配置（秒）
     CACHE_TTL_SECONDS = 300  # 5 分钟
 
-    # Cache for permission lookups with timestamp: {user_id: (permissions, timestamp)}
-    _permission_cache: Dict[int, Tuple[Set[str], float]] = {}
-    _role_cache: Dict[int, Tuple[List[str], float]] = {}
-
-    @staticmethod
-    def _is_cache_valid(timestamp: float) -> bool:
-        """检查缓存是否在 TTL 内有效"""
-        return (time.time() - timestamp) < RBACService.CACHE_TTL_SECONDS
+    # Cross-process permission cache, invalidated by generation broadcast
+    _cache = PermissionCache(ttl=CACHE_TTL_SECONDS)
 
     @staticmethod
     def clear_cache(user_id: Optional[int] = None):
-        """Clear permission cache for a user or all users"""
-        if user_id:
-            RBACService._permission_cache.pop(user_id, None)
-            RBACService._role_cache.pop(user_id, None)
-        else:
-            RBACService._permission_cache.clear()
-            RBACService._role_cache.clear()
+        """
+        Clear permission cache for a user or all users.
+        The invalidation is broadcast to every worker process.
+        """
+        RBACService._cache.invalidate(user_id)
 
     @staticmethod
     def get_user_roles(user_id: int) -> List[Role]:
@@ -66,102 +58,82 @@ class RBACService:
             session.close()
 
     @staticmethod
-    def get_user_role_codes(user_id: int) -> List[str]:
-        """Get role codes for a user (cached with TTL)"""
-        # P2-23: 检查缓存是否存在且未过期
-        if user_id in RBACService._role_cache:
-            cached_roles, timestamp = RBACService._role_cache[user_id]
-            if RBACService._is_cache_valid(timestamp):
-                return cached_roles
-            # 缓存过期，删除
-            del RBACService._role_cache[user_id]
-
-        roles = RBACService.get_user_roles(user_id)
-        role_codes = [r.code for r in roles]
-
-        # P2-23: 缓存时记录时间戳
-        RBACService._role_cache[user_id] = (role_codes, time.time())
-        return role_codes
-
-    @staticmethod
-    def get_user_permissions(user_id: int) -> Set[str]:
+    def _compile_permission_set(user_id: int) -> PermissionSet:
         """
-        Get all permission codes for a user (cached with TTL)
+        Get the compiled permission set for a user (cached across processes)
         Aggregates permissions from all user's roles
         """
-        # P2-23: 检查缓存是否存在且未过期
-        if user_id in RBACService._permission_cache:
-            cached_perms, timestamp = RBACService._permission_cache[user_id]
-            if RBACService._is_cache_valid(timestamp):
-                return cached_perms
-            # 缓存过期，删除
-            del RBACService._permission_cache[user_id]
+        cached = RBACService._cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        # Read generation before querying so concurrent changes are not masked
+        generation = RBACService._cache.current_generation()
 
         session = AuthSessionLocal()
         try:
-            permissions = set()
-
-            # Get all roles for user
             roles = RBACService.get_user_roles(user_id)
+            role_ids = [r.id for r in roles]
+            role_codes = [r.code for r in roles]
+            permissions = set()
 
-            # Get permissions for each role
-            for role in roles:
-                for perm in role.permissions:
-                    if perm.is_active:
-                        permissions.add(perm.code)
+            if role_ids:
+                from sqlalchemy import select
+                stmt = select(Permission.code).join(role_permissions).where(
+                    role_permissions.c.role_id.in_(role_ids),
+                    Permission.is_active == True
+                )
+                permissions.update(session.execute(stmt).scalars().all())
 
             # Super admin has all permissions
-            role_codes = [r.code for r in roles]
             if 'super_admin' in role_codes:
                 # 安全修复：Super Admin 使用特殊标记，在权限检查时直接放行
                 # 而不是依赖权限表中的记录（权限表为空时会导致权限失效）
                 permissions.add('*')  # 特殊通配符权限，表示拥有所有权限
                 # 同时加载所有已定义的权限（向后兼容）
-                all_perms = session.query(Permission).filter_by(is_active=True).all()
-                for perm in all_perms:
-                    permissions.add(perm.code)
+                all_codes = session.query(Permission.code).filter_by(is_active=True).all()
+                permissions.update(code for (code,) in all_codes)
 
-            # P2-23: 缓存时记录时间戳
-            RBACService._permission_cache[user_id] = (permissions, time.time())
-            return permissions
+            return RBACService._cache.put(user_id, permissions, role_codes, generation)
         finally:
             session.close()
 
+    @staticmethod
+    def get_user_role_codes(user_id: int) -> List[str]:
+        """Get role codes for a user (cached)"""
+        return list(RBACService._compile_permission_set(user_id).role_codes)
+
+    @staticmethod
+    def get_user_permissions(user_id: int) -> FrozenSet[str]:
+        """
+        Get all permission codes for a user (cached)
+        Aggregates permissions from all user's roles
+        """
+        return RBACService._compile_permission_set(user_id).codes
+
     @staticmethod
     def has_permission(user_id: int, permission_code: str) -> bool:
         """Check if user has a specific permission"""
-        permissions = RBACService.get_user_permissions(user_id)
         # 安全修复：检查通配符权限（Super Admin）
-        if '*' in permissions:
-            return True
-        return permission_code in permissions
+        return RBACService._compile_permission_set(user_id).has(permission_code)
 
     @staticmethod
     def has_any_permission(user_id: int, permission_codes: List[str]) -> bool:
         """Check if user has any of the given permissions"""
-        permissions = RBACService.get_user_permissions(user_id)
         # 安全修复：检查通配符权限（Super Admin）
-        if '*' in permissions:
-            return True
-        return any(code in permissions for code in permission_codes)
+        return RBACService._compile_permission_set(user_id).has_any(permission_codes)
 
     @staticmethod
     def has_all_permissions(user_id: int, permission_codes: List[str]) -> bool:
         """Check if user has all of the given permissions"""
-        permissions = RBACService.get_user_permissions(user_id)
         # 安全修复：检查通配符权限（Super Admin）
-        if '*' in permissions:
-            return True
-        return all(code in permissions for code in permission_codes)
+        return RBACService._compile_permission_set(user_id).has_all(permission_codes)
 
     @staticmethod
     def has_module_access(user_id: int, module: str) -> bool:
         """Check if user has any permission for a module"""
-        permissions = RBACService.get_user_permissions(user_id)
         # 安全修复：检查通配符权限（Super Admin）
-        if '*' in permissions:
-            return True
-        return any(perm.startswith(f"{module}:") for perm in permissions)
+        return RBACService._compile_permission_set(user_id).has_module(module)
 
     @staticmethod
     def get_user_menus(user_id: int, module: Optional[str] = None) -> List[Dict]:
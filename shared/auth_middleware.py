@@ -369,15 +369,17 @@ def validate_pagination_params(page=1, per_page=20, max_per_page=1000):
     return page, per_page, None
 
 
-def paginated_response(items, total, page=1, per_page=20):
+def paginated_response(items, total, page=1, per_page=20, cursor_page=None):
     """
     统一分页响应格式
 
     Args:
         items: 数据列表
-        total: 总数
+        total: 总数（游标分页未统计总数时为 None）
         page: 当前页
         per_page: 每页数量
+        cursor_page: 游标分页结果（shared.pagination.CursorPage），
+            传入时附加 next_cursor / prev_cursor / has_next / has_prev
 
     Returns:
         dict: 包含分页信息的响应
@@ -386,13 +388,17 @@ def paginated_response(items, total, page=1, per_page=20):
     page = max(1, int(page) if page else 1)
     per_page = max(1, min(1000, int(per_page) if per_page else 20))
 
+    pagination = {
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page if total is not None else None
+    }
+    if cursor_page is not None:
+        pagination.update(cursor_page.pagination_meta())
+
     return {
         'success': True,
         'data': items,
-        'pagination': {
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'pages': (total + per_page - 1) // per_page if per_page > 0 else 0
-        }
+        'pagination': pagination
     }
@@ -2,12 +2,28 @@
 """
 统一Redis缓存配置模块
 提供缓存连接和常用缓存操作
+
+两级缓存:
+- L1: 进程内有界LRU缓存（短TTL，减少对Redis的网络往返）
+- L2: Redis共享缓存
+
+cached 装饰器和 CacheManager.get_or_set 带击穿保护:
+- 进程内单飞（同一个键只有一个线程重算）
+- 跨进程Redis锁（SET NX PX）
+- 概率提前过期（XFetch），热点键在过期前由单个请求提前刷新
 """
 import os
 import json
+import math
+import time
+import uuid
+import random
+import fnmatch
+import threading
+from collections import OrderedDict
 from datetime import timedelta
 from functools import wraps
-from typing import Any, Optional, Callable
+from typing import Any, Optional, Callable, Iterable, Tuple
 
 # 尝试导入Redis
 try:
@@ -25,6 +41,15 @@ class CacheConfig:
         self.redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
         self.default_ttl = int(os.getenv('CACHE_DEFAULT_TTL', 3600))  # 默认1小时
         self.prefix = os.getenv('CACHE_PREFIX', 'app')
+        # L1进程内缓存（CACHE_L1_MAX_SIZE=0 表示禁用）
+        self.l1_max_size = int(os.getenv('CACHE_L1_MAX_SIZE', 1000))
+        self.l1_ttl = float(os.getenv('CACHE_L1_TTL', 10))
+        # 击穿保护
+        self.lock_timeout = float(os.getenv('CACHE_LOCK_TIMEOUT', 10))  # 重算锁最长持有时间（秒）
+        self.lock_wait = float(os.getenv('CACHE_LOCK_WAIT', 5))  # 等待其他进程重算的最长时间（秒）
+        self.early_expiry_beta = float(os.getenv('CACHE_EARLY_EXPIRY_BETA', 1.0))
+        self.scan_count = int(os.getenv('CACHE_SCAN_COUNT', 500))
+        self.tag_ttl = int(os.getenv('CACHE_TAG_TTL', 7 * 24 * 3600))
         self._client = None
 
     @property
@@ -54,69 +79,374 @@ class CacheConfig:
         return self.client is not None
 
 
+class LocalLRUCache:
+    """
+    进程内有界LRU缓存（L1）
+
+    条目保存序列化后的字符串，命中时反序列化，保证返回值与从Redis读取时一致，
+    且调用方修改返回对象不会污染缓存。
+    本地过期时间不超过 ttl，用于限制跨进程的陈旧窗口。
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 10):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """获取 (序列化值, 逻辑过期时间)，不存在或已过期返回None"""
+        if self.max_size <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            raw, expires_at, local_expires_at = item
+            if local_expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return raw, expires_at
+
+    def set(self, key: str, raw: str, expires_at: float):
+        """写入条目，超出容量时淘汰最久未使用的条目"""
+        now = time.time()
+        if self.max_size <= 0 or expires_at <= now:
+            return
+        local_expires_at = min(expires_at, now + self.ttl)
+        with self._lock:
+            self._data[key] = (raw, expires_at, local_expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    removed += 1
+        return removed
+
+    def delete_pattern(self, pattern: str) -> int:
+        """按通配符删除条目"""
+        with self._lock:
+            keys = [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        return {
+            'size': size,
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class _SingleFlight:
+    """进程内单飞：同一个键同一时刻只允许一个线程重算"""
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._locks = {}
+
+    def acquire(self, key: str, blocking: bool = True) -> bool:
+        with self._mutex:
+            item = self._locks.get(key)
+            if item is None:
+                item = self._locks[key] = [threading.Lock(), 0]
+            item[1] += 1
+        acquired = item[0].acquire(blocking)
+        if not acquired:
+            self._unref(key)
+        return acquired
+
+    def release(self, key: str):
+        with self._mutex:
+            item = self._locks[key]
+        item[0].release()
+        self._unref(key)
+
+    def _unref(self, key: str):
+        with self._mutex:
+            item = self._locks[key]
+            item[1] -= 1
+            if item[1] == 0:
+                del self._locks[key]
+
+
 # 全局缓存配置实例
 cache_config = CacheConfig()
 
+# 全局L1缓存实例
+local_cache = LocalLRUCache(cache_config.l1_max_size, cache_config.l1_ttl)
+
+_single_flight = _SingleFlight()
+
+# 释放跨进程锁时校验持有者，避免误删其他进程的锁
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Redis中带元数据的缓存值标记（用于概率提前过期）
+_ENVELOPE_MARKER = '__xf__'
+
+# 标签集合键前缀
+_TAG_PREFIX = '__tag__'
+
 
 def get_cache_key(key: str) -> str:
     """生成带前缀的缓存键"""
     return f"{cache_config.prefix}:{key}"
 
 
-def cache_get(key: str) -> Optional[Any]:
-    """
-    从缓存获取值
+def _get_tag_key(tag: str) -> str:
+    """生成标签集合键"""
+    return get_cache_key(f"{_TAG_PREFIX}:{tag}")
 
-    Args:
-        key: 缓存键
 
-    Returns:
-        缓存的值，如果不存在则返回None
+def _encode_value(value: Any, delta: float = None, expires_at: float = None) -> str:
+    """序列化缓存值；带重算耗时时包装为信封格式"""
+    if delta is None:
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return json.dumps(
+        {_ENVELOPE_MARKER: 1, 'v': value, 'd': delta, 'e': expires_at},
+        ensure_ascii=False,
+        default=str
+    )
+
+
+def _decode_value(raw: str) -> Tuple[Any, float, Optional[float]]:
+    """反序列化缓存值，返回 (值, 计算耗时, 逻辑过期时间)"""
+    data = json.loads(raw)
+    if isinstance(data, dict) and data.get(_ENVELOPE_MARKER) == 1:
+        return data.get('v'), float(data.get('d') or 0), data.get('e')
+    return data, 0.0, None
+
+
+def _cache_get_entry(full_key: str) -> Optional[Tuple[Any, float, float]]:
+    """
+    两级读取，返回 (值, 计算耗时, 逻辑过期时间)
+
+    先查L1，未命中再查Redis并回填L1。
     """
+    local = local_cache.get(full_key)
+    if local is not None:
+        raw, expires_at = local
+        value, delta, _ = _decode_value(raw)
+        return value, delta, expires_at
+
     if not cache_config.is_available():
         return None
 
     try:
-        full_key = get_cache_key(key)
-        value = cache_config.client.get(full_key)
-        if value:
-            return json.loads(value)
-        return None
+        pipe = cache_config.client.pipeline(transaction=False)
+        pipe.get(full_key)
+        pipe.pttl(full_key)
+        raw, pttl = pipe.execute()
+        if not raw:
+            return None
+        value, delta, expires_at = _decode_value(raw)
+        if value is None:
+            return None
+        if expires_at is None:
+            expires_at = time.time() + (pttl / 1000.0 if pttl and pttl > 0 else cache_config.l1_ttl)
+        local_cache.set(full_key, raw, expires_at)
+        return value, delta, expires_at
     except Exception as e:
         print(f"缓存读取错误: {e}")
         return None
 
 
-def cache_set(key: str, value: Any, ttl: int = None) -> bool:
-    """
-    设置缓存值
+def _cache_set_full(full_key: str, value: Any, ttl: int = None, delta: float = None,
+                    tags: Iterable[str] = None) -> bool:
+    """写入两级缓存（full_key 已带前缀）"""
+    if ttl is None:
+        ttl = cache_config.default_ttl
+    expires_at = time.time() + ttl
+    raw = _encode_value(value, delta, expires_at)
+    local_cache.set(full_key, raw, expires_at)
 
-    Args:
-        key: 缓存键
-        value: 要缓存的值（会自动JSON序列化）
-        ttl: 过期时间（秒），默认使用全局配置
-
-    Returns:
-        是否成功
-    """
     if not cache_config.is_available():
         return False
 
     try:
-        full_key = get_cache_key(key)
-        if ttl is None:
-            ttl = cache_config.default_ttl
-        cache_config.client.setex(
-            full_key,
-            ttl,
-            json.dumps(value, ensure_ascii=False, default=str)
-        )
+        pipe = cache_config.client.pipeline(transaction=False)
+        pipe.set(full_key, raw, ex=ttl)
+        for tag in tags or ():
+            tag_key = _get_tag_key(tag)
+            pipe.sadd(tag_key, full_key)
+            # 标签集合的过期时间不短于成员，残留的失效成员删除时无副作用
+            pipe.expire(tag_key, max(ttl, cache_config.tag_ttl))
+        pipe.execute()
         return True
     except Exception as e:
         print(f"缓存写入错误: {e}")
         return False
 
 
+def _should_refresh_early(delta: float, expires_at: float) -> bool:
+    """
+    概率提前过期（XFetch）
+
+    重算耗时越长、越接近过期，提前刷新的概率越大；
+    大量并发读取中通常只有一个请求会提前触发重算。
+    """
+    beta = cache_config.early_expiry_beta
+    if not delta or beta <= 0:
+        return False
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _acquire_remote_lock(full_key: str) -> Optional[str]:
+    """
+    获取跨进程重算锁
+
+    Returns:
+        锁令牌；Redis不可用时返回空字符串（视为获得锁）；锁被占用时返回None
+    """
+    if not cache_config.is_available():
+        return ''
+    token = uuid.uuid4().hex
+    try:
+        acquired = cache_config.client.set(
+            f"{full_key}:__lock__", token, nx=True, px=int(cache_config.lock_timeout * 1000)
+        )
+        return token if acquired else None
+    except Exception as e:
+        print(f"缓存锁获取错误: {e}")
+        return ''
+
+
+def _release_remote_lock(full_key: str, token: Optional[str]):
+    """释放跨进程重算锁"""
+    if not token or not cache_config.is_available():
+        return
+    lock_key = f"{full_key}:__lock__"
+    client = cache_config.client
+    try:
+        client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+    except Exception:
+        # 不支持Lua脚本时退化为先比较后删除
+        try:
+            if client.get(lock_key) == token:
+                client.delete(lock_key)
+        except Exception as e:
+            print(f"缓存锁释放错误: {e}")
+
+
+def _wait_for_value(full_key: str) -> Optional[Tuple[Any, float, float]]:
+    """等待其他进程完成重算，超时返回None"""
+    deadline = time.time() + cache_config.lock_wait
+    interval = 0.02
+    while time.time() < deadline:
+        time.sleep(interval)
+        entry = _cache_get_entry(full_key)
+        if entry is not None:
+            return entry
+        interval = min(interval * 2, 0.2)
+    return None
+
+
+def _get_or_compute(full_key: str, func: Callable, ttl: int = None,
+                    tags: Iterable[str] = None) -> Any:
+    """
+    带击穿保护的读取或计算（full_key 已带前缀）
+
+    - 命中且未触发提前刷新: 直接返回
+    - 提前刷新: 只有拿到锁的请求重算，其他请求继续返回当前值
+    - 未命中: 进程内单飞 + 跨进程锁，其他请求等待结果
+    """
+    entry = _cache_get_entry(full_key)
+    if entry is not None and not _should_refresh_early(entry[1], entry[2]):
+        return entry[0]
+
+    if entry is not None:
+        # 已有线程在刷新，直接返回当前值
+        if not _single_flight.acquire(full_key, blocking=False):
+            return entry[0]
+    else:
+        _single_flight.acquire(full_key)
+
+    try:
+        if entry is None:
+            # 等锁期间可能已有线程完成计算
+            entry = _cache_get_entry(full_key)
+            if entry is not None:
+                return entry[0]
+
+        token = _acquire_remote_lock(full_key)
+        if token is None:
+            # 其他进程正在重算
+            if entry is not None:
+                return entry[0]
+            entry = _wait_for_value(full_key)
+            if entry is not None:
+                return entry[0]
+            # 等待超时，降级为自行计算
+
+        try:
+            start = time.time()
+            value = func()
+            delta = time.time() - start
+            if value is not None:
+                _cache_set_full(full_key, value, ttl, delta=delta, tags=tags)
+            return value
+        finally:
+            _release_remote_lock(full_key, token)
+    finally:
+        _single_flight.release(full_key)
+
+
+def cache_get(key: str) -> Optional[Any]:
+    """
+    从缓存获取值（先L1，后Redis）
+
+    Args:
+        key: 缓存键
+
+    Returns:
+        缓存的值，如果不存在则返回None
+    """
+    entry = _cache_get_entry(get_cache_key(key))
+    return entry[0] if entry is not None else None
+
+
+def cache_set(key: str, value: Any, ttl: int = None, tags: Iterable[str] = None) -> bool:
+    """
+    设置缓存值（同时写入L1和Redis）
+
+    Args:
+        key: 缓存键
+        value: 要缓存的值（会自动JSON序列化）
+        ttl: 过期时间（秒），默认使用全局配置
+        tags: 标签列表，可通过 cache_invalidate_tags 批量失效
+
+    Returns:
+        是否成功写入Redis
+    """
+    return _cache_set_full(get_cache_key(key), value, ttl, tags=tags)
+
+
 def cache_delete(key: str) -> bool:
     """
     删除缓存
@@ -127,11 +457,13 @@ def cache_delete(key: str) -> bool:
     Returns:
         是否成功
     """
+    full_key = get_cache_key(key)
+    local_cache.delete(full_key)
+
     if not cache_config.is_available():
         return False
 
     try:
-        full_key = get_cache_key(key)
         cache_config.client.delete(full_key)
         return True
     except Exception as e:
@@ -139,30 +471,81 @@ def cache_delete(key: str) -> bool:
         return False
 
 
+def _delete_keys_in_batches(keys: Iterable[str], batch_size: int) -> int:
+    """分批删除Redis键，返回删除数量"""
+    client = cache_config.client
+    deleted = 0
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) >= batch_size:
+            deleted += client.delete(*batch)
+            batch = []
+    if batch:
+        deleted += client.delete(*batch)
+    return deleted
+
+
 def cache_delete_pattern(pattern: str) -> int:
     """
     按模式删除缓存
 
+    使用增量 SCAN 遍历（不使用阻塞的 KEYS 命令），分批删除。
+
     Args:
         pattern: 模式（支持通配符 *）
 
     Returns:
         删除的键数量
     """
+    full_pattern = get_cache_key(pattern)
+    local_cache.delete_pattern(full_pattern)
+
     if not cache_config.is_available():
         return 0
 
     try:
-        full_pattern = get_cache_key(pattern)
-        keys = cache_config.client.keys(full_pattern)
-        if keys:
-            return cache_config.client.delete(*keys)
-        return 0
+        keys = cache_config.client.scan_iter(match=full_pattern, count=cache_config.scan_count)
+        return _delete_keys_in_batches(keys, cache_config.scan_count)
     except Exception as e:
         print(f"缓存批量删除错误: {e}")
         return 0
 
 
+def cache_invalidate_tags(*tags: str) -> int:
+    """
+    按标签批量失效缓存
+
+    Args:
+        tags: 标签列表
+
+    Returns:
+        删除的键数量
+    """
+    if not tags:
+        return 0
+
+    tag_keys = [_get_tag_key(tag) for tag in tags]
+
+    if not cache_config.is_available():
+        # 无法获知标签成员，只能清空本进程L1
+        local_cache.clear()
+        return 0
+
+    try:
+        client = cache_config.client
+        deleted = 0
+        for tag_key in tag_keys:
+            members = list(client.sscan_iter(tag_key, count=cache_config.scan_count))
+            local_cache.delete(*members)
+            deleted += _delete_keys_in_batches(members, cache_config.scan_count)
+        client.delete(*tag_keys)
+        return deleted
+    except Exception as e:
+        print(f"缓存标签失效错误: {e}")
+        return 0
+
+
 def cache_exists(key: str) -> bool:
     """检查缓存键是否存在"""
     if not cache_config.is_available():
@@ -191,6 +574,7 @@ def cache_increment(key: str, amount: int = 1) -> Optional[int]:
 
     try:
         full_key = get_cache_key(key)
+        local_cache.delete(full_key)
         return cache_config.client.incrby(full_key, amount)
     except Exception as e:
         print(f"缓存计数器错误: {e}")
@@ -209,13 +593,17 @@ def cache_ttl(key: str) -> int:
         return -1
 
 
-def cached(ttl: int = None, key_func: Callable = None):
+def cached(ttl: int = None, key_func: Callable = None, tags: Iterable[str] = None):
     """
     函数结果缓存装饰器
 
+    带击穿保护：缓存未命中时同一个键只有一个调用者执行函数，
+    热点键在过期前按概率由单个调用者提前刷新。
+
     Args:
         ttl: 过期时间（秒）
         key_func: 自定义缓存键生成函数
+        tags: 标签列表，可通过 cache_invalidate_tags 批量失效
 
     Usage:
         @cached(ttl=3600)
@@ -228,42 +616,23 @@ def cached(ttl: int = None, key_func: Callable = None):
             pass
     """
     def decorator(f):
+        def make_key(*args, **kwargs):
+            if key_func:
+                return key_func(*args, **kwargs)
+            # 默认使用函数名和参数生成键
+            key_parts = [f.__name__]
+            key_parts.extend([str(arg) for arg in args])
+            key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
+            return ":".join(key_parts)
+
         @wraps(f)
         def wrapper(*args, **kwargs):
-            # 如果Redis不可用，直接执行函数
-            if not cache_config.is_available():
-                return f(*args, **kwargs)
-
-            # 生成缓存键
-            if key_func:
-                cache_key = key_func(*args, **kwargs)
-            else:
-                # 默认使用函数名和参数生成键
-                key_parts = [f.__name__]
-                key_parts.extend([str(arg) for arg in args])
-                key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
-                cache_key = ":".join(key_parts)
-
-            # 尝试从缓存获取
-            cached_value = cache_get(cache_key)
-            if cached_value is not None:
-                return cached_value
-
-            # 执行函数并缓存结果
-            result = f(*args, **kwargs)
-            cache_set(cache_key, result, ttl)
-            return result
+            full_key = get_cache_key(make_key(*args, **kwargs))
+            return _get_or_compute(full_key, lambda: f(*args, **kwargs), ttl, tags)
 
         # 添加缓存清除方法
         def clear_cache(*args, **kwargs):
-            if key_func:
-                cache_key = key_func(*args, **kwargs)
-            else:
-                key_parts = [f.__name__]
-                key_parts.extend([str(arg) for arg in args])
-                key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
-                cache_key = ":".join(key_parts)
-            cache_delete(cache_key)
+            cache_delete(make_key(*args, **kwargs))
 
         wrapper.clear_cache = clear_cache
         return wrapper
@@ -292,9 +661,9 @@ class CacheManager:
         """获取缓存"""
         return cache_get(self._make_key(key))
 
-    def set(self, key: str, value: Any, ttl: int = None) -> bool:
+    def set(self, key: str, value: Any, ttl: int = None, tags: Iterable[str] = None) -> bool:
         """设置缓存"""
-        return cache_set(self._make_key(key), value, ttl)
+        return cache_set(self._make_key(key), value, ttl, tags=tags)
 
     def delete(self, key: str) -> bool:
         """删除缓存"""
@@ -306,26 +675,28 @@ class CacheManager:
             return cache_delete_pattern(f"{self.namespace}:*")
         return 0
 
-    def get_or_set(self, key: str, func: Callable, ttl: int = None) -> Any:
+    def invalidate_tags(self, *tags: str) -> int:
+        """按标签批量失效缓存"""
+        return cache_invalidate_tags(*tags)
+
+    def get_or_set(self, key: str, func: Callable, ttl: int = None,
+                   tags: Iterable[str] = None) -> Any:
         """
         获取缓存，如果不存在则调用函数并缓存结果
 
+        带击穿保护（单飞 + 跨进程锁 + 概率提前过期），见 cached 装饰器。
+
         Args:
             key: 缓存键
             func: 生成值的函数
             ttl: 过期时间
+            tags: 标签列表
 
         Returns:
             缓存的值或新生成的值
         """
-        full_key = self._make_key(key)
-        cached_value = cache_get(full_key)
-        if cached_value is not None:
-            return cached_value
-
-        value = func()
-        cache_set(full_key, value, ttl)
-        return value
+        full_key = get_cache_key(self._make_key(key))
+        return _get_or_compute(full_key, func, ttl, tags)
 
 
 # 预定义的缓存管理器
@@ -369,4 +740,6 @@ def health_check() -> dict:
     else:
         result['error'] = 'Connection failed'
 
+    result['local_cache'] = local_cache.stats()
+
     return result
@@ -0,0 +1,748 @@
+# shared/file_metadata_store.py
+# -*- coding: utf-8 -*-
+"""
+文件元数据存储（EnterpriseFileStorage 的可插拔后端）
+
+后端:
+    - SQLMetadataStore      数据库表（默认 SQLite，可配置 MySQL），按文件一行存储
+    - SidecarMetadataStore  每个实体一个 _meta.json（旧方式，兼容保留）
+
+SQL 后端的特性:
+    - 每个文件一行，并发上传同一实体时只插入各自的行，不再争用同一个 _meta.json
+    - 实体、哈希、分类上有索引，可按哈希查重
+    - 存储统计使用计数器表增量维护，get_storage_stats 不再全量扫描（temp 短期文件读取时扫描 temp 目录）
+    - 读取未迁移的实体时自动导入其 _meta.json（懒迁移），
+      也可用 migrate_sidecars() / storage_utils.py migrate 一次性迁移
+
+配置:
+    FILE_METADATA_STORE=sql|json     选择后端（默认 sql）
+    FILE_METADATA_DB_URL=...         SQL 后端数据库（默认 {存储根目录}/_index/metadata.db）
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, BigInteger, String, Text, Boolean,
+    Index, UniqueConstraint, create_engine, event, select, insert, update,
+    delete, case, and_
+)
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# 实体键: (system, entity_type, entity_id, year, month)
+EntityKey = Tuple[str, str, str, int, int]
+
+# 统计状态（与 get_storage_stats 返回的 by_status 键一致）
+COUNTER_STATUSES = ("active", "archived", "temp", "quarantine")
+
+# 文件信息字段（与 FileInfo 一致）
+FILE_FIELDS = (
+    "id", "name", "stored_name", "path", "url", "category", "size", "mime_type",
+    "md5", "sha256", "version", "is_latest", "language", "translation_of_id",
+    "access_level", "tags", "description", "uploaded_by", "uploaded_at"
+)
+
+ACCESS_HISTORY_LIMIT = 100
+
+
+def empty_stats() -> Dict[str, Any]:
+    """空的存储统计结构"""
+    return {
+        "total_files": 0,
+        "total_size": 0,
+        "by_system": {},
+        "by_status": {status: {"files": 0, "size": 0} for status in COUNTER_STATUSES}
+    }
+
+
+class MetadataStore:
+    """元数据存储接口"""
+
+    supports_counters = False
+
+    def load_entity(self, key: EntityKey) -> Optional[Dict[str, Any]]:
+        """加载实体元数据（EntityMeta.to_dict() 格式），不存在返回 None"""
+        raise NotImplementedError
+
+    def save_entity(self, key: EntityKey, meta: Dict[str, Any]):
+        """整体写入实体元数据（迁移和兼容旧接口使用）"""
+        raise NotImplementedError
+
+    def add_file(self, key: EntityKey, file_info: Dict[str, Any], created_by: str = None):
+        """新增文件"""
+        raise NotImplementedError
+
+    def add_version(self, key: EntityKey, file_id: str, version: str, file_info: Dict[str, Any]):
+        """新增文件版本：旧版本标记为非最新，更新版本历史，并新增版本文件"""
+        raise NotImplementedError
+
+    def remove_file(self, key: EntityKey, file_id: str, moved_to: str = None) -> Optional[Dict]:
+        """
+        移除文件元数据
+
+        Args:
+            moved_to: 文件移动到的状态（如 quarantine），None 表示物理删除
+        """
+        raise NotImplementedError
+
+    def get_file(self, key: EntityKey, file_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def list_files(self, key: EntityKey, category: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def append_access(self, key: EntityKey, record: Dict[str, Any]):
+        """追加操作记录（每个实体保留最近 ACCESS_HISTORY_LIMIT 条）"""
+        raise NotImplementedError
+
+    def get_access_history(self, key: EntityKey) -> List[Dict[str, Any]]:
+        """获取操作记录（最新在前）"""
+        raise NotImplementedError
+
+    def find_files_by_hash(self, sha256: str = None, md5: str = None) -> List[Dict[str, Any]]:
+        """按哈希查找文件（不支持时返回空列表）"""
+        return []
+
+    def drop_entity(self, key: EntityKey):
+        """删除实体的全部元数据（归档后调用）"""
+        raise NotImplementedError
+
+    # ---------- 计数器 ----------
+
+    def adjust_counters(self, status: str, system: str = None, files: int = 0, size: int = 0):
+        """增量调整统计计数器（按系统的统计只针对 active）"""
+
+    def get_stats(self) -> Optional[Dict[str, Any]]:
+        """读取统计计数器；未初始化或不支持时返回 None"""
+        return None
+
+    def replace_counters(self, stats: Dict[str, Any]):
+        """用全量扫描结果重置计数器"""
+
+
+# ============== _meta.json 后端 ==============
+
+class SidecarMetadataStore(MetadataStore):
+    """每个实体目录下一个 _meta.json（旧方式）"""
+
+    def __init__(self, entity_path_resolver: Callable[[EntityKey], str]):
+        self._entity_path = entity_path_resolver
+        self._lock = threading.Lock()
+
+    def _meta_path(self, key: EntityKey) -> str:
+        return os.path.join(self._entity_path(key), "_meta.json")
+
+    def _new_meta(self, key: EntityKey) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        return {
+            "entity_id": key[2], "entity_type": key[1], "system": key[0],
+            "created_at": now, "updated_at": now, "created_by": None,
+            "total_files": 0, "total_size_bytes": 0,
+            "files": [], "version_history": {}, "access_history": []
+        }
+
+    def load_entity(self, key: EntityKey) -> Optional[Dict[str, Any]]:
+        meta_path = self._meta_path(key)
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load meta: {e}")
+        return None
+
+    def save_entity(self, key: EntityKey, meta: Dict[str, Any]):
+        entity_path = self._entity_path(key)
+        Path(entity_path).mkdir(parents=True, exist_ok=True)
+        meta["updated_at"] = datetime.now().isoformat()
+        with open(os.path.join(entity_path, "_meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def _modify(self, key: EntityKey, fn: Callable[[Dict], Any]):
+        """读-改-写（进程内加锁）"""
+        with self._lock:
+            meta = self.load_entity(key) or self._new_meta(key)
+            meta.setdefault("files", [])
+            result = fn(meta)
+            files = meta["files"]
+            meta["total_files"] = len(files)
+            meta["total_size_bytes"] = sum(f.get('size', 0) for f in files)
+            self.save_entity(key, meta)
+            return result
+
+    def add_file(self, key: EntityKey, file_info: Dict[str, Any], created_by: str = None):
+        self._modify(key, lambda meta: meta["files"].append(file_info))
+
+    def add_version(self, key: EntityKey, file_id: str, version: str, file_info: Dict[str, Any]):
+        def apply(meta):
+            history = meta.get("version_history") or {}
+            entry = history.setdefault(file_id, {"current": version, "versions": []})
+            entry["current"] = version
+            if version not in entry["versions"]:
+                entry["versions"].append(version)
+            meta["version_history"] = history
+            for f in meta["files"]:
+                if f.get('id') == file_id:
+                    f['is_latest'] = False
+            meta["files"].append(file_info)
+        self._modify(key, apply)
+
+    def remove_file(self, key: EntityKey, file_id: str, moved_to: str = None) -> Optional[Dict]:
+        def apply(meta):
+            removed = next((f for f in meta["files"] if f.get('id') == file_id), None)
+            meta["files"] = [f for f in meta["files"] if f.get('id') != file_id]
+            return removed
+        return self._modify(key, apply)
+
+    def get_file(self, key: EntityKey, file_id: str) -> Optional[Dict[str, Any]]:
+        meta = self.load_entity(key) or {}
+        return next((f for f in meta.get("files") or [] if f.get('id') == file_id), None)
+
+    def list_files(self, key: EntityKey, category: str = None) -> List[Dict[str, Any]]:
+        files = (self.load_entity(key) or {}).get("files") or []
+        if category:
+            files = [f for f in files if f.get('category') == category]
+        return files
+
+    def append_access(self, key: EntityKey, record: Dict[str, Any]):
+        def apply(meta):
+            history = meta.get("access_history") or []
+            history.insert(0, record)
+            meta["access_history"] = history[:ACCESS_HISTORY_LIMIT]
+        self._modify(key, apply)
+
+    def get_access_history(self, key: EntityKey) -> List[Dict[str, Any]]:
+        return (self.load_entity(key) or {}).get("access_history") or []
+
+    def drop_entity(self, key: EntityKey):
+        # 元数据随实体目录一起归档
+        pass
+
+
+# ============== SQL 后端 ==============
+
+_metadata = MetaData()
+
+file_entities = Table(
+    "file_entities", _metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("system", String(50), nullable=False),
+    Column("entity_type", String(50), nullable=False),
+    Column("entity_id", String(100), nullable=False),
+    Column("year", Integer, nullable=False),
+    Column("month", Integer, nullable=False),
+    Column("created_at", String(32)),
+    Column("updated_at", String(32)),
+    Column("created_by", String(100)),
+    Column("total_files", BigInteger, nullable=False, default=0),
+    Column("total_size_bytes", BigInteger, nullable=False, default=0),
+    Column("version_history", Text),
+    UniqueConstraint("system", "entity_type", "entity_id", "year", "month", name="uq_file_entity_key"),
+)
+
+file_metadata = Table(
+    "file_metadata", _metadata,
+    Column("pk", Integer, primary_key=True, autoincrement=True),
+    Column("entity_ref", Integer, nullable=False),
+    Column("file_id", String(64), nullable=False),
+    Column("name", String(255)),
+    Column("stored_name", String(255)),
+    Column("path", String(500)),
+    Column("url", String(1000)),
+    Column("category", String(50)),
+    Column("size", BigInteger, default=0),
+    Column("mime_type", String(100)),
+    Column("md5", String(32)),
+    Column("sha256", String(64)),
+    Column("version", String(20)),
+    Column("is_latest", Boolean, default=True),
+    Column("language", String(10)),
+    Column("translation_of_id", String(64)),
+    Column("access_level", String(20)),
+    Column("tags", Text),
+    Column("description", Text),
+    Column("uploaded_by", String(100)),
+    Column("uploaded_at", String(32)),
+    UniqueConstraint("entity_ref", "file_id", name="uq_file_metadata_entity_file"),
+    Index("idx_file_metadata_entity_category", "entity_ref", "category"),
+    Index("idx_file_metadata_sha256", "sha256"),
+    Index("idx_file_metadata_md5", "md5"),
+)
+
+file_access_history = Table(
+    "file_access_history", _metadata,
+    Column("pk", Integer, primary_key=True, autoincrement=True),
+    Column("entity_ref", Integer, nullable=False),
+    Column("file_id", String(64)),
+    Column("record", Text, nullable=False),
+    Index("idx_file_access_entity", "entity_ref", "pk"),
+)
+
+file_storage_counters = Table(
+    "file_storage_counters", _metadata,
+    Column("scope", String(20), primary_key=True),   # status | system | meta
+    Column("name", String(50), primary_key=True),
+    Column("files", BigInteger, nullable=False, default=0),
+    Column("size", BigInteger, nullable=False, default=0),
+)
+
+_engines: Dict[str, Any] = {}
+_engines_lock = threading.Lock()
+
+
+def _get_engine(db_url: str):
+    """按 URL 复用引擎（同一进程内多个 EnterpriseFileStorage 实例共享连接池）"""
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            if db_url.startswith("sqlite:///"):
+                Path(os.path.dirname(db_url[len("sqlite:///"):]) or ".").mkdir(parents=True, exist_ok=True)
+                engine = create_engine(db_url, connect_args={"timeout": 30})
+
+                @event.listens_for(engine, "connect")
+                def _sqlite_pragmas(dbapi_conn, _):
+                    cursor = dbapi_conn.cursor()
+                    cursor.execute("PRAGMA journal_mode=WAL")
+                    cursor.execute("PRAGMA synchronous=NORMAL")
+                    cursor.close()
+            else:
+                engine = create_engine(db_url, pool_pre_ping=True, pool_recycle=1200)
+            _metadata.create_all(engine)
+            _engines[db_url] = engine
+        return engine
+
+
+def _file_to_row(file_info: Dict[str, Any]) -> Dict[str, Any]:
+    row = {field: file_info.get(field) for field in FILE_FIELDS if field != "id"}
+    row["file_id"] = file_info.get("id")
+    row["tags"] = json.dumps(file_info.get("tags") or [], ensure_ascii=False)
+    row["size"] = file_info.get("size") or 0
+    row["is_latest"] = bool(file_info.get("is_latest", True))
+    return row
+
+
+def _row_to_file(row) -> Dict[str, Any]:
+    data = dict(row._mapping)
+    info = {field: data.get(field) for field in FILE_FIELDS if field != "id"}
+    info["id"] = data["file_id"]
+    try:
+        info["tags"] = json.loads(data.get("tags") or "[]")
+    except ValueError:
+        info["tags"] = []
+    info["is_latest"] = bool(data.get("is_latest"))
+    return {field: info.get(field) for field in FILE_FIELDS}
+
+
+class SQLMetadataStore(MetadataStore):
+    """数据库元数据存储（每个文件一行，计数器增量维护）"""
+
+    supports_counters = True
+
+    def __init__(self, db_url: str, entity_path_resolver: Callable[[EntityKey], str] = None):
+        """
+        Args:
+            db_url: SQLAlchemy 数据库 URL
+            entity_path_resolver: 实体目录解析函数，用于懒迁移旧的 _meta.json
+        """
+        self.db_url = db_url
+        self._engine = None
+        self._sidecars = SidecarMetadataStore(entity_path_resolver) if entity_path_resolver else None
+
+    @property
+    def engine(self):
+        """首次使用时创建引擎和表"""
+        if self._engine is None:
+            self._engine = _get_engine(self.db_url)
+        return self._engine
+
+    # ---------- 实体 ----------
+
+    @staticmethod
+    def _key_clause(key: EntityKey):
+        system, entity_type, entity_id, year, month = key
+        return and_(
+            file_entities.c.system == system,
+            file_entities.c.entity_type == entity_type,
+            file_entities.c.entity_id == str(entity_id),
+            file_entities.c.year == year,
+            file_entities.c.month == month,
+        )
+
+    def _find_entity(self, conn, key: EntityKey, for_update: bool = False):
+        stmt = select(file_entities).where(self._key_clause(key))
+        if for_update:
+            stmt = stmt.with_for_update()
+        return conn.execute(stmt).first()
+
+    def _ensure_entity(self, conn, key: EntityKey, created_by: str = None) -> int:
+        """获取实体行ID，不存在时创建（存在旧 _meta.json 时先导入）"""
+        row = self._find_entity(conn, key)
+        if row is not None:
+            return row.id
+
+        if self._sidecars is not None:
+            legacy = self._sidecars.load_entity(key)
+            if legacy is not None:
+                return self._import_entity(conn, key, legacy)
+
+        now = datetime.now().isoformat()
+        try:
+            with conn.begin_nested():
+                result = conn.execute(insert(file_entities).values(
+                    system=key[0], entity_type=key[1], entity_id=str(key[2]),
+                    year=key[3], month=key[4], created_at=now, updated_at=now,
+                    created_by=created_by, total_files=0, total_size_bytes=0,
+                    version_history="{}"
+                ))
+            return result.inserted_primary_key[0]
+        except IntegrityError:
+            # 并发创建同一实体
+            return self._find_entity(conn, key).id
+
+    def _import_entity(self, conn, key: EntityKey, meta: Dict[str, Any]) -> int:
+        """导入 _meta.json 内容（不影响计数器，计数器统计的是物理文件）"""
+        files = meta.get("files") or []
+        existing = self._find_entity(conn, key)
+        if existing is not None:
+            conn.execute(delete(file_metadata).where(file_metadata.c.entity_ref == existing.id))
+            conn.execute(delete(file_access_history).where(file_access_history.c.entity_ref == existing.id))
+            conn.execute(delete(file_entities).where(file_entities.c.id == existing.id))
+
+        entity_ref = conn.execute(insert(file_entities).values(
+            system=key[0], entity_type=key[1], entity_id=str(key[2]),
+            year=key[3], month=key[4],
+            created_at=meta.get("created_at"), updated_at=meta.get("updated_at"),
+            created_by=meta.get("created_by"),
+            total_files=len(files),
+            total_size_bytes=sum(f.get("size", 0) or 0 for f in files),
+            version_history=json.dumps(meta.get("version_history") or {}, ensure_ascii=False)
+        )).inserted_primary_key[0]
+
+        if files:
+            conn.execute(insert(file_metadata), [
+                {**_file_to_row(f), "entity_ref": entity_ref} for f in files
+            ])
+        history = (meta.get("access_history") or [])[:ACCESS_HISTORY_LIMIT]
+        if history:
+            # 旧格式最新在前，按时间正序插入
+            conn.execute(insert(file_access_history), [
+                {"entity_ref": entity_ref, "file_id": r.get("file_id"),
+                 "record": json.dumps(r, ensure_ascii=False, default=str)}
+                for r in reversed(history)
+            ])
+        return entity_ref
+
+    def load_entity(self, key: EntityKey) -> Optional[Dict[str, Any]]:
+        with self.engine.begin() as conn:
+            row = self._find_entity(conn, key)
+            if row is None:
+                if self._sidecars is None or self._sidecars.load_entity(key) is None:
+                    return None
+                self._ensure_entity(conn, key)
+                row = self._find_entity(conn, key)
+
+            files = [_row_to_file(r) for r in conn.execute(
+                select(file_metadata).where(file_metadata.c.entity_ref == row.id)
+                .order_by(file_metadata.c.pk)
+            )]
+            return {
+                "entity_id": row.entity_id,
+                "entity_type": row.entity_type,
+                "system": row.system,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at,
+                "created_by": row.created_by,
+                "total_files": row.total_files,
+                "total_size_bytes": row.total_size_bytes,
+                "files": files,
+                "version_history": json.loads(row.version_history or "{}"),
+                "access_history": self._access_history(conn, row.id),
+            }
+
+    def save_entity(self, key: EntityKey, meta: Dict[str, Any]):
+        with self.engine.begin() as conn:
+            self._import_entity(conn, key, meta)
+
+    def _touch_entity(self, conn, entity_ref: int, files: int = 0, size: int = 0, **values):
+        """行级增量更新实体汇总"""
+        conn.execute(update(file_entities).where(file_entities.c.id == entity_ref).values(
+            total_files=file_entities.c.total_files + files,
+            total_size_bytes=file_entities.c.total_size_bytes + size,
+            updated_at=datetime.now().isoformat(),
+            **values
+        ))
+
+    # ---------- 文件 ----------
+
+    def add_file(self, key: EntityKey, file_info: Dict[str, Any], created_by: str = None):
+        size = file_info.get("size") or 0
+        with self.engine.begin() as conn:
+            entity_ref = self._ensure_entity(conn, key, created_by)
+            conn.execute(insert(file_metadata).values(**_file_to_row(file_info), entity_ref=entity_ref))
+            self._touch_entity(conn, entity_ref, 1, size)
+            self._adjust(conn, "active", key[0], 1, size)
+
+    def add_version(self, key: EntityKey, file_id: str, version: str, file_info: Dict[str, Any]):
+        size = file_info.get("size") or 0
+        with self.engine.begin() as conn:
+            entity_ref = self._ensure_entity(conn, key)
+            row = conn.execute(
+                select(file_entities.c.version_history)
+                .where(file_entities.c.id == entity_ref).with_for_update()
+            ).first()
+            history = json.loads(row.version_history or "{}")
+            entry = history.setdefault(file_id, {"current": version, "versions": []})
+            entry["current"] = version
+            if version not in entry["versions"]:
+                entry["versions"].append(version)
+
+            conn.execute(update(file_metadata).where(and_(
+                file_metadata.c.entity_ref == entity_ref,
+                file_metadata.c.file_id == file_id
+            )).values(is_latest=False))
+            conn.execute(insert(file_metadata).values(**_file_to_row(file_info), entity_ref=entity_ref))
+            self._touch_entity(conn, entity_ref, 1, size,
+                               version_history=json.dumps(history, ensure_ascii=False))
+            self._adjust(conn, "active", key[0], 1, size)
+
+    def remove_file(self, key: EntityKey, file_id: str, moved_to: str = None) -> Optional[Dict]:
+        with self.engine.begin() as conn:
+            entity = self._find_entity(conn, key)
+            if entity is None:
+                return None
+            row = conn.execute(select(file_metadata).where(and_(
+                file_metadata.c.entity_ref == entity.id,
+                file_metadata.c.file_id == file_id
+            ))).first()
+            if row is None:
+                return None
+
+            conn.execute(delete(file_metadata).where(file_metadata.c.pk == row.pk))
+            size = row.size or 0
+            self._touch_entity(conn, entity.id, -1, -size)
+            self._adjust(conn, "active", key[0], -1, -size)
+            if moved_to:
+                self._adjust(conn, moved_to, None, 1, size)
+            return _row_to_file(row)
+
+    def get_file(self, key: EntityKey, file_id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            entity = self._find_entity(conn, key)
+            if entity is None:
+                meta = self.load_entity(key)  # 懒迁移
+                return next((f for f in (meta or {}).get("files", []) if f.get("id") == file_id), None)
+            row = conn.execute(select(file_metadata).where(and_(
+                file_metadata.c.entity_ref == entity.id,
+                file_metadata.c.file_id == file_id
+            ))).first()
+            return _row_to_file(row) if row is not None else None
+
+    def list_files(self, key: EntityKey, category: str = None) -> List[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            entity = self._find_entity(conn, key)
+            if entity is None:
+                files = (self.load_entity(key) or {}).get("files") or []  # 懒迁移
+                return [f for f in files if not category or f.get("category") == category]
+            stmt = select(file_metadata).where(file_metadata.c.entity_ref == entity.id)
+            if category:
+                stmt = stmt.where(file_metadata.c.category == category)
+            return [_row_to_file(r) for r in conn.execute(stmt.order_by(file_metadata.c.pk))]
+
+    def find_files_by_hash(self, sha256: str = None, md5: str = None) -> List[Dict[str, Any]]:
+        if not sha256 and not md5:
+            return []
+        column, value = (file_metadata.c.sha256, sha256) if sha256 else (file_metadata.c.md5, md5)
+        stmt = select(file_metadata, file_entities.c.system, file_entities.c.entity_type,
+                      file_entities.c.entity_id, file_entities.c.year, file_entities.c.month) \
+            .join(file_entities, file_entities.c.id == file_metadata.c.entity_ref) \
+            .where(column == value).order_by(file_metadata.c.pk)
+        with self.engine.connect() as conn:
+            results = []
+            for row in conn.execute(stmt):
+                info = _row_to_file(row)
+                info["entity_key"] = (row.system, row.entity_type, row.entity_id, row.year, row.month)
+                results.append(info)
+            return results
+
+    # ---------- 操作记录 ----------
+
+    @staticmethod
+    def _access_history(conn, entity_ref: int) -> List[Dict[str, Any]]:
+        rows = conn.execute(
+            select(file_access_history.c.record)
+            .where(file_access_history.c.entity_ref == entity_ref)
+            .order_by(file_access_history.c.pk.desc())
+            .limit(ACCESS_HISTORY_LIMIT)
+        )
+        return [json.loads(r.record) for r in rows]
+
+    def append_access(self, key: EntityKey, record: Dict[str, Any]):
+        with self.engine.begin() as conn:
+            entity_ref = self._ensure_entity(conn, key)
+            pk = conn.execute(insert(file_access_history).values(
+                entity_ref=entity_ref, file_id=record.get("file_id"),
+                record=json.dumps(record, ensure_ascii=False, default=str)
+            )).inserted_primary_key[0]
+            # 定期裁剪，只保留最近 ACCESS_HISTORY_LIMIT 条
+            if pk % ACCESS_HISTORY_LIMIT == 0:
+                cutoff = conn.execute(
+                    select(file_access_history.c.pk)
+                    .where(file_access_history.c.entity_ref == entity_ref)
+                    .order_by(file_access_history.c.pk.desc())
+                    .offset(ACCESS_HISTORY_LIMIT).limit(1)
+                ).scalar()
+                if cutoff is not None:
+                    conn.execute(delete(file_access_history).where(and_(
+                        file_access_history.c.entity_ref == entity_ref,
+                        file_access_history.c.pk <= cutoff
+                    )))
+
+    def get_access_history(self, key: EntityKey) -> List[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            entity = self._find_entity(conn, key)
+            if entity is None:
+                return (self.load_entity(key) or {}).get("access_history") or []
+            return self._access_history(conn, entity.id)
+
+    def drop_entity(self, key: EntityKey):
+        with self.engine.begin() as conn:
+            entity = self._find_entity(conn, key)
+            if entity is None:
+                return
+            conn.execute(delete(file_metadata).where(file_metadata.c.entity_ref == entity.id))
+            conn.execute(delete(file_access_history).where(file_access_history.c.entity_ref == entity.id))
+            conn.execute(delete(file_entities).where(file_entities.c.id == entity.id))
+
+    # ---------- 计数器 ----------
+
+    @staticmethod
+    def _adjust_row(conn, scope: str, name: str, files: int, size: int):
+        """原子增量更新计数器行（不会小于 0），不存在时插入"""
+        new_files = file_storage_counters.c.files + files
+        new_size = file_storage_counters.c.size + size
+        result = conn.execute(update(file_storage_counters).where(and_(
+            file_storage_counters.c.scope == scope,
+            file_storage_counters.c.name == name
+        )).values(
+            files=case((new_files < 0, 0), else_=new_files),
+            size=case((new_size < 0, 0), else_=new_size)
+        ))
+        if result.rowcount:
+            return
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(file_storage_counters).values(
+                    scope=scope, name=name, files=max(files, 0), size=max(size, 0)
+                ))
+        except IntegrityError:
+            SQLMetadataStore._adjust_row(conn, scope, name, files, size)
+
+    def _adjust(self, conn, status: str, system: str, files: int, size: int):
+        self._adjust_row(conn, "status", status, files, size)
+        if status == "active" and system:
+            self._adjust_row(conn, "system", system, files, size)
+
+    def adjust_counters(self, status: str, system: str = None, files: int = 0, size: int = 0):
+        if not files and not size:
+            return
+        with self.engine.begin() as conn:
+            self._adjust(conn, status, system, files, size)
+
+    def get_stats(self) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(file_storage_counters)).all()
+        if not any(r.scope == "meta" and r.name == "initialized" for r in rows):
+            return None
+
+        stats = empty_stats()
+        for row in rows:
+            if row.scope == "status" and row.name in stats["by_status"]:
+                stats["by_status"][row.name] = {"files": row.files, "size": row.size}
+                stats["total_files"] += row.files
+                stats["total_size"] += row.size
+            elif row.scope == "system" and row.files:
+                stats["by_system"][row.name] = {"files": row.files, "size": row.size}
+        return stats
+
+    def replace_counters(self, stats: Dict[str, Any]):
+        rows = [{"scope": "meta", "name": "initialized", "files": 0, "size": 0}]
+        rows += [{"scope": "status", "name": status, "files": data["files"], "size": data["size"]}
+                 for status, data in stats["by_status"].items()]
+        rows += [{"scope": "system", "name": system, "files": data["files"], "size": data["size"]}
+                 for system, data in stats["by_system"].items()]
+        with self.engine.begin() as conn:
+            conn.execute(delete(file_storage_counters))
+            conn.execute(insert(file_storage_counters), rows)
+
+
+def create_metadata_store(
+    base_path: str,
+    entity_path_resolver: Callable[[EntityKey], str],
+    backend: str = None,
+    db_url: str = None
+) -> MetadataStore:
+    """
+    按配置创建元数据存储
+
+    Args:
+        base_path: 存储根目录（默认 SQLite 数据库位于 {base_path}/_index/metadata.db）
+        entity_path_resolver: 实体目录解析函数
+        backend: 'sql' 或 'json'，默认读取 FILE_METADATA_STORE
+        db_url: 数据库 URL，默认读取 FILE_METADATA_DB_URL
+    """
+    backend = (backend or os.getenv('FILE_METADATA_STORE', 'sql')).lower()
+    if backend == 'json':
+        return SidecarMetadataStore(entity_path_resolver)
+
+    db_url = db_url or os.getenv('FILE_METADATA_DB_URL') or \
+        f"sqlite:///{os.path.abspath(os.path.join(base_path, '_index', 'metadata.db'))}"
+    return SQLMetadataStore(db_url, entity_path_resolver)
+
+
+def migrate_sidecars(base_path: str, store: SQLMetadataStore, overwrite: bool = False) -> Dict[str, int]:
+    """
+    一次性将 active/ 下所有 _meta.json 导入数据库
+
+    目录结构: active/{system}/{YYYY}/{MM}/{entity_type}/{entity_id}/_meta.json
+    _meta.json 保留原位，便于回退到 json 后端。
+
+    Args:
+        overwrite: 数据库中已存在的实体是否用 _meta.json 覆盖
+
+    Returns:
+        {"migrated": n, "skipped": n, "failed": n}
+    """
+    result = {"migrated": 0, "skipped": 0, "failed": 0}
+    active_path = os.path.join(base_path, "active")
+
+    for root, dirs, files in os.walk(active_path):
+        if "_meta.json" not in files:
+            continue
+        parts = os.path.relpath(root, active_path).split(os.sep)
+        if len(parts) != 5:
+            logger.warning(f"Skip unexpected meta location: {root}")
+            result["skipped"] += 1
+            continue
+        system, year, month, entity_type, dir_entity_id = parts
+        try:
+            with open(os.path.join(root, "_meta.json"), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            key = (system, entity_type, str(meta.get("entity_id") or dir_entity_id), int(year), int(month))
+            with store.engine.begin() as conn:
+                if not overwrite and store._find_entity(conn, key) is not None:
+                    result["skipped"] += 1
+                    continue
+                store._import_entity(conn, key, meta)
+            result["migrated"] += 1
+        except Exception as e:
+            logger.error(f"Failed to migrate {root}: {e}")
+            result["failed"] += 1
+
+    return result
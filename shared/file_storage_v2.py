@@ -7,7 +7,7 @@
     storage/
     ├── active/                           # 活跃文件
     │   └── {system}/{YYYY}/{MM}/{entity_type}/{entity_id}/
-    │       ├── _meta.json                # 元数据索引
+    │       ├── _meta.json                # 元数据索引（json 后端）
     │       ├── documents/
     │       ├── drawings/
     │       ├── contracts/
@@ -16,20 +16,23 @@
     │   └── {YYYY}/{system}/{entity_type}/{entity_id}.tar.gz
     ├── temp/                             # 临时文件
     │   └── {date}/{session_id}/
-    └── quarantine/                       # 隔离区
-        └── {date}/
+    ├── quarantine/                       # 隔离区
+    │   └── {date}/
+    └── _index/metadata.db                # 元数据索引（sql 后端，默认）
 
 特性:
     - 按实体组织文件（项目、供应商、员工等）
     - 完整版本控制
-    - 元数据索引（_meta.json）
+    - 元数据索引（数据库，见 file_metadata_store；可切换回 _meta.json）
     - 自动归档
     - 临时文件管理
     - 访问控制级别
-    - MD5/SHA256 校验
+    - MD5/SHA256 校验（分块流式写入，边写边算）
+    - 断点续传的分片上传、按哈希去重
 """
 
 import base64
+import io
 import os
 import uuid
 import json
@@ -38,12 +41,22 @@ import hashlib
 import shutil
 import tarfile
 import re
+import tempfile
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, BinaryIO, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+try:
+    from .file_metadata_store import (
+        MetadataStore, SidecarMetadataStore, create_metadata_store, empty_stats
+    )
+except ImportError:
+    from file_metadata_store import (
+        MetadataStore, SidecarMetadataStore, create_metadata_store, empty_stats
+    )
+
 logger = logging.getLogger(__name__)
 
 
@@ -87,6 +100,14 @@ DEFAULT_STORAGE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)),
 URL_PREFIX = "/storage"
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 TEMP_FILE_EXPIRE_DAYS = 7
+
+# 流式写入的块大小（内存占用与文件大小无关）
+UPLOAD_CHUNK_SIZE = int(os.getenv('FILE_UPLOAD_CHUNK_SIZE', 1024 * 1024))
+# 分片上传：单个分片与整个文件的大小上限
+CHUNKED_UPLOAD_PART_SIZE = int(os.getenv('FILE_CHUNKED_PART_SIZE', 8 * 1024 * 1024))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('FILE_CHUNKED_MAX_SIZE', 4 * 1024 * 1024 * 1024))
+# 相同内容的文件使用硬链接，不重复占用磁盘
+DEDUPE_ENABLED = os.getenv('FILE_DEDUPE_ENABLED', 'true').lower() == 'true'
 QUARANTINE_EXPIRE_DAYS = 30
 
 # 允许的文件扩展名（按类别）
@@ -187,22 +208,58 @@ class EntityMeta:
         return data
 
 
+# ============== 分片读取 ==============
+
+class _ConcatenatedReader:
+    """按顺序读取多个分片文件，对外表现为一个文件对象"""
+
+    def __init__(self, paths: List[str]):
+        self._paths = list(paths)
+        self._current = None
+
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            if self._current is None:
+                if not self._paths:
+                    return b""
+                self._current = open(self._paths.pop(0), 'rb')
+            data = self._current.read(size)
+            if data:
+                return data
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
 # ============== 主类 ==============
 
 class EnterpriseFileStorage:
     """企业级文件存储管理器"""
 
-    def __init__(self, base_path: str = None, url_prefix: str = URL_PREFIX):
+    def __init__(
+        self,
+        base_path: str = None,
+        url_prefix: str = URL_PREFIX,
+        metadata_store: MetadataStore = None
+    ):
         """
         初始化存储管理器
 
         Args:
             base_path: 存储根目录
             url_prefix: URL 前缀
+            metadata_store: 元数据存储（默认按 FILE_METADATA_STORE 配置创建）
         """
         self.base_path = base_path or DEFAULT_STORAGE_PATH
         self.url_prefix = url_prefix
         self._init_storage_structure()
+        self.metadata_store = metadata_store or create_metadata_store(
+            self.base_path, self._get_entity_path_by_key
+        )
 
     def _init_storage_structure(self):
         """初始化存储目录结构"""
@@ -244,6 +301,22 @@ class EnterpriseFileStorage:
             self._sanitize_entity_id(entity_id)
         )
 
+    def _entity_key(
+        self,
+        system: str,
+        entity_type: str,
+        entity_id: str,
+        year: int = None,
+        month: int = None
+    ) -> tuple:
+        """生成元数据存储的实体键"""
+        now = datetime.now()
+        return (system, entity_type, str(entity_id), year or now.year, month or now.month)
+
+    def _get_entity_path_by_key(self, key: tuple) -> str:
+        """按实体键获取实体存储路径"""
+        return self._get_entity_path(*key)
+
     def _get_file_path(
         self,
         system: str,
@@ -283,17 +356,28 @@ class EnterpriseFileStorage:
         date_str = datetime.now().strftime("%Y-%m-%d")
         return os.path.join(self.base_path, "quarantine", date_str)
 
-    def _get_archive_path(self, system: str, entity_type: str, entity_id: str, year: int) -> str:
-        """获取归档路径"""
+    def _get_archive_path(self, system: str, entity_type: str, entity_id: str, year: int,
+                          version: int = 0) -> str:
+        """获取归档路径（同一年份再次归档时按 version 另存为 <id>.1.tar.gz、<id>.2.tar.gz ...）"""
+        suffix = f".{version}" if version else ""
         return os.path.join(
             self.base_path,
             "archive",
             str(year),
             system,
             entity_type,
-            f"{self._sanitize_entity_id(entity_id)}.tar.gz"
+            f"{self._sanitize_entity_id(entity_id)}{suffix}.tar.gz"
         )
 
+    def _list_archive_paths(self, system: str, entity_type: str, entity_id: str, year: int) -> List[str]:
+        """实体在该年份已有的归档（从旧到新）"""
+        paths = []
+        while True:
+            path = self._get_archive_path(system, entity_type, entity_id, year, len(paths))
+            if not os.path.exists(path):
+                return paths
+            paths.append(path)
+
     # ============== 工具方法 ==============
 
     @staticmethod
@@ -381,7 +465,10 @@ class EnterpriseFileStorage:
         if file_size > max_size:
             return False, f"文件大小超过限制 ({max_size / 1024 / 1024:.1f}MB)"
 
-        # 检查扩展名
+        return self._validate_extension(filename, category)
+
+    def _validate_extension(self, filename: str, category: str = None) -> Tuple[bool, str]:
+        """检查扩展名（流式写入前先检查，不合法时不读取内容）"""
         ext = self._get_extension(filename)
         if category and category in ALLOWED_EXTENSIONS:
             allowed = ALLOWED_EXTENSIONS[category]
@@ -416,12 +503,10 @@ class EnterpriseFileStorage:
         month: int = None
     ) -> EntityMeta:
         """加载实体元数据"""
-        meta_path = self._get_meta_path(system, entity_type, entity_id, year, month)
-
-        if os.path.exists(meta_path):
+        key = self._entity_key(system, entity_type, entity_id, year, month)
+        data = self.metadata_store.load_entity(key)
+        if data is not None:
             try:
-                with open(meta_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
                 return EntityMeta(**data)
             except Exception as e:
                 logger.warning(f"Failed to load meta: {e}")
@@ -447,15 +532,14 @@ class EnterpriseFileStorage:
         year: int = None,
         month: int = None
     ):
-        """保存实体元数据"""
-        entity_path = self._get_entity_path(system, entity_type, entity_id, year, month)
-        Path(entity_path).mkdir(parents=True, exist_ok=True)
+        """
+        整体保存实体元数据
 
-        meta_path = os.path.join(entity_path, "_meta.json")
+        仅用于兼容旧调用，新增/删除文件请使用 metadata_store 的增量接口
+        """
         meta.updated_at = datetime.now().isoformat()
-
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump(meta.to_dict(), f, ensure_ascii=False, indent=2)
+        key = self._entity_key(system, entity_type, entity_id, year, month)
+        self.metadata_store.save_entity(key, meta.to_dict())
 
     def _add_file_to_meta(
         self,
@@ -494,11 +578,96 @@ class EnterpriseFileStorage:
 
         return meta
 
+    # ============== 流式写入 ==============
+
+    def _ingest_stream(
+        self,
+        stream: BinaryIO,
+        max_size: int = None
+    ) -> Tuple[str, int, str, str]:
+        """
+        分块写入临时文件，同时计算 MD5 和 SHA256
+
+        临时文件位于存储根目录下，最终 os.replace 移动即可，不再复制。
+
+        Returns:
+            (临时文件路径, 大小, md5, sha256)
+
+        Raises:
+            ValueError: 文件超过 max_size
+        """
+        temp_dir = self._get_temp_path("ingest")
+        Path(temp_dir).mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix=".part")
+
+        md5_hash = hashlib.md5()
+        sha256_hash = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size and size > max_size:
+                        raise ValueError(f"文件大小超过限制 ({max_size / 1024 / 1024:.1f}MB)")
+                    md5_hash.update(chunk)
+                    sha256_hash.update(chunk)
+                    f.write(chunk)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        return temp_path, size, md5_hash.hexdigest(), sha256_hash.hexdigest()
+
+    def _find_duplicate(self, sha256: str, size: int) -> Optional[str]:
+        """按 SHA256 查找内容相同且仍存在的文件，返回其完整路径"""
+        for f in self.metadata_store.find_files_by_hash(sha256=sha256):
+            entity_key = f.get("entity_key")
+            if not entity_key or not f.get("path"):
+                continue
+            full_path = os.path.join(self._get_entity_path_by_key(entity_key), f["path"])
+            if os.path.isfile(full_path) and os.path.getsize(full_path) == size:
+                return full_path
+        return None
+
+    def _commit_ingested(
+        self,
+        temp_path: str,
+        file_path: str,
+        size: int,
+        sha256: str,
+        dedupe: bool = None
+    ) -> Optional[str]:
+        """
+        将临时文件移动到最终位置
+
+        启用去重且已存在相同内容时，改为创建指向已有文件的硬链接。
+
+        Returns:
+            去重时返回已有文件路径，否则 None
+        """
+        dedupe = DEDUPE_ENABLED if dedupe is None else dedupe
+        if dedupe:
+            existing = self._find_duplicate(sha256, size)
+            if existing:
+                try:
+                    os.link(existing, file_path)
+                    os.remove(temp_path)
+                    return existing
+                except OSError as e:
+                    # 跨设备或文件系统不支持硬链接时照常保存
+                    logger.warning(f"Dedupe link failed, storing a copy: {e}")
+
+        os.replace(temp_path, file_path)
+        return None
+
     # ============== 核心操作 ==============
 
     def save_file(
         self,
-        file_bytes: bytes,
+        file_bytes: Union[bytes, BinaryIO],
         original_filename: str,
         system: str,
         entity_type: str,
@@ -512,13 +681,18 @@ class EnterpriseFileStorage:
         uploaded_by: str = None,
         year: int = None,
         month: int = None,
-        validate: bool = True
+        validate: bool = True,
+        max_size: int = None,
+        dedupe: bool = None,
+        expected_sha256: str = None
     ) -> Dict[str, Any]:
         """
         保存文件到存储系统
 
+        内容按块流式写入并计算哈希，传入文件对象时内存占用与文件大小无关。
+
         Args:
-            file_bytes: 文件字节内容
+            file_bytes: 文件字节内容，或可 read() 的文件对象（如 werkzeug FileStorage.stream）
             original_filename: 原始文件名
             system: 系统代码 (portal, caigou, quotation, etc.)
             entity_type: 实体类型 (projects, suppliers, quotes, etc.)
@@ -533,6 +707,9 @@ class EnterpriseFileStorage:
             year: 指定年份（默认当前年）
             month: 指定月份（默认当前月）
             validate: 是否验证文件
+            max_size: 大小上限（默认 MAX_FILE_SIZE）
+            dedupe: 相同内容是否硬链接到已有文件（默认 FILE_DEDUPE_ENABLED）
+            expected_sha256: 客户端提供的 SHA256，不一致时不保存
 
         Returns:
             {
@@ -543,16 +720,31 @@ class EnterpriseFileStorage:
                 "stored_name": "存储文件名",
                 "size": 文件大小,
                 "md5": "MD5哈希",
+                "deduplicated": 是否复用了已有文件,
                 "error": "错误信息（如果有）"
             }
         """
+        temp_path = None
         try:
             # 验证文件
             if validate:
-                is_valid, error = self._validate_file(file_bytes, original_filename, category)
+                is_valid, error = self._validate_extension(original_filename, category)
                 if not is_valid:
                     return {"success": False, "error": error}
 
+            # 分块写入临时文件并计算哈希
+            stream = io.BytesIO(file_bytes) if isinstance(file_bytes, (bytes, bytearray)) else file_bytes
+            try:
+                temp_path, file_size, md5_hash, sha256_hash = self._ingest_stream(
+                    stream, (max_size or MAX_FILE_SIZE) if validate else max_size
+                )
+            except ValueError as e:
+                return {"success": False, "error": str(e)}
+            if validate and file_size == 0:
+                return {"success": False, "error": "文件内容为空"}
+            if expected_sha256 and expected_sha256.lower() != sha256_hash:
+                return {"success": False, "error": "文件校验失败 (SHA256 不一致)"}
+
             # 生成文件信息
             file_id = self._generate_file_id()
             stored_name = self._generate_stored_name(original_filename, file_id)
@@ -568,13 +760,9 @@ class EnterpriseFileStorage:
 
             file_path = os.path.join(category_path, stored_name)
 
-            # 保存文件
-            with open(file_path, 'wb') as f:
-                f.write(file_bytes)
-
-            # 计算哈希
-            md5_hash = self._calculate_hash(file_bytes, 'md5')
-            sha256_hash = self._calculate_hash(file_bytes, 'sha256')
+            # 移动到最终位置（或链接到相同内容的已有文件）
+            duplicate_of = self._commit_ingested(temp_path, file_path, file_size, sha256_hash, dedupe)
+            temp_path = None
 
             # 生成URL
             relative_path = os.path.relpath(file_path, os.path.join(self.base_path, "active"))
@@ -588,7 +776,7 @@ class EnterpriseFileStorage:
                 path=f"{category}/{stored_name}",
                 url=file_url,
                 category=category,
-                size=len(file_bytes),
+                size=file_size,
                 mime_type=self._get_mime_type(original_filename),
                 md5=md5_hash,
                 sha256=sha256_hash,
@@ -603,11 +791,11 @@ class EnterpriseFileStorage:
             )
 
             # 更新元数据
-            meta = self._load_meta(system, entity_type, entity_id, year, month)
-            meta = self._add_file_to_meta(meta, file_info)
-            self._save_meta(meta, system, entity_type, entity_id, year, month)
+            key = self._entity_key(system, entity_type, entity_id, year, month)
+            self.metadata_store.add_file(key, file_info.to_dict(), created_by=uploaded_by)
 
-            logger.info(f"File saved: {file_path} ({len(file_bytes)} bytes)")
+            logger.info(f"File saved: {file_path} ({file_size} bytes)"
+                        + (f", linked to {duplicate_of}" if duplicate_of else ""))
 
             return {
                 "success": True,
@@ -616,9 +804,10 @@ class EnterpriseFileStorage:
                 "url": file_url,
                 "stored_name": stored_name,
                 "original_name": original_filename,
-                "size": len(file_bytes),
+                "size": file_size,
                 "md5": md5_hash,
                 "sha256": sha256_hash,
+                "deduplicated": duplicate_of is not None,
                 "category": category,
                 "entity_id": entity_id,
                 "entity_type": entity_type,
@@ -628,10 +817,13 @@ class EnterpriseFileStorage:
         except Exception as e:
             logger.error(f"Failed to save file: {e}")
             return {"success": False, "error": str(e)}
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
 
     def save_file_version(
         self,
-        file_bytes: bytes,
+        file_bytes: Union[bytes, BinaryIO],
         original_filename: str,
         system: str,
         entity_type: str,
@@ -651,6 +843,7 @@ class EnterpriseFileStorage:
             new_version: 新版本号 (如 "1.1", "2.0")
             version_note: 版本说明
         """
+        temp_path = None
         try:
             now = datetime.now()
             year = year or now.year
@@ -666,26 +859,16 @@ class EnterpriseFileStorage:
             stored_name = self._generate_stored_name(original_filename, file_id)
             file_path = os.path.join(version_path, stored_name)
 
-            # 保存文件
-            with open(file_path, 'wb') as f:
-                f.write(file_bytes)
-
-            # 计算哈希
-            md5_hash = self._calculate_hash(file_bytes, 'md5')
+            # 分块写入并计算哈希
+            stream = io.BytesIO(file_bytes) if isinstance(file_bytes, (bytes, bytearray)) else file_bytes
+            temp_path, file_size, md5_hash, sha256_hash = self._ingest_stream(stream)
+            self._commit_ingested(temp_path, file_path, file_size, sha256_hash)
+            temp_path = None
 
             # 生成URL
             relative_path = os.path.relpath(file_path, os.path.join(self.base_path, "active"))
             file_url = f"{self.url_prefix}/active/{relative_path.replace(os.sep, '/')}"
 
-            # 更新元数据
-            meta = self._load_meta(system, entity_type, entity_id, year, month)
-            meta = self._update_version_history(meta, file_id, new_version)
-
-            # 标记旧版本为非最新
-            for f in meta.files:
-                if f.get('id') == file_id:
-                    f['is_latest'] = False
-
             # 添加新版本文件信息
             file_info = FileInfo(
                 id=f"{file_id}_v{new_version}",
@@ -694,17 +877,19 @@ class EnterpriseFileStorage:
                 path=f"versions/{file_id}/{new_version}/{stored_name}",
                 url=file_url,
                 category="versions",
-                size=len(file_bytes),
+                size=file_size,
                 mime_type=self._get_mime_type(original_filename),
                 md5=md5_hash,
+                sha256=sha256_hash,
                 version=new_version,
                 is_latest=True,
                 description=version_note,
                 uploaded_by=uploaded_by,
                 uploaded_at=now.isoformat()
             )
-            meta = self._add_file_to_meta(meta, file_info)
-            self._save_meta(meta, system, entity_type, entity_id, year, month)
+            # 更新元数据（更新版本历史、标记旧版本为非最新）
+            key = self._entity_key(system, entity_type, entity_id, year, month)
+            self.metadata_store.add_version(key, file_id, new_version, file_info.to_dict())
 
             logger.info(f"File version saved: {file_path} (v{new_version})")
 
@@ -720,6 +905,9 @@ class EnterpriseFileStorage:
         except Exception as e:
             logger.error(f"Failed to save file version: {e}")
             return {"success": False, "error": str(e)}
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
 
     def save_base64_file(
         self,
@@ -740,6 +928,204 @@ class EnterpriseFileStorage:
             logger.error(f"Failed to decode base64: {e}")
             return {"success": False, "error": f"Base64 解码失败: {e}"}
 
+    # ============== 分片上传（断点续传） ==============
+
+    def _get_upload_path(self, upload_id: str) -> str:
+        """
+        获取分片上传会话目录
+
+        upload_id 以日期开头，会话目录位于 temp/{date}/ 下，随临时文件一起过期清理。
+        """
+        if not re.fullmatch(r"\d{8}[0-9a-f]{16}", upload_id or ""):
+            raise ValueError("无效的上传ID")
+        date_str = datetime.strptime(upload_id[:8], "%Y%m%d").strftime("%Y-%m-%d")
+        return os.path.join(self.base_path, "temp", date_str, f"upload-{upload_id}")
+
+    def _load_upload_manifest(self, upload_id: str) -> Dict[str, Any]:
+        manifest_path = os.path.join(self._get_upload_path(upload_id), "_upload.json")
+        if not os.path.exists(manifest_path):
+            raise ValueError("上传会话不存在或已过期")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def create_chunked_upload(
+        self,
+        original_filename: str,
+        total_size: int,
+        chunk_size: int = None,
+        category: str = None,
+        sha256: str = None,
+        extra: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        创建分片上传会话
+
+        Args:
+            total_size: 文件总大小
+            chunk_size: 分片大小（默认且不超过 CHUNKED_UPLOAD_PART_SIZE）
+            category: 文件分类（用于检查扩展名）
+            sha256: 客户端计算的 SHA256（可选，合并时校验）
+            extra: 调用方自定义数据（如项目ID），查询状态时原样返回
+
+        Returns:
+            {"success": True, "upload_id": "...", "chunk_size": n, "total_chunks": n}
+        """
+        is_valid, error = self._validate_extension(original_filename, category)
+        if not is_valid:
+            return {"success": False, "error": error}
+        if not isinstance(total_size, int) or total_size <= 0:
+            return {"success": False, "error": "文件内容为空"}
+        if total_size > CHUNKED_UPLOAD_MAX_SIZE:
+            return {"success": False,
+                    "error": f"文件大小超过限制 ({CHUNKED_UPLOAD_MAX_SIZE / 1024 / 1024:.1f}MB)"}
+
+        if chunk_size is not None and (not isinstance(chunk_size, int) or chunk_size <= 0):
+            return {"success": False, "error": "分片大小必须是正整数"}
+        chunk_size = min(chunk_size or CHUNKED_UPLOAD_PART_SIZE, CHUNKED_UPLOAD_PART_SIZE)
+        upload_id = f"{datetime.now():%Y%m%d}{uuid.uuid4().hex[:16]}"
+        manifest = {
+            "upload_id": upload_id,
+            "filename": original_filename,
+            "total_size": total_size,
+            "chunk_size": chunk_size,
+            "total_chunks": (total_size + chunk_size - 1) // chunk_size,
+            "category": category,
+            "sha256": sha256,
+            "extra": extra or {},
+            "created_at": datetime.now().isoformat()
+        }
+
+        upload_path = self._get_upload_path(upload_id)
+        Path(upload_path).mkdir(parents=True, exist_ok=True)
+        with open(os.path.join(upload_path, "_upload.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        return {"success": True, "upload_id": upload_id,
+                "chunk_size": chunk_size, "total_chunks": manifest["total_chunks"]}
+
+    def save_upload_chunk(
+        self,
+        upload_id: str,
+        index: int,
+        chunk: Union[bytes, BinaryIO]
+    ) -> Dict[str, Any]:
+        """
+        保存一个分片（重复上传同一分片会覆盖，可安全重试）
+
+        Args:
+            index: 分片序号（从 0 开始）
+            chunk: 分片内容或文件对象（如 request.stream）
+        """
+        try:
+            manifest = self._load_upload_manifest(upload_id)
+            total_chunks = manifest["total_chunks"]
+            if not 0 <= index < total_chunks:
+                return {"success": False, "error": f"分片序号超出范围 (0-{total_chunks - 1})"}
+
+            chunk_size = manifest["chunk_size"]
+            expected = min(chunk_size, manifest["total_size"] - index * chunk_size)
+            stream = io.BytesIO(chunk) if isinstance(chunk, (bytes, bytearray)) else chunk
+
+            upload_path = self._get_upload_path(upload_id)
+            fd, temp_path = tempfile.mkstemp(dir=upload_path, suffix=".tmp")
+            size = 0
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    while True:
+                        data = stream.read(min(UPLOAD_CHUNK_SIZE, expected - size + 1))
+                        if not data:
+                            break
+                        size += len(data)
+                        if size > expected:
+                            break
+                        f.write(data)
+                if size != expected:
+                    os.remove(temp_path)
+                    return {"success": False, "error": f"分片大小不正确 (应为 {expected} 字节)"}
+                os.replace(temp_path, os.path.join(upload_path, f"{index:06d}.part"))
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            received = len(self._received_chunks(upload_path))
+            return {"success": True, "upload_id": upload_id, "index": index,
+                    "received": received, "total_chunks": total_chunks}
+
+        except Exception as e:
+            logger.error(f"Failed to save upload chunk: {e}")
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _received_chunks(upload_path: str) -> List[int]:
+        return sorted(int(name[:-5]) for name in os.listdir(upload_path) if name.endswith(".part"))
+
+    def get_upload_status(self, upload_id: str) -> Dict[str, Any]:
+        """查询分片上传进度（客户端据此只补传缺失的分片）"""
+        try:
+            manifest = self._load_upload_manifest(upload_id)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+
+        received = self._received_chunks(self._get_upload_path(upload_id))
+        received_set = set(received)
+        missing = [i for i in range(manifest["total_chunks"]) if i not in received_set]
+        return {
+            "success": True,
+            **manifest,
+            "received": received,
+            "missing": missing,
+            "complete": not missing
+        }
+
+    def complete_chunked_upload(
+        self,
+        upload_id: str,
+        system: str,
+        entity_type: str,
+        entity_id: str,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        合并分片并保存文件
+
+        分片按顺序流式读取，走与 save_file 相同的写入、哈希、去重流程，
+        成功后删除上传会话。kwargs 透传给 save_file。
+        """
+        status = self.get_upload_status(upload_id)
+        if not status.get("success"):
+            return status
+        if status["missing"]:
+            return {"success": False, "error": f"缺少 {len(status['missing'])} 个分片",
+                    "missing": status["missing"]}
+
+        upload_path = self._get_upload_path(upload_id)
+        reader = _ConcatenatedReader([
+            os.path.join(upload_path, f"{i:06d}.part") for i in range(status["total_chunks"])
+        ])
+        kwargs.setdefault("category", status.get("category") or "documents")
+        kwargs.setdefault("max_size", CHUNKED_UPLOAD_MAX_SIZE)
+        try:
+            result = self.save_file(
+                reader, status["filename"], system, entity_type, entity_id,
+                expected_sha256=status.get("sha256"), **kwargs
+            )
+        finally:
+            reader.close()
+
+        if result.get("success"):
+            shutil.rmtree(upload_path, ignore_errors=True)
+            result["upload_id"] = upload_id
+        return result
+
+    def abort_chunked_upload(self, upload_id: str) -> Dict[str, Any]:
+        """取消分片上传，删除已上传的分片"""
+        try:
+            shutil.rmtree(self._get_upload_path(upload_id), ignore_errors=True)
+            return {"success": True, "upload_id": upload_id}
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+
     def delete_file(
         self,
         system: str,
@@ -757,14 +1143,10 @@ class EnterpriseFileStorage:
             soft_delete: 软删除（移动到隔离区）还是物理删除
         """
         try:
-            meta = self._load_meta(system, entity_type, entity_id, year, month)
+            key = self._entity_key(system, entity_type, entity_id, year, month)
 
             # 查找文件
-            file_info = None
-            for f in meta.files or []:
-                if f.get('id') == file_id:
-                    file_info = f
-                    break
+            file_info = self.metadata_store.get_file(key, file_id)
 
             if not file_info:
                 return {"success": False, "error": "文件不存在"}
@@ -790,10 +1172,9 @@ class EnterpriseFileStorage:
                 logger.info(f"File deleted: {file_path}")
 
             # 从元数据中移除
-            meta.files = [f for f in meta.files if f.get('id') != file_id]
-            meta.total_files = len(meta.files)
-            meta.total_size_bytes = sum(f.get('size', 0) for f in meta.files)
-            self._save_meta(meta, system, entity_type, entity_id, year, month)
+            self.metadata_store.remove_file(
+                key, file_id, moved_to="quarantine" if soft_delete else None
+            )
 
             return {"success": True, "file_id": file_id}
 
@@ -811,18 +1192,18 @@ class EnterpriseFileStorage:
         month: int = None
     ) -> Optional[Dict[str, Any]]:
         """获取文件信息"""
-        meta = self._load_meta(system, entity_type, entity_id, year, month)
+        key = self._entity_key(system, entity_type, entity_id, year, month)
+        f = self.metadata_store.get_file(key, file_id)
 
-        for f in meta.files or []:
-            if f.get('id') == file_id:
-                entity_path = self._get_entity_path(system, entity_type, entity_id, year, month)
-                full_path = os.path.join(entity_path, f['path'])
+        if f:
+            entity_path = self._get_entity_path(system, entity_type, entity_id, year, month)
+            full_path = os.path.join(entity_path, f['path'])
 
-                return {
-                    **f,
-                    "full_path": full_path,
-                    "exists": os.path.exists(full_path)
-                }
+            return {
+                **f,
+                "full_path": full_path,
+                "exists": os.path.exists(full_path)
+            }
 
         return None
 
@@ -836,14 +1217,12 @@ class EnterpriseFileStorage:
         month: int = None
     ) -> List[Dict[str, Any]]:
         """列出实体的所有文件"""
-        meta = self._load_meta(system, entity_type, entity_id, year, month)
+        key = self._entity_key(system, entity_type, entity_id, year, month)
+        return self.metadata_store.list_files(key, category)
 
-        files = meta.files or []
-
-        if category:
-            files = [f for f in files if f.get('category') == category]
-
-        return files
+    def find_files_by_hash(self, sha256: str = None, md5: str = None) -> List[Dict[str, Any]]:
+        """按哈希查找已存储的文件（用于去重，json 后端不支持）"""
+        return self.metadata_store.find_files_by_hash(sha256=sha256, md5=md5)
 
     def get_entity_meta(
         self,
@@ -870,7 +1249,7 @@ class EnterpriseFileStorage:
         """
         归档实体的所有文件
 
-        将实体目录压缩为 tar.gz 并移动到 archive 目录
+        将实体目录压缩为 tar.gz 并移动到 archive 目录；同一年份已有归档时另存为新版本，不覆盖
         """
         try:
             entity_path = self._get_entity_path(system, entity_type, entity_id, year, month)
@@ -879,22 +1258,39 @@ class EnterpriseFileStorage:
                 return {"success": False, "error": "实体目录不存在"}
 
             # 创建归档路径
-            archive_path = self._get_archive_path(system, entity_type, entity_id, year)
+            version = len(self._list_archive_paths(system, entity_type, entity_id, year))
+            archive_path = self._get_archive_path(system, entity_type, entity_id, year, version)
             Path(os.path.dirname(archive_path)).mkdir(parents=True, exist_ok=True)
 
+            # 元数据快照写入 _meta.json 随目录归档（恢复后可懒加载回索引）
+            key = self._entity_key(system, entity_type, entity_id, year, month)
+            sql_backed = not isinstance(self.metadata_store, SidecarMetadataStore)
+            if sql_backed:
+                snapshot = self.metadata_store.load_entity(key)
+                if snapshot is not None:
+                    SidecarMetadataStore(self._get_entity_path_by_key).save_entity(key, snapshot)
+
+            file_count, file_size = self._count_files(entity_path)
+
             # 创建压缩包
             with tarfile.open(archive_path, "w:gz") as tar:
                 tar.add(entity_path, arcname=os.path.basename(entity_path))
 
             # 删除原目录
             shutil.rmtree(entity_path)
+            if sql_backed:
+                self.metadata_store.drop_entity(key)
+
+            archive_size = os.path.getsize(archive_path)
+            self.metadata_store.adjust_counters("active", system, -file_count, -file_size)
+            self.metadata_store.adjust_counters("archived", None, 1, archive_size)
 
             logger.info(f"Entity archived: {archive_path}")
 
             return {
                 "success": True,
                 "archive_path": archive_path,
-                "archive_size": os.path.getsize(archive_path)
+                "archive_size": archive_size
             }
 
         except Exception as e:
@@ -906,14 +1302,21 @@ class EnterpriseFileStorage:
         system: str,
         entity_type: str,
         entity_id: str,
-        year: int
+        year: int,
+        remove_archive: bool = False
     ) -> Dict[str, Any]:
-        """从归档恢复实体文件"""
+        """
+        从最新一版归档恢复实体文件
+
+        默认保留压缩包（恢复不完整或文件再次被删除时仍可从归档找回）；
+        remove_archive=True 时解压成功后删除该压缩包
+        """
         try:
-            archive_path = self._get_archive_path(system, entity_type, entity_id, year)
+            archive_paths = self._list_archive_paths(system, entity_type, entity_id, year)
 
-            if not os.path.exists(archive_path):
+            if not archive_paths:
                 return {"success": False, "error": "归档文件不存在"}
+            archive_path = archive_paths[-1]
 
             # 确定恢复路径
             restore_base = os.path.join(
@@ -926,11 +1329,20 @@ class EnterpriseFileStorage:
 
             # 解压
             with tarfile.open(archive_path, "r:gz") as tar:
+                members = [m for m in tar.getmembers() if m.isfile()]
                 tar.extractall(restore_base)
 
+            restored_size = sum(m.size for m in members if os.path.basename(m.name) != "_meta.json")
+            restored_count = sum(1 for m in members if os.path.basename(m.name) != "_meta.json")
+            if remove_archive:
+                archive_size = os.path.getsize(archive_path)
+                os.remove(archive_path)
+                self.metadata_store.adjust_counters("archived", None, -1, -archive_size)
+            self.metadata_store.adjust_counters("active", system, restored_count, restored_size)
+
             logger.info(f"Archive restored: {archive_path}")
 
-            return {"success": True, "restored_path": restore_base}
+            return {"success": True, "restored_path": restore_base, "archive_path": archive_path}
 
         except Exception as e:
             logger.error(f"Failed to restore archive: {e}")
@@ -997,6 +1409,8 @@ class EnterpriseFileStorage:
                 except ValueError:
                     continue
 
+        self.metadata_store.adjust_counters("quarantine", None, -deleted_count, -deleted_size)
+
         return {
             "deleted_files": deleted_count,
             "deleted_size": deleted_size
@@ -1004,22 +1418,42 @@ class EnterpriseFileStorage:
 
     # ============== 统计信息 ==============
 
-    def get_storage_stats(self) -> Dict[str, Any]:
-        """获取存储统计信息"""
-        stats = {
-            "total_files": 0,
-            "total_size": 0,
-            "by_system": {},
-            "by_status": {
-                "active": {"files": 0, "size": 0},
-                "archived": {"files": 0, "size": 0},
-                "temp": {"files": 0, "size": 0},
-                "quarantine": {"files": 0, "size": 0}
-            }
-        }
+    @staticmethod
+    def _count_files(path: str) -> Tuple[int, int]:
+        """统计目录下的文件数和大小（不含 _meta.json）"""
+        count, size = 0, 0
+        for root, dirs, files in os.walk(path):
+            for f in files:
+                if f == "_meta.json":
+                    continue
+                count += 1
+                size += os.path.getsize(os.path.join(root, f))
+        return count, size
+
+    def get_storage_stats(self, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        获取存储统计信息
 
-        for status in ["active", "archive", "temp", "quarantine"]:
-            status_path = os.path.join(self.base_path, status)
+        sql 后端读取增量维护的计数器；计数器未初始化、json 后端
+        或 rebuild=True 时全量扫描目录，并用扫描结果重置计数器。
+        temp 下是上传中转、分片等短期文件，不维护计数器，每次扫描 temp 目录。
+        """
+        if not rebuild:
+            stats = self.metadata_store.get_stats()
+            if stats is not None:
+                files, size = self._count_files(os.path.join(self.base_path, "temp"))
+                stale = stats["by_status"]["temp"]
+                stats["total_files"] += files - stale["files"]
+                stats["total_size"] += size - stale["size"]
+                stats["by_status"]["temp"] = {"files": files, "size": size}
+                return stats
+
+        stats = empty_stats()
+
+        # 目录名 -> 统计状态
+        for directory, status in [("active", "active"), ("archive", "archived"),
+                                  ("temp", "temp"), ("quarantine", "quarantine")]:
+            status_path = os.path.join(self.base_path, directory)
             if os.path.exists(status_path):
                 for root, dirs, files in os.walk(status_path):
                     for f in files:
@@ -1044,6 +1478,7 @@ class EnterpriseFileStorage:
                                 stats["by_system"][system]["files"] += 1
                                 stats["by_system"][system]["size"] += file_size
 
+        self.metadata_store.replace_counters(stats)
         return stats
 
 
@@ -1156,7 +1591,7 @@ class FileAccessLogger:
     文件操作日志记录器
 
     日志存储在两个位置:
-    1. 实体的 _meta.json 文件中 (access_history 字段)
+    1. 实体元数据的 access_history (metadata_store)
     2. 数据库 file_access_log 表 (如果有数据库连接)
     """
 
@@ -1222,7 +1657,7 @@ class FileAccessLogger:
                 details=details or {}
             )
 
-            # 1. 写入实体的 _meta.json
+            # 1. 写入实体元数据
             if system and entity_type and entity_id:
                 self._log_to_meta(record, system, entity_type, entity_id, year, month)
 
@@ -1247,20 +1682,9 @@ class FileAccessLogger:
         year: int = None,
         month: int = None
     ):
-        """写入实体元数据文件"""
-        meta = self.storage._load_meta(system, entity_type, entity_id, year, month)
-
-        # 初始化 access_history
-        if not hasattr(meta, 'access_history') or meta.access_history is None:
-            meta.access_history = []
-
-        # 添加记录 (保留最近 100 条)
-        meta.access_history.insert(0, record.to_dict())
-        if len(meta.access_history) > 100:
-            meta.access_history = meta.access_history[:100]
-
-        # 保存
-        self.storage._save_meta(meta, system, entity_type, entity_id, year, month)
+        """写入实体元数据 (保留最近 100 条)"""
+        key = self.storage._entity_key(system, entity_type, entity_id, year, month)
+        self.storage.metadata_store.append_access(key, record.to_dict())
 
     def _log_to_database(self, record: FileAccessRecord):
         """写入数据库表"""
@@ -1299,8 +1723,8 @@ class FileAccessLogger:
             if not (system and entity_type and entity_id):
                 return []
 
-            meta = self.storage._load_meta(system, entity_type, entity_id, year, month)
-            access_history = getattr(meta, 'access_history', []) or []
+            key = self.storage._entity_key(system, entity_type, entity_id, year, month)
+            access_history = self.storage.metadata_store.get_access_history(key)
 
             # 过滤指定文件的记录
             file_records = [
@@ -1340,8 +1764,8 @@ class FileAccessLogger:
             操作记录列表
         """
         try:
-            meta = self.storage._load_meta(system, entity_type, entity_id, year, month)
-            access_history = getattr(meta, 'access_history', []) or []
+            key = self.storage._entity_key(system, entity_type, entity_id, year, month)
+            access_history = self.storage.metadata_store.get_access_history(key)
 
             # 过滤
             records = access_history
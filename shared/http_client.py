@@ -3,13 +3,22 @@ P2-18: 跨系统服务调用重试机制
 
 提供带有自动重试功能的 HTTP 客户端，用于跨系统 API 调用。
 支持指数退避、可配置重试次数和可重试错误类型。
+
+连接池: 每个进程按目标主机复用 requests.Session（keep-alive），
+       连接数上限见 HTTP_POOL_CONNECTIONS / HTTP_POOL_MAXSIZE。
+熔断器: 按目标主机统计连续失败，达到阈值后熔断（直接失败，不再重试），
+       冷却后放行一个探测请求（半开），成功则恢复。
 """
 
+import os
 import time
 import logging
+import threading
 import requests
 from functools import wraps
 from typing import Optional, Dict, Any, Callable, Tuple, Set
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 
 # 配置日志
 logger = logging.getLogger('http_client')
@@ -28,6 +37,16 @@ DEFAULT_MAX_DELAY = 10  # 最大延迟（秒）
 DEFAULT_BACKOFF_FACTOR = 2  # 指数退避因子
 DEFAULT_TIMEOUT = 10  # 默认超时（秒）
 
+# 连接池配置
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 10))  # 缓存的主机连接池数
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 20))  # 每个主机保持的 keep-alive 连接数
+POOL_BLOCK = os.getenv('HTTP_POOL_BLOCK', 'false').lower() == 'true'  # 连接耗尽时等待而不是新建
+
+# 熔断器配置
+CIRCUIT_BREAKER_ENABLED = os.getenv('HTTP_CIRCUIT_BREAKER_ENABLED', 'true').lower() == 'true'
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('HTTP_CIRCUIT_FAILURE_THRESHOLD', 5))  # 连续失败次数
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv('HTTP_CIRCUIT_RECOVERY_TIMEOUT', 30))  # 熔断冷却（秒）
+
 # 可重试的 HTTP 状态码
 RETRYABLE_STATUS_CODES: Set[int] = {408, 429, 500, 502, 503, 504}
 
@@ -39,6 +58,144 @@ RETRYABLE_EXCEPTIONS: Tuple = (
 )
 
 
+class CircuitOpenError(requests.exceptions.RequestException):
+    """熔断器打开，请求未发出"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    状态:
+        closed     正常放行，连续失败达到阈值后转为 open
+        open       直接拒绝，冷却 recovery_timeout 秒后转为 half_open
+        half_open  只放行一个探测请求，成功转为 closed，失败重新 open
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        name: str = '',
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout: float = CIRCUIT_RECOVERY_TIMEOUT
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """是否放行本次请求（半开状态下只放行一个探测请求）"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.time() - self._opened_at < self.recovery_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"[熔断恢复] {self.name} 探测成功，恢复请求")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.error(
+                        f"[熔断] {self.name} 连续失败 {self._failures} 次，"
+                        f"{self.recovery_timeout:.0f}秒内直接拒绝请求"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+    def release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {'name': self.name, 'state': self.state, 'failures': self._failures}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_sessions: Dict[str, requests.Session] = {}
+_registry_lock = threading.Lock()
+_registry_pid = os.getpid()
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _check_fork():
+    """fork 后子进程不能复用父进程的连接"""
+    global _registry_pid
+    if _registry_pid != os.getpid():
+        _sessions.clear()
+        _registry_pid = os.getpid()
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """获取目标主机的熔断器（进程内共享）"""
+    key = _host_key(url)
+    with _registry_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(key)
+        return breaker
+
+
+def get_session(url: str) -> requests.Session:
+    """获取目标主机的连接池会话（进程内共享，keep-alive 复用连接）"""
+    key = _host_key(url)
+    with _registry_lock:
+        _check_fork()
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                pool_block=POOL_BLOCK
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+        return session
+
+
+def get_circuit_stats() -> Dict[str, Dict[str, Any]]:
+    """所有熔断器状态（用于健康检查）"""
+    with _registry_lock:
+        return {key: breaker.stats() for key, breaker in _breakers.items()}
+
+
 def calculate_delay(attempt: int, initial_delay: float, max_delay: float, backoff_factor: float) -> float:
     """
     计算指数退避延迟时间
@@ -85,6 +242,8 @@ def request_with_retry(
     backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
     timeout: int = DEFAULT_TIMEOUT,
     on_retry: Optional[Callable[[int, str, Exception], None]] = None,
+    session: Optional[requests.Session] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
     **kwargs
 ) -> requests.Response:
     """
@@ -99,23 +258,40 @@ def request_with_retry(
         backoff_factor: 指数退避因子
         timeout: 请求超时（秒）
         on_retry: 重试回调函数，接收 (attempt, url, exception) 参数
+        session: 请求会话，默认使用目标主机的连接池会话
+        circuit_breaker: 熔断器，默认使用目标主机的熔断器（HTTP_CIRCUIT_BREAKER_ENABLED）
         **kwargs: 传递给 requests 的其他参数
 
     Returns:
         requests.Response 对象
 
     Raises:
+        CircuitOpenError: 熔断器打开（不重试）
         requests.exceptions.RequestException: 所有重试都失败后抛出最后一个异常
     """
     # 设置默认超时
     if 'timeout' not in kwargs:
         kwargs['timeout'] = timeout
 
+    session = session or get_session(url)
+    if circuit_breaker is None and CIRCUIT_BREAKER_ENABLED:
+        circuit_breaker = get_circuit_breaker(url)
+
     last_exception = None
 
     for attempt in range(max_retries + 1):
+        # 依赖已宕机时立即失败，不再退避重试
+        if circuit_breaker is not None and not circuit_breaker.allow_request():
+            raise CircuitOpenError(f"{method} {url} 已熔断 ({circuit_breaker.name})")
+
         try:
-            response = requests.request(method, url, **kwargs)
+            response = session.request(method, url, **kwargs)
+
+            if circuit_breaker is not None:
+                if response.status_code >= 500:
+                    circuit_breaker.record_failure()
+                else:
+                    circuit_breaker.record_success()
 
             # 检查是否需要重试
             if should_retry(response, None) and attempt < max_retries:
@@ -133,6 +309,8 @@ def request_with_retry(
 
         except RETRYABLE_EXCEPTIONS as e:
             last_exception = e
+            if circuit_breaker is not None:
+                circuit_breaker.record_failure()
 
             if attempt < max_retries:
                 delay = calculate_delay(attempt, initial_delay, max_delay, backoff_factor)
@@ -148,6 +326,11 @@ def request_with_retry(
                     f"[重试失败] {method} {url} 所有重试均失败，"
                     f"最后一个错误: {type(e).__name__}: {str(e)}"
                 )
+        except Exception:
+            # 非网络错误（参数错误等）不计入熔断，但要释放半开探测名额
+            if circuit_breaker is not None:
+                circuit_breaker.release_probe()
+            raise
 
     # 所有重试都失败，抛出最后一个异常
     if last_exception:
@@ -254,7 +437,8 @@ class RetryableHTTPClient:
         max_delay: float = DEFAULT_MAX_DELAY,
         backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
         timeout: int = DEFAULT_TIMEOUT,
-        default_headers: Optional[Dict[str, str]] = None
+        default_headers: Optional[Dict[str, str]] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
     ):
         self.base_url = base_url.rstrip('/')
         self.max_retries = max_retries
@@ -263,6 +447,10 @@ class RetryableHTTPClient:
         self.backoff_factor = backoff_factor
         self.timeout = timeout
         self.default_headers = default_headers or {}
+        # 同一主机的客户端共享熔断器
+        if circuit_breaker is None and CIRCUIT_BREAKER_ENABLED and self.base_url:
+            circuit_breaker = get_circuit_breaker(self.base_url)
+        self.circuit_breaker = circuit_breaker
 
     def _build_url(self, path: str) -> str:
         """构建完整 URL"""
@@ -287,15 +475,17 @@ class RetryableHTTPClient:
         """发送请求"""
         url = self._build_url(path)
         merged_headers = self._merge_headers(headers)
+        kwargs.setdefault('max_retries', self.max_retries)
+        kwargs.setdefault('timeout', self.timeout)
+        if self.circuit_breaker is not None and url.startswith(self.base_url):
+            kwargs.setdefault('circuit_breaker', self.circuit_breaker)
 
         return request_with_retry(
             method=method,
             url=url,
-            max_retries=self.max_retries,
             initial_delay=self.initial_delay,
             max_delay=self.max_delay,
             backoff_factor=self.backoff_factor,
-            timeout=self.timeout,
             headers=merged_headers,
             **kwargs
         )
@@ -16,7 +16,8 @@ JZC 系统统一集成模块
     employees = hr.get_employees(role="sales")
 """
 
-from .base_client import BaseIntegrationClient
+from .base_client import BaseIntegrationClient, clear_integration_cache
+from .request_cache import ResponseCache, RequestCoalescer, BatchLoader
 from .crm_client import CRMClient
 from .hr_client import HRClient
 from .scm_client import SCMClient
@@ -24,6 +25,10 @@ from .quotation_client import QuotationClient
 
 __all__ = [
     'BaseIntegrationClient',
+    'clear_integration_cache',
+    'ResponseCache',
+    'RequestCoalescer',
+    'BatchLoader',
     'CRMClient',
     'HRClient',
     'SCMClient',
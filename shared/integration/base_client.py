@@ -2,19 +2,56 @@
 基础集成客户端类
 
 提供所有系统集成客户端的基础功能，包括：
-- HTTP 请求（带重试）
+- HTTP 请求（带重试、连接池复用、熔断）
+- GET 响应缓存（按接口 TTL，过期后条件请求）与相同请求合并
+- 按 ID 批量查询（服务端无批量接口时回退为逐个查询）
 - 统一的错误处理
 - 日志记录
 - 配置管理
 """
 
 import os
+import copy
+import fnmatch
 import logging
-from typing import Optional, Dict, Any, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+import requests
 from ..http_client import RetryableHTTPClient
+from .request_cache import ResponseCache, RequestCoalescer, BatchLoader
 
 logger = logging.getLogger('integration')
 
+CACHE_ENABLED = os.getenv('INTEGRATION_CACHE_ENABLED', 'true').lower() == 'true'
+CACHE_MAX_ENTRIES = int(os.getenv('INTEGRATION_CACHE_MAX_ENTRIES', 2048))
+# 服务不可用时返回已过期的缓存
+STALE_IF_ERROR = os.getenv('INTEGRATION_STALE_IF_ERROR', 'true').lower() == 'true'
+BATCH_WINDOW_MS = float(os.getenv('INTEGRATION_BATCH_WINDOW_MS', 5))
+BATCH_MAX_SIZE = int(os.getenv('INTEGRATION_BATCH_MAX_SIZE', 100))
+# 无批量接口时逐个查询的并发数
+FALLBACK_CONCURRENCY = int(os.getenv('INTEGRATION_FALLBACK_CONCURRENCY', 8))
+
+# 同一服务地址 + Token 的客户端实例共享缓存和请求合并（客户端通常按请求创建）
+_shared_state: Dict[Tuple[str, Optional[str]], Tuple[ResponseCache, RequestCoalescer]] = {}
+_shared_lock = threading.Lock()
+
+
+def _get_shared_state(base_url: str, token: Optional[str]) -> Tuple[ResponseCache, RequestCoalescer]:
+    key = (base_url.rstrip('/'), token)
+    with _shared_lock:
+        state = _shared_state.get(key)
+        if state is None:
+            state = _shared_state[key] = (ResponseCache(CACHE_MAX_ENTRIES), RequestCoalescer())
+        return state
+
+
+def clear_integration_cache():
+    """清空所有集成客户端的响应缓存"""
+    with _shared_lock:
+        for cache, _ in _shared_state.values():
+            cache.invalidate()
+
 
 class BaseIntegrationClient:
     """
@@ -30,6 +67,9 @@ class BaseIntegrationClient:
     DEFAULT_TIMEOUT: int = 10
     DEFAULT_MAX_RETRIES: int = 3
 
+    # GET 响应缓存时间（秒），键为路径通配符，按声明顺序匹配第一条；未匹配的接口不缓存
+    CACHE_TTLS: Dict[str, float] = {}
+
     def __init__(
         self,
         base_url: Optional[str] = None,
@@ -64,33 +104,94 @@ class BaseIntegrationClient:
             default_headers=headers
         )
 
+        self._cache, self._coalescer = _get_shared_state(self.base_url, self.token)
+        self._loaders: Dict[str, BatchLoader] = {}
+
         logger.info(f"[{self.SERVICE_NAME}] 客户端初始化: {self.base_url}")
 
+    # ============ 缓存 ============
+
+    def _cache_ttl(self, path: str) -> float:
+        if not CACHE_ENABLED:
+            return 0
+        for pattern, ttl in self.CACHE_TTLS.items():
+            if fnmatch.fnmatchcase(path, pattern):
+                return ttl
+        return 0
+
+    def invalidate_cache(self, path_prefix: str = ""):
+        """删除本服务的缓存（path_prefix 为空时全部删除）"""
+        self._cache.invalidate(path_prefix)
+
+    def _invalidate_resource(self, path: str):
+        """写操作成功后，删除同一资源（/api/<resource>）下的缓存"""
+        self._cache.invalidate('/'.join(path.split('/')[:3]))
+
     def _get(self, path: str, params: Optional[Dict] = None, **kwargs) -> Dict:
         """
         发送 GET 请求
 
+        同一时刻相同的请求只发一次；CACHE_TTLS 中配置的接口使用响应缓存。
+
         Args:
             path: API 路径
             params: 查询参数
-            **kwargs: 其他参数
+            **kwargs: 其他参数（传入时不缓存、不合并）
 
         Returns:
             响应 JSON 数据
         """
+        if kwargs:
+            return self._fetch(path, params, None, 0, **kwargs)
+
+        key = (path, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+        ttl = self._cache_ttl(path)
+        if ttl:
+            entry = self._cache.get(key)
+            if entry is not None and entry.fresh:
+                return copy.deepcopy(entry.value)
+        return self._coalescer.do(key, lambda: self._fetch(path, params, key, ttl))
+
+    def _fetch(self, path: str, params: Optional[Dict], key, ttl: float, **kwargs) -> Dict:
+        """发送 GET 请求；有过期缓存时带条件请求头，304 时续期并返回缓存"""
+        entry = self._cache.get(key) if ttl else None
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
         try:
-            response = self._client.get(path, params=params, **kwargs)
+            response = self._client.get(path, params=params, headers=headers or None, **kwargs)
+            if response.status_code == 304 and entry is not None:
+                self._cache.refresh(key, ttl)
+                return copy.deepcopy(entry.value)
             response.raise_for_status()
-            return response.json()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            is_server_error = e.response is None or e.response.status_code >= 500
+            if entry is not None and STALE_IF_ERROR and is_server_error:
+                logger.warning(f"[{self.SERVICE_NAME}] GET {path} 失败，返回过期缓存: {e}")
+                return copy.deepcopy(entry.value)
+            logger.error(f"[{self.SERVICE_NAME}] GET {path} 失败: {e}")
+            raise
         except Exception as e:
             logger.error(f"[{self.SERVICE_NAME}] GET {path} 失败: {e}")
             raise
 
+        if ttl:
+            self._cache.set(key, copy.deepcopy(data), ttl,
+                            etag=response.headers.get('ETag'),
+                            last_modified=response.headers.get('Last-Modified'))
+        return data
+
     def _post(self, path: str, data: Optional[Dict] = None, **kwargs) -> Dict:
         """发送 POST 请求"""
         try:
             response = self._client.post(path, json=data, **kwargs)
             response.raise_for_status()
+            self._invalidate_resource(path)
             return response.json()
         except Exception as e:
             logger.error(f"[{self.SERVICE_NAME}] POST {path} 失败: {e}")
@@ -101,6 +202,7 @@ class BaseIntegrationClient:
         try:
             response = self._client.put(path, json=data, **kwargs)
             response.raise_for_status()
+            self._invalidate_resource(path)
             return response.json()
         except Exception as e:
             logger.error(f"[{self.SERVICE_NAME}] PUT {path} 失败: {e}")
@@ -111,6 +213,7 @@ class BaseIntegrationClient:
         try:
             response = self._client.delete(path, **kwargs)
             response.raise_for_status()
+            self._invalidate_resource(path)
             return response.json()
         except Exception as e:
             logger.error(f"[{self.SERVICE_NAME}] DELETE {path} 失败: {e}")
@@ -126,6 +229,80 @@ class BaseIntegrationClient:
             logger.warning(f"[{self.SERVICE_NAME}] safe_get {path} 失败，返回默认值: {e}")
             return default
 
+    # ============ 批量查询 ============
+
+    @staticmethod
+    def _unwrap(result: Any) -> Any:
+        """兼容 {"success": true, "data": {...}} 与直接返回对象两种响应格式"""
+        if isinstance(result, dict) and isinstance(result.get("data"), (dict, list)):
+            return result["data"]
+        return result
+
+    def _get_many(
+        self,
+        batch_path: str,
+        item_path: str,
+        ids: Iterable[Any],
+        id_field: str = "id"
+    ) -> Dict[Any, Optional[Dict]]:
+        """
+        按 ID 批量查询
+
+        先调用批量接口 GET {batch_path}?ids=1,2,3；服务端没有批量接口（404/405）时，
+        记住该结果并回退为并发逐个查询 item_path.format(id=...)。
+
+        Args:
+            batch_path: 批量接口路径
+            item_path: 单个查询路径模板，如 "/api/employees/{id}"
+            ids: ID 列表
+            id_field: 批量接口返回对象中的 ID 字段
+
+        Returns:
+            {id: 对象或 None}，键与传入的 ID 一致
+        """
+        ids = list(dict.fromkeys(i for i in ids if i is not None))
+        if not ids:
+            return {}
+
+        unsupported = self._cache.get(("__no_batch__", batch_path))
+        if unsupported is None or not unsupported.fresh:
+            try:
+                found = {}
+                for i in range(0, len(ids), BATCH_MAX_SIZE):
+                    chunk = ids[i:i + BATCH_MAX_SIZE]
+                    result = self._get(batch_path, params={"ids": ",".join(str(x) for x in chunk)})
+                    items = self._unwrap(result)
+                    if isinstance(items, dict):
+                        items = items.get("items", [])
+                    found.update({str(item.get(id_field)): item for item in items or []})
+                return {i: found.get(str(i)) for i in ids}
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code not in (404, 405):
+                    logger.warning(f"[{self.SERVICE_NAME}] 批量查询 {batch_path} 失败: {e}")
+                    return {i: None for i in ids}
+                logger.info(f"[{self.SERVICE_NAME}] {batch_path} 不支持批量查询，改为逐个查询")
+                self._cache.set(("__no_batch__", batch_path), True, 600)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"[{self.SERVICE_NAME}] 批量查询 {batch_path} 失败: {e}")
+                return {i: None for i in ids}
+
+        def fetch_one(item_id):
+            return self._unwrap(self._safe_get(item_path.format(id=item_id)))
+
+        with ThreadPoolExecutor(max_workers=min(FALLBACK_CONCURRENCY, len(ids))) as pool:
+            return dict(zip(ids, pool.map(fetch_one, ids)))
+
+    def _get_loader(self, batch_path: str, item_path: str, id_field: str = "id") -> BatchLoader:
+        """按 ID 查询的批量加载器：并发的单个查询在短时间窗口内合并为一次批量查询"""
+        loader = self._loaders.get(batch_path)
+        if loader is None:
+            loader = self._loaders[batch_path] = BatchLoader(
+                lambda ids: self._get_many(batch_path, item_path, ids, id_field),
+                max_batch=BATCH_MAX_SIZE,
+                window=BATCH_WINDOW_MS / 1000
+            )
+        return loader
+
     def health_check(self) -> bool:
         """
         健康检查
@@ -38,6 +38,11 @@ class CRMClient(BaseIntegrationClient):
     ENV_URL_KEY = "CRM_API_URL"
     DEFAULT_URL = "http://localhost:8002"
 
+    CACHE_TTLS = {
+        "/api/customers/*": 60,
+        "/api/suppliers/*": 60,
+    }
+
     # ============ 客户相关 API ============
 
     def get_customers(
@@ -100,6 +105,18 @@ class CRMClient(BaseIntegrationClient):
         """
         return self._safe_get(f"/api/customers/{customer_id}")
 
+    def get_customers_by_ids(self, customer_ids: List[int]) -> Dict[int, Optional[Dict]]:
+        """
+        按 ID 批量获取客户
+
+        Args:
+            customer_ids: 客户 ID 列表
+
+        Returns:
+            {客户 ID: 客户信息或 None}
+        """
+        return self._get_many("/api/customers/batch", "/api/customers/{id}", customer_ids)
+
     def get_customer_contacts(self, customer_id: int) -> List[Dict]:
         """
         获取客户联系人列表
@@ -175,6 +192,18 @@ class CRMClient(BaseIntegrationClient):
         """
         return self._safe_get(f"/api/suppliers/{supplier_id}")
 
+    def get_suppliers_by_ids(self, supplier_ids: List[int]) -> Dict[int, Optional[Dict]]:
+        """
+        按 ID 批量获取供应商
+
+        Args:
+            supplier_ids: 供应商 ID 列表
+
+        Returns:
+            {供应商 ID: 供应商信息或 None}
+        """
+        return self._get_many("/api/suppliers/batch", "/api/suppliers/{id}", supplier_ids)
+
     def get_supplier_contacts(self, supplier_id: int) -> List[Dict]:
         """
         获取供应商联系人列表
@@ -38,6 +38,12 @@ class HRClient(BaseIntegrationClient):
     ENV_URL_KEY = "HR_API_URL"
     DEFAULT_URL = "http://localhost:8003"
 
+    CACHE_TTLS = {
+        "/api/departments*": 300,
+        "/api/positions*": 300,
+        "/api/employees/*": 60,
+    }
+
     # 角色到部门/职位的映射
     ROLE_FILTERS = {
         "sales": {"department": "销售", "position_keywords": ["销售", "业务"]},
@@ -113,6 +119,30 @@ class HRClient(BaseIntegrationClient):
         """
         return self._safe_get(f"/api/employees/{employee_id}")
 
+    def get_employees_by_ids(self, employee_ids: List[int]) -> Dict[int, Optional[Dict]]:
+        """
+        按 ID 批量获取员工（一次请求）
+
+        Args:
+            employee_ids: 员工 ID 列表
+
+        Returns:
+            {员工 ID: 员工信息或 None}
+        """
+        return self._get_many("/api/employees/batch", "/api/employees/{id}", employee_ids)
+
+    def load_employee(self, employee_id: int) -> Optional[Dict]:
+        """
+        获取单个员工信息（多线程并发调用时合并为批量查询）
+
+        Args:
+            employee_id: 员工 ID
+
+        Returns:
+            员工信息或 None
+        """
+        return self._get_loader("/api/employees/batch", "/api/employees/{id}").load(employee_id)
+
     def get_employees_by_role(self, role: str, keyword: str = "") -> List[Dict]:
         """
         按角色获取员工列表
@@ -34,6 +34,10 @@ class QuotationClient(BaseIntegrationClient):
     ENV_URL_KEY = "QUOTATION_API_URL"
     DEFAULT_URL = "http://localhost:8001"
 
+    CACHE_TTLS = {
+        "/api/products/*": 120,
+    }
+
     # ============ 产品/品番号相关 API ============
 
     def get_products(
@@ -108,6 +112,18 @@ class QuotationClient(BaseIntegrationClient):
         """
         return self._safe_get(f"/api/products/id/{product_id}")
 
+    def get_products_by_ids(self, product_ids: List[int]) -> Dict[int, Optional[Dict]]:
+        """
+        按 ID 批量获取产品
+
+        Args:
+            product_ids: 产品 ID 列表
+
+        Returns:
+            {产品 ID: 产品详情或 None}
+        """
+        return self._get_many("/api/products/batch", "/api/products/id/{id}", product_ids)
+
     # ============ 工艺相关 API ============
 
     def get_product_processes(self, product_code: str) -> List[Dict]:
@@ -0,0 +1,201 @@
+"""
+集成客户端请求合并与缓存
+
+- ResponseCache: 按接口 TTL 缓存 GET 响应，过期后带 ETag / Last-Modified 条件请求，
+  服务端返回 304 时直接续期
+- RequestCoalescer: 同一时刻相同的请求只发一次，其余调用方等待并共享结果
+- BatchLoader: 把短时间窗口内的单个 ID 查询合并成一次批量查询
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class CacheEntry:
+    """缓存条目"""
+
+    __slots__ = ('value', 'etag', 'last_modified', 'expires_at')
+
+    def __init__(self, value: Any, ttl: float, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = time.time() + ttl
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class ResponseCache:
+    """
+    TTL + LRU 响应缓存（线程安全）
+
+    过期条目不立即删除，保留用于条件请求和服务不可用时的降级返回。
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: Hashable, value: Any, ttl: float, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> CacheEntry:
+        entry = CacheEntry(value, ttl, etag, last_modified)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def refresh(self, key: Hashable, ttl: float):
+        """条件请求命中（304）后续期"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.time() + ttl
+
+    def invalidate(self, path_prefix: str = ""):
+        """删除路径以 path_prefix 开头的条目（键的第一个元素为路径）"""
+        with self._lock:
+            if not path_prefix:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if str(k[0]).startswith(path_prefix)]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """
+    相同请求合并（single-flight）
+
+    第一个调用方执行请求，同一时刻相同 key 的其他调用方等待并拿到同一结果
+    （各自得到一份拷贝，互不影响）。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+
+class _Batch:
+    __slots__ = ('keys', 'full', 'done', 'results', 'error')
+
+    def __init__(self):
+        self.keys: 'OrderedDict[Hashable, None]' = OrderedDict()
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: Dict[Hashable, Any] = {}
+        self.error = None
+
+
+class BatchLoader:
+    """
+    批量加载器
+
+    并发调用 load(key) 时，第一个调用方等待 window 秒（或凑满 max_batch 个 key），
+    然后用一次 batch_fn(keys) 查询所有 key，其余调用方直接取结果。
+
+    batch_fn 接收 key 列表，返回 {key: value}；缺失的 key 返回 None。
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Dict[Hashable, Any]],
+                 max_batch: int = 100, window: float = 0.005):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self._pending: Optional[_Batch] = None
+        self._lock = threading.Lock()
+
+    def load(self, key: Hashable) -> Any:
+        return self.load_many([key]).get(key)
+
+    def load_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        with self._lock:
+            batch = self._pending
+            leader = batch is None
+            if leader:
+                batch = self._pending = _Batch()
+            for key in keys:
+                batch.keys[key] = None
+            if len(batch.keys) >= self.max_batch:
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending is batch:
+                    self._pending = None
+            self._run(batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return {key: batch.results.get(key) for key in keys}
+
+    def _run(self, batch: _Batch):
+        try:
+            pending = list(batch.keys)
+            for i in range(0, len(pending), self.max_batch):
+                batch.results.update(self.batch_fn(pending[i:i + self.max_batch]) or {})
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
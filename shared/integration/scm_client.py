@@ -33,6 +33,12 @@ class SCMClient(BaseIntegrationClient):
     ENV_URL_KEY = "SCM_API_URL"
     DEFAULT_URL = "http://localhost:8005"
 
+    # 库存数量变化频繁，不缓存
+    CACHE_TTLS = {
+        "/api/warehouses*": 300,
+        "/api/inventory/locations*": 300,
+    }
+
     # ============ 库存相关 API ============
 
     def get_inventory(
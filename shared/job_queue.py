@@ -0,0 +1,634 @@
+# shared/job_queue.py
+# -*- coding: utf-8 -*-
+"""
+本地持久化任务队列（SQLite）
+
+长耗时任务（如逐页翻译 PDF）不在 HTTP 请求内执行：请求只负责入队，
+由工作线程/进程领取执行，任务状态写入 SQLite，服务重启或多进程部署都能看到。
+
+一个任务分三步:
+    prepare    拆分为若干子任务（如 PDF 的每一页），每个子任务可带 cache_key
+    unit       子任务并发执行，每完成一个立即写入结果（断点续传）
+    finalize   所有子任务结束后汇总结果（如生成译文 PDF）
+
+- 领取通过 BEGIN IMMEDIATE 原子完成，多个进程可共用同一个数据库文件
+- 领取后持有租约，进程崩溃后租约到期（或检测到本机进程已退出）由其他工作者接管，
+  已完成的子任务不会重做
+- 子任务失败按指数退避重试，超过次数标记失败，由 finalize 决定如何处理
+- cache_key 相同的子任务结果写入缓存：重复上传或重复页面直接命中，
+  同一 cache_key 同时只执行一个，其余等待结果
+- max_running 限制所有进程同时执行的步骤数（如翻译接口的并发上限）
+
+用法:
+    queue = JobQueue('/path/jobs.db')
+    job_id = queue.enqueue('doc_translate', {'pdf_path': ...})
+
+    pool = WorkerPool(queue, {'doc_translate': handler}, concurrency=4)
+    pool.start()
+
+handler 需实现:
+    prepare(job) -> List[UnitSpec]
+    run_unit(job, unit) -> 可 JSON 序列化的结果
+    finalize(job, units) -> 任务结果（units 按 seq 排列，含 status/result/error）
+可选:
+    cleanup(job)            任务结果写入后清理临时文件（写入失败时不调用，重试时文件仍在）
+
+配置:
+    JOB_WORKERS=2               每个进程的工作线程数
+    JOB_MAX_RUNNING=0           所有进程同时执行的步骤上限（0 不限制）
+    JOB_LEASE_SECONDS=900       租约时长，须大于单个步骤的最长耗时
+    JOB_MAX_ATTEMPTS=3          每个步骤的最多尝试次数
+    JOB_RETRY_BACKOFF=5         重试退避基数（秒）
+    JOB_POLL_INTERVAL=1         空闲时轮询间隔（秒）
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_MAX_RUNNING = int(os.getenv('JOB_MAX_RUNNING', 0))
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', 900))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BACKOFF = float(os.getenv('JOB_RETRY_BACKOFF', 5))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+
+# 任务状态
+QUEUED = 'queued'           # 等待拆分
+RUNNING = 'running'         # 子任务执行中
+FINALIZING = 'finalizing'   # 子任务已全部结束，等待汇总
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+# 子任务状态
+PENDING = 'pending'
+DONE = 'done'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT,
+    result TEXT,
+    error TEXT,
+    total_units INTEGER NOT NULL DEFAULT 0,
+    done_units INTEGER NOT NULL DEFAULT 0,
+    failed_units INTEGER NOT NULL DEFAULT 0,
+    cached_units INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_units (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT,
+    cache_key TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS ix_job_units_status ON job_units (status, available_at);
+CREATE INDEX IF NOT EXISTS ix_job_units_cache ON job_units (cache_key, status);
+CREATE TABLE IF NOT EXISTS job_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class UnitSpec(NamedTuple):
+    """prepare 返回的子任务定义"""
+    payload: Any
+    cache_key: Optional[str] = None
+
+
+class Claim(NamedTuple):
+    """领取到的步骤: stage 为 prepare / unit / finalize"""
+    stage: str
+    job: dict
+    unit: Optional[dict] = None
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _loads(value: Optional[str]) -> Any:
+    return None if value is None else json.loads(value)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """SQLite 任务队列（线程安全，每个线程一个连接，可多进程共用）"""
+
+    def __init__(self, path: str, max_running: int = None, lease_seconds: float = None,
+                 max_attempts: int = None, retry_backoff: float = None):
+        self.path = path
+        self.max_running = JOB_MAX_RUNNING if max_running is None else max_running
+        self.lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or JOB_MAX_ATTEMPTS
+        self.retry_backoff = JOB_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self._local = threading.local()
+        self._ready = False
+        self._lock = threading.Lock()
+
+    # ---------- 连接 ----------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    conn.executescript(_SCHEMA)
+                    self._ready = True
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._conn())
+
+    # ---------- 入队与查询 ----------
+
+    def enqueue(self, kind: str, payload: Any = None, job_id: str = None) -> str:
+        job_id = job_id or uuid.uuid4().hex[:12]
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, _dumps(payload), now, now)
+        )
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job_dict(row) if row else None
+
+    def list_jobs(self, kind: str = None, limit: int = 50) -> List[dict]:
+        if kind:
+            rows = self._conn().execute(
+                "SELECT * FROM jobs WHERE kind = ? ORDER BY created_at DESC LIMIT ?", (kind, limit))
+        else:
+            rows = self._conn().execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self._job_dict(row) for row in rows]
+
+    def get_units(self, job_id: str) -> List[dict]:
+        rows = self._conn().execute("SELECT * FROM job_units WHERE job_id = ? ORDER BY seq", (job_id,))
+        return [self._unit_dict(row) for row in rows]
+
+    def wait(self, job_id: str, timeout: float = None, interval: float = 0.05) -> Optional[dict]:
+        """等待任务结束（完成或失败），超时返回当前状态"""
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            job = self.get_job(job_id)
+            if job is None or job['status'] in (COMPLETED, FAILED):
+                return job
+            if deadline and time.time() >= deadline:
+                return job
+            time.sleep(interval)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        jobs = dict(conn.execute("SELECT status, count(*) FROM jobs GROUP BY status").fetchall())
+        units = dict(conn.execute("SELECT status, count(*) FROM job_units GROUP BY status").fetchall())
+        cache = conn.execute("SELECT count(*), coalesce(sum(hits), 0) FROM job_cache").fetchone()
+        return {'jobs': jobs, 'units': units, 'cache_entries': cache[0], 'cache_hits': cache[1]}
+
+    @staticmethod
+    def _job_dict(row) -> dict:
+        job = dict(row)
+        job['payload'] = _loads(job['payload'])
+        job['result'] = _loads(job['result'])
+        total = job['total_units']
+        finished = job['done_units'] + job['failed_units']
+        # 汇总完成前最多显示 99%
+        job['progress'] = 100 if job['status'] == COMPLETED else (min(99, finished * 100 // total) if total else 0)
+        return job
+
+    @staticmethod
+    def _unit_dict(row) -> dict:
+        unit = dict(row)
+        unit['payload'] = _loads(unit['payload'])
+        unit['result'] = _loads(unit['result'])
+        return unit
+
+    # ---------- 缓存 ----------
+
+    def cache_get(self, key: str) -> Any:
+        conn = self._conn()
+        row = conn.execute("SELECT value FROM job_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE job_cache SET hits = hits + 1 WHERE key = ?", (key,))
+        return _loads(row['value'])
+
+    def cache_put(self, key: str, value: Any):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO job_cache (key, value, hits, created_at) VALUES (?, ?, 0, ?)",
+            (key, _dumps(value), time.time())
+        )
+
+    # ---------- 领取 ----------
+
+    def claim(self, worker_id: str, kinds: List[str] = None) -> Optional[Claim]:
+        """领取一个待执行步骤：优先汇总和已开始任务的子任务，再拆分新任务"""
+        now = time.time()
+        kind_filter, kind_args = '', ()
+        if kinds:
+            kind_filter = f" AND j.kind IN ({', '.join('?' * len(kinds))})"
+            kind_args = tuple(kinds)
+
+        with self._transaction() as conn:
+            if self.max_running:
+                busy = conn.execute(
+                    "SELECT (SELECT count(*) FROM job_units WHERE status = 'running' AND lease_until >= ?)"
+                    " + (SELECT count(*) FROM jobs WHERE lease_until >= ?)", (now, now)
+                ).fetchone()[0]
+                if busy >= self.max_running:
+                    return None
+
+            lease = (worker_id, now + self.lease_seconds, now)
+
+            # 反复在执行中崩溃（租约到期且次数用尽）的子任务标记失败
+            stuck = conn.execute(
+                "SELECT DISTINCT job_id FROM job_units WHERE status = 'running' AND lease_until < ?"
+                " AND attempts >= ?", (now, self.max_attempts)
+            ).fetchall()
+            if stuck:
+                conn.execute(
+                    "UPDATE job_units SET status = ?, error = 'lease expired', lease_owner = NULL,"
+                    " lease_until = NULL, updated_at = ? WHERE status = 'running' AND lease_until < ?"
+                    " AND attempts >= ?", (FAILED, now, now, self.max_attempts)
+                )
+                for row in stuck:
+                    self._refresh_counts(conn, row['job_id'])
+
+            # 拆分或汇总反复崩溃（租约到期且次数用尽）的任务标记失败
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'lease expired', lease_owner = NULL, lease_until = NULL,"
+                " updated_at = ?, finished_at = ? WHERE status IN (?, ?) AND lease_until < ? AND attempts >= ?",
+                (FAILED, now, now, QUEUED, FINALIZING, now, self.max_attempts)
+            )
+
+            # 1. 汇总
+            row = conn.execute(
+                f"SELECT j.* FROM jobs j WHERE j.status = '{FINALIZING}' AND j.available_at <= ?"
+                f" AND (j.lease_until IS NULL OR j.lease_until < ?){kind_filter}"
+                f" ORDER BY j.created_at LIMIT 1", (now, now) + kind_args
+            ).fetchone()
+            if row:
+                return Claim('finalize', self._lease_job(conn, row, lease))
+
+            # 2. 子任务（同一 cache_key 正在执行时跳过，等待其结果）
+            row = conn.execute(
+                f"SELECT u.* FROM job_units u JOIN jobs j ON j.id = u.job_id"
+                f" WHERE j.status = '{RUNNING}'{kind_filter}"
+                f" AND ((u.status = '{PENDING}' AND u.available_at <= ?)"
+                f"      OR (u.status = 'running' AND u.lease_until < ?))"
+                f" AND (u.cache_key IS NULL OR NOT EXISTS ("
+                f"      SELECT 1 FROM job_units r WHERE r.cache_key = u.cache_key"
+                f"      AND r.status = 'running' AND r.lease_until >= ?))"
+                f" ORDER BY j.created_at, u.seq LIMIT 1", kind_args + (now, now, now)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE job_units SET status = 'running', attempts = attempts + 1, lease_owner = ?,"
+                    " lease_until = ?, updated_at = ? WHERE job_id = ? AND seq = ?",
+                    lease + (row['job_id'], row['seq'])
+                )
+                unit = self._unit_dict(row)
+                unit['attempts'] += 1
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row['job_id'],)).fetchone()
+                return Claim('unit', self._job_dict(job), unit)
+
+            # 3. 拆分新任务
+            row = conn.execute(
+                f"SELECT j.* FROM jobs j WHERE j.status = '{QUEUED}' AND j.available_at <= ?"
+                f" AND (j.lease_until IS NULL OR j.lease_until < ?){kind_filter}"
+                f" ORDER BY j.created_at LIMIT 1", (now, now) + kind_args
+            ).fetchone()
+            if row:
+                return Claim('prepare', self._lease_job(conn, row, lease))
+        return None
+
+    def _lease_job(self, conn, row, lease) -> dict:
+        conn.execute(
+            "UPDATE jobs SET attempts = attempts + 1, lease_owner = ?, lease_until = ?, updated_at = ?"
+            " WHERE id = ?", lease + (row['id'],)
+        )
+        job = self._job_dict(row)
+        job['attempts'] += 1
+        return job
+
+    def release_dead_leases(self) -> int:
+        """本机已退出进程持有的租约立即过期（重启后无需等待租约到期）"""
+        prefix = f"{socket.gethostname()}:"
+        released = 0
+        with self._transaction() as conn:
+            for table in ('jobs', 'job_units'):
+                owners = [r[0] for r in conn.execute(
+                    f"SELECT DISTINCT lease_owner FROM {table} WHERE lease_owner LIKE ? AND lease_until >= ?",
+                    (prefix + '%', time.time())
+                )]
+                for owner in owners:
+                    pid = owner[len(prefix):].split(':', 1)[0]
+                    if pid.isdigit() and not _pid_alive(int(pid)):
+                        released += conn.execute(
+                            f"UPDATE {table} SET lease_until = 0 WHERE lease_owner = ?", (owner,)
+                        ).rowcount
+        return released
+
+    # ---------- 提交结果 ----------
+
+    def complete_prepare(self, job_id: str, worker_id: str, units: List[UnitSpec]) -> bool:
+        """写入子任务；已有缓存结果的子任务直接完成"""
+        now = time.time()
+        with self._transaction() as conn:
+            if not self._owns_job(conn, job_id, worker_id, QUEUED):
+                return False
+            conn.execute("DELETE FROM job_units WHERE job_id = ?", (job_id,))
+            cached = 0
+            for seq, spec in enumerate(units):
+                spec = spec if isinstance(spec, UnitSpec) else UnitSpec(*spec)
+                hit = None
+                if spec.cache_key:
+                    hit = conn.execute("SELECT value FROM job_cache WHERE key = ?", (spec.cache_key,)).fetchone()
+                if hit:
+                    conn.execute("UPDATE job_cache SET hits = hits + 1 WHERE key = ?", (spec.cache_key,))
+                    cached += 1
+                conn.execute(
+                    "INSERT INTO job_units (job_id, seq, status, payload, cache_key, result, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, seq, DONE if hit else PENDING, _dumps(spec.payload), spec.cache_key,
+                     hit['value'] if hit else None, now)
+                )
+            conn.execute(
+                "UPDATE jobs SET status = ?, total_units = ?, cached_units = ?, attempts = 0,"
+                " lease_owner = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (RUNNING, len(units), cached, now, job_id)
+            )
+            self._refresh_counts(conn, job_id)
+        return True
+
+    def complete_unit(self, job_id: str, seq: int, worker_id: str, result: Any) -> bool:
+        """子任务完成（检查点）；相同 cache_key 的等待中子任务一并完成"""
+        now = time.time()
+        value = _dumps(result)
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT cache_key FROM job_units WHERE job_id = ? AND seq = ? AND status = 'running'"
+                " AND lease_owner = ?", (job_id, seq, worker_id)
+            ).fetchone()
+            if row is None:
+                return False  # 租约已被接管
+            conn.execute(
+                "UPDATE job_units SET status = ?, result = ?, error = NULL, lease_owner = NULL,"
+                " lease_until = NULL, updated_at = ? WHERE job_id = ? AND seq = ?",
+                (DONE, value, now, job_id, seq)
+            )
+            affected = {job_id}
+            cache_key = row['cache_key']
+            if cache_key:
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_cache (key, value, hits, created_at) VALUES (?, ?, 0, ?)",
+                    (cache_key, value, now)
+                )
+                waiting = conn.execute(
+                    "SELECT job_id, seq FROM job_units WHERE cache_key = ? AND status = ?",
+                    (cache_key, PENDING)
+                ).fetchall()
+                for other in waiting:
+                    conn.execute(
+                        "UPDATE job_units SET status = ?, result = ?, updated_at = ? WHERE job_id = ? AND seq = ?",
+                        (DONE, value, now, other['job_id'], other['seq'])
+                    )
+                    conn.execute("UPDATE job_cache SET hits = hits + 1 WHERE key = ?", (cache_key,))
+                    conn.execute("UPDATE jobs SET cached_units = cached_units + 1 WHERE id = ?", (other['job_id'],))
+                    affected.add(other['job_id'])
+            for affected_id in affected:
+                self._refresh_counts(conn, affected_id)
+        return True
+
+    def fail_unit(self, job_id: str, seq: int, worker_id: str, error: str) -> bool:
+        """子任务失败：未超过次数时退避后重试，否则标记失败"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM job_units WHERE job_id = ? AND seq = ? AND status = 'running'"
+                " AND lease_owner = ?", (job_id, seq, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            attempts = row['attempts']
+            if attempts >= self.max_attempts:
+                status, available_at = FAILED, 0
+            else:
+                status, available_at = PENDING, now + self.retry_backoff * 2 ** (attempts - 1)
+            conn.execute(
+                "UPDATE job_units SET status = ?, error = ?, available_at = ?, lease_owner = NULL,"
+                " lease_until = NULL, updated_at = ? WHERE job_id = ? AND seq = ?",
+                (status, str(error)[:2000], available_at, now, job_id, seq)
+            )
+            self._refresh_counts(conn, job_id)
+        return True
+
+    def complete_job(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            if not self._owns_job(conn, job_id, worker_id, FINALIZING):
+                return False
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_until = NULL,"
+                " updated_at = ?, finished_at = ? WHERE id = ?",
+                (COMPLETED, _dumps(result), now, now, job_id)
+            )
+        return True
+
+    def fail_job(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """拆分或汇总失败：未超过次数时退避后重试，否则任务失败"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            if retry and row['attempts'] < self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET error = ?, available_at = ?, lease_owner = NULL, lease_until = NULL,"
+                    " updated_at = ? WHERE id = ?",
+                    (str(error)[:2000], now + self.retry_backoff * 2 ** (row['attempts'] - 1), now, job_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_until = NULL,"
+                    " updated_at = ?, finished_at = ? WHERE id = ?",
+                    (FAILED, str(error)[:2000], now, now, job_id)
+                )
+        return True
+
+    @staticmethod
+    def _owns_job(conn, job_id: str, worker_id: str, status: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?", (job_id, status, worker_id)
+        ).fetchone() is not None
+
+    @staticmethod
+    def _refresh_counts(conn, job_id: str):
+        counts = dict(conn.execute(
+            "SELECT status, count(*) FROM job_units WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall())
+        done, failed = counts.get(DONE, 0), counts.get(FAILED, 0)
+        conn.execute(
+            "UPDATE jobs SET done_units = ?, failed_units = ?, updated_at = ?,"
+            " status = CASE WHEN status = ? AND ? >= total_units THEN ? ELSE status END WHERE id = ?",
+            (done, failed, time.time(), RUNNING, done + failed, FINALIZING, job_id)
+        )
+
+    # ---------- 维护 ----------
+
+    def purge(self, older_than: float) -> int:
+        """删除早于 older_than 秒前结束的任务记录（缓存保留）"""
+        cutoff = time.time() - older_than
+        with self._transaction() as conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (COMPLETED, FAILED, cutoff)
+            )]
+            for job_id in ids:
+                conn.execute("DELETE FROM job_units WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE 写事务（领取与提交在多进程间串行）"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+class WorkerPool:
+    """
+    工作线程池：每个线程循环领取并执行步骤
+
+    步骤耗时主要在外部调用（子进程、HTTP）上，线程即可并发；
+    需要更多并发时可再启动独立的 worker 进程，共用同一个队列文件。
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Any], concurrency: int = None,
+                 poll_interval: float = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency or JOB_WORKERS
+        self.poll_interval = JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        if self.running:
+            return
+        released = self.queue.release_dead_leases()
+        if released:
+            logger.info(f"[JobQueue] 接管已退出进程的 {released} 个步骤")
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, args=(self._worker_id(i),), name=f'job-worker-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @staticmethod
+    def _worker_id(index: int) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{index}:{uuid.uuid4().hex[:6]}"
+
+    def _loop(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                worked = self.run_once(worker_id)
+            except Exception as e:
+                logger.error(f"[JobQueue] 工作线程异常: {e}")
+                worked = False
+            if not worked:
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self, worker_id: str) -> bool:
+        """领取并执行一个步骤，无可执行步骤时返回 False"""
+        claim = self.queue.claim(worker_id, list(self.handlers))
+        if claim is None:
+            return False
+        job = claim.job
+        handler = self.handlers[job['kind']]
+        try:
+            if claim.stage == 'prepare':
+                self.queue.complete_prepare(job['id'], worker_id, handler.prepare(job))
+            elif claim.stage == 'unit':
+                result = handler.run_unit(job, claim.unit)
+                self.queue.complete_unit(job['id'], claim.unit['seq'], worker_id, result)
+            else:
+                result = handler.finalize(job, self.queue.get_units(job['id']))
+                if self.queue.complete_job(job['id'], worker_id, result) and hasattr(handler, 'cleanup'):
+                    handler.cleanup(job)
+        except Exception as e:
+            logger.warning(f"[JobQueue] {job['kind']} {job['id']} {claim.stage} 失败: {e}")
+            if claim.stage == 'unit':
+                self.queue.fail_unit(job['id'], claim.unit['seq'], worker_id, str(e))
+            else:
+                self.queue.fail_job(job['id'], worker_id, str(e))
+        return True
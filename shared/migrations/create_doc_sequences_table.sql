@@ -0,0 +1,12 @@
+-- 单据编号计数器表（shared/sequence.py）
+-- 按 (名称, 周期) 保存已分配的最大流水号，例如 ('TR', '20251027')
+-- 各系统共用同一数据库时只需执行一次；未执行时 get_allocator 首次获取会在独立连接上建表
+
+CREATE TABLE IF NOT EXISTS doc_sequences (
+    name VARCHAR(64) NOT NULL COMMENT '序列名称（单号前缀）',
+    period VARCHAR(16) NOT NULL DEFAULT '' COMMENT '周期键，如 20251027',
+    value BIGINT NOT NULL DEFAULT 0 COMMENT '已分配的最大流水号',
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+
+    PRIMARY KEY (name, period)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='单据编号计数器';
@@ -10,9 +10,34 @@ P1-10: 分页参数验证工具
 
     # 方式2：验证已有参数
     page = validate_pagination(page, per_page)
+
+    # 方式3：游标（keyset）分页，深分页性能不随页码下降
+    cursor, direction, per_page = get_cursor_params()
+    result = KeysetPaginator(
+        AuditLog.query.filter(...),
+        order_by=[(AuditLog.created_at, 'desc'), (AuditLog.id, 'desc')],
+        per_page=per_page,
+        total_mode='cached'
+    ).paginate(cursor, direction)
+    return jsonify(paginated_response(
+        [r.to_dict() for r in result.items], result.total,
+        per_page=result.per_page, cursor_page=result
+    ))
 """
 
+import os
+import json
+import hmac
+import time
+import base64
+import hashlib
+import threading
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+
 from flask import request
+from sqlalchemy import and_, or_, func, select
 
 
 # 默认配置
@@ -150,3 +175,298 @@ def make_pagination_response(items, total: int, page: int, per_page: int) -> dic
             'has_next': page < total_pages
         }
     }
+
+
+# ==================== 游标（keyset）分页 ====================
+
+CURSOR_SECRET = os.getenv('PAGINATION_CURSOR_SECRET') or os.getenv(
+    'JWT_SECRET_KEY', 'jzc-dev-shared-secret-key-2025'
+)
+COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 60))  # 缓存总数有效期（秒）
+APPROXIMATE_COUNT_CAP = int(os.getenv('PAGINATION_APPROXIMATE_COUNT_CAP', 10000))
+
+DIRECTION_NEXT = 'next'
+DIRECTION_PREV = 'prev'
+
+
+class InvalidCursorError(ValueError):
+    """游标格式错误、签名不匹配或与排序列不一致"""
+
+
+def _encode_cursor_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'$dec': str(value)}
+    return value
+
+
+def _decode_cursor_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if '$dt' in value:
+            return datetime.fromisoformat(value['$dt'])
+        if '$d' in value:
+            return date.fromisoformat(value['$d'])
+        if '$dec' in value:
+            return Decimal(value['$dec'])
+    return value
+
+
+def _sign(payload: bytes) -> str:
+    digest = hmac.new(CURSOR_SECRET.encode(), payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip('=')
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    将排序列取值编码为不透明的签名游标
+
+    Args:
+        values: 边界行的排序列取值（与 order_by 顺序一致）
+
+    Returns:
+        str: URL 安全的游标字符串
+    """
+    payload = json.dumps(
+        [_encode_cursor_value(v) for v in values], separators=(',', ':'), ensure_ascii=False
+    ).encode()
+    body = base64.urlsafe_b64encode(payload).decode().rstrip('=')
+    return f"{body}.{_sign(payload)}"
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    解码并校验游标
+
+    Raises:
+        InvalidCursorError: 游标被篡改或格式错误
+    """
+    try:
+        body, signature = cursor.split('.', 1)
+        payload = base64.urlsafe_b64decode(body + '=' * (-len(body) % 4))
+    except (ValueError, AttributeError) as e:
+        raise InvalidCursorError('无效的分页游标') from e
+
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidCursorError('分页游标签名无效')
+
+    try:
+        values = json.loads(payload)
+    except ValueError as e:
+        raise InvalidCursorError('无效的分页游标') from e
+    if not isinstance(values, list):
+        raise InvalidCursorError('无效的分页游标')
+    return [_decode_cursor_value(v) for v in values]
+
+
+def get_cursor_params(
+    default_per_page: int = DEFAULT_PER_PAGE,
+    max_per_page: int = MAX_PER_PAGE,
+    cursor_param: str = 'cursor'
+) -> tuple:
+    """
+    从 Flask request.args 获取游标分页参数
+
+    Returns:
+        tuple: (cursor, direction, per_page)
+    """
+    cursor = request.args.get(cursor_param) or None
+    direction = request.args.get('direction', DIRECTION_NEXT)
+    if direction not in (DIRECTION_NEXT, DIRECTION_PREV):
+        direction = DIRECTION_NEXT
+    _, per_page = validate_pagination(DEFAULT_PAGE, request.args.get(
+        'per_page', request.args.get('page_size', request.args.get('pageSize', default_per_page))
+    ), max_per_page)
+    return cursor, direction, per_page
+
+
+class CursorPage:
+    """游标分页结果"""
+
+    def __init__(self, items: list, per_page: int, next_cursor: Optional[str],
+                 prev_cursor: Optional[str], has_next: bool, has_prev: bool,
+                 total: Optional[int] = None, total_is_estimate: bool = False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+    def pagination_meta(self) -> dict:
+        """供 paginated_response 合并的游标分页信息"""
+        return {
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'has_next': self.has_next,
+            'has_prev': self.has_prev,
+            'total_is_estimate': self.total_is_estimate,
+        }
+
+
+# 进程内总数缓存: {key: (total, timestamp)}
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+
+class KeysetPaginator:
+    """
+    游标（keyset）分页器
+
+    使用 WHERE (排序列) > (上一页边界值) 代替 OFFSET，任意深度的页面都只扫描
+    per_page + 1 行，配合排序列上的索引延迟基本恒定。
+
+    约束:
+    - order_by 的最后一列必须唯一（通常为主键），保证顺序确定
+    - 排序列不能为 NULL
+    - 查询结果必须是 ORM 实体（通过列属性名从实体取边界值）
+    """
+
+    def __init__(
+        self,
+        query,
+        order_by: Sequence[Tuple[Any, str]],
+        per_page: int = DEFAULT_PER_PAGE,
+        total_mode: Optional[str] = None,
+        count_cache_key: Optional[str] = None
+    ):
+        """
+        Args:
+            query: SQLAlchemy Query（未排序、未分页）
+            order_by: [(列, 'asc'|'desc'), ...]
+            per_page: 每页数量
+            total_mode: 总数统计方式
+                None          不统计
+                'exact'       COUNT(*)，每次请求都执行
+                'cached'      COUNT(*) 结果在进程内缓存 COUNT_CACHE_TTL 秒
+                'approximate' 最多统计 APPROXIMATE_COUNT_CAP 行，超出时返回上限并标记为估算
+            count_cache_key: 'cached' 模式的缓存键，默认使用查询语句和参数的哈希
+        """
+        if not order_by:
+            raise ValueError('order_by 不能为空')
+        for _, order in order_by:
+            if order not in ('asc', 'desc'):
+                raise ValueError(f'无效的排序方向: {order}')
+        if total_mode not in (None, 'exact', 'cached', 'approximate'):
+            raise ValueError(f'无效的总数统计方式: {total_mode}')
+
+        self.query = query
+        self.order_by = list(order_by)
+        self.per_page = max(MIN_PER_PAGE, min(int(per_page), MAX_PER_PAGE))
+        self.total_mode = total_mode
+        self.count_cache_key = count_cache_key
+
+    def _row_values(self, item) -> list:
+        return [getattr(item, column.key) for column, _ in self.order_by]
+
+    def _seek_condition(self, values: list, reverse: bool):
+        """
+        构造 "位于边界之后" 的条件（支持混合排序方向）:
+            c1 > v1 OR (c1 = v1 AND c2 > v2) OR ...
+        另加首列范围条件，便于数据库使用索引做范围扫描
+        """
+        clauses = []
+        for i, (column, order) in enumerate(self.order_by):
+            ascending = (order == 'asc') != reverse
+            prefix = [self.order_by[j][0] == values[j] for j in range(i)]
+            step = column > values[i] if ascending else column < values[i]
+            clauses.append(and_(*prefix, step))
+
+        first_column, first_order = self.order_by[0]
+        first_ascending = (first_order == 'asc') != reverse
+        leading = first_column >= values[0] if first_ascending else first_column <= values[0]
+        return and_(leading, or_(*clauses))
+
+    def _ordering(self, reverse: bool) -> list:
+        clauses = []
+        for column, order in self.order_by:
+            ascending = (order == 'asc') != reverse
+            clauses.append(column.asc() if ascending else column.desc())
+        return clauses
+
+    def _count(self) -> Tuple[Optional[int], bool]:
+        if self.total_mode is None:
+            return None, False
+
+        if self.total_mode == 'approximate':
+            limited = self.query.order_by(None).limit(APPROXIMATE_COUNT_CAP + 1).subquery()
+            total = self.query.session.execute(
+                select(func.count()).select_from(limited)
+            ).scalar()
+            if total > APPROXIMATE_COUNT_CAP:
+                return APPROXIMATE_COUNT_CAP, True
+            return total, False
+
+        if self.total_mode == 'cached':
+            key = self.count_cache_key or self._default_count_key()
+            now = time.time()
+            with _count_cache_lock:
+                cached = _count_cache.get(key)
+            if cached and now - cached[1] < COUNT_CACHE_TTL:
+                return cached[0], True
+            total = self.query.order_by(None).count()
+            with _count_cache_lock:
+                _count_cache[key] = (total, now)
+                # 防止缓存无限增长
+                if len(_count_cache) > 1000:
+                    expired = [k for k, v in _count_cache.items() if now - v[1] >= COUNT_CACHE_TTL]
+                    for k in expired:
+                        del _count_cache[k]
+            return total, False
+
+        return self.query.order_by(None).count(), False
+
+    def _default_count_key(self) -> str:
+        statement = self.query.statement.compile(compile_kwargs={'literal_binds': False})
+        raw = f"{statement}|{sorted((k, str(v)) for k, v in statement.params.items())}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def paginate(self, cursor: Optional[str] = None, direction: str = DIRECTION_NEXT) -> CursorPage:
+        """
+        获取一页数据
+
+        Args:
+            cursor: 上一次返回的 next_cursor / prev_cursor；为空表示第一页
+            direction: 'next' 向后翻页，'prev' 向前翻页
+
+        Raises:
+            InvalidCursorError: 游标无效
+        """
+        reverse = direction == DIRECTION_PREV
+        query = self.query
+
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(self.order_by):
+                raise InvalidCursorError('分页游标与排序列不匹配')
+            query = query.filter(self._seek_condition(values, reverse))
+
+        rows = query.order_by(*self._ordering(reverse)).limit(self.per_page + 1).all()
+        has_more = len(rows) > self.per_page
+        items = rows[:self.per_page]
+        if reverse:
+            items.reverse()
+
+        if reverse:
+            has_prev, has_next = has_more, bool(cursor)
+        else:
+            has_prev, has_next = bool(cursor), has_more
+
+        next_cursor = encode_cursor(self._row_values(items[-1])) if items and has_next else None
+        prev_cursor = encode_cursor(self._row_values(items[0])) if items and has_prev else None
+        total, is_estimate = self._count()
+
+        return CursorPage(
+            items=items,
+            per_page=self.per_page,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            has_next=has_next,
+            has_prev=has_prev,
+            total=total,
+            total_is_estimate=is_estimate
+        )
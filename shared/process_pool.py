@@ -0,0 +1,490 @@
+# shared/process_pool.py
+# -*- coding: utf-8 -*-
+"""
+常驻进程工作池
+
+OCR 等任务的模型加载要几秒，每个请求起一个子进程（解释器启动 + 加载模型）
+代价远大于识别本身。这里启动固定数量的常驻工作进程，模型只在进程启动时加载一次，
+之后任务通过管道派发:
+
+- 每个工作进程同一时间只处理一个任务，多余的任务在队列中等待
+- 单个任务超时时结束该工作进程并立即重启（重新预热），调用方收到 JobTimeout
+- 工作进程崩溃时同样重启，调用方收到 WorkerError
+- 处理完 max_jobs 个任务或常驻内存超过 max_rss_mb 时回收工作进程，防止内存持续增长
+- stats() 给出队列深度、排队/执行耗时分位数、超时和回收次数
+
+多个 Web 进程（gunicorn workers）共用一个工作池时，用 PoolServer 在本机 Unix socket
+（Windows 上为 127.0.0.1 端口，需 authkey）上提供服务，Web 进程通过 PoolClient 调用，
+模型只加载一份。
+
+用法:
+    pool = ProcessPool('services.ocr_worker:recognize', size=2,
+                       initializer='services.ocr_worker:load_engine').start()
+    result = pool.run(image_path, timeout=30)
+
+    PoolServer(pool, '/tmp/ocr.sock').serve_forever()     # 独立进程
+    PoolClient('/tmp/ocr.sock').run(image_path)            # Web 进程
+
+target / initializer 为 "模块:函数" 字符串，在工作进程（spawn 方式启动）中导入。
+"""
+
+import os
+import sys
+import time
+import queue
+import socket
+import logging
+import importlib
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+POOL_START_TIMEOUT = float(os.getenv('POOL_START_TIMEOUT', 300))
+POOL_LATENCY_WINDOW = int(os.getenv('POOL_LATENCY_WINDOW', 1000))
+
+_STOP = object()
+
+
+class JobTimeout(TimeoutError):
+    """任务执行超时（工作进程已被结束并重启）"""
+
+
+class WorkerError(RuntimeError):
+    """任务在工作进程中出错、工作进程崩溃或无法启动"""
+
+
+def _resolve(ref: str):
+    module, _, name = ref.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def _rss_mb() -> Optional[float]:
+    """当前进程常驻内存（MB）"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1048576
+    except Exception:
+        return None
+
+
+def _worker_main(conn, target: str, initializer: Optional[str], init_args: tuple):
+    """工作进程入口：预热一次，然后逐个处理任务"""
+    try:
+        if initializer:
+            _resolve(initializer)(*init_args)
+        handler = _resolve(target)
+    except BaseException as e:
+        conn.send(('init_error', f'{type(e).__name__}: {e}', None))
+        return
+    conn.send(('ready', None, _rss_mb()))
+
+    while True:
+        try:
+            payload = conn.recv()
+        except (EOFError, OSError):
+            return
+        if payload is None:
+            return
+        try:
+            message = ('ok', handler(payload), _rss_mb())
+        except Exception as e:
+            message = ('error', f'{type(e).__name__}: {e}', _rss_mb())
+        try:
+            conn.send(message)
+        except Exception as e:  # 结果无法序列化
+            conn.send(('error', f'结果无法序列化: {e}', _rss_mb()))
+
+
+class _Job:
+    __slots__ = ('payload', 'timeout', 'future', 'submitted_at')
+
+    def __init__(self, payload, timeout, future):
+        self.payload = payload
+        self.timeout = timeout
+        self.future = future
+        self.submitted_at = time.monotonic()
+
+
+class _Slot:
+    """一个工作进程及其派发线程"""
+
+    def __init__(self, pool: 'ProcessPool', index: int):
+        self.pool = pool
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.jobs = 0
+        self.rss_mb = None
+        self.busy = False
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name=f'process-pool-{index}', daemon=True)
+
+    def _spawn(self):
+        pool = self.pool
+        parent, child = pool._context.Pipe()
+        process = pool._context.Process(
+            target=_worker_main, args=(child, pool.target, pool.initializer, pool.init_args),
+            name=f'{pool.name}-{self.index}', daemon=True)
+        process.start()
+        child.close()
+        if not parent.poll(pool.start_timeout):
+            self._kill(process, parent)
+            raise WorkerError(f'工作进程 {pool.start_timeout:.0f} 秒内未完成启动')
+        try:
+            status, message, rss = parent.recv()
+        except (EOFError, OSError):
+            self._kill(process, parent)
+            raise WorkerError(f'工作进程启动时退出 (exitcode={process.exitcode})')
+        if status != 'ready':
+            self._kill(process, parent)
+            raise WorkerError(f'工作进程初始化失败: {message}')
+        self.process, self.conn, self.jobs, self.rss_mb = process, parent, 0, rss
+
+    @staticmethod
+    def _kill(process, conn):
+        if process.is_alive():
+            process.kill()
+        process.join(5)
+        conn.close()
+
+    def _retire(self, graceful=True):
+        process, conn = self.process, self.conn
+        self.process = self.conn = None
+        if process is None:
+            return
+        if graceful:
+            try:
+                conn.send(None)
+                process.join(5)
+            except OSError:
+                pass
+        self._kill(process, conn)
+
+    def _restart(self):
+        """重启工作进程；初始化失败时标记工作池不可用"""
+        try:
+            self._spawn()
+        except WorkerError as e:
+            logger.error(f"[ProcessPool] {self.pool.name} 工作进程启动失败: {e}")
+            self.pool._broken = str(e)
+
+    def _loop(self):
+        self._restart()
+        self.ready.set()
+        while True:
+            job = self.pool._jobs.get()
+            if job is _STOP:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            if self.process is None:
+                self._restart()
+            if self.process is None:
+                self.pool._finish(job, error=WorkerError(self.pool._broken or '工作进程不可用'))
+                continue
+            self.busy = True
+            try:
+                self._run(job)
+            finally:
+                self.busy = False
+        self._retire()
+
+    def _run(self, job: _Job):
+        pool = self.pool
+        started = time.monotonic()
+        try:
+            self.conn.send(job.payload)
+            if not self.conn.poll(job.timeout):
+                logger.warning(f"[ProcessPool] {pool.name}-{self.index} 任务超时 ({job.timeout}s)，重启工作进程")
+                self._retire(graceful=False)
+                pool._count('timeouts')
+                pool._finish(job, started, error=JobTimeout(f'任务执行超过 {job.timeout} 秒'))
+                self._restart()
+                return
+            status, value, self.rss_mb = self.conn.recv()
+        except (EOFError, OSError) as e:
+            exitcode = self.process.exitcode if self.process else None
+            logger.error(f"[ProcessPool] {pool.name}-{self.index} 工作进程异常退出 (exitcode={exitcode}): {e}")
+            self._retire(graceful=False)
+            pool._count('crashed')
+            pool._finish(job, started, error=WorkerError(f'工作进程异常退出 (exitcode={exitcode})'))
+            self._restart()
+            return
+
+        self.jobs += 1
+        reason = None
+        if pool.max_jobs and self.jobs >= pool.max_jobs:
+            reason = f'已处理 {self.jobs} 个任务'
+        elif pool.max_rss_mb and self.rss_mb and self.rss_mb > pool.max_rss_mb:
+            reason = f'内存 {self.rss_mb:.0f} MB 超过 {pool.max_rss_mb:.0f} MB'
+        if reason:
+            pool._count('recycled')  # 先计数再返回结果，调用方看到的统计与结果一致
+
+        if status == 'ok':
+            pool._finish(job, started, result=value)
+        else:
+            pool._finish(job, started, error=WorkerError(value))
+
+        if reason:
+            logger.info(f"[ProcessPool] {pool.name}-{self.index} 回收工作进程: {reason}")
+            self._retire()
+            self._restart()
+
+
+def _percentiles(values) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'max': round(ordered[-1] * 1000, 1)}
+
+
+class ProcessPool:
+    """常驻进程工作池"""
+
+    def __init__(self, target: str, size: int = 1, initializer: Optional[str] = None, init_args: tuple = (),
+                 timeout: float = 60, max_jobs: int = 0, max_rss_mb: float = 0,
+                 start_timeout: float = POOL_START_TIMEOUT, name: str = 'pool'):
+        """
+        Args:
+            target: 任务处理函数 "模块:函数"，参数为 payload，返回值须可 pickle
+            size: 工作进程数
+            initializer: 工作进程启动时执行一次的函数（如加载模型）
+            timeout: 默认单任务超时（秒）
+            max_jobs: 每个工作进程处理多少个任务后回收（0 不限制）
+            max_rss_mb: 工作进程常驻内存超过该值时回收（0 不限制）
+        """
+        self.target = target
+        self.size = max(1, size)
+        self.initializer = initializer
+        self.init_args = tuple(init_args)
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.start_timeout = start_timeout
+        self.name = name
+        self._context = multiprocessing.get_context('spawn')
+        self._jobs = queue.Queue()
+        self._slots = []
+        self._broken = None
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ('submitted', 'completed', 'failed', 'timeouts', 'crashed', 'recycled'), 0)
+        self._wait_times = deque(maxlen=POOL_LATENCY_WINDOW)
+        self._run_times = deque(maxlen=POOL_LATENCY_WINDOW)
+
+    def start(self, wait: bool = True) -> 'ProcessPool':
+        """启动工作进程（并行预热），wait=True 时等待全部就绪"""
+        if not self._slots:
+            self._slots = [_Slot(self, i) for i in range(self.size)]
+            for slot in self._slots:
+                slot.thread.start()
+        if wait:
+            for slot in self._slots:
+                slot.ready.wait()
+            if self._broken:
+                raise WorkerError(self._broken)
+        return self
+
+    def submit(self, payload: Any, timeout: Optional[float] = None) -> Future:
+        if self._broken and not any(slot.process for slot in self._slots):
+            raise WorkerError(self._broken)
+        if not self._slots:
+            self.start(wait=False)
+        future = Future()
+        self._count('submitted')
+        self._jobs.put(_Job(payload, timeout or self.timeout, future))
+        return future
+
+    def run(self, payload: Any, timeout: Optional[float] = None) -> Any:
+        """提交任务并等待结果；超时抛 JobTimeout，出错抛 WorkerError"""
+        return self.submit(payload, timeout).result()
+
+    def close(self):
+        for _ in self._slots:
+            self._jobs.put(_STOP)
+        for slot in self._slots:
+            slot.thread.join(10)
+        self._slots = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _finish(self, job: _Job, started: Optional[float] = None, result=None, error=None):
+        now = time.monotonic()
+        with self._lock:
+            self._wait_times.append((started or now) - job.submitted_at)
+            if started is not None:
+                self._run_times.append(now - started)
+            self._counters['failed' if error else 'completed'] += 1
+        if error:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            wait_times, run_times = list(self._wait_times), list(self._run_times)
+        return {
+            'workers': self.size,
+            'alive': sum(1 for s in self._slots if s.process is not None and s.process.is_alive()),
+            'busy': sum(1 for s in self._slots if s.busy),
+            'queue_depth': self._jobs.qsize(),
+            **counters,
+            'wait_ms': _percentiles(wait_times),
+            'run_ms': _percentiles(run_times),
+            'rss_mb': [round(s.rss_mb, 1) if s.rss_mb else None for s in self._slots],
+            'broken': self._broken,
+        }
+
+
+# ============ 本机服务 ============
+
+def parse_address(address: str):
+    """'host:port' -> (host, port)，其他视为 Unix socket 路径（可带 unix: 前缀）"""
+    if address.startswith('unix:'):
+        return address[5:]
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and os.sep not in host:
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+def default_address(name: str) -> str:
+    """POSIX 上为临时目录下的 Unix socket，Windows 上为本机端口"""
+    if sys.platform == 'win32' or not hasattr(socket, 'AF_UNIX'):
+        return '127.0.0.1:8765'
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), f'{name}.sock')
+
+
+class PoolServer:
+    """在本机 socket 上提供 ProcessPool 服务，每个连接一个线程"""
+
+    def __init__(self, pool: ProcessPool, address: str, authkey: Optional[bytes] = None):
+        self.pool = pool
+        self.address = parse_address(address)
+        self.authkey = authkey or None
+        self._listener = None
+        self._closed = threading.Event()
+
+    def _listen(self):
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)  # 上次未清理的 socket 文件
+            self._listener = Listener(self.address, 'AF_UNIX', authkey=self.authkey)
+            os.chmod(self.address, 0o600)
+        else:
+            if not self.authkey:
+                raise ValueError('TCP 监听必须设置 authkey')
+            self._listener = Listener(self.address, 'AF_INET', authkey=self.authkey)
+        logger.info(f"[PoolServer] {self.pool.name} 监听 {self.address}")
+
+    def start(self) -> 'PoolServer':
+        """后台线程提供服务"""
+        self._listen()
+        threading.Thread(target=self._accept_loop, name=f'{self.pool.name}-server', daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        self._listen()
+        self._accept_loop()
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self._closed.is_set():
+                    return
+                logger.warning(f"[PoolServer] 接受连接失败: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if request[0] == 'run':
+                        response = ('ok', self.pool.run(request[1], request[2]))
+                    elif request[0] == 'stats':
+                        response = ('ok', self.pool.stats())
+                    else:
+                        response = ('error', f'未知请求: {request[0]}')
+                except JobTimeout as e:
+                    response = ('timeout', str(e))
+                except Exception as e:
+                    response = ('error', str(e))
+                try:
+                    conn.send(response)
+                except OSError:
+                    return
+
+    def close(self):
+        self._closed.set()
+        if self._listener:
+            self._listener.close()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.unlink(self.address)
+
+
+class PoolClient:
+    """PoolServer 客户端，接口与 ProcessPool 相同（run / stats），每次调用一个连接"""
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None):
+        self.address = parse_address(address)
+        self.authkey = authkey or None
+
+    def _call(self, *request):
+        try:
+            conn = Client(self.address, authkey=self.authkey)
+        except OSError as e:
+            raise ConnectionError(f'无法连接工作池服务 {self.address}: {e}') from e
+        with conn:
+            conn.send(request)
+            try:
+                status, value = conn.recv()
+            except EOFError as e:
+                raise WorkerError('工作池服务断开连接') from e
+        if status == 'timeout':
+            raise JobTimeout(value)
+        if status != 'ok':
+            raise WorkerError(value)
+        return value
+
+    def run(self, payload: Any, timeout: Optional[float] = None) -> Any:
+        return self._call('run', payload, timeout)
+
+    def stats(self) -> dict:
+        return self._call('stats')
+
+    def ping(self) -> bool:
+        try:
+            self.stats()
+            return True
+        except (ConnectionError, WorkerError):
+            return False
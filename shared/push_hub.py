@@ -0,0 +1,263 @@
+# shared/push_hub.py
+# -*- coding: utf-8 -*-
+"""
+服务端推送（SSE）分发中心
+
+客户端建立一条长连接，服务端在数据变化时按用户推送事件，替代定时轮询。
+
+- 按用户订阅，同一用户多个标签页各自一个订阅
+- 事件带递增 ID，断线重连时按 Last-Event-ID 补发缓冲区内的事件；
+  缓冲区已覆盖或服务重启（ID 前缀不同）时发送 reset，客户端重新拉取快照
+- 空闲时定时发送心跳注释行，防止代理断开连接
+- 订阅队列有上限，消费过慢的连接收到 reset 后被断开，不会拖累发布方
+- 可选 Redis 发布订阅，多进程部署时各进程都能收到事件
+
+用法:
+    hub = PushHub()
+    hub.publish([user_id], 'chat.message', {...})
+
+    sub, replay = hub.subscribe(user_id, request.headers.get('Last-Event-ID'))
+    return Response(sse_stream(hub, sub, replay, snapshot=...), mimetype='text/event-stream')
+
+配置:
+    PUSH_BUFFER_SIZE=5000       补发缓冲区事件数
+    PUSH_QUEUE_SIZE=200         单个连接的待发送事件上限
+    PUSH_HEARTBEAT=25           心跳间隔（秒）
+    PUSH_MAX_CONNECTION=3600    单个连接最长保持时间（秒），到期由客户端自动重连
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PUSH_BUFFER_SIZE = int(os.getenv('PUSH_BUFFER_SIZE', 5000))
+PUSH_QUEUE_SIZE = int(os.getenv('PUSH_QUEUE_SIZE', 200))
+PUSH_HEARTBEAT = float(os.getenv('PUSH_HEARTBEAT', 25))
+PUSH_MAX_CONNECTION = float(os.getenv('PUSH_MAX_CONNECTION', 3600))
+PUSH_RETRY_MS = int(os.getenv('PUSH_RETRY_MS', 3000))
+
+RESET_EVENT = 'reset'
+
+
+class PushEvent:
+    """推送事件"""
+
+    __slots__ = ('seq', 'event_id', 'user_ids', 'type', 'data')
+
+    def __init__(self, seq: int, event_id: str, user_ids: Set[int], type: str, data: Any):
+        self.seq = seq
+        self.event_id = event_id
+        self.user_ids = user_ids
+        self.type = type
+        self.data = data
+
+
+class Subscription:
+    """单个连接的订阅（有界队列）"""
+
+    def __init__(self, user_id: int, max_queue: int):
+        self.user_id = user_id
+        self.max_queue = max_queue
+        self.created_at = time.time()
+        self.overflowed = False
+        self.closed = False
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def put(self, event: PushEvent):
+        with self._cond:
+            if self.closed or self.overflowed:
+                return
+            if len(self._queue) >= self.max_queue:
+                # 消费过慢：丢弃积压事件，通知客户端重新拉取快照
+                self.overflowed = True
+                self._queue.clear()
+            else:
+                self._queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: float) -> List[PushEvent]:
+        """取出所有待发送事件，超时返回空列表"""
+        with self._cond:
+            if not self._queue and not self.overflowed and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class PushHub:
+    """
+    进程内推送分发中心
+
+    redis_client 不为 None 时，publish 经 Redis 频道广播，由各进程的监听线程分发到本地订阅。
+    """
+
+    def __init__(self, buffer_size: int = None, max_queue: int = None, redis_client=None,
+                 channel: str = 'push:events'):
+        self.max_queue = max_queue or PUSH_QUEUE_SIZE
+        self.instance_id = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._buffer = deque(maxlen=buffer_size or PUSH_BUFFER_SIZE)
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._published = 0
+        self._delivered = 0
+
+        self._redis = redis_client
+        self._channel = channel
+        if redis_client is not None:
+            threading.Thread(target=self._listen, name='push-hub-redis', daemon=True).start()
+
+    # ---------- 发布 ----------
+
+    def publish(self, user_ids: Iterable[int], event_type: str, data: Any = None):
+        """向指定用户推送事件"""
+        user_ids = {int(u) for u in user_ids if u is not None}
+        if not user_ids:
+            return
+        if self._redis is not None:
+            try:
+                self._redis.publish(self._channel, json.dumps(
+                    {'users': list(user_ids), 'type': event_type, 'data': data},
+                    ensure_ascii=False, default=str
+                ))
+                return
+            except Exception as e:
+                logger.warning(f"[PushHub] Redis 发布失败，仅推送本进程: {e}")
+        self._dispatch(user_ids, event_type, data)
+
+    def _dispatch(self, user_ids: Set[int], event_type: str, data: Any):
+        with self._lock:
+            self._seq += 1
+            event = PushEvent(self._seq, f"{self.instance_id}-{self._seq}", user_ids, event_type, data)
+            self._buffer.append(event)
+            targets = [sub for uid in user_ids for sub in self._subscribers.get(uid, ())]
+            self._published += 1
+            self._delivered += len(targets)
+        for sub in targets:
+            sub.put(event)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for message in pubsub.listen():
+                    payload = json.loads(message['data'])
+                    self._dispatch({int(u) for u in payload['users']}, payload['type'], payload.get('data'))
+            except Exception as e:
+                logger.exception(f"[PushHub] Redis 订阅中断，5 秒后重连: {e}")
+                time.sleep(5)
+
+    # ---------- 订阅 ----------
+
+    def subscribe(self, user_id: int, last_event_id: str = None):
+        """
+        订阅用户事件
+
+        Returns:
+            (Subscription, 补发事件列表)；无法补发时返回 None 代替列表，
+            调用方应发送 reset 让客户端重新拉取快照
+        """
+        sub = Subscription(int(user_id), self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(sub.user_id, set()).add(sub)
+            replay = self._replay(sub.user_id, last_event_id)
+        return sub, replay
+
+    def _replay(self, user_id: int, last_event_id: Optional[str]) -> Optional[List[PushEvent]]:
+        if not last_event_id:
+            return []
+        instance_id, _, seq = last_event_id.partition('-')
+        if instance_id != self.instance_id or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self._seq:
+            return None
+        if self._buffer and seq < self._buffer[0].seq - 1:
+            return None  # 缓冲区已覆盖
+        return [e for e in self._buffer if e.seq > seq and user_id in e.user_ids]
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'instance_id': self.instance_id,
+                'users': len(self._subscribers),
+                'connections': sum(len(s) for s in self._subscribers.values()),
+                'last_event_id': self._seq,
+                'buffered': len(self._buffer),
+                'published': self._published,
+                'delivered': self._delivered,
+            }
+
+
+def format_sse(event_type: str, data: Any, event_id: str = None) -> str:
+    """格式化为 SSE 消息"""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    lines.extend(f"data: {line}" for line in payload.split('\n'))
+    return '\n'.join(lines) + '\n\n'
+
+
+def sse_stream(hub: PushHub, sub: Subscription, replay: Optional[List[PushEvent]],
+               snapshot: Any = None, heartbeat: float = None,
+               max_duration: float = None) -> Iterator[str]:
+    """
+    生成 SSE 响应流
+
+    Args:
+        hub: PushHub
+        sub, replay: hub.subscribe 的返回值
+        snapshot: 连接建立时发送的快照（为 None 时不发送；无法补发且没有快照时发送 reset）
+        heartbeat: 心跳间隔（秒）
+        max_duration: 连接最长保持时间（秒）
+    """
+    heartbeat = heartbeat or PUSH_HEARTBEAT
+    deadline = time.time() + (max_duration or PUSH_MAX_CONNECTION)
+    try:
+        yield f"retry: {PUSH_RETRY_MS}\n\n"
+        if replay is None and snapshot is None:
+            yield format_sse(RESET_EVENT, {'reason': 'resume_unavailable'})
+        for event in replay or ():
+            yield format_sse(event.type, event.data, event.event_id)
+        if snapshot is not None:
+            # 快照对应当前最新事件 ID，之后的事件为增量
+            yield format_sse('snapshot', snapshot, f"{hub.instance_id}-{hub.stats()['last_event_id']}")
+
+        while not sub.closed and time.time() < deadline:
+            events = sub.get(heartbeat)
+            if sub.overflowed:
+                yield format_sse(RESET_EVENT, {'reason': 'overflow'})
+                return
+            if not events:
+                yield ': ping\n\n'
+                continue
+            for event in events:
+                yield format_sse(event.type, event.data, event.event_id)
+    finally:
+        hub.unsubscribe(sub)
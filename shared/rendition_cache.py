@@ -0,0 +1,262 @@
+# shared/rendition_cache.py
+# -*- coding: utf-8 -*-
+"""
+预览图（缩略图）生成与磁盘缓存
+
+- 图片缩略图（Pillow）、PDF 首页栅格图（PyMuPDF），统一输出 JPEG
+- 缓存键 = 内容哈希 + 渲染类型 + 尺寸，文件内容不变即命中，内容变化自动失效
+- 磁盘 LRU：命中时刷新修改时间，总大小超过预算时按修改时间淘汰
+- 同一个键同时只渲染一次（进程内单飞）
+- 上传后可在后台线程池预生成常用尺寸
+
+配置:
+    RENDITION_CACHE_MAX_BYTES=1073741824   缓存总大小上限
+    RENDITION_WORKERS=2                    后台预生成线程数
+    RENDITION_JPEG_QUALITY=80
+"""
+
+import os
+import logging
+import threading
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import fitz  # PyMuPDF
+    FITZ_AVAILABLE = True
+except ImportError:
+    FITZ_AVAILABLE = False
+
+RENDITION_CACHE_MAX_BYTES = int(os.getenv('RENDITION_CACHE_MAX_BYTES', 1024 ** 3))
+RENDITION_WORKERS = int(os.getenv('RENDITION_WORKERS', 2))
+RENDITION_JPEG_QUALITY = int(os.getenv('RENDITION_JPEG_QUALITY', 80))
+
+# 允许的尺寸（长边像素），请求尺寸向上取整，避免任意尺寸撑爆缓存
+RENDITION_SIZES = (128, 256, 512, 1024)
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp', 'tif', 'tiff'}
+
+
+def normalize_size(size) -> int:
+    """请求尺寸取整到允许的尺寸"""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        return RENDITION_SIZES[1]
+    for allowed in RENDITION_SIZES:
+        if size <= allowed:
+            return allowed
+    return RENDITION_SIZES[-1]
+
+
+def rendition_kind(file_name: str, mime_type: str = None) -> Optional[str]:
+    """可生成缩略图的类型: 'image' / 'pdf'，不支持返回 None"""
+    mime_type = mime_type or ''
+    extension = os.path.splitext(file_name or '')[1].lower().lstrip('.')
+    if PIL_AVAILABLE and (mime_type.startswith('image/') or extension in IMAGE_EXTENSIONS):
+        return 'image'
+    if PIL_AVAILABLE and FITZ_AVAILABLE and (mime_type == 'application/pdf' or extension == 'pdf'):
+        return 'pdf'
+    return None
+
+
+def _to_jpeg(image, size: int) -> bytes:
+    image.thumbnail((size, size))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=RENDITION_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def render_image(path: str, size: int) -> bytes:
+    """图片缩略图（按 EXIF 方向旋转，长边不超过 size）"""
+    with Image.open(path) as image:
+        # JPEG 解码时直接缩小，大图省内存和时间
+        image.draft('RGB', (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image)
+        return _to_jpeg(image, size)
+
+
+def render_pdf_page(path: str, size: int, page_no: int = 0) -> bytes:
+    """PDF 页面栅格图（默认首页）"""
+    with fitz.open(path) as doc:
+        page = doc[page_no]
+        scale = size / max(page.rect.width, page.rect.height, 1)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+        image = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+        return _to_jpeg(image, size)
+
+
+RENDERERS: Dict[str, Callable[[str, int], bytes]] = {
+    'image': render_image,
+    'pdf': render_pdf_page,
+}
+
+
+class RenditionCache:
+    """
+    预览图磁盘缓存（LRU + 总大小预算）
+
+    用法:
+        cache = RenditionCache('/data/_renditions')
+        path = cache.get_or_render(md5, '/data/a.jpg', 'image', 256)
+    """
+
+    def __init__(self, root: str, max_bytes: int = None):
+        self.root = root
+        self.max_bytes = max_bytes or RENDITION_CACHE_MAX_BYTES
+        self._total = None
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: str, kind: str, size: int) -> str:
+        return f"{content_hash}_{kind}_{size}.jpg"
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key: str) -> Optional[str]:
+        """命中返回缓存文件路径（刷新修改时间用于 LRU）"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        """写入缓存（临时文件 + 原子替换）"""
+        path = self.path_for(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan_size()
+            else:
+                self._total += len(data)
+            over_budget = self._total > self.max_bytes
+        if over_budget:
+            self.evict()
+        return path
+
+    def get_or_render(self, content_hash: str, source_path: str, kind: str, size: int) -> Optional[str]:
+        """
+        获取预览图，未缓存时渲染
+
+        Returns:
+            缓存文件路径；类型不支持或渲染失败时抛出异常
+        """
+        key = self.make_key(content_hash, kind, size)
+        path = self.get(key)
+        if path:
+            return path
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                path = self.get(key)
+                if path:
+                    return path
+                return self.put(key, RENDERERS[kind](source_path, size))
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def _iter_files(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._iter_files())
+
+    def evict(self, target_ratio: float = 0.9):
+        """按最近使用时间淘汰，直到总大小降到预算的 target_ratio"""
+        files = sorted(self._iter_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * target_ratio
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._total = total
+
+    def stats(self) -> dict:
+        files = list(self._iter_files())
+        return {
+            'root': self.root,
+            'files': len(files),
+            'bytes': sum(size for _, size, _ in files),
+            'max_bytes': self.max_bytes,
+        }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=RENDITION_WORKERS,
+                                               thread_name_prefix='rendition')
+    return _executor
+
+
+def pregenerate(cache: RenditionCache, content_hash: str, source_path: str, kind: str,
+                sizes: Iterable[int] = (RENDITION_SIZES[1],), background: bool = True):
+    """预生成预览图（默认后台线程执行，失败只记录不抛出）"""
+    def run():
+        for size in sizes:
+            try:
+                cache.get_or_render(content_hash, source_path, kind, size)
+            except Exception:
+                logger.exception(f"[Rendition] 预生成失败 {source_path} ({size})")
+                return
+
+    if background:
+        return _get_executor().submit(run)
+    run()
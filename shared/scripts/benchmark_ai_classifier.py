@@ -0,0 +1,95 @@
+"""
+采购物料分类基准：逐条规则嵌套循环 + 字典余弦 vs 关键词自动机 + n-gram 原型矩阵批量分类
+
+生成 --items 行 RFQ 物料（约一半命中规则关键词，其余走向量兜底，含 --dup-rate 比例的重复行），
+不连知识库和大模型，分别统计:
+    legacy       原实现：规则表嵌套循环，未命中时空格分词词袋 + 逐个原型字典余弦
+    ngram/item   n-gram 原型矩阵，逐条 classify()
+    batch        classify_batch()：去重 + 自动机规则层 + 一次矩阵运算的向量层
+并核对规则命中结果与原实现一致、batch 与逐条 classify() 结果一致。
+
+Usage:
+    python shared/scripts/benchmark_ai_classifier.py --items 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, '采购', 'backend'))
+
+from services.ai_classifier import EmbeddingBackend, LocalClassifier, NgramEmbeddingBackend, NUMPY_AVAILABLE
+
+PLAIN = ['铝合金型材', '不锈钢圆棒', '工业酒精', '冲压模具', '塑料托盘', '硅胶垫片', '弹簧', '密封圈', '铜排', '电磁阀',
+         '液压阀', '滤芯', '胶水', '焊丝', '保险丝', '指示灯', '风扇', '导轨滑块', '丝杆', '编码器']
+SPECS = ['M8×30', 'Φ50mm', '6205-2RS', '24V 5A', '304 1.5mm', 'HTD5M-20', '20L', '非标', '', 'L=1000']
+
+
+def make_items(classifier, count, dup_rate, seed=7):
+    rng = random.Random(seed)
+    keywords = [kw for kws in classifier.rules.values() for kw in kws]
+    items = []
+    for i in range(count):
+        if items and rng.random() < dup_rate:
+            items.append(dict(rng.choice(items)))
+            continue
+        word = rng.choice(keywords) if rng.random() < 0.5 else rng.choice(PLAIN)
+        items.append({'name': f'{rng.choice(["", "精密", "加厚", "进口"])}{word}', 'spec': rng.choice(SPECS),
+                      'remark': f'批次{i % 97}' if rng.random() < 0.3 else ''})
+    return items
+
+
+def legacy_classify(classifier, name, spec='', remark=''):
+    """原实现：规则表嵌套循环，未命中时逐个原型余弦（不含知识库/大模型）"""
+    text = ' '.join([name or '', spec or '', remark or '']).strip()
+    if not text:
+        return {'category': '未分类', 'source': 'empty'}
+    t = text.lower()
+    for cat, kws in classifier.rules.items():
+        for kw in kws:
+            if kw.lower() in t:
+                return {'category': cat, 'source': 'rule'}
+    scores = classifier.embed_match(text)
+    return {'category': next(iter(scores), '未分类'), 'source': 'vector'}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--dup-rate', type=float, default=0.3)
+    args = parser.parse_args()
+
+    legacy = LocalClassifier(embedding=EmbeddingBackend(), use_ollama=False, use_knowledge=False)
+    ngram = LocalClassifier(embedding=NgramEmbeddingBackend(), use_ollama=False, use_knowledge=False)
+    items = make_items(ngram, args.items, args.dup_rate)
+    print(f"{args.items} items, dup-rate {args.dup_rate}, numpy={NUMPY_AVAILABLE}")
+
+    def report(label, elapsed):
+        print(f"  {label:14s} {elapsed:8.3f} s  {args.items / elapsed:10.0f} items/s")
+
+    elapsed, old = timed(lambda: [legacy_classify(legacy, **item) for item in items])
+    report('legacy', elapsed)
+    elapsed, single = timed(lambda: [ngram.classify(**item) for item in items])
+    report('ngram/item', elapsed)
+    elapsed, batch = timed(lambda: ngram.classify_batch(items))
+    report('batch', elapsed)
+
+    rules_match = all((o['source'] == 'rule') == (b['source'] == 'rule') and
+                      (o['source'] != 'rule' or o['category'] == b['category']) for o, b in zip(old, batch))
+    batch_match = all(s['category'] == b['category'] and s['source'] == b['source'] for s, b in zip(single, batch))
+    vector = sum(b['source'] == 'vector' for b in batch)
+    print(f"  rule results match legacy: {rules_match}  batch matches classify(): {batch_match}  "
+          f"vector fallback: {vector}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+审计日志写入吞吐基准：逐条同步写入 vs 异步批量写入（SQLite）
+
+Usage:
+    python shared/scripts/benchmark_audit_writer.py --events 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from shared.auth import models as auth_models
+from shared.auth import audit_service
+from shared.auth.audit_service import AuditService, AuditWriter
+
+
+def setup_database(path):
+    engine = create_engine(f'sqlite:///{path}')
+    auth_models.Base.metadata.create_all(engine, tables=[auth_models.AuditLog.__table__])
+    auth_models.AuthSessionLocal = sessionmaker(bind=engine)
+    return engine
+
+
+def count_rows():
+    session = auth_models.AuthSessionLocal()
+    try:
+        return session.query(func.count(auth_models.AuditLog.id)).scalar()
+    finally:
+        session.close()
+
+
+def emit(events):
+    for i in range(events):
+        AuditService.log(
+            action_type=AuditService.ACTION_DATA_ACCESS,
+            user_id=i % 100,
+            username=f'user{i % 100}',
+            resource_type='employee',
+            resource_id=i,
+            description=f'benchmark event {i}',
+            module='hr'
+        )
+
+
+def run(mode, events, tmp_dir):
+    setup_database(os.path.join(tmp_dir, f'{mode}.db'))
+    audit_service.AUDIT_ASYNC_ENABLED = mode == 'batched'
+    audit_service.audit_writer = AuditWriter()
+
+    start = time.perf_counter()
+    emit(events)
+    request_side = time.perf_counter() - start
+    AuditService.flush(timeout=300)
+    total = time.perf_counter() - start
+
+    written = count_rows()
+    assert written == events, f'{mode}: expected {events} rows, got {written}'
+    print(f"{mode:>8}: 请求线程耗时 {request_side * 1000:9.1f} ms "
+          f"({request_side / events * 1e6:7.1f} us/条), "
+          f"全部落库 {total * 1000:9.1f} ms ({events / total:9.0f} 条/秒)")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audit_service.AUDIT_BACKUP_DIR = os.path.join(tmp_dir, 'backup')
+        per_row = run('per-row', args.events, tmp_dir)
+        batched = run('batched', args.events, tmp_dir)
+        print(f"加速比: {per_row / batched:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+HR 员工 Excel 导入基准：整表载入 + 逐行查询插入 vs 流式读取 + 分批批量 upsert
+
+生成 --rows 行的员工 xlsx（含部门/职位/班组名称和少量错误行），分别统计原实现
+（openpyxl 整表载入、逐行按工号查询、逐行 add）和 EmployeeImporter 的耗时、SQL 数、
+核对结果一致（先新增导入，再以另一份数据更新导入）；然后单独统计 Python 内存峰值
+（tracemalloc），导入器按 --rows / 5 和 --rows 两种规模对比，峰值应基本不随行数增长。
+
+Usage:
+    python shared/scripts/benchmark_employee_import.py --rows 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'HR', 'backend'))
+
+import openpyxl
+from flask import Flask
+from sqlalchemy import event, insert
+
+from app import db
+from app.models import Employee
+from app.models.base_data import Department, Position, Team
+from app.services.employee_importer import EmployeeImporter, normalize_header, parse_date
+
+HEADER = ['工号', '姓名', '性别', '部门', '职位', '班组', '入厂时间', '联系电话', '身份证号码', '备注']
+DEPARTMENTS = ['生产部', '品质部', '仓储部', '行政部', '财务部']
+POSITIONS = ['普工', '组长', '文员', '主管']
+TEAMS = [f'{i}组' for i in range(1, 21)]
+
+
+def write_workbook(path, rows, seed):
+    rng = random.Random(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('员工')
+    sheet.append(HEADER)
+    for i in range(1, rows + 1):
+        hire = date(2015, 1, 1) + timedelta(days=rng.randrange(3650))
+        sheet.append([
+            100000 + i, f'员工{i}', rng.choice(['男', '女']), rng.choice(DEPARTMENTS),
+            rng.choice(POSITIONS), rng.choice(TEAMS),
+            '不是日期' if i % 997 == 0 else hire,  # 少量错误行
+            13800000000 + i, f'44190019900101{i:06d}', f'备注 {seed}',
+        ])
+    workbook.save(path)
+
+
+def legacy_import(path, factory_id):
+    """原实现：整表载入内存，逐行按工号查询，新增或修改"""
+    workbook = openpyxl.load_workbook(path)
+    sheet = workbook.active
+    rows = list(sheet.iter_rows(values_only=True))
+    header = [normalize_header(h) for h in rows[0]]
+    departments = {d.name: d.id for d in Department.query}
+    positions = {p.name: p.id for p in Position.query}
+    teams = {t.name: t.id for t in Team.query}
+    created = updated = errors = 0
+    for values in rows[1:]:
+        row = dict(zip(header, values))
+        try:
+            hire_date = parse_date(row['入厂时间'])
+        except ValueError:
+            errors += 1
+            continue
+        data = {
+            'name': row['姓名'], 'gender': row['性别'], 'department': row['部门'], 'title': row['职位'],
+            'team': row['班组'], 'hire_date': hire_date, 'phone': str(row['联系电话']),
+            'id_card': row['身份证号码'], 'remark': row['备注'], 'factory_id': factory_id,
+            'department_id': departments.get(row['部门']), 'position_id': positions.get(row['职位']),
+            'team_id': teams.get(row['班组']),
+        }
+        emp_no = str(row['工号'])
+        employee = Employee.query.filter_by(empNo=emp_no).first()
+        if employee:
+            for key, value in data.items():
+                setattr(employee, key, value)
+            updated += 1
+        else:
+            db.session.add(Employee(empNo=emp_no, employment_status='Active', **data))
+            created += 1
+    db.session.commit()
+    return {'created': created, 'updated': updated, 'errors': errors}
+
+
+def importer_import(path, factory_id):
+    report = EmployeeImporter(defaults={'factory_id': factory_id}).import_file(path)
+    return {'created': report.created, 'updated': report.updated, 'errors': len(report.errors)}
+
+
+def seed_dimensions():
+    for model, names in ((Department, DEPARTMENTS), (Position, POSITIONS), (Team, TEAMS)):
+        db.session.execute(insert(model), [{'code': f'C{i}', 'name': name} for i, name in enumerate(names)])
+    db.session.commit()
+
+
+def snapshot():
+    columns = (Employee.empNo, Employee.name, Employee.department_id, Employee.position_id, Employee.team_id,
+               Employee.hire_date, Employee.phone, Employee.id_card, Employee.remark)
+    return {row[0]: tuple(row[1:]) for row in db.session.query(*columns)}
+
+
+def reset():
+    Employee.query.delete()
+    db.session.commit()
+
+
+def measure(counter, fn, trace=False):
+    """trace=True 时统计内存峰值（tracemalloc 会明显拖慢耗时，计时与测内存分开跑）"""
+    queries = counter[0]
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return elapsed, counter[0] - queries, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        small, large, update = (os.path.join(tmp_dir, f'{n}.xlsx') for n in ('small', 'large', 'update'))
+        write_workbook(small, max(args.rows // 5, 1), seed=1)
+        write_workbook(large, args.rows, seed=1)
+        write_workbook(update, args.rows, seed=2)
+        print(f"{args.rows} rows, workbook {os.path.getsize(large) / 1024 / 1024:.1f} MB")
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'hr.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            seed_dimensions()
+
+            counter = [0]
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: counter.__setitem__(0, counter[0] + 1))
+
+            def report(label, measured):
+                elapsed, queries, peak, stats = measured
+                memory = f"peak {peak:7.1f} MB" if peak is not None else ' ' * 15
+                print(f"  {label:26s} {elapsed:8.2f} s  {queries:7d} SQL  {memory}  {stats}")
+
+            if not args.skip_legacy:
+                report('legacy per-row (insert)', measure(counter, lambda: legacy_import(large, 1)))
+                report('legacy per-row (update)', measure(counter, lambda: legacy_import(update, 1)))
+                legacy = snapshot()
+                reset()
+
+            report('importer (insert)', measure(counter, lambda: importer_import(large, 1)))
+            report('importer (update)', measure(counter, lambda: importer_import(update, 1)))
+            if not args.skip_legacy:
+                print(f"  results match legacy: {snapshot() == legacy}")
+                reset()
+                report('legacy memory', measure(counter, lambda: legacy_import(large, 1), trace=True))
+            for path, rows in ((small, max(args.rows // 5, 1)), (large, args.rows)):
+                reset()
+                report(f'importer memory {rows} rows',
+                       measure(counter, lambda: importer_import(path, 1), trace=True))
+
+
+if __name__ == '__main__':
+    main()
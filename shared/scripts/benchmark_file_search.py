@@ -0,0 +1,135 @@
+"""
+文件搜索基准（SQLite）：多列 LIKE '%关键词%' + count + offset vs FTS5 倒排索引
+
+生成合成文件索引记录（文件名/项目编号/客户/品番号等，中日英混合），
+分别用 FileIndexService.search 的旧查询方式和 shared/search_index 检索同一组关键词。
+
+Usage:
+    python shared/scripts/benchmark_file_search.py --records 1000000
+    python shared/scripts/benchmark_file_search.py --records 100000 --queries 50
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from shared.search_index import FTS5Index
+
+WORDS = ['设计图纸', '检验报告', '报价单', '采购订单', '送货单', '承认图', '作業標準書', '見積書',
+         '注文書', '材质证明', '装箱单', 'drawing', 'spec', 'invoice', 'packing', 'rev']
+CUSTOMERS = ['东京精密', '大阪机械', '名古屋电子', 'ACME Corp', '苏州精工', '横浜製作所']
+CATEGORIES = ['drawing', 'quotation', 'purchase_order', 'inspection_report', 'delivery_note', 'other']
+EXTENSIONS = ['pdf', 'xlsx', 'dwg', 'docx', 'png']
+LIKE_COLUMNS = ('file_name', 'order_no', 'project_no', 'supplier_name', 'customer_name',
+                'part_number', 'po_number')
+
+
+def make_record(i, rng):
+    part = f"{rng.choice('ABCDJK')}{rng.randint(1, 9)}{rng.choice('ABCDJK')}{rng.randint(1000, 9999)}"
+    name = f"{rng.choice(WORDS)}_{part}_{rng.choice(WORDS)}.{rng.choice(EXTENSIONS)}"
+    return (
+        i, name, f"SO-{rng.randint(2023, 2025)}-{rng.randint(1, 99999):05d}",
+        f"PRJ-{rng.randint(1, 5000):05d}", rng.choice(CUSTOMERS), rng.choice(CUSTOMERS), part,
+        f"PO{rng.randint(1, 999999):06d}", rng.choice(CATEGORIES), rng.randint(1, 5000),
+        f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00",
+    )
+
+
+def build(db_path, index_path, records, batch=20000):
+    rng = random.Random(42)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE file_index (id INTEGER PRIMARY KEY, file_name TEXT, order_no TEXT, project_no TEXT, "
+        "supplier_name TEXT, customer_name TEXT, part_number TEXT, po_number TEXT, file_category TEXT, "
+        "project_id INTEGER, created_at TEXT, status TEXT DEFAULT 'active')"
+    )
+    conn.execute("CREATE INDEX ix_created ON file_index (created_at)")
+    conn.execute("CREATE INDEX ix_project ON file_index (project_id)")
+    index = FTS5Index(index_path, ('name', 'tags', 'project'), (8.0, 3.0, 3.0),
+                      {'created_at': 'TEXT'}, name='file_search')
+
+    start = time.perf_counter()
+    for offset in range(0, records, batch):
+        rows = [make_record(i, rng) for i in range(offset + 1, min(offset + batch, records) + 1)]
+        conn.executemany("INSERT INTO file_index (id, file_name, order_no, project_no, supplier_name, "
+                         "customer_name, part_number, po_number, file_category, project_id, created_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        index.upsert_many(
+            (r[0], {'name': r[1], 'tags': f"{r[6]} {r[2]} {r[7]}", 'project': f"{r[3]} {r[4]} {r[5]}"},
+             {'category': r[8], 'project': r[9], 'status': 'active'}, {'created_at': r[10]})
+            for r in rows
+        )
+    conn.commit()
+    index.optimize()
+    print(f"built {records} records in {time.perf_counter() - start:.1f}s "
+          f"(table {os.path.getsize(db_path) / 1e6:.0f} MB, index {os.path.getsize(index_path) / 1e6:.0f} MB)")
+    return conn, index
+
+
+def like_search(conn, q, project_id=None, page=1, page_size=20):
+    """FileIndexService.search 的旧查询：7 列 LIKE + count + order by + offset"""
+    pattern = f"%{q}%"
+    where = "status = 'active' AND (" + ' OR '.join(f"{c} LIKE ?" for c in LIKE_COLUMNS) + ")"
+    params = [pattern] * len(LIKE_COLUMNS)
+    if project_id:
+        where += " AND project_id = ?"
+        params.append(project_id)
+    total = conn.execute(f"SELECT count(*) FROM file_index WHERE {where}", params).fetchone()[0]
+    rows = conn.execute(f"SELECT id FROM file_index WHERE {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                        params + [page_size, (page - 1) * page_size]).fetchall()
+    return [r[0] for r in rows], total
+
+
+def index_search(index, q, project_id=None, page=1, page_size=20):
+    facets = {'project': project_id} if project_id else None
+    hits, total = index.search(q, facets=facets, exclude_facets={'status': 'deleted'},
+                               limit=page_size, offset=(page - 1) * page_size)
+    return [h['id'] for h in hits], total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=20, help='每种方式执行的查询数')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    queries = []
+    for _ in range(args.queries):
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append((rng.choice(WORDS), None))
+        elif kind < 0.7:
+            queries.append((make_record(0, rng)[6][2:], None))   # 品番号片段
+        elif kind < 0.85:
+            queries.append((rng.choice(CUSTOMERS), None))
+        else:
+            queries.append((rng.choice(WORDS), rng.randint(1, 5000)))  # 关键词 + 项目过滤
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conn, index = build(os.path.join(tmp_dir, 'files.db'), os.path.join(tmp_dir, 'search.db'),
+                            args.records)
+        for name, fn, target in (('like', like_search, conn), ('fts5', index_search, index)):
+            latencies = []
+            for q, project_id in queries:
+                start = time.perf_counter()
+                fn(target, q, project_id)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            print(f"{name:5s} avg {sum(latencies) / len(latencies) * 1000:9.1f} ms  "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:9.1f} ms  "
+                  f"max {latencies[-1] * 1000:9.1f} ms")
+
+        # 结果集一致性抽查（LIKE 为子串匹配，索引为词条/前缀匹配，数量接近但不完全相同）
+        for q, project_id in queries[:3]:
+            print(f"  '{q}' project={project_id}: like total {like_search(conn, q, project_id)[1]}, "
+                  f"fts5 total {index_search(index, q, project_id)[1]}")
+
+
+if __name__ == '__main__':
+    main()
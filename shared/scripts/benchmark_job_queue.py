@@ -0,0 +1,94 @@
+"""
+文档翻译任务队列基准：串行逐页翻译 vs shared/job_queue 并发工作者
+
+模拟翻译接口每页耗时 --delay 秒，统计不同工作者数量下的页面吞吐量，
+并验证重新上传同一文档时全部命中翻译缓存。
+
+Usage:
+    python shared/scripts/benchmark_job_queue.py --pages 40 --delay 0.2
+    python shared/scripts/benchmark_job_queue.py --workers 1 2 4 8 16 --processes 2
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from shared.job_queue import JobQueue, UnitSpec, WorkerPool
+
+
+class StubTranslator:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def prepare(self, job):
+        return [UnitSpec({'page': i + 1}, cache_key=f"{job['payload']['doc']}:{i}")
+                for i in range(job['payload']['pages'])]
+
+    def run_unit(self, job, unit):
+        time.sleep(self.delay)
+        return f"translated page {unit['payload']['page']}"
+
+    def finalize(self, job, units):
+        return {'pages': len(units)}
+
+
+def run_worker_process(db_path, concurrency, delay, stop_at):
+    pool = WorkerPool(JobQueue(db_path), {'translate': StubTranslator(delay)}, concurrency=concurrency,
+                      poll_interval=0.01)
+    pool.start()
+    while time.time() < stop_at:
+        time.sleep(0.05)
+    pool.stop()
+
+
+def run(db_path, doc, pages, delay, workers, processes):
+    queue = JobQueue(db_path)
+    job_id = queue.enqueue('translate', {'doc': doc, 'pages': pages})
+    start = time.perf_counter()
+    if processes > 1:
+        stop_at = time.time() + pages * delay + 30
+        procs = [multiprocessing.Process(target=run_worker_process,
+                                         args=(db_path, workers // processes or 1, delay, stop_at), daemon=True)
+                 for _ in range(processes)]
+        for proc in procs:
+            proc.start()
+        job = queue.wait(job_id, timeout=pages * delay + 30)
+        for proc in procs:
+            proc.terminate()
+    else:
+        pool = WorkerPool(queue, {'translate': StubTranslator(delay)}, concurrency=workers, poll_interval=0.01)
+        pool.start()
+        job = queue.wait(job_id, timeout=pages * delay + 30)
+        pool.stop()
+    elapsed = time.perf_counter() - start
+    assert job['status'] == 'completed', job
+    return elapsed, job
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--delay', type=float, default=0.2, help='模拟每页翻译耗时（秒）')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--processes', type=int, default=1, help='工作者分布在几个进程中')
+    args = parser.parse_args()
+
+    serial = args.pages * args.delay
+    print(f"{args.pages} pages, {args.delay:g} s/page, serial in-request: {serial:.1f} s")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'jobs.db')
+        for workers in args.workers:
+            elapsed, _ = run(db_path, f'doc-{workers}', args.pages, args.delay, workers, args.processes)
+            print(f"  workers {workers:3d}  {elapsed:7.2f} s  {args.pages / elapsed:7.1f} pages/s  "
+                  f"speedup {serial / elapsed:5.1f}x")
+
+        elapsed, job = run(db_path, f'doc-{args.workers[-1]}', args.pages, args.delay, 1, 1)
+        print(f"  re-upload   {elapsed:7.2f} s  cached {job['cached_units']}/{job['total_units']} pages")
+
+
+if __name__ == '__main__':
+    main()
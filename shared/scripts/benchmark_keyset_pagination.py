@@ -0,0 +1,106 @@
+"""
+深分页基准：OFFSET 分页 vs 游标（keyset）分页（SQLite）
+
+在种子表上分别测量第 1 页和第 N 页的延迟，游标分页的延迟应基本不随页码变化。
+
+Usage:
+    python shared/scripts/benchmark_keyset_pagination.py --rows 300000 --deep-page 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, create_engine, insert
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from shared.pagination import KeysetPaginator, encode_cursor, paginate_query
+
+Base = declarative_base()
+
+
+class LedgerEntry(Base):
+    __tablename__ = 'ledger_entries'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, nullable=False)
+    description = Column(String(100))
+
+    __table_args__ = (
+        Index('idx_ledger_created_id', 'created_at', 'id'),
+    )
+
+
+def seed(session, rows):
+    base = datetime(2024, 1, 1)
+    batch = []
+    for i in range(rows):
+        # 每秒多条记录，验证排序列重复时以 id 兜底
+        batch.append({'created_at': base + timedelta(seconds=i // 3), 'description': f'entry {i}'})
+        if len(batch) == 10000:
+            session.execute(insert(LedgerEntry), batch)
+            batch = []
+    if batch:
+        session.execute(insert(LedgerEntry), batch)
+    session.commit()
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=300000)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--deep-page', type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.deep_page * args.per_page > args.rows:
+        parser.error('rows 不足以覆盖 deep-page')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        seed(session, args.rows)
+
+        order_by = [(LedgerEntry.created_at, 'desc'), (LedgerEntry.id, 'desc')]
+        base_query = session.query(LedgerEntry)
+        ordered = base_query.order_by(LedgerEntry.created_at.desc(), LedgerEntry.id.desc())
+        paginator = KeysetPaginator(base_query, order_by, per_page=args.per_page)
+
+        # 第 N 页的游标 = 第 N-1 页最后一行
+        boundary = ordered.offset((args.deep_page - 1) * args.per_page - 1).first()
+        deep_cursor = encode_cursor([boundary.created_at, boundary.id])
+
+        # 结果一致性校验
+        offset_rows = paginate_query(ordered, args.deep_page, args.per_page).all()
+        keyset_rows = paginator.paginate(deep_cursor).items
+        assert [r.id for r in offset_rows] == [r.id for r in keyset_rows], '分页结果不一致'
+
+        results = {
+            ('offset', 1): timed(lambda: paginate_query(ordered, 1, args.per_page).all()),
+            ('offset', args.deep_page): timed(
+                lambda: paginate_query(ordered, args.deep_page, args.per_page).all()),
+            ('keyset', 1): timed(lambda: paginator.paginate(None)),
+            ('keyset', args.deep_page): timed(lambda: paginator.paginate(deep_cursor)),
+        }
+
+        print(f"{args.rows} 行, 每页 {args.per_page} 条")
+        for (mode, page), ms in results.items():
+            print(f"{mode:>7} 第 {page:>6} 页: {ms:8.2f} ms")
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+物料知识库查询基准：每次查询走 SQL（缓存表 + 精确 + FULLTEXT/LIKE）vs 常驻内存索引
+
+在临时 sqlite 库生成 --materials 条知识和 --queries 条查询（精确名称、名称+型号后缀、
+关键词、未命中各占一部分，查询文本有重复），统计 MaterialKnowledgeService.search() 的
+p50/p99 延迟和每次查询的 SQL 数，以及 LocalClassifier.classify()（不连大模型）每次分类的 SQL 数。
+
+sqlite 没有 FULLTEXT，原实现的 MATCH AGAINST 用等价的 LIKE 查询代替；缓存写入语句为
+MySQL 语法，在 sqlite 上执行失败（仍计入 SQL 数，日志已静音）。MySQL 上每条 SQL
+还要加一次网络往返，原实现的实际延迟高于此处结果。
+
+Usage:
+    python shared/scripts/benchmark_material_knowledge.py --materials 10000 --queries 2000
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, '采购', 'backend'))
+
+from flask import Flask
+from sqlalchemy import event, text
+
+from extensions import db
+from services.ai_classifier import LocalClassifier
+from services.material_knowledge import MaterialKnowledgeService
+
+CATEGORIES = ['机械零部件/轴承', '刀具/铣削刀具', '化工辅料/清洗剂', '五金劳保/紧固件', '电器气动/传感器',
+              '原材料/金属材料', '包装印刷/包装箱', '磨具磨料/砂轮']
+HEADS = ['精密', '重型', '微型', '不锈钢', '合金', '工业', '耐高温', '防爆', '数控', '液压', '气动', '进口']
+BODIES = ['轴承', '铣刀', '清洗剂', '螺钉', '传感器', '圆棒', '纸箱', '砂轮', '接头', '阀门', '密封件', '导轨']
+
+
+class LegacySqliteService(MaterialKnowledgeService):
+    """原实现（无索引）；FULLTEXT 在 sqlite 上用 LIKE 代替"""
+
+    def __init__(self):
+        super().__init__(use_index=False)
+
+    def search_fuzzy(self, name, spec=""):
+        query_text = f"{name} {spec}".strip()
+        result = db.session.execute(text("""
+            SELECT category, id, match_priority FROM material_knowledge_base
+            WHERE keywords LIKE :q OR synonyms LIKE :q OR description LIKE :q
+            ORDER BY match_priority DESC LIMIT 1
+        """), {"q": f"%{query_text}%"}).fetchone()
+        if result:
+            return result[0], result[1], 0.8
+        result = db.session.execute(text("""
+            SELECT category, id, match_priority FROM material_knowledge_base
+            WHERE keywords LIKE :pattern OR synonyms LIKE :pattern OR standard_name LIKE :pattern
+            ORDER BY match_priority DESC LIMIT 1
+        """), {"pattern": f"%{name}%"}).fetchone()
+        return (result[0], result[1], 0.7) if result else None
+
+
+def create_tables():
+    db.session.execute(text("""
+        CREATE TABLE material_knowledge_base (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, standard_name VARCHAR(200) NOT NULL,
+            category VARCHAR(100) NOT NULL, major_category VARCHAR(100), minor_category VARCHAR(100),
+            spec_pattern VARCHAR(200), synonyms TEXT, keywords TEXT, description TEXT, usage_scenario TEXT,
+            match_priority INTEGER DEFAULT 50, source VARCHAR(20), updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)
+    """))
+    db.session.execute(text("CREATE INDEX idx_mkb_standard_name ON material_knowledge_base(standard_name)"))
+    db.session.execute(text("""
+        CREATE TABLE material_match_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, input_text VARCHAR(500), input_hash CHAR(32) UNIQUE,
+            matched_category VARCHAR(100), matched_knowledge_id INTEGER, match_score DECIMAL(5, 4),
+            match_method VARCHAR(20), hit_count INTEGER DEFAULT 1, last_hit_at DATETIME)
+    """))
+    db.session.commit()
+
+
+def seed(count, rng):
+    rows = []
+    for i in range(count):
+        head, body = rng.choice(HEADS), rng.choice(BODIES)
+        rows.append({
+            'name': f'{head}{body}{i:05d}', 'cat': CATEGORIES[BODIES.index(body) % len(CATEGORIES)],
+            'spec': f'K{i:05d}', 'syn': f'{body}{i:05d}，{head}{body}', 'kw': f'{body},{head}{body}件{i % 500}',
+            'desc': f'{head} {body} 标准件', 'priority': rng.randint(1, 100),
+        })
+    db.session.execute(text("""
+        INSERT INTO material_knowledge_base (standard_name, category, spec_pattern, synonyms, keywords,
+                                             description, match_priority, source)
+        VALUES (:name, :cat, :spec, :syn, :kw, :desc, :priority, 'manual')
+    """), rows)
+    db.session.commit()
+    return rows
+
+
+def make_queries(rows, count, rng):
+    distinct = []
+    for _ in range(max(count // 3, 1)):
+        row = rng.choice(rows)
+        kind = rng.random()
+        if kind < 0.35:
+            distinct.append((row['name'], ''))                         # 精确
+        elif kind < 0.6:
+            distinct.append((row['name'] + '-A', row['spec'] + '-2RS'))  # 名称 / 型号前缀
+        elif kind < 0.85:
+            distinct.append((row['kw'].split(',')[1], ''))               # 关键词
+        else:
+            distinct.append((f'未知物料{rng.randint(0, 10 ** 6)}', ''))  # 未命中
+    return [rng.choice(distinct) for _ in range(count)]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(label, service, queries, counter):
+    latencies = []
+    start_queries = counter[0]
+    hits = 0
+    for name, spec in queries:
+        start = time.perf_counter()
+        hits += service.search(name, spec) is not None
+        latencies.append(time.perf_counter() - start)
+    per_query = (counter[0] - start_queries) / len(queries)
+    print(f"  {label:22s} p50 {percentile(latencies, 0.5) * 1e6:9.1f} us  p99 {percentile(latencies, 0.99) * 1e6:9.1f} us"
+          f"  {per_query:5.2f} SQL/search  hits {hits}/{len(queries)}")
+
+
+def classify_queries(label, service, queries, counter):
+    classifier = LocalClassifier(use_ollama=False, use_knowledge=False)
+    classifier.knowledge_service = service
+    start_queries = counter[0]
+    start = time.perf_counter()
+    for name, spec in queries:
+        classifier.classify(name, spec)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:22s} {(counter[0] - start_queries) / len(queries):5.2f} SQL/classification  "
+          f"{len(queries) / elapsed:8.0f} classifications/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--materials', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+    logging.getLogger('services.material_knowledge').setLevel(logging.CRITICAL)
+    logging.getLogger('services.ai_classifier').setLevel(logging.CRITICAL)
+
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'caigou.db')}"
+        db.init_app(app)
+        with app.app_context():
+            create_tables()
+            rows = seed(args.materials, rng)
+            queries = make_queries(rows, args.queries, rng)
+            counter = [0]
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: counter.__setitem__(0, counter[0] + 1))
+            print(f"{args.materials} materials, {len(queries)} searches ({len(set(queries))} distinct)")
+
+            legacy = LegacySqliteService()
+            run('legacy SQL', legacy, queries, counter)
+
+            indexed = MaterialKnowledgeService()
+            start = time.perf_counter()
+            indexed.index.ensure_fresh()
+            print(f"  index build            {(time.perf_counter() - start) * 1000:9.1f} ms  {indexed.index.stats()}")
+            run('index (cold cache)', indexed, queries, counter)
+            run('index (warm cache)', indexed, queries, counter)
+
+            same = sum(legacy.search_exact(n, s) == indexed.search_exact(n, s) for n, s in queries[:500])
+            print(f"  exact results match legacy: {same}/{min(500, len(queries))}")
+
+            classify_queries('classify legacy', LegacySqliteService(), queries, counter)
+            classify_queries('classify index', indexed, queries, counter)
+
+
+if __name__ == '__main__':
+    main()
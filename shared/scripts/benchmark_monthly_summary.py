@@ -0,0 +1,195 @@
+"""
+HR 月度考勤汇总基准：逐员工查询 + 逐行写入 vs 集合化聚合 + 批量写入
+
+在 SQLite 中构造 --employees 名员工 × 31 天考勤记录和加班记录，分别统计
+原实现（每名员工 3 次查询）、集合化全量生成和增量生成（只重算记录有变化的员工）
+的耗时与 SQL 数，并核对两种实现的汇总结果一致。
+
+Usage:
+    python shared/scripts/benchmark_monthly_summary.py --employees 5000
+    python shared/scripts/benchmark_monthly_summary.py --employees 1000 --changed 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'HR', 'backend'))
+
+from flask import Flask
+from sqlalchemy import and_, event, insert
+
+from app import db
+from app.models import Employee, AttendanceRecord, OvertimeRequest, MonthlyAttendanceSummary
+from app.services.attendance_summary import generate_monthly_summaries, month_range
+
+YEAR, MONTH = 2025, 1
+FIELDS = ('actual_work_days', 'late_count', 'late_minutes_total', 'early_leave_count',
+          'early_leave_minutes_total', 'absent_days', 'actual_hours', 'overtime_hours',
+          'workday_overtime_hours', 'weekend_overtime_hours', 'holiday_overtime_hours')
+
+
+def legacy_generate(year, month):
+    """原实现：逐员工查询已有汇总、考勤记录和加班记录，逐行新增/更新"""
+    start_date, end_date = month_range(year, month)
+    count = 0
+    for emp in Employee.query.filter_by(employment_status='Active').all():
+        existing = MonthlyAttendanceSummary.query.filter_by(employee_id=emp.id, year=year, month=month).first()
+        if existing and existing.is_locked:
+            continue
+        records = AttendanceRecord.query.filter(and_(
+            AttendanceRecord.employee_id == emp.id,
+            AttendanceRecord.attendance_date >= start_date,
+            AttendanceRecord.attendance_date <= end_date
+        )).all()
+        late = [r for r in records if r.is_late]
+        early = [r for r in records if r.is_early_leave]
+        overtime = OvertimeRequest.query.filter(and_(
+            OvertimeRequest.employee_id == emp.id,
+            OvertimeRequest.overtime_date >= start_date,
+            OvertimeRequest.overtime_date <= end_date,
+            OvertimeRequest.status == 'approved'
+        )).all()
+        values = dict(
+            actual_work_days=len([r for r in records if r.check_in_time and r.check_out_time]),
+            late_count=len(late),
+            late_minutes_total=sum(r.late_minutes for r in late),
+            early_leave_count=len(early),
+            early_leave_minutes_total=sum(r.early_leave_minutes for r in early),
+            absent_days=len([r for r in records if r.is_absent]),
+            actual_hours=round(sum(r.work_hours or 0 for r in records), 2),
+            overtime_hours=round(sum(r.overtime_hours or 0 for r in records), 2),
+            **{f'{t}_overtime_hours': round(sum(o.actual_hours or o.planned_hours for o in overtime
+                                                if o.overtime_type == t), 2)
+               for t in ('workday', 'weekend', 'holiday')}
+        )
+        if existing:
+            for key, value in values.items():
+                setattr(existing, key, value)
+        else:
+            db.session.add(MonthlyAttendanceSummary(employee_id=emp.id, year=year, month=month,
+                                                    work_days=22, standard_hours=176, **values))
+        count += 1
+    db.session.commit()
+    return count
+
+
+def seed(employees):
+    rng = random.Random(employees)
+    start_date, end_date = month_range(YEAR, MONTH)
+    days = (end_date - start_date).days + 1
+    db.session.execute(insert(Employee), [
+        {'empNo': f'E{i:06d}', 'name': f'员工{i}', 'employment_status': 'Active' if i % 50 else 'Resigned'}
+        for i in range(1, employees + 1)
+    ])
+    records, overtime = [], []
+    for emp_id in range(1, employees + 1):
+        for d in range(days):
+            day = start_date + timedelta(days=d)
+            absent = rng.random() < 0.03
+            late = not absent and rng.random() < 0.08
+            early = not absent and rng.random() < 0.04
+            check_in = None if absent else datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+            records.append({
+                'employee_id': emp_id, 'attendance_date': day,
+                'check_in_time': check_in,
+                'check_out_time': None if absent or rng.random() < 0.02 else check_in + timedelta(hours=9),
+                'is_late': late, 'late_minutes': rng.randint(1, 40) if late else 0,
+                'is_early_leave': early, 'early_leave_minutes': rng.randint(1, 30) if early else 0,
+                'is_absent': absent,
+                'work_hours': 0 if absent else round(rng.uniform(7, 9), 2),
+                'overtime_hours': round(rng.choice([0, 0, 0, 1, 1.5, 2]), 2),
+            })
+        for _ in range(rng.randint(0, 6)):
+            overtime.append({
+                'employee_id': emp_id,
+                'overtime_date': start_date + timedelta(days=rng.randrange(days)),
+                'overtime_type': rng.choice(['workday', 'weekend', 'holiday']),
+                'start_time': datetime.min.time(), 'end_time': datetime.min.time(),
+                'planned_hours': rng.choice([1, 2, 3]),
+                'actual_hours': rng.choice([None, 0, 1.5, 2.5]),
+                'reason': 'bench', 'status': rng.choice(['approved', 'approved', 'pending']),
+            })
+    for i in range(0, len(records), 20000):
+        db.session.execute(insert(AttendanceRecord), records[i:i + 20000])
+    db.session.execute(insert(OvertimeRequest), overtime)
+    db.session.commit()
+    return len(records), len(overtime)
+
+
+def snapshot():
+    return {s.employee_id: tuple(getattr(s, f) for f in FIELDS) for s in
+            MonthlyAttendanceSummary.query.filter_by(year=YEAR, month=MONTH)}
+
+
+def timed(counter, fn):
+    queries = counter[0]
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, counter[0] - queries, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=5000)
+    parser.add_argument('--changed', type=int, default=50, help='增量测试中修改记录的员工数')
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'hr.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            records, overtime = seed(args.employees)
+            print(f"{args.employees} employees, {records} attendance records, {overtime} overtime requests "
+                  f"(seeded in {time.perf_counter() - start:.1f} s)")
+
+            counter = [0]
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: counter.__setitem__(0, counter[0] + 1))
+
+            if not args.skip_legacy:
+                elapsed, queries, count = timed(counter, lambda: legacy_generate(YEAR, MONTH))
+                print(f"  legacy per-employee   {elapsed:8.2f} s  {queries:6d} SQL  ({count} summaries)")
+                legacy = snapshot()
+                MonthlyAttendanceSummary.query.delete()
+                db.session.commit()
+
+            def run(**kwargs):
+                stats = generate_monthly_summaries(YEAR, MONTH, **kwargs)
+                db.session.commit()
+                return stats
+
+            elapsed, queries, stats = timed(counter, run)
+            print(f"  set-based (create)    {elapsed:8.2f} s  {queries:6d} SQL  {stats}")
+            if not args.skip_legacy:
+                current = snapshot()
+                mismatched = [k for k in legacy if legacy[k] != current.get(k)]
+                print(f"  results match legacy: {not mismatched and len(legacy) == len(current)}")
+
+            elapsed, queries, stats = timed(counter, run)
+            print(f"  set-based (update)    {elapsed:8.2f} s  {queries:6d} SQL  {stats}")
+
+            elapsed, queries, stats = timed(counter, lambda: run(incremental=True))
+            print(f"  incremental, no change{elapsed:8.2f} s  {queries:6d} SQL  {stats}")
+
+            # 修改部分员工的考勤记录后增量重算
+            time.sleep(0.01)
+            changed = random.Random(3).sample(range(1, args.employees + 1), args.changed)
+            for record in AttendanceRecord.query.filter(AttendanceRecord.employee_id.in_(changed),
+                                                        AttendanceRecord.attendance_date == date(YEAR, MONTH, 1)):
+                record.is_late, record.late_minutes = True, 15
+            db.session.commit()
+            elapsed, queries, stats = timed(counter, lambda: run(incremental=True))
+            print(f"  incremental, {args.changed} changed{elapsed:8.2f} s  {queries:6d} SQL  {stats}")
+
+
+if __name__ == '__main__':
+    main()
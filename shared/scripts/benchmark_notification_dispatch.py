@@ -0,0 +1,234 @@
+"""
+RFQ 通知派发基准：逐条任务查询 + 发送 + 提交 vs 批量派发器（认领 → 按供应商合并 → 通道并发限速 → 批量写回）
+
+本机起一个 HTTP 替身充当微信服务号客服消息接口（每次请求延迟 --latency 毫秒），在临时 sqlite 库生成
+--rfqs 个 RFQ × --suppliers 个供应商 × --categories 个品类的通知任务（一半供应商已关注服务号走 wechat，
+其余走站内信），分别统计原方式（_process_notification_tasks_sync 逐条处理，每条任务一次接口调用）
+与 NotificationDispatcher 的吞吐（任务/秒）、接口调用次数、SQL 条数，并核对两边每个供应商都收到了
+全部 RFQ 的通知、任务全部为 sent。
+
+Usage:
+    python shared/scripts/benchmark_notification_dispatch.py --rfqs 10 --suppliers 50 --latency 10
+    python shared/scripts/benchmark_notification_dispatch.py --concurrency 8 --rate 200
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, '采购', 'backend'))
+
+import requests
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.dialects.mysql import BIGINT
+from sqlalchemy.ext.compiler import compiles
+
+import models  # noqa: F401
+import models.purchase_order  # noqa: F401
+import models.rfq_item  # noqa: F401
+import models.supplier_quote  # noqa: F401
+from extensions import db
+from models.notification import Notification
+from models.rfq import RFQ
+from models.rfq_notification_task import RFQNotificationTask
+from models.supplier import Supplier
+from services.notification_dispatcher import InAppChannel, NotificationDispatcher, WeChatChannel
+
+CATEGORIES = ['刀具/铣削刀具', '五金劳保/劳保防护', '电器气动/气动元件', '机械零部件/轴承']
+
+
+@compiles(BIGINT, 'sqlite')
+def _sqlite_bigint(element, compiler, **kw):
+    return 'INTEGER'
+
+
+class StandInEndpoint:
+    """本机 HTTP 替身：POST 任意路径，延迟 latency 秒后返回 errcode=0，记录收件人"""
+
+    def __init__(self, latency):
+        self.received = []
+        lock = threading.Lock()
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                time.sleep(latency)
+                with lock:
+                    endpoint.received.append(body)
+                payload = b'{"errcode": 0, "errmsg": "ok"}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/cgi-bin/message/custom/send"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StandInWeChatService:
+    """与 WeChatOfficialService.send_text_message 同签名，请求发往本机替身"""
+
+    def __init__(self, url):
+        self.url = url
+        self._local = threading.local()
+
+    def is_enabled(self):
+        return True
+
+    def send_text_message(self, openid, content):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        payload = {"touser": openid, "msgtype": "text", "text": {"content": content}}
+        return session.post(self.url, json=payload, timeout=10).json().get('errcode') == 0
+
+
+def make_app(path, rfqs, suppliers, categories):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[m.__table__ for m in (Supplier, RFQ, RFQNotificationTask,
+                                                                          Notification)])
+        for i in range(1, suppliers + 1):
+            subscribed = i % 2 == 1
+            db.session.add(Supplier(id=i, company_name=f'供应商{i}', code=f'S{i}', email=f's{i}@x.com',
+                                    password_hash='x', tax_id=f'T{i}', contact_phone='13800000000',
+                                    contact_email=f's{i}@x.com', status='approved',
+                                    wechat_openid=f'openid-{i}' if subscribed else None, is_subscribed=subscribed))
+        for r in range(1, rfqs + 1):
+            db.session.add(RFQ(id=r, pr_id=r, status='sent'))
+        db.session.flush()
+        db.session.execute(RFQNotificationTask.__table__.insert(), [
+            {'rfq_id': r, 'supplier_id': s, 'category': CATEGORIES[(s + c) % len(CATEGORIES)], 'status': 'pending',
+             'retry_count': 0, 'max_retries': 5, 'created_at': datetime.utcnow()}
+            for r in range(1, rfqs + 1) for s in range(1, suppliers + 1) for c in range(categories)
+        ])
+        db.session.commit()
+    return app
+
+
+def legacy_process(task_ids, service):
+    """原方式：逐条任务查 RFQ / 供应商，发一次消息（或写一条站内信），单独提交"""
+    for task_id in task_ids:
+        task = db.session.get(RFQNotificationTask, task_id)
+        if not task or task.status != 'pending':
+            continue
+        rfq = db.session.get(RFQ, task.rfq_id)
+        supplier = db.session.get(Supplier, task.supplier_id)
+        if not rfq or not supplier:
+            task.status = 'failed'
+            db.session.commit()
+            continue
+        content = f"您好 {supplier.company_name}，您有新询价单 RFQ#{rfq.id} 待报价：{task.category}"
+        if supplier.wechat_openid and supplier.is_subscribed:
+            service.send_text_message(supplier.wechat_openid, content)
+        else:
+            db.session.add(Notification(recipient_id=supplier.id, recipient_type='supplier',
+                                        notification_type='rfq_invitation', title=f'新询价单 RFQ#{rfq.id}',
+                                        message=content, related_type='rfq', related_id=rfq.id,
+                                        is_sent=True, sent_at=datetime.utcnow(), send_method='in_app'))
+        task.status = 'sent'
+        task.sent_at = datetime.utcnow()
+        db.session.commit()
+
+
+def collect(endpoint_bodies, suppliers, rfqs):
+    """每个供应商收到通知的 RFQ 集合（服务号消息正文 + 站内信）"""
+    received = {s: set() for s in range(1, suppliers + 1)}
+    for body in endpoint_bodies:
+        supplier_id = int(body['touser'].split('-')[1])
+        received[supplier_id].update(r for r in range(1, rfqs + 1) if f"RFQ#{r}：" in body['text']['content']
+                                     or f"RFQ#{r} " in body['text']['content'])
+    for notification in Notification.query:
+        if notification.data:
+            received[notification.recipient_id].update(int(r) for r in json.loads(notification.data)['rfqs'])
+        else:
+            received[notification.recipient_id].add(notification.related_id)
+    return received
+
+
+def run(label, app, endpoint, fn):
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(1))
+        task_ids = [row[0] for row in db.session.query(RFQNotificationTask.id).order_by(RFQNotificationTask.id)]
+        endpoint.received.clear()
+        before = len(statements)
+        start = time.perf_counter()
+        fn(task_ids)
+        elapsed = time.perf_counter() - start
+        sql = len(statements) - before
+        calls = len(endpoint.received)
+        sent = RFQNotificationTask.query.filter_by(status='sent').count()
+        print(f"  {label:<10} {len(task_ids) / elapsed:9.1f} tasks/s  {elapsed:7.2f} s  "
+              f"wechat calls {calls:6d}  in-app rows {Notification.query.count():6d}  SQL {sql:7d}")
+        return sent, len(task_ids), list(endpoint.received)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rfqs', type=int, default=10)
+    parser.add_argument('--suppliers', type=int, default=50)
+    parser.add_argument('--categories', type=int, default=2, help='每个 RFQ × 供应商的品类（任务）数')
+    parser.add_argument('--latency', type=float, default=10, help='替身接口每次请求延迟（毫秒）')
+    parser.add_argument('--concurrency', type=int, default=8, help='wechat 通道并发上限')
+    parser.add_argument('--rate', type=float, default=0, help='wechat 通道限速（条/秒，0 不限）')
+    parser.add_argument('--batch', type=int, default=200, help='每批认领任务数')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    endpoint = StandInEndpoint(args.latency / 1000)
+    service = StandInWeChatService(endpoint.url)
+    total = args.rfqs * args.suppliers * args.categories
+    print(f"{total} notification tasks ({args.rfqs} RFQs × {args.suppliers} suppliers × {args.categories} categories), "
+          f"endpoint latency {args.latency:g} ms")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            legacy_app = make_app(os.path.join(tmp_dir, 'legacy.db'), args.rfqs, args.suppliers, args.categories)
+            batch_app = make_app(os.path.join(tmp_dir, 'batch.db'), args.rfqs, args.suppliers, args.categories)
+
+            legacy = run('legacy', legacy_app, endpoint, lambda ids: legacy_process(ids, service))
+            with legacy_app.app_context():
+                legacy_received = collect(legacy[2], args.suppliers, args.rfqs)
+
+            wechat = WeChatChannel(service)
+            wechat.concurrency, wechat.rate = args.concurrency, args.rate
+            dispatcher = NotificationDispatcher([wechat, InAppChannel()], batch_size=args.batch)
+            batch = run('dispatcher', batch_app, endpoint, lambda ids: dispatcher.drain(task_ids=ids))
+            with batch_app.app_context():
+                batch_received = collect(batch[2], args.suppliers, args.rfqs)
+
+            expected = {s: set(range(1, args.rfqs + 1)) for s in range(1, args.suppliers + 1)}
+            ok = legacy[0] == batch[0] == total and legacy_received == batch_received == expected
+            print(f"  results match: {ok}")
+            if not ok:
+                sys.exit(1)
+    finally:
+        endpoint.close()
+
+
+if __name__ == '__main__':
+    main()
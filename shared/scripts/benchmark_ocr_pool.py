@@ -0,0 +1,176 @@
+"""
+发票 OCR 基准：每张发票起一个子进程（解释器启动 + 加载模型）vs 常驻 OCR 工作池（仅 CPU）
+
+在临时目录生成 --images 张发票样图，分别统计:
+    legacy      每张 subprocess 启动 Python、加载模型、识别（原 ocr_paddle.py 方式）
+    pool        常驻工作池冷启动耗时，之后经本机 socket（PoolClient）逐张识别的稳态延迟
+    concurrent  --workers 个工作进程并发识别的吞吐
+
+安装了 rapidocr_onnxruntime / paddleocr 时使用真实引擎（services/ocr_worker.py）；
+未安装时用模拟引擎：加载模型 sleep --stub-load 秒，每张解码图片后做 --stub-cost 秒 CPU 计算。
+
+Usage:
+    python shared/scripts/benchmark_ocr_pool.py --images 20 --workers 2
+    python shared/scripts/benchmark_ocr_pool.py --engine stub --stub-load 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+BACKEND = os.path.join(ROOT, '采购', 'backend')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from shared.process_pool import PoolClient, PoolServer, ProcessPool
+
+STUB_COST = 'BENCH_OCR_STUB_COST'
+
+
+def stub_load(seconds):
+    """模拟模型加载"""
+    time.sleep(seconds)
+
+
+def stub_recognize(image_path):
+    """模拟识别：解码图片 + 固定 CPU 耗时"""
+    with Image.open(image_path) as image:
+        pixels = image.convert('L').tobytes()
+    deadline = time.perf_counter() + float(os.getenv(STUB_COST, 0.15))
+    checksum = 0
+    while time.perf_counter() < deadline:
+        checksum = (checksum * 31 + len(pixels)) % 1000003
+    return {'success': True, 'text': f'stub {len(pixels)}', 'lines': [], 'count': 0, 'confidence': 0.0}
+
+
+def _font(size):
+    for path in ('/usr/share/fonts/truetype/wqy/wqy-microhei.ttc', '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+                 'C:/Windows/Fonts/msyh.ttc', '/System/Library/Fonts/PingFang.ttc'):
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default()
+
+
+def write_invoices(directory, count):
+    """发票样图（1200x800，发票号码、日期、购销方、金额等）"""
+    font, title = _font(26), _font(40)
+    paths = []
+    for i in range(count):
+        image = Image.new('RGB', (1200, 800), 'white')
+        draw = ImageDraw.Draw(image)
+        draw.text((380, 30), '增值税专用发票 VAT INVOICE', fill='black', font=title)
+        lines = [
+            f'发票代码: 44{i:010d}    发票号码: {10000000 + i}',
+            f'开票日期: 2025年{i % 12 + 1:02d}月{i % 28 + 1:02d}日',
+            f'购买方: 东莞某某制造有限公司  纳税人识别号: 91441900MA5{i:07d}',
+            f'销售方: 深圳某某科技有限公司  纳税人识别号: 91440300MA5{i:07d}',
+            f'货物名称: 铝型材 6063-T5   数量: {100 + i}   单价: 23.50',
+            f'金额: ¥{(100 + i) * 23.5:.2f}   税率: 13%   税额: ¥{(100 + i) * 23.5 * 0.13:.2f}',
+            f'价税合计(小写): ¥{(100 + i) * 23.5 * 1.13:.2f}',
+            '开票人: 张三    备注: 月结',
+        ]
+        for row, text in enumerate(lines):
+            draw.text((60, 140 + row * 70), text, fill='black', font=font)
+        draw.rectangle((40, 120, 1160, 720), outline='black', width=2)
+        path = os.path.join(directory, f'invoice_{i:03d}.png')
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def legacy_ocr(path, engine, stub_load_seconds):
+    """原方式：每张一个子进程，启动解释器并加载模型"""
+    if engine == 'stub':
+        code = (f"import sys; sys.path[:0] = {[ROOT, os.path.dirname(os.path.abspath(__file__))]!r}; "
+                f"import json, benchmark_ocr_pool as b; b.stub_load({stub_load_seconds}); "
+                f"print(json.dumps(b.stub_recognize({path!r})))")
+    else:
+        code = (f"import sys; sys.path[:0] = {[ROOT, BACKEND]!r}; import json; "
+                f"from services.ocr_worker import load_engine, recognize; load_engine(); "
+                f"print(json.dumps(recognize({path!r}), ensure_ascii=False))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=300,
+                            encoding='utf-8')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def make_pool(engine, workers, stub_load_seconds):
+    if engine == 'stub':
+        return ProcessPool('benchmark_ocr_pool:stub_recognize', size=workers, initializer='benchmark_ocr_pool:stub_load',
+                           init_args=(stub_load_seconds,), timeout=120, name='bench-ocr')
+    return ProcessPool('services.ocr_worker:recognize', size=workers, initializer='services.ocr_worker:load_engine',
+                       timeout=120, name='bench-ocr')
+
+
+def describe(latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return f"mean {statistics.mean(ordered) * 1000:8.1f} ms  p50 {statistics.median(ordered) * 1000:8.1f} ms  p95 {p95 * 1000:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--engine', choices=('auto', 'real', 'stub'), default='auto')
+    parser.add_argument('--stub-load', type=float, default=3.0, help='模拟引擎加载模型耗时（秒）')
+    parser.add_argument('--stub-cost', type=float, default=0.15, help='模拟引擎每张识别耗时（秒）')
+    parser.add_argument('--legacy-images', type=int, default=5, help='legacy 方式识别张数（每张要加载模型）')
+    args = parser.parse_args()
+
+    engine = args.engine
+    if engine == 'auto':
+        from services.ocr_worker import engine_available
+        engine = 'real' if engine_available() else 'stub'
+    os.environ[STUB_COST] = str(args.stub_cost)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        images = write_invoices(tmp_dir, args.images)
+        print(f"{args.images} invoice images, engine={engine}, cpu={os.cpu_count()}")
+
+        latencies = []
+        for path in images[:args.legacy_images]:
+            start = time.perf_counter()
+            assert legacy_ocr(path, engine, args.stub_load)['success']
+            latencies.append(time.perf_counter() - start)
+        print(f"  legacy subprocess/image    {describe(latencies)}  ({len(latencies)} images)")
+
+        start = time.perf_counter()
+        pool = make_pool(engine, args.workers, args.stub_load).start()
+        print(f"  pool cold start            {time.perf_counter() - start:8.2f} s ({args.workers} workers, 一次性)")
+        address = os.path.join(tmp_dir, 'ocr.sock') if hasattr(__import__('socket'), 'AF_UNIX') else '127.0.0.1:8799'
+        server = PoolServer(pool, address, b'benchmark').start()
+        client = PoolClient(address, b'benchmark')
+        try:
+            client.run(images[0])  # 预热
+            latencies = []
+            for path in images:
+                start = time.perf_counter()
+                assert client.run(path)['success']
+                latencies.append(time.perf_counter() - start)
+            print(f"  pool steady state (socket) {describe(latencies)}  ({len(latencies)} images)")
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.workers * 2) as executor:
+                results = list(executor.map(client.run, images))
+            elapsed = time.perf_counter() - start
+            assert all(r['success'] for r in results)
+            print(f"  pool concurrent            {len(images) / elapsed:8.1f} images/s ({args.workers} workers)")
+            stats = client.stats()
+            print(f"  pool stats: wait_ms={stats['wait_ms']} run_ms={stats['run_ms']} "
+                  f"completed={stats['completed']} rss_mb={stats['rss_mb']}")
+        finally:
+            server.close()
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+HR 批量算薪基准：逐员工查询 + 逐人查税率表 + 逐人取单号 vs 预加载 + 列式计算 + 批量写入
+
+在 SQLite 中构造 --employees 名员工的薪资档案和当月考勤汇总，分别统计
+原实现（每名员工 4 次查询 + 1 次取单号）、批量引擎首次计算（全部新建）、
+重算（全部更新）和试算（dry_run）的耗时与 SQL 数，并核对两种实现的结果一致。
+
+Usage:
+    python shared/scripts/benchmark_payroll.py --employees 10000
+    python shared/scripts/benchmark_payroll.py --employees 2000 --skip-legacy
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'HR', 'backend'))
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from app import db
+from app.models import Employee
+from app.models.attendance import MonthlyAttendanceSummary
+from app.models.payroll import EmployeeSalary, Payroll, TaxBracket, init_default_tax_brackets
+from app.services.payroll_engine import RESULT_FIELDS, calculate_payrolls
+from shared.sequence import get_allocator
+
+YEAR, MONTH = 2025, 1
+
+
+def legacy_tax(taxable_income):
+    brackets = TaxBracket.query.filter(TaxBracket.is_active == True).order_by(TaxBracket.min_income).all()
+    for bracket in brackets:
+        max_income = bracket.max_income if bracket.max_income else float('inf')
+        if taxable_income <= max_income:
+            return max(0, taxable_income * (bracket.tax_rate / 100) - bracket.quick_deduction)
+    return max(0, taxable_income * (brackets[-1].tax_rate / 100) - brackets[-1].quick_deduction)
+
+
+def legacy_calculate(year, month):
+    """原实现：逐员工查询薪资档案、已有工资单、考勤汇总和税率表，逐个取单号、逐行写入"""
+    allocator = get_allocator(db.engine)
+    today = datetime.now().strftime('%Y%m%d')
+    count = 0
+    for emp in Employee.query.filter(Employee.employment_status == 'Active').all():
+        salary = EmployeeSalary.query.filter_by(employee_id=emp.id, is_current=True).first()
+        if not salary:
+            continue
+        existing = Payroll.query.filter_by(employee_id=emp.id, year=year, month=month).first()
+        payroll = existing or Payroll(
+            payroll_no=f"GZ-{today}-{allocator.next_value('GZ', today, session=db.session):04d}",
+            employee_id=emp.id, year=year, month=month, bonus=0, performance_bonus=0, leave_deduction=0, other_deduction=0)
+        attendance = MonthlyAttendanceSummary.query.filter_by(employee_id=emp.id, year=year, month=month).first()
+        payroll.base_salary = salary.base_salary
+        payroll.position_salary = salary.position_salary
+        payroll.performance_salary = salary.performance_salary
+        payroll.housing_allowance = salary.housing_allowance
+        payroll.transport_allowance = salary.transport_allowance
+        payroll.meal_allowance = salary.meal_allowance
+        payroll.other_allowance = salary.phone_allowance + salary.other_allowance
+        payroll.allowances = (payroll.housing_allowance + payroll.transport_allowance +
+                              payroll.meal_allowance + payroll.other_allowance)
+        payroll.absence_deduction = 0
+        if attendance:
+            payroll.work_days = attendance.work_days
+            payroll.actual_work_days = attendance.actual_work_days
+            payroll.overtime_hours = attendance.overtime_hours
+            daily_rate = salary.base_salary / 21.75
+            payroll.overtime_pay = attendance.overtime_hours * (daily_rate / 8) * 1.5
+            absent_days = payroll.work_days - payroll.actual_work_days
+            if absent_days > 0:
+                payroll.absence_deduction = absent_days * daily_rate
+            payroll.late_deduction = attendance.late_count * 20
+        else:
+            payroll.work_days = payroll.actual_work_days = 21.75
+            payroll.overtime_hours = payroll.overtime_pay = payroll.late_deduction = 0
+        payroll.social_insurance = salary.social_insurance
+        payroll.housing_fund = salary.housing_fund
+        payroll.deductions = (payroll.absence_deduction + payroll.late_deduction +
+                              payroll.leave_deduction + payroll.other_deduction)
+        payroll.gross_salary = (payroll.base_salary + payroll.position_salary + payroll.performance_salary +
+                                payroll.overtime_pay + payroll.allowances + payroll.bonus +
+                                payroll.performance_bonus - payroll.deductions)
+        payroll.taxable_income = max(0, payroll.gross_salary - payroll.social_insurance -
+                                     payroll.housing_fund - 5000)
+        payroll.tax = legacy_tax(payroll.taxable_income)
+        payroll.net_salary = payroll.gross_salary - payroll.social_insurance - payroll.housing_fund - payroll.tax
+        payroll.status = 'calculated'
+        payroll.calculated_at = datetime.now()
+        if not existing:
+            db.session.add(payroll)
+        count += 1
+    db.session.commit()
+    return count
+
+
+def seed(employees):
+    rng = random.Random(employees)
+    db.session.execute(insert(Employee), [
+        {'empNo': f'E{i:06d}', 'name': f'员工{i}', 'employment_status': 'Active' if i % 50 else 'Resigned'}
+        for i in range(1, employees + 1)
+    ])
+    db.session.execute(insert(EmployeeSalary), [{
+        'employee_id': i,
+        'base_salary': rng.choice([3000, 6500, 12000, 30000, 80000]) + rng.randint(0, 999),
+        'position_salary': rng.choice([0, 500, 2000]), 'performance_salary': rng.choice([0, 1000, 5000]),
+        'housing_allowance': rng.choice([0, 300]), 'transport_allowance': rng.choice([0, 200]),
+        'meal_allowance': 150, 'phone_allowance': rng.choice([0, 100]), 'other_allowance': 0,
+        'social_insurance': rng.choice([420.5, 1100]), 'housing_fund': rng.choice([300, 1200]),
+        'effective_date': date(2024, 1, 1), 'is_current': True,
+    } for i in range(1, employees + 1)])
+    db.session.execute(insert(MonthlyAttendanceSummary), [{
+        'employee_id': i, 'year': YEAR, 'month': MONTH, 'work_days': 22,
+        'actual_work_days': rng.choice([22, 22, 21, 19.5]),
+        'late_count': rng.choice([0, 0, 1, 3]), 'overtime_hours': rng.choice([0, 4.5, 12]),
+    } for i in range(1, employees + 1) if i % 10])
+    db.session.commit()
+    init_default_tax_brackets()
+
+
+def snapshot():
+    return {p.employee_id: tuple(getattr(p, f) for f in RESULT_FIELDS) for p in
+            Payroll.query.filter_by(year=YEAR, month=MONTH)}
+
+
+def timed(counter, fn):
+    queries = counter[0]
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, counter[0] - queries, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=10000)
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'hr.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            seed(args.employees)
+            print(f"{args.employees} employees")
+
+            counter = [0]
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: counter.__setitem__(0, counter[0] + 1))
+
+            if not args.skip_legacy:
+                elapsed, queries, count = timed(counter, lambda: legacy_calculate(YEAR, MONTH))
+                print(f"  legacy per-employee  {elapsed:8.2f} s  {queries:6d} SQL  ({count} payrolls)")
+                legacy = snapshot()
+                Payroll.query.delete()
+                db.session.commit()
+
+            def run(**kwargs):
+                results, errors, stats = calculate_payrolls(YEAR, MONTH, **kwargs)
+                db.session.commit()
+                return {k: v for k, v in stats.items() if k != 'totals'}
+
+            elapsed, queries, stats = timed(counter, run)
+            print(f"  engine (create)      {elapsed:8.2f} s  {queries:6d} SQL  {stats}")
+            if not args.skip_legacy:
+                current = snapshot()
+                mismatched = [k for k in legacy if legacy[k] != current.get(k)]
+                print(f"  results match legacy: {not mismatched and len(legacy) == len(current)}")
+
+            elapsed, queries, stats = timed(counter, run)
+            print(f"  engine (update)      {elapsed:8.2f} s  {queries:6d} SQL  {stats}")
+
+            elapsed, queries, stats = timed(counter, lambda: run(
+                dry_run=True, tax_brackets=[{'min_income': 0, 'max_income': None, 'tax_rate': 10}]))
+            print(f"  engine (dry run)     {elapsed:8.2f} s  {queries:6d} SQL  {stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+项目进度更新基准：逐阶段全量重算 vs progress_rollups 增量汇总
+
+构造一个 7 个阶段的项目（默认 10000 个任务），逐个修改任务完成度，
+分别统计原实现（每个阶段一次任务查询并加载全部任务）、集合化全量重算
+（update_all_progress）和增量汇总（apply_task_change）的单次耗时与 SQL 数；
+再按不同任务规模验证增量更新耗时不随任务数增长，并比较批量更新。
+
+Usage:
+    python shared/scripts/benchmark_progress_rollup.py --tasks 10000
+    python shared/scripts/benchmark_progress_rollup.py --sizes 1000 10000 50000 --updates 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Portal', 'backend'))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+from models.project import Project
+from models.project_phase import ProjectPhase, ProgressRollup
+from models.task import Task
+from services.progress_calculator import ProgressCalculator
+
+PHASES = 7
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def legacy_update_all_progress(session, project_id):
+    """原实现：逐阶段查询任务并在 Python 中求和"""
+    phases = session.query(ProjectPhase).filter_by(project_id=project_id).all()
+    for phase in phases:
+        tasks = session.query(Task).filter_by(phase_id=phase.id).all()
+        total = sum((t.weight or 1) for t in tasks)
+        weighted = sum((t.completion_percentage or 0) * (t.weight or 1) for t in tasks)
+        phase.completion_percentage = round(weighted / total) if total else 0
+    project = session.query(Project).filter_by(id=project_id).first()
+    phases = session.query(ProjectPhase).filter_by(project_id=project_id).all()
+    project.progress_percentage = round(sum(p.completion_percentage or 0 for p in phases) / len(phases))
+
+
+def build_project(db_path, task_count):
+    engine = create_engine(f'sqlite:///{db_path}')
+    Base.metadata.create_all(engine, tables=[
+        Project.__table__, ProjectPhase.__table__, Task.__table__, ProgressRollup.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+
+    project = Project(project_no='BENCH-1', name='benchmark', created_by_id=1)
+    session.add(project)
+    session.flush()
+    phases = [ProjectPhase(project_id=project.id, phase_type=p['phase_type'], phase_order=p['phase_order'],
+                           name=p['name']) for p in ProjectPhase.get_default_phases()[:PHASES]]
+    session.add_all(phases)
+    session.flush()
+
+    rng = random.Random(task_count)
+    session.bulk_insert_mappings(Task, [{
+        'project_id': project.id,
+        'task_no': f'T{i:07d}',
+        'title': f'task {i}',
+        'created_by_id': 1,
+        'phase_id': phases[i % PHASES].id,
+        'weight': rng.randint(1, 10),
+        'completion_percentage': rng.randint(0, 100),
+    } for i in range(task_count)])
+    session.commit()
+
+    ProgressCalculator.verify_rollups(session, [project.id])
+    session.commit()
+    return engine, session, project.id
+
+
+def time_updates(session, counter, project_id, updates, apply):
+    rng = random.Random(1)
+    task_ids = [r[0] for r in session.query(Task.id).filter_by(project_id=project_id)]
+    queries = counter.count
+    start = time.perf_counter()
+    for _ in range(updates):
+        task = session.get(Task, rng.choice(task_ids))
+        before = ProgressCalculator.task_state(task)
+        task.completion_percentage = rng.randint(0, 100)
+        apply(session, project_id, before, task)
+        session.commit()
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / updates, (counter.count - queries) / updates
+
+
+def incremental(session, project_id, before, task):
+    ProgressCalculator.apply_task_change(session, before, task)
+
+
+def full_recompute(session, project_id, before, task):
+    ProgressCalculator.update_all_progress(session, project_id)
+
+
+def legacy(session, project_id, before, task):
+    legacy_update_all_progress(session, project_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 50000],
+                        help='验证增量更新耗时的任务规模')
+    parser.add_argument('--updates', type=int, default=100, help='每种方式的单任务更新次数')
+    parser.add_argument('--batch', type=int, default=500, help='批量更新的任务数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine, session, project_id = build_project(os.path.join(tmp_dir, 'bench.db'), args.tasks)
+        counter = QueryCounter(engine)
+
+        print(f"single-task update, {args.tasks} tasks / {PHASES} phases ({args.updates} updates)")
+        ms, queries = time_updates(session, counter, project_id, args.updates, incremental)
+        print(f"  {'incremental':16s} {ms:9.2f} ms/update  {queries:6.1f} SQL/update")
+        stats = ProgressCalculator.verify_rollups(session, [project_id])
+        session.rollback()
+        print(f"  verify after incremental updates: {stats}")
+
+        for name, apply in (('full recompute', full_recompute), ('legacy N+1', legacy)):
+            ms, queries = time_updates(session, counter, project_id, max(1, args.updates // 10), apply)
+            print(f"  {name:16s} {ms:9.2f} ms/update  {queries:6.1f} SQL/update")
+
+        # 批量更新：逐个增量 vs 合并差量
+        rng = random.Random(2)
+        task_ids = rng.sample([r[0] for r in session.query(Task.id)], min(args.batch, args.tasks))
+        for name, batched in (('per-task', False), ('batched', True)):
+            queries = counter.count
+            start = time.perf_counter()
+            tasks = session.query(Task).filter(Task.id.in_(task_ids)).all()
+            changes = []
+            for task in tasks:
+                before = ProgressCalculator.task_state(task)
+                task.completion_percentage = rng.randint(0, 100)
+                if batched:
+                    changes.append((before, ProgressCalculator.task_state(task)))
+                else:
+                    ProgressCalculator.apply_task_change(session, before, task)
+            if batched:
+                ProgressCalculator.apply_task_changes(session, changes)
+            session.commit()
+            print(f"  batch {len(tasks)} {name:9s} {(time.perf_counter() - start) * 1000:9.1f} ms  "
+                  f"{counter.count - queries:6d} SQL")
+        session.close()
+        engine.dispose()
+
+    print(f"\nincremental update vs project size ({args.updates} updates)")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine, session, project_id = build_project(os.path.join(tmp_dir, 'bench.db'), size)
+            counter = QueryCounter(engine)
+            ms, queries = time_updates(session, counter, project_id, args.updates, incremental)
+            print(f"  {size:7d} tasks  {ms:7.2f} ms/update  {queries:5.1f} SQL/update")
+            session.close()
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+RFQ 报价行扇出基准：逐 (物料, 供应商) 查询是否存在再插入 vs 一条 INSERT ... SELECT（反连接去重）
+
+在临时 sqlite 库生成 --items 个物料的 RFQ 和 --suppliers 个已审核供应商，分别统计原实现
+（每对一次存在性查询 + ORM 插入）和 RFQService.create_supplier_quotes_for_routes 的
+耗时、SQL 条数，核对两者生成的报价行一致；再统计重复发送（全部已存在）和
+match_suppliers_for_rfq 的 SQL 条数。
+
+Usage:
+    python shared/scripts/benchmark_rfq_fanout.py --items 500 --suppliers 50
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, '采购', 'backend'))
+
+from flask import Flask
+from sqlalchemy import and_, event
+from sqlalchemy.dialects.mysql import BIGINT, LONGTEXT
+from sqlalchemy.ext.compiler import compiles
+
+import models  # noqa: F401
+import models.purchase_order  # noqa: F401
+from extensions import db
+from models.rfq import RFQ
+from models.rfq_item import RFQItem
+from models.supplier import Supplier
+from models.supplier_category import SupplierCategory
+from models.supplier_major_category import SupplierMajorCategory, sync_supplier_major_categories
+from models.supplier_quote import SupplierQuote
+from services.rfq_service import RFQService
+
+MAJORS = ['刀具', '五金劳保', '电器气动', '机械零部件', '化工辅料']
+
+
+@compiles(BIGINT, 'sqlite')
+def _sqlite_bigint(element, compiler, **kw):
+    return 'INTEGER'
+
+
+@compiles(LONGTEXT, 'sqlite')
+def _sqlite_longtext(element, compiler, **kw):
+    return 'TEXT'
+
+
+def legacy_create_quotes(rfq, routes):
+    """原实现：每个物料 × 每个供应商先查是否存在，再逐条 add"""
+    items = RFQItem.query.filter_by(rfq_id=rfq.id).all()
+    all_supplier_ids = {int(sid) for ids in routes.values() for sid in ids}
+    created = 0
+    supplier_map = {}
+    for item in items:
+        category = (item.category or "未分类").strip()
+        for sid in all_supplier_ids:
+            exists = SupplierQuote.query.filter(and_(
+                SupplierQuote.supplier_id == sid, SupplierQuote.rfq_id == rfq.id, SupplierQuote.rfq_item_id == item.id
+            )).first()
+            if exists:
+                continue
+            if sid not in supplier_map:
+                s = db.session.get(Supplier, sid)
+                supplier_map[sid] = s.company_name if s else None
+            db.session.add(SupplierQuote(
+                rfq_id=rfq.id, rfq_item_id=item.id, supplier_id=sid, supplier_name=supplier_map.get(sid),
+                category=category, status='pending', item_name=item.item_name or "",
+                item_description=item.item_spec or "", quantity_requested=item.quantity or 1,
+                unit=item.unit or "个", created_at=datetime.utcnow()))
+            created += 1
+    db.session.commit()
+    return created
+
+
+def seed(items, suppliers):
+    for i in range(1, suppliers + 1):
+        db.session.add(Supplier(id=i, company_name=f'供应商{i}', code=f'S{i:04d}', email=f's{i}@example.com',
+                                password_hash='x', tax_id=f'T{i}', contact_phone='13800000000',
+                                contact_email=f's{i}@example.com', status='approved'))
+    db.session.flush()
+    for i in range(1, suppliers + 1):
+        majors = ', '.join(MAJORS[(i + k) % len(MAJORS)] for k in range(3))
+        db.session.add(SupplierCategory(supplier_id=i, category=majors, major_category=majors))
+    db.session.add(RFQ(id=1, pr_id=1, status='draft'))
+    for i in range(1, items + 1):
+        major = MAJORS[i % len(MAJORS)]
+        db.session.add(RFQItem(id=i, rfq_id=1, pr_item_id=i, item_name=f'物料{i}', item_spec=f'规格{i}',
+                               quantity=i % 7, unit='件' if i % 3 else '', category=f'{major}/子类{i % 4}',
+                               classification_source='rule'))
+    db.session.commit()
+    sync_supplier_major_categories()
+    db.session.commit()
+
+
+def snapshot():
+    columns = (SupplierQuote.rfq_item_id, SupplierQuote.supplier_id, SupplierQuote.supplier_name,
+               SupplierQuote.category, SupplierQuote.status, SupplierQuote.item_name, SupplierQuote.item_description,
+               SupplierQuote.quantity_requested, SupplierQuote.unit, SupplierQuote.payment_terms)
+    return set(db.session.query(*columns))
+
+
+def measure(counter, fn):
+    start_count = counter[0]
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, counter[0] - start_count, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--suppliers', type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger('services.ai_classifier').setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'caigou.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.metadata.create_all(db.engine, tables=[m.__table__ for m in (
+                Supplier, SupplierCategory, SupplierMajorCategory, RFQ, RFQItem, SupplierQuote)])
+            seed(args.items, args.suppliers)
+            counter = [0]
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: counter.__setitem__(0, counter[0] + 1))
+            service = RFQService.__new__(RFQService)  # 不初始化分类器
+
+            rfq = db.session.get(RFQ, 1)
+            elapsed, statements, routes = measure(counter, lambda: service.match_suppliers_for_rfq(rfq))
+            pairs = args.items * len({sid for ids in routes.values() for sid in ids})
+            print(f"{args.items} items x {args.suppliers} suppliers, {len(routes)} categories, {pairs} quote rows")
+            print(f"  {'match_suppliers_for_rfq':26s} {elapsed:8.3f} s  {statements:7d} SQL")
+
+            def report(label, measured):
+                elapsed, statements, created = measured
+                print(f"  {label:26s} {elapsed:8.3f} s  {statements:7d} SQL  created {created}")
+
+            report('legacy per-pair', measure(counter, lambda: legacy_create_quotes(db.session.get(RFQ, 1), routes)))
+            legacy = snapshot()
+            report('legacy re-send', measure(counter, lambda: legacy_create_quotes(db.session.get(RFQ, 1), routes)))
+            SupplierQuote.query.delete()
+            db.session.commit()
+
+            rfq = db.session.get(RFQ, 1)
+            report('INSERT ... SELECT', measure(counter, lambda: service.create_supplier_quotes_for_routes(rfq, routes)))
+            print(f"  results match legacy: {snapshot() == legacy}")
+            rfq = db.session.get(RFQ, 1)
+            report('INSERT ... SELECT re-send', measure(
+                counter, lambda: service.create_supplier_quotes_for_routes(rfq, routes)))
+
+
+if __name__ == '__main__':
+    main()
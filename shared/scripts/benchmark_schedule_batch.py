@@ -0,0 +1,133 @@
+"""
+HR 批量排班基准：逐 (员工, 日期) 查询 + 逐行插入 vs 一次查询比对 + 分批批量写入
+
+在 SQLite 中为 --employees 名员工排 --days 天班（部分日期已有排班），分别统计
+原实现和批量引擎的耗时与 SQL 数并核对结果一致；再测试轮班覆盖（overwrite）。
+
+Usage:
+    python shared/scripts/benchmark_schedule_batch.py --employees 1000 --days 90
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'HR', 'backend'))
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from app import db
+from app.models import Employee
+from app.models.attendance import Schedule, Shift
+from app.services.schedule_generator import generate_schedules
+
+START = date(2025, 1, 1)
+
+
+def legacy_batch(employee_ids, shift_id, start_date, end_date, rest_days):
+    """原实现：逐 (员工, 日期) 查询已有排班，逐行新增"""
+    created_count = skipped_count = 0
+    current_date = start_date
+    while current_date <= end_date:
+        is_rest = current_date.strftime('%Y-%m-%d') in rest_days or current_date.weekday() >= 5
+        for emp_id in employee_ids:
+            if Schedule.query.filter_by(employee_id=emp_id, schedule_date=current_date).first():
+                skipped_count += 1
+                continue
+            db.session.add(Schedule(employee_id=emp_id, shift_id=shift_id if not is_rest else None,
+                                    schedule_date=current_date, is_rest=is_rest, created_by=1))
+            created_count += 1
+        current_date += timedelta(days=1)
+    db.session.commit()
+    return {'created': created_count, 'skipped': skipped_count}
+
+
+def seed(employees, days):
+    db.session.execute(insert(Employee), [
+        {'empNo': f'E{i:06d}', 'name': f'员工{i}', 'employment_status': 'Active'} for i in range(1, employees + 1)
+    ])
+    db.session.execute(insert(Shift), [
+        {'name': name, 'code': name, 'start_time': dtime(h), 'end_time': dtime((h + 9) % 24)}
+        for name, h in (('DAY', 8), ('MID', 14), ('NIGHT', 20))
+    ])
+    rng = random.Random(employees)
+    db.session.execute(insert(Schedule), [
+        {'employee_id': emp_id, 'schedule_date': START + timedelta(days=rng.randrange(days)),
+         'shift_id': 3, 'is_rest': False}
+        for emp_id in range(1, employees + 1, 4)
+    ])
+    db.session.commit()
+
+
+def snapshot():
+    return {(s.employee_id, s.schedule_date): (s.shift_id, s.is_rest) for s in
+            db.session.query(Schedule.employee_id, Schedule.schedule_date, Schedule.shift_id, Schedule.is_rest)}
+
+
+def reset():
+    Schedule.query.filter(Schedule.created_by == 1).delete()
+    db.session.commit()
+
+
+def timed(counter, fn):
+    queries = counter[0]
+    start = time.perf_counter()
+    result = fn()
+    db.session.commit()
+    return time.perf_counter() - start, counter[0] - queries, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    employee_ids = list(range(1, args.employees + 1))
+    end = START + timedelta(days=args.days - 1)
+    rest_days = ['2025-01-01', '2025-01-28', '2025-01-29']
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_dir, 'hr.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            seed(args.employees, args.days)
+            print(f"{args.employees} employees x {args.days} days")
+
+            counter = [0]
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: counter.__setitem__(0, counter[0] + 1))
+
+            if not args.skip_legacy:
+                elapsed, queries, stats = timed(counter, lambda: legacy_batch(employee_ids, 1, START, end, rest_days))
+                print(f"  legacy per-pair      {elapsed:8.2f} s  {queries:7d} SQL  {stats}")
+                legacy = snapshot()
+                reset()
+
+            elapsed, queries, stats = timed(counter, lambda: generate_schedules(
+                employee_ids, START, end, shift_id=1, rest_days=rest_days, created_by=1))
+            print(f"  bulk (skip)          {elapsed:8.2f} s  {queries:7d} SQL  {stats}")
+            if not args.skip_legacy:
+                print(f"  results match legacy: {snapshot() == legacy}")
+
+            elapsed, queries, stats = timed(counter, lambda: generate_schedules(
+                employee_ids, START, end, pattern=[1, 1, 2, 2, None, None], stagger=2,
+                rest_days=rest_days, conflict='overwrite', created_by=1))
+            print(f"  rotation (overwrite) {elapsed:8.2f} s  {queries:7d} SQL  {stats}")
+
+            elapsed, queries, stats = timed(counter, lambda: generate_schedules(
+                employee_ids, START, end, pattern=[1, 1, 2, 2, None, None], stagger=2,
+                rest_days=rest_days, conflict='overwrite', created_by=1))
+            print(f"  rotation (rerun)     {elapsed:8.2f} s  {queries:7d} SQL  {stats}")
+
+
+if __name__ == '__main__':
+    main()
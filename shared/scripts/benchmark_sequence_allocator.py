@@ -0,0 +1,97 @@
+"""
+单据编号并发基准（SQLite）：LIKE 取最大号 +1 vs 计数器原子递增 vs 号段预分配
+
+每个线程循环 "取号 + 插入单据 + 提交"，单号列有唯一约束；
+旧方式冲突时重试，统计吞吐量与冲突重试次数。
+
+Usage:
+    python shared/scripts/benchmark_sequence_allocator.py --threads 16 --docs 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import Column, Integer, String, create_engine, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session, declarative_base
+
+from shared.sequence import SequenceAllocator
+
+Base = declarative_base()
+TODAY = '20250101'
+PREFIX = f'TR-{TODAY}-'
+
+
+class TransferOrder(Base):
+    __tablename__ = 'transfer_orders'
+    id = Column(Integer, primary_key=True)
+    order_no = Column(String(32), unique=True, nullable=False)
+
+
+def legacy_order_no(session):
+    last = session.execute(
+        select(TransferOrder.order_no).where(TransferOrder.order_no.like(f'{PREFIX}%'))
+        .order_by(TransferOrder.order_no.desc()).limit(1)
+    ).scalar()
+    return f'{PREFIX}{(int(last.rsplit("-", 1)[-1]) if last else 0) + 1:06d}'
+
+
+def run(mode, threads, docs, tmp_dir):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, f'{mode}.db')}",
+                           connect_args={'timeout': 60})
+    Base.metadata.create_all(engine)
+    allocator = SequenceAllocator(engine, block_size=1 if mode == 'counter' else 50)
+    retries = [0]
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(docs):
+            while True:
+                with Session(engine) as session:
+                    try:
+                        if mode == 'legacy':
+                            order_no = legacy_order_no(session)
+                        else:
+                            order_no = f"{PREFIX}{allocator.next_value('TR', TODAY):06d}"
+                        session.add(TransferOrder(order_no=order_no))
+                        session.commit()
+                        break
+                    except (IntegrityError, OperationalError):
+                        session.rollback()
+                        with lock:
+                            retries[0] += 1
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    with Session(engine) as session:
+        numbers = session.execute(select(TransferOrder.order_no)).scalars().all()
+    total = threads * docs
+    assert len(numbers) == len(set(numbers)) == total
+    print(f"{mode:8s} {elapsed:7.2f}s {total / elapsed:9.0f} docs/s  retries {retries[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--docs', type=int, default=200, help='每个线程创建的单据数')
+    args = parser.parse_args()
+
+    print(f"threads={args.threads} docs/thread={args.docs}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in ('legacy', 'counter', 'block'):
+            run(mode, args.threads, args.docs, tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+大文件上传内存基准：整文件读入内存 vs 流式写入 vs 分片上传
+
+每种方式在独立子进程中运行，报告耗时和进程峰值内存（ru_maxrss）。
+
+Usage:
+    python shared/scripts/benchmark_streaming_upload.py --size-mb 1024
+    python shared/scripts/benchmark_streaming_upload.py --size-mb 256 --legacy
+"""
+import argparse
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+PATTERN = os.urandom(1024 * 1024)
+
+
+class PatternStream:
+    """生成指定大小的数据流（不占用内存，模拟上传请求体）"""
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0:
+            size = self.remaining
+        size = min(size, self.remaining, len(PATTERN))
+        self.remaining -= size
+        return PATTERN[:size]
+
+
+def peak_rss_mb():
+    # Linux 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, size, base_path):
+    from shared.file_metadata_store import SQLMetadataStore
+    from shared.file_storage_v2 import EnterpriseFileStorage
+
+    storage = EnterpriseFileStorage(
+        base_path, metadata_store=SQLMetadataStore(f"sqlite:///{os.path.join(base_path, 'meta.db')}")
+    )
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+
+    if mode == 'legacy':
+        # 旧方式：整个请求体读入内存，再对完整字节串计算哈希
+        stream = PatternStream(size)
+        file_bytes = b''.join(iter(lambda: stream.read(1024 * 1024), b''))
+        hashlib.md5(file_bytes).hexdigest()
+        hashlib.sha256(file_bytes).hexdigest()
+        path = os.path.join(base_path, 'legacy.bin')
+        with open(path, 'wb') as f:
+            f.write(file_bytes)
+        result = {'success': True}
+    elif mode == 'stream':
+        result = storage.save_file(PatternStream(size), 'big.zip', 'portal', 'projects', 'BENCH',
+                                   category='archives', max_size=size, dedupe=False)
+    else:
+        session = storage.create_chunked_upload('big.zip', size, category='archives')
+        for index in range(session['total_chunks']):
+            part = PatternStream(min(session['chunk_size'], size - index * session['chunk_size']))
+            storage.save_upload_chunk(session['upload_id'], index, part)
+        result = storage.complete_chunked_upload(session['upload_id'], 'portal', 'projects', 'BENCH',
+                                                 dedupe=False)
+
+    elapsed = time.perf_counter() - start
+    assert result.get('success'), result
+    print(f"{mode:8s} {elapsed:8.2f}s {size / 1024 / 1024 / elapsed:8.1f} MB/s "
+          f"peak RSS {peak_rss_mb():8.1f} MB (baseline {baseline:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--legacy', action='store_true',
+                        help='同时运行整文件读入内存的旧方式（需要约 2 倍文件大小的内存）')
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    parser.add_argument('--base-path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    if args.mode:
+        run_mode(args.mode, size, args.base_path)
+        return
+
+    print(f"file size: {args.size_mb} MB")
+    modes = (['legacy'] if args.legacy else []) + ['stream', 'chunked']
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            subprocess.run([sys.executable, __file__, '--mode', mode, '--base-path', tmp_dir,
+                            '--size-mb', str(args.size_mb)], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+文件夹网格视图加载基准：返回原图 vs shared/rendition_cache 缩略图
+
+生成一组相机尺寸的照片，模拟网格视图每个格子请求一次 preview?thumb=true，
+分别统计传输字节数、服务端耗时和按带宽估算的传输时间
+（原图、缩略图首次生成、缩略图缓存命中）。
+
+Usage:
+    python shared/scripts/benchmark_thumbnails.py --tiles 48
+    python shared/scripts/benchmark_thumbnails.py --tiles 24 --width 6000 --height 4000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from PIL import Image
+
+from shared.rendition_cache import RenditionCache
+
+
+def make_photos(directory, count, width, height):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f'IMG_{i:04d}.jpg')
+        noise = Image.effect_noise((width, height), 40 + i % 20)
+        Image.merge('RGB', (noise, noise.rotate(90, expand=False), noise.transpose(Image.FLIP_LEFT_RIGHT))) \
+            .save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+
+def read_all(path):
+    with open(path, 'rb') as f:
+        return len(f.read())
+
+
+def run(name, paths, fetch, bandwidth_mbps):
+    start = time.perf_counter()
+    total = sum(fetch(i, path) for i, path in enumerate(paths))
+    elapsed = time.perf_counter() - start
+    transfer = total * 8 / (bandwidth_mbps * 1e6)
+    print(f"{name:16s} {total / 1e6:9.2f} MB  server {elapsed * 1000:9.1f} ms  "
+          f"({elapsed * 1000 / len(paths):6.1f} ms/tile)  transfer @{bandwidth_mbps:g}Mbps {transfer:7.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tiles', type=int, default=48)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--size', type=int, default=256, help='缩略图长边像素')
+    parser.add_argument('--bandwidth', type=float, default=100, help='估算传输时间的带宽 (Mbps)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = make_photos(tmp_dir, args.tiles, args.width, args.height)
+        cache = RenditionCache(os.path.join(tmp_dir, '_renditions'))
+        print(f"{args.tiles} tiles, {args.width}x{args.height} photos, thumbnail {args.size}px")
+
+        run('original', paths, lambda i, p: read_all(p), args.bandwidth)
+        run('thumbnail cold', paths,
+            lambda i, p: read_all(cache.get_or_render(f'h{i}', p, 'image', args.size)), args.bandwidth)
+        run('thumbnail warm', paths,
+            lambda i, p: read_all(cache.get_or_render(f'h{i}', p, 'image', args.size)), args.bandwidth)
+
+
+if __name__ == '__main__':
+    main()
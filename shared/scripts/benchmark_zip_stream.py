@@ -0,0 +1,90 @@
+"""
+批量下载打包基准：zipfile 写临时文件后发送 vs shared/zip_stream 流式生成
+
+生成一组混合文件（PDF/图片等已压缩格式 + 文本/CSV），分别测量
+首字节时间、总耗时、输出大小和峰值内存（tracemalloc）。
+
+Usage:
+    python shared/scripts/benchmark_zip_stream.py --files 50 --size-mb 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from shared.zip_stream import ZipEntry, stream_zip
+
+SEND_CHUNK = 256 * 1024
+
+
+def make_files(directory, count, size):
+    paths = []
+    for i in range(count):
+        if i % 2:
+            path = os.path.join(directory, f'drawing_{i}.pdf')
+            data = os.urandom(size)
+        else:
+            path = os.path.join(directory, f'report_{i}.csv')
+            line = f'{i},SO-2025-{i:05d},检验合格,2025-01-01\n'.encode('utf-8')
+            data = line * (size // len(line))
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def tempfile_zip(paths):
+    """旧实现：ZIP_DEFLATED 写完整临时文件后再按块发送"""
+    temp = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
+    temp.close()
+    with zipfile.ZipFile(temp.name, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for path in paths:
+            zf.write(path, os.path.basename(path))
+    try:
+        with open(temp.name, 'rb') as f:
+            yield from iter(lambda: f.read(SEND_CHUNK), b'')
+    finally:
+        os.unlink(temp.name)
+
+
+def streaming_zip(paths):
+    return stream_zip(ZipEntry(os.path.basename(p), p) for p in paths)
+
+
+def measure(fn, paths):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    total = 0
+    for chunk in fn(paths):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        total += len(chunk)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte, elapsed, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--size-mb', type=float, default=20, help='单个文件大小 (MB)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = make_files(tmp_dir, args.files, int(args.size_mb * 1024 * 1024))
+        print(f"{args.files} files x {args.size_mb} MB")
+        for name, fn in (('tempfile', tempfile_zip), ('stream', streaming_zip)):
+            first_byte, elapsed, total, peak = measure(fn, paths)
+            print(f"{name:8s} first byte {first_byte * 1000:8.1f} ms  total {elapsed:6.2f} s  "
+                  f"size {total / 1e6:8.1f} MB  peak mem {peak / 1e6:6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""
+推送 vs 轮询负载测试：大量空闲客户端下的服务端开销
+
+启动一个本地 Flask 服务（子进程，werkzeug 多线程，与 Portal 开发部署相同），
+SQLite 中生成用户/项目/消息数据，然后用 asyncio 模拟客户端:
+
+- poll: 每个客户端按间隔请求未读汇总（旧实现：逐项目查询已读状态 + count）
+- push: 每个客户端保持一条 SSE 连接（shared/push_hub），连接时一次快照查询，之后只收事件；
+        测试期间发布若干事件，统计投递延迟
+
+统计服务进程 CPU 时间、请求数、SQL 查询数、内存和线程数。
+
+Usage:
+    python shared/scripts/loadtest_push.py --clients 2000 --duration 30
+    python shared/scripts/loadtest_push.py --mode push --clients 5000 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+PROJECTS_PER_USER = 20
+MESSAGES_PER_PROJECT = 50
+
+
+# ==================== 服务端（子进程） ====================
+
+def build_db(path, users):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT, created_by_id INTEGER, deleted_at TEXT);
+        CREATE TABLE project_members (project_id INTEGER, user_id INTEGER);
+        CREATE INDEX ix_members_user ON project_members (user_id);
+        CREATE TABLE project_messages (id INTEGER PRIMARY KEY, project_id INTEGER, task_id INTEGER,
+                                       sender_id INTEGER, is_deleted INTEGER DEFAULT 0);
+        CREATE INDEX ix_messages_project ON project_messages (project_id);
+        CREATE TABLE message_read_status (user_id INTEGER, project_id INTEGER, last_read_message_id INTEGER);
+        CREATE INDEX ix_read_user ON message_read_status (user_id);
+        CREATE TABLE chat_unread_counters (user_id INTEGER, project_id INTEGER, unread_count INTEGER,
+                                           UNIQUE (user_id, project_id));
+        CREATE TABLE project_notifications (id INTEGER PRIMARY KEY, recipient_id INTEGER, is_read INTEGER);
+        CREATE INDEX ix_notifications_recipient ON project_notifications (recipient_id, is_read);
+    """)
+    rng = random.Random(1)
+    projects = max(users // 4, PROJECTS_PER_USER)
+    conn.executemany("INSERT INTO projects VALUES (?, ?, ?, NULL)",
+                     [(p, f'P{p}', rng.randint(1, users)) for p in range(1, projects + 1)])
+    members = {(p, u) for u in range(1, users + 1) for p in rng.sample(range(1, projects + 1), PROJECTS_PER_USER)}
+    conn.executemany("INSERT INTO project_members VALUES (?, ?)", sorted(members))
+    conn.executemany("INSERT INTO project_messages (project_id, sender_id) VALUES (?, ?)",
+                     [(p, rng.randint(1, users)) for p in range(1, projects + 1) for _ in range(MESSAGES_PER_PROJECT)])
+    conn.executemany("INSERT INTO message_read_status VALUES (?, ?, ?)",
+                     [(u, p, rng.randint(0, projects * MESSAGES_PER_PROJECT)) for p, u in members])
+    conn.execute("""
+        INSERT INTO chat_unread_counters
+        SELECT r.user_id, r.project_id, (SELECT count(*) FROM project_messages m
+            WHERE m.project_id = r.project_id AND m.id > r.last_read_message_id AND m.sender_id != r.user_id)
+        FROM message_read_status r
+    """)
+    conn.executemany("INSERT INTO project_notifications (recipient_id, is_read) VALUES (?, ?)",
+                     [(rng.randint(1, users), rng.random() < 0.7) for _ in range(users * 5)])
+    conn.commit()
+    conn.close()
+
+
+def serve(port, db_path):
+    from flask import Flask, Response, jsonify, request
+    from werkzeug.serving import make_server
+    from shared.push_hub import PushHub, sse_stream
+
+    app = Flask(__name__)
+    hub = PushHub()
+    local = threading.local()
+    counters = {'requests': 0, 'queries': 0}
+    lock = threading.Lock()
+
+    def query(sql, params=()):
+        if not hasattr(local, 'conn'):
+            local.conn = sqlite3.connect(db_path)
+        with lock:
+            counters['queries'] += 1
+        return local.conn.execute(sql, params).fetchall()
+
+    @app.before_request
+    def count_request():
+        with lock:
+            counters['requests'] += 1
+
+    @app.route('/poll')
+    def poll():
+        """旧实现：通知未读数 + 逐项目未读汇总"""
+        user_id = int(request.args['user'])
+        notifications = query("SELECT count(*) FROM project_notifications WHERE recipient_id = ? AND is_read = 0",
+                              (user_id,))[0][0]
+        projects = query("SELECT id, name FROM projects WHERE deleted_at IS NULL AND (created_by_id = ? OR id IN "
+                         "(SELECT project_id FROM project_members WHERE user_id = ?))", (user_id, user_id))
+        by_project = []
+        for project_id, name in projects:
+            row = query("SELECT last_read_message_id FROM message_read_status WHERE user_id = ? AND project_id = ?",
+                        (user_id, project_id))
+            last_read = row[0][0] if row else 0
+            count = query("SELECT count(*) FROM project_messages WHERE project_id = ? AND task_id IS NULL "
+                          "AND is_deleted = 0 AND id > ? AND sender_id != ?", (project_id, last_read, user_id))[0][0]
+            if count:
+                by_project.append({'project_id': project_id, 'project_name': name, 'unread_count': count})
+        return jsonify({'notifications_unread': notifications, 'by_project': by_project})
+
+    @app.route('/stream')
+    def stream():
+        user_id = int(request.args['user'])
+        sub, replay = hub.subscribe(user_id, request.headers.get('Last-Event-ID'))
+        notifications = query("SELECT count(*) FROM project_notifications WHERE recipient_id = ? AND is_read = 0",
+                              (user_id,))[0][0]
+        rows = query("SELECT c.project_id, p.name, c.unread_count FROM chat_unread_counters c "
+                     "JOIN projects p ON p.id = c.project_id WHERE c.user_id = ? AND c.unread_count > 0",
+                     (user_id,))
+        snapshot = {'notifications_unread': notifications, 'chat_unread': rows}
+        return Response(sse_stream(hub, sub, replay, snapshot), mimetype='text/event-stream')
+
+    @app.route('/publish', methods=['POST'])
+    def publish():
+        data = request.get_json()
+        hub.publish(data['users'], 'bench', {'sent': time.time()})
+        return jsonify({'ok': True})
+
+    @app.route('/stats')
+    def stats():
+        return jsonify({**counters, **hub.stats()})
+
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    server.socket.listen(4096)
+    server.serve_forever()
+
+
+# ==================== 客户端 ====================
+
+def proc_usage(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    ticks = os.sysconf('SC_CLK_TCK')
+    cpu = (int(fields[11]) + int(fields[12])) / ticks
+    with open(f'/proc/{pid}/status') as f:
+        status = dict(line.split(':', 1) for line in f)
+    return cpu, int(status['VmRSS'].split()[0]) / 1024, int(status['Threads'])
+
+
+async def http_request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data
+
+
+async def server_stats(port):
+    data = await http_request(port, 'GET', '/stats')
+    return json.loads(data.split(b'\r\n\r\n', 1)[1])
+
+
+async def poll_client(port, user_id, interval, stop_at, stats):
+    await asyncio.sleep(random.random() * interval)
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            await http_request(port, 'GET', f'/poll?user={user_id}')
+            stats['latencies'].append(time.perf_counter() - start)
+        except OSError:
+            stats['errors'] += 1
+        await asyncio.sleep(interval)
+
+
+async def push_client(port, user_id, stop_at, stats, connected):
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1 << 20)
+    except OSError:
+        stats['errors'] += 1
+        connected.release()
+        return
+    writer.write(f"GET /stream?user={user_id} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    connected.release()
+    event = None
+    try:
+        while time.time() < stop_at:
+            try:
+                line = await asyncio.wait_for(reader.readline(), timeout=max(stop_at - time.time(), 0.1))
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                break
+            line = line.decode().strip()
+            if line.startswith('event: '):
+                event = line[7:]
+            elif line.startswith('data: ') and event == 'bench':
+                stats['latencies'].append(time.time() - json.loads(line[6:])['sent'])
+            elif line.startswith('data: ') and event == 'snapshot':
+                stats['snapshots'] += 1
+    finally:
+        writer.close()
+
+
+async def run_poll(port, args, pid):
+    stats = {'latencies': [], 'errors': 0}
+    stop_at = time.time() + args.duration
+    cpu_before = proc_usage(pid)[0]
+    before = await server_stats(port)
+    await asyncio.gather(*(poll_client(port, u, args.poll_interval, stop_at, stats)
+                           for u in range(1, args.clients + 1)))
+    cpu, rss, threads = proc_usage(pid)
+    after = await server_stats(port)
+    lat = sorted(stats['latencies']) or [0]
+    print(f"poll   {args.clients} clients every {args.poll_interval:g}s for {args.duration}s: "
+          f"{len(stats['latencies'])} requests, {stats['errors']} errors, "
+          f"p50 {lat[len(lat) // 2] * 1000:.1f} ms, p99 {lat[int(len(lat) * 0.99)] * 1000:.1f} ms")
+    print(f"       server CPU {cpu - cpu_before:.1f} s, SQL queries {after['queries'] - before['queries']}, "
+          f"RSS {rss:.0f} MB, threads {threads}")
+
+
+async def run_push(port, args, pid):
+    stats = {'latencies': [], 'errors': 0, 'snapshots': 0}
+    connected = asyncio.Semaphore(0)
+    stop_at = time.time() + args.duration + 60
+    tasks = []
+    connect_start = time.time()
+    for u in range(1, args.clients + 1):
+        tasks.append(asyncio.ensure_future(push_client(port, u, stop_at, stats, connected)))
+        if u % 200 == 0:
+            await asyncio.sleep(0.05)
+    for _ in range(args.clients):
+        await connected.acquire()
+    while stats['snapshots'] + stats['errors'] < args.clients and time.time() - connect_start < 60:
+        await asyncio.sleep(0.1)
+    print(f"push   {args.clients} connections, snapshots received in {time.time() - connect_start:.1f}s")
+
+    # 空闲阶段：只有心跳
+    cpu_before = proc_usage(pid)[0]
+    before = await server_stats(port)
+    events = 0
+    for _ in range(args.events):
+        await asyncio.sleep(args.duration / args.events)
+        users = random.sample(range(1, args.clients + 1), max(1, args.clients // 100))
+        await http_request(port, 'POST', '/publish', {'users': users})
+        events += len(users)
+    await asyncio.sleep(1)
+    cpu, rss, threads = proc_usage(pid)
+    after = await server_stats(port)
+    lat = sorted(stats['latencies']) or [0]
+    print(f"       {args.duration}s idle + {args.events} publishes ({events} deliveries): "
+          f"received {len(stats['latencies'])}, errors {stats['errors']}, "
+          f"p50 {lat[len(lat) // 2] * 1000:.1f} ms, p99 {lat[int(len(lat) * 0.99)] * 1000:.1f} ms")
+    print(f"       server CPU {cpu - cpu_before:.1f} s, SQL queries {after['queries'] - before['queries']}, "
+          f"RSS {rss:.0f} MB, threads {threads}")
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--duration', type=int, default=30, help='每种模式的测量时间（秒）')
+    parser.add_argument('--mode', choices=['poll', 'push', 'both'], default='both')
+    parser.add_argument('--poll-interval', type=float, default=30, help='轮询间隔（秒，旧前端为 30）')
+    parser.add_argument('--events', type=int, default=10, help='push 模式发布事件次数（每次 1%% 用户）')
+    parser.add_argument('--serve', nargs=2, metavar=('PORT', 'DB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(int(args.serve[0]), args.serve[1])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        build_db(db_path, args.clients)
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port), db_path],
+                                  stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(('127.0.0.1', port)).close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            if args.mode in ('poll', 'both'):
+                asyncio.run(run_poll(port, args, server.pid))
+            if args.mode in ('push', 'both'):
+                asyncio.run(run_push(port, args, server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
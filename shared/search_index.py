@@ -0,0 +1,356 @@
+# shared/search_index.py
+# -*- coding: utf-8 -*-
+"""
+本地全文检索索引（SQLite FTS5）
+
+替代多列 LIKE '%关键词%' 的全表扫描：
+    - 分词: 中日韩文字按二元组（bigram）切分，英文/数字按单词切分并支持前缀匹配，
+      字母数字混合的编号（如 2J1030J）额外索引其中的字母段和数字段
+    - 排序: FTS5 内置 BM25，各字段可设置权重
+    - 过滤: 等值条件编码为 facets 列中的词条，与关键词一起在倒排索引内求交；
+      范围条件和排序字段存于属性表，按 rowid 关联
+    - 增量: upsert / delete 单条更新，rebuild 时批量写入
+
+用法:
+    index = FTS5Index('/path/search.db', fields=('name', 'content'), weights=(5.0, 1.0),
+                      attrs={'created_at': 'TEXT'})
+    index.upsert(1, {'name': '设计图纸.pdf'}, facets={'project': 12},
+                 attrs={'created_at': '2025-03-01T10:00:00'})
+    hits, total = index.search('图纸', facets={'project': [12, 13]})
+"""
+
+import os
+import re
+import enum
+import sqlite3
+import logging
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 假名、CJK 扩展 A、CJK 统一汉字、兼容汉字、谚文
+_CJK_RANGES = ((0x3040, 0x30FF), (0x31F0, 0x31FF), (0x3400, 0x4DBF), (0x4E00, 0x9FFF),
+               (0xF900, 0xFAFF), (0xAC00, 0xD7AF))
+_CJK = ''.join(f'{chr(low)}-{chr(high)}' for low, high in _CJK_RANGES)
+_TOKEN_RE = re.compile(f'[0-9a-z]+|[{_CJK}]+')
+_CJK_RE = re.compile(f'[{_CJK}]')
+_SUBWORD_RE = re.compile('[a-z]+|[0-9]+')
+_FACET_RE = re.compile(f'[^0-9a-z{_CJK}]+')
+
+FACETS_COLUMN = 'facets'
+
+
+def _normalize(text: Any) -> str:
+    # NFKC: 全角字母数字转半角、半角片假名转全角
+    return unicodedata.normalize('NFKC', str(text)).lower() if text else ''
+
+
+def tokenize(text: Any) -> List[str]:
+    """
+    索引分词
+
+    中日韩连续文字输出二元组，并补充末字单字（保证任意单字都是某个词条的前缀）；
+    英文数字输出完整单词，混合编号额外输出长度 >= 2 的字母段/数字段。
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall(_normalize(text)):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+                tokens.append(run[-1])
+        else:
+            tokens.append(run)
+            parts = _SUBWORD_RE.findall(run)
+            if len(parts) > 1:
+                tokens.extend(p for p in parts if len(p) >= 2)
+    return tokens
+
+
+def build_match_query(text: Any) -> Optional[str]:
+    """
+    把用户输入转换为 FTS5 MATCH 表达式（各词之间为 AND）
+
+    中日韩文字按二元组组成短语（要求相邻），单字和英文数字按前缀匹配。
+    无有效词条时返回 None。
+    """
+    terms = []
+    for run in _TOKEN_RE.findall(_normalize(text)):
+        if _CJK_RE.match(run) and len(run) > 1:
+            terms.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+        else:
+            terms.append(f'"{run}"*')
+    return ' '.join(terms) or None
+
+
+def facet_token(name: str, value: Any) -> str:
+    """过滤条件词条，如 ('project', 12) -> 'project_12'"""
+    if isinstance(value, enum.Enum):
+        value = value.value
+    if isinstance(value, bool):
+        value = int(value)
+    return f"{name}_{_FACET_RE.sub('_', _normalize(value)).strip('_')}"
+
+
+class FTS5Index:
+    """
+    SQLite FTS5 倒排索引（线程安全，每个线程一个连接）
+
+    表结构:
+        {name}_fts    FTS5 虚表，列为 fields + facets，rowid 为文档 ID
+        {name}_attrs  属性表（范围过滤/排序），rowid 与 FTS 表一致
+        {name}_meta   键值表（如索引是否已完整构建）
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fields: Sequence[str],
+        weights: Optional[Sequence[float]] = None,
+        attrs: Optional[Dict[str, str]] = None,
+        name: str = 'search'
+    ):
+        """
+        Args:
+            path: SQLite 数据库文件路径
+            fields: 全文字段
+            weights: BM25 字段权重（默认均为 1）
+            attrs: 属性列 {列名: SQLite 类型}，用于范围过滤和排序
+            name: 表名前缀
+        """
+        self.path = path
+        self.fields = tuple(fields)
+        self.weights = tuple(weights) if weights else (1.0,) * len(self.fields)
+        self.attrs = dict(attrs or {})
+        self.name = name
+        self._local = threading.local()
+        self._ready = False
+        self._lock = threading.Lock()
+
+    # ---------- 连接与建表 ----------
+
+    @staticmethod
+    def available() -> bool:
+        """当前 SQLite 是否编译了 FTS5"""
+        try:
+            conn = sqlite3.connect(':memory:')
+            conn.execute('CREATE VIRTUAL TABLE t USING fts5(x)')
+            conn.close()
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        if not self._ready:
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        with self._lock:
+            if self._ready:
+                return
+            columns = ', '.join(self.fields + (FACETS_COLUMN,))
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name}_fts USING fts5("
+                f"{columns}, tokenize=\"unicode61 remove_diacritics 0 tokenchars '_'\")"
+            )
+            attr_columns = ''.join(f', {col} {sql_type}' for col, sql_type in self.attrs.items())
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.name}_attrs (rowid INTEGER PRIMARY KEY{attr_columns})")
+            for col in self.attrs:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.name}_attrs_{col} ON {self.name}_attrs ({col})")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.name}_meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._ready = True
+
+    # ---------- 写入 ----------
+
+    def _rows(self, doc_id: int, fields: Dict[str, Any], facets: Optional[Dict[str, Any]],
+              attrs: Optional[Dict[str, Any]]) -> Tuple[list, tuple]:
+        facet_tokens = []
+        for key, value in (facets or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            facet_tokens.extend(facet_token(key, v) for v in values if v is not None and v != '')
+        # 未传入的字段为 None，写入时沿用已有内容
+        fts_row = [doc_id] + [' '.join(tokenize(fields[f])) if f in fields else None for f in self.fields] + \
+            [' '.join(facet_tokens)]
+        attrs = attrs or {}
+        attr_row = (doc_id,) + tuple(attrs.get(col) for col in self.attrs)
+        return fts_row, attr_row
+
+    def _write(self, conn, rows: Iterable[Tuple[list, tuple]]):
+        placeholders = ', '.join('?' * (len(self.fields) + 2))
+        attr_placeholders = ', '.join('?' * (len(self.attrs) + 1))
+        attr_columns = ''.join(f', {col}' for col in self.attrs)
+        for fts_row, attr_row in rows:
+            missing = [i for i, value in enumerate(fts_row[1:-1], 1) if value is None]
+            if missing:
+                existing = conn.execute(
+                    f"SELECT {', '.join(self.fields)} FROM {self.name}_fts WHERE rowid = ?", (fts_row[0],)
+                ).fetchone()
+                for i in missing:
+                    fts_row[i] = existing[i - 1] if existing else ''
+            conn.execute(f"DELETE FROM {self.name}_fts WHERE rowid = ?", (fts_row[0],))
+            conn.execute(f"INSERT INTO {self.name}_fts (rowid, {', '.join(self.fields)}, {FACETS_COLUMN}) "
+                         f"VALUES ({placeholders})", fts_row)
+            conn.execute(f"INSERT OR REPLACE INTO {self.name}_attrs (rowid{attr_columns}) "
+                         f"VALUES ({attr_placeholders})", attr_row)
+
+    def upsert(self, doc_id: int, fields: Dict[str, Any], facets: Optional[Dict[str, Any]] = None,
+               attrs: Optional[Dict[str, Any]] = None):
+        """新增或替换一篇文档（fields 中未出现的字段保留原内容）"""
+        self.upsert_many([(doc_id, fields, facets, attrs)])
+
+    def upsert_many(self, docs: Iterable[Tuple[int, Dict[str, Any], Optional[Dict], Optional[Dict]]]):
+        """批量新增或替换（一个事务）"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._write(conn, (self._rows(*doc) for doc in docs))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def delete(self, doc_id: int):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(f"DELETE FROM {self.name}_fts WHERE rowid = ?", (doc_id,))
+            conn.execute(f"DELETE FROM {self.name}_attrs WHERE rowid = ?", (doc_id,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute(f"DELETE FROM {self.name}_fts")
+        conn.execute(f"DELETE FROM {self.name}_attrs")
+        conn.execute(f"DELETE FROM {self.name}_meta")
+
+    def optimize(self):
+        """合并 FTS5 段（批量重建后调用）"""
+        self._conn().execute(f"INSERT INTO {self.name}_fts ({self.name}_fts) VALUES ('optimize')")
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute(f"SELECT value FROM {self.name}_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self._conn().execute(f"INSERT OR REPLACE INTO {self.name}_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def count(self) -> int:
+        return self._conn().execute(f"SELECT count(*) FROM {self.name}_attrs").fetchone()[0]
+
+    # ---------- 查询 ----------
+
+    def search(
+        self,
+        query: Any = None,
+        field_queries: Optional[Dict[str, Any]] = None,
+        facets: Optional[Dict[str, Any]] = None,
+        exclude_facets: Optional[Dict[str, Any]] = None,
+        ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        sort_by: Optional[str] = None,
+        sort_desc: bool = True,
+        limit: int = 20,
+        offset: int = 0,
+        columns: Sequence[str] = (),
+        with_total: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        检索
+
+        Args:
+            query: 关键词（为空时仅按过滤条件匹配）
+            field_queries: 限定字段的关键词 {字段: 关键词}
+            facets: 等值过滤 {名称: 值或值列表}，列表内为 OR，不同名称之间为 AND
+            exclude_facets: 排除条件 {名称: 值或值列表}
+            ranges: 范围过滤 {属性列: (下限, 上限)}，下限含、上限不含，None 表示不限
+            sort_by: 排序属性列，默认按相关度（BM25）
+            sort_desc: 属性排序方向
+            limit / offset: 分页
+            columns: 需要一并返回的属性列
+            with_total: 是否统计总数
+
+        Returns:
+            ([{'id': 文档ID, 'score': 相关度, 属性列...}], 总数)
+        """
+        clauses = []
+        text = build_match_query(query)
+        if text:
+            clauses.append(f"{{{' '.join(self.fields)}}} : ({text})")
+        for field, value in (field_queries or {}).items():
+            if field not in self.fields:
+                raise ValueError(f"未知字段: {field}")
+            field_text = build_match_query(value)
+            if field_text:
+                clauses.append(f"{field} : ({field_text})")
+        for key, value in (facets or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            tokens = [f'"{facet_token(key, v)}"' for v in values if v is not None and v != '']
+            if tokens:
+                clauses.append(f"{FACETS_COLUMN} : ({' OR '.join(tokens)})")
+        match = ' AND '.join(clauses)
+        if not match:
+            return [], 0
+        for key, value in (exclude_facets or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            tokens = [f'"{facet_token(key, v)}"' for v in values]
+            match = f"({match}) NOT {FACETS_COLUMN} : ({' OR '.join(tokens)})"
+
+        where = [f"{self.name}_fts MATCH ?"]
+        params: List[Any] = [match]
+        for col, (low, high) in (ranges or {}).items():
+            if col not in self.attrs:
+                raise ValueError(f"未知属性列: {col}")
+            if low is not None:
+                where.append(f"a.{col} >= ?")
+                params.append(low)
+            if high is not None:
+                where.append(f"a.{col} < ?")
+                params.append(high)
+
+        from_clause = f"{self.name}_fts JOIN {self.name}_attrs a ON a.rowid = {self.name}_fts.rowid"
+        where_clause = ' AND '.join(where)
+        weights = ', '.join(str(w) for w in self.weights + (0.0,))
+        score = f"bm25({self.name}_fts, {weights})"
+        if sort_by and sort_by in self.attrs:
+            order = f"a.{sort_by} {'DESC' if sort_desc else 'ASC'}, {self.name}_fts.rowid DESC"
+        else:
+            order = "score"
+        extra = ''.join(f', a.{col}' for col in columns if col in self.attrs)
+
+        conn = self._conn()
+        rows = conn.execute(
+            f"SELECT {self.name}_fts.rowid, {score} AS score{extra} FROM {from_clause} "
+            f"WHERE {where_clause} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        names = ['id', 'score'] + [col for col in columns if col in self.attrs]
+        hits = [dict(zip(names, row)) for row in rows]
+
+        total = None
+        if with_total:
+            if offset == 0 and len(hits) < limit:
+                total = len(hits)
+            elif ranges:
+                total = conn.execute(f"SELECT count(*) FROM {from_clause} WHERE {where_clause}",
+                                     params).fetchone()[0]
+            else:
+                # 无范围条件时只在倒排索引内计数，不关联属性表
+                total = conn.execute(f"SELECT count(*) FROM {self.name}_fts WHERE {self.name}_fts MATCH ?",
+                                     (match,)).fetchone()[0]
+        return hits, total
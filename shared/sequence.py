@@ -0,0 +1,204 @@
+# shared/sequence.py
+# -*- coding: utf-8 -*-
+"""
+单据编号分配器
+
+按 (名称, 周期) 维护计数器行，例如 ("TR", "20251027") 表示转移单当天的流水号。
+取号为单行原子递增，不再使用 "LIKE 前缀 ORDER BY DESC 取第一条 +1"
+（扫描索引、并发时重号、需要重试）。
+
+两种模式:
+    - 独立事务模式（默认）: 每次取号用独立短事务递增计数器，不持有调用方的行锁。
+      block_size > 1 时一次预留一个号段在进程内存中发放，大部分取号不访问数据库，
+      代价是: 进程重启时未用完的号段作废（编号有空洞），多进程之间编号不按时间先后。
+      默认 block_size=1，不会因进程重启产生空洞（调用方回滚时已取的号仍作废，需严格连续用事务模式）。
+    - 事务模式（传入 session）: 在调用方事务内递增并锁住计数器行，
+      调用方回滚时编号一起回滚，严格连续，但该行锁持有到事务提交。
+
+计数器表 doc_sequences 在启动时建好（shared/migrations/create_doc_sequences_table.sql，
+或调用 ensure_table()）；建表只在分配器自己的连接上执行，不会在调用方事务内执行 DDL
+（MySQL 的 DDL 会隐式提交当前事务）。
+
+用法:
+    from shared.sequence import get_allocator
+
+    allocator = get_allocator(db.engine)     # 首次获取时建表
+    seq = allocator.next_value('TR', today, seed=lambda: 已有最大流水号)
+    order_no = f'TR-{today}-{seq:04d}'
+
+配置:
+    SEQUENCE_BLOCK_SIZE=1     号段大小（默认 1: 每次取号都访问数据库，不预留号段；
+                              调大可减少数据库访问，但重启后有空洞、多进程编号不按时间先后）
+"""
+
+import os
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    MetaData, Table, Column, String, BigInteger, DateTime, select, insert, update,
+    and_, func, inspect
+)
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = int(os.getenv('SEQUENCE_BLOCK_SIZE', 1))
+
+_metadata = MetaData()
+
+doc_sequences = Table(
+    "doc_sequences", _metadata,
+    Column("name", String(64), primary_key=True),
+    Column("period", String(16), primary_key=True, default=""),
+    Column("value", BigInteger, nullable=False, default=0),
+    Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now()),
+)
+
+
+class SequenceAllocator:
+    """基于计数器表的编号分配器（线程安全）"""
+
+    def __init__(self, engine, block_size: int = None):
+        """
+        Args:
+            engine: SQLAlchemy 引擎（Flask-SQLAlchemy 可传 db.engine）
+            block_size: 号段大小，默认 SEQUENCE_BLOCK_SIZE
+        """
+        self.engine = engine
+        self.block_size = max(1, block_size or DEFAULT_BLOCK_SIZE)
+        # (name, period) -> [下一个可用值, 号段末尾值]
+        self._blocks: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = threading.Lock()
+        self._table_ready = False
+        self._pid = os.getpid()
+
+    def ensure_table(self):
+        """
+        建计数器表（已存在则跳过；多个进程同时建表时以已存在的表为准）
+
+        在分配器自己的连接上执行，应在启动时调用（get_allocator 首次获取时已调用），
+        不要放到业务事务中间。
+        """
+        if self._table_ready:
+            return
+        try:
+            _metadata.create_all(self.engine, tables=[doc_sequences], checkfirst=True)
+        except DBAPIError:
+            with self.engine.connect() as conn:
+                if not inspect(conn).has_table(doc_sequences.name):
+                    raise
+        self._table_ready = True
+
+    # ---------- 原子递增 ----------
+
+    @staticmethod
+    def _increment(conn, name: str, period: str, count: int,
+                   seed: Optional[Callable[[], int]]) -> int:
+        """
+        计数器原子加 count，返回递增后的值（在 conn 的事务内执行）
+
+        UPDATE 会锁住计数器行，直到事务结束；支持 RETURNING 的数据库
+        一条语句完成，否则随后在同一事务内读取。
+        """
+        key_clause = and_(doc_sequences.c.name == name, doc_sequences.c.period == period)
+        stmt = update(doc_sequences).where(key_clause).values(value=doc_sequences.c.value + count)
+
+        if conn.dialect.update_returning:
+            value = conn.execute(stmt.returning(doc_sequences.c.value)).scalar()
+            if value is not None:
+                return value
+        elif conn.execute(stmt).rowcount:
+            return conn.execute(select(doc_sequences.c.value).where(key_clause)).scalar()
+
+        # 计数器不存在：以已有单据的最大流水号为起点创建
+        start = int(seed() or 0) if seed else 0
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(doc_sequences).values(name=name, period=period, value=start + count))
+            return start + count
+        except IntegrityError:
+            # 其他进程同时创建了该计数器
+            return SequenceAllocator._increment(conn, name, period, count, None)
+
+    def _reserve(self, name: str, period: str, count: int,
+                 seed: Optional[Callable[[], int]]) -> int:
+        """独立短事务预留 count 个编号，返回号段末尾值"""
+        self.ensure_table()
+        with self.engine.begin() as conn:
+            return self._increment(conn, name, period, count, seed)
+
+    # ---------- 取号 ----------
+
+    def next_value(
+        self,
+        name: str,
+        period: str = "",
+        seed: Optional[Callable[[], int]] = None,
+        session=None
+    ) -> int:
+        """
+        获取下一个流水号
+
+        Args:
+            name: 序列名称（通常为单号前缀，如 "TR"、"SHM"）
+            period: 周期键（如 "20251027"），每个周期从 1 开始
+            seed: 计数器首次创建时调用，返回已有单据的最大流水号，
+                  用于从旧的编号方式平滑切换
+            session: 传入时在该会话的事务内递增（事务模式，编号严格连续）
+        """
+        period = period or ""
+        if session is not None:
+            self.ensure_table()
+            return self._increment(session.connection(), name, period, 1, seed)
+
+        key = (name, period)
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 后子进程不能继续使用父进程的号段
+                self._blocks.clear()
+                self._pid = os.getpid()
+            block = self._blocks.get(key)
+            if block is None or block[0] > block[1]:
+                end = self._reserve(name, period, self.block_size, seed)
+                block = [end - self.block_size + 1, end]
+                self._blocks[key] = block
+                # 旧周期的号段不再使用
+                for stale in [k for k in self._blocks if k[0] == name and k[1] != period]:
+                    del self._blocks[stale]
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def next_values(self, name: str, period: str = "", count: int = 1,
+                    seed: Optional[Callable[[], int]] = None) -> List[int]:
+        """一次获取 count 个连续流水号（批量创建单据时使用）"""
+        if count <= 0:
+            return []
+        end = self._reserve(name, period or "", count, seed)
+        return list(range(end - count + 1, end + 1))
+
+    def current_value(self, name: str, period: str = "") -> int:
+        """计数器当前值（已分配出去的最大号，含内存中未用完的号段）"""
+        self.ensure_table()
+        with self.engine.connect() as conn:
+            return conn.execute(select(doc_sequences.c.value).where(and_(
+                doc_sequences.c.name == name, doc_sequences.c.period == (period or "")
+            ))).scalar() or 0
+
+
+_allocators: Dict[int, SequenceAllocator] = {}
+_allocators_lock = threading.Lock()
+
+
+def get_allocator(engine, block_size: int = None) -> SequenceAllocator:
+    """获取引擎对应的分配器（每个进程每个引擎一个，号段在进程内共享；首次获取时建表）"""
+    with _allocators_lock:
+        allocator = _allocators.get(id(engine))
+        if allocator is None or allocator.engine is not engine:
+            allocator = SequenceAllocator(engine, block_size)
+            allocator.ensure_table()
+            _allocators[id(engine)] = allocator
+        return allocator
+
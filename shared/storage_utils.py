@@ -9,6 +9,7 @@
     - 清理临时文件
     - 存储统计报告
     - 数据库同步
+    - 元数据迁移（_meta.json -> 元数据数据库）
 """
 
 import os
@@ -28,6 +29,7 @@ from shared.file_storage_v2 import (
     FILE_CATEGORIES,
     DEFAULT_STORAGE_PATH
 )
+from shared.file_metadata_store import SQLMetadataStore, migrate_sidecars
 
 logger = logging.getLogger(__name__)
 
@@ -205,9 +207,24 @@ storage/
         print(f"删除 {result['deleted_files']} 个文件, 释放 {result['deleted_size'] / 1024 / 1024:.2f} MB")
         return result
 
-    def get_stats(self, verbose: bool = True) -> dict:
+    def migrate_metadata(self, overwrite: bool = False) -> dict:
+        """将 _meta.json 一次性迁移到元数据数据库，并重建统计计数器"""
+        store = self.storage.metadata_store
+        if not isinstance(store, SQLMetadataStore):
+            print("当前使用 json 元数据后端 (FILE_METADATA_STORE=json)，无需迁移")
+            return {"migrated": 0, "skipped": 0, "failed": 0}
+
+        print(f"\n迁移元数据到: {store.db_url}")
+        result = migrate_sidecars(self.base_path, store, overwrite=overwrite)
+        print(f"迁移 {result['migrated']} 个实体, 跳过 {result['skipped']} 个, 失败 {result['failed']} 个")
+
+        self.storage.get_storage_stats(rebuild=True)
+        print("✓ 统计计数器已重建")
+        return result
+
+    def get_stats(self, verbose: bool = True, rebuild: bool = False) -> dict:
         """获取存储统计"""
-        stats = self.storage.get_storage_stats()
+        stats = self.storage.get_storage_stats(rebuild=rebuild)
 
         if verbose:
             print("\n" + "=" * 60)
@@ -254,7 +271,7 @@ storage/
 def main():
     """命令行入口"""
     parser = argparse.ArgumentParser(description='JZC 企业级文件存储管理工具')
-    parser.add_argument('command', choices=['init', 'cleanup', 'stats', 'report'],
+    parser.add_argument('command', choices=['init', 'cleanup', 'stats', 'report', 'migrate'],
                         help='执行的命令')
     parser.add_argument('--path', default=DEFAULT_STORAGE_PATH,
                         help='存储根目录路径')
@@ -263,6 +280,10 @@ def main():
     parser.add_argument('--quarantine-days', type=int, default=30,
                         help='隔离文件保留天数')
     parser.add_argument('--output', help='报告输出路径')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='stats: 全量扫描目录并重建统计计数器')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='migrate: 覆盖数据库中已存在的实体')
 
     args = parser.parse_args()
 
@@ -276,7 +297,10 @@ def main():
         manager.cleanup_quarantine(args.quarantine_days)
 
     elif args.command == 'stats':
-        manager.get_stats()
+        manager.get_stats(rebuild=args.rebuild)
+
+    elif args.command == 'migrate':
+        manager.migrate_metadata(overwrite=args.overwrite)
 
     elif args.command == 'report':
         output = args.output or os.path.join(
@@ -0,0 +1,65 @@
+"""
+shared/auth/audit_service 异步批量写入单元测试
+Run with: pytest shared/tests/test_audit_writer.py -v
+"""
+
+import queue
+
+import pytest
+
+audit_service = pytest.importorskip('shared.auth.audit_service')
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from shared.auth import models as auth_models
+
+AuditLog = auth_models.AuditLog
+
+
+@pytest.fixture
+def audit_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    auth_models.Base.metadata.create_all(engine, tables=[AuditLog.__table__])
+    monkeypatch.setattr(auth_models, 'AuthSessionLocal', sessionmaker(bind=engine))
+    monkeypatch.setattr(audit_service, 'AUDIT_BACKUP_DIR', str(tmp_path / 'backup'))
+    return engine
+
+
+def count_rows():
+    session = auth_models.AuthSessionLocal()
+    try:
+        return session.query(func.count(AuditLog.id)).scalar()
+    finally:
+        session.close()
+
+
+def event(i):
+    return {
+        'action_type': 'data_access', 'user_id': i, 'username': f'u{i}',
+        'status': 'success', 'module': 'hr', 'created_at': '2024-01-01T00:00:00'
+    }
+
+
+class TestAuditWriter:
+
+    def test_batches_are_written(self, audit_db):
+        writer = audit_service.AuditWriter(batch_size=50, flush_interval=0.05)
+        for i in range(120):
+            writer.submit(event(i))
+        assert writer.flush(timeout=5)
+        assert count_rows() == 120
+        assert writer.stats['batches'] < 120
+        writer.stop()
+
+    def test_overflow_spills_and_recovers_in_bulk(self, audit_db):
+        writer = audit_service.AuditWriter(max_queue_size=1, enqueue_timeout=0)
+        writer._ensure_started = lambda: None
+        writer._queue = queue.Queue(maxsize=1)
+        writer._queue.put(event(0))
+
+        assert writer.submit(event(1)) is False
+        assert audit_service.get_backup_status()['pending_count'] == 1
+
+        result = audit_service.recover_backup_audits()
+        assert result['recovered'] == 1 and result['failed'] == 0
+        assert count_rows() == 1
+        assert audit_service.get_backup_status()['pending_count'] == 0
@@ -0,0 +1,117 @@
+"""
+shared/cache_config 两级缓存单元测试
+Run with: pytest shared/tests/test_cache_config.py -v
+"""
+
+import threading
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from shared import cache_config as cc
+
+
+@pytest.fixture(autouse=True)
+def fake_redis():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    original = cc.cache_config._client
+    cc.cache_config._client = client
+    cc.local_cache.clear()
+    yield client
+    cc.cache_config._client = original
+    cc.local_cache.clear()
+
+
+class TestLocalCache:
+
+    def test_l1_hit_skips_redis(self, fake_redis):
+        cc.cache_set('user:1', {'id': 1})
+        fake_redis.flushall()
+        assert cc.cache_get('user:1') == {'id': 1}
+
+    def test_l1_returns_copies(self):
+        cc.cache_set('user:2', {'tags': ['a']})
+        cc.cache_get('user:2')['tags'].append('b')
+        assert cc.cache_get('user:2') == {'tags': ['a']}
+
+    def test_lru_eviction(self):
+        cache = cc.LocalLRUCache(max_size=2, ttl=60)
+        expires_at = time.time() + 60
+        cache.set('a', '1', expires_at)
+        cache.set('b', '2', expires_at)
+        cache.get('a')
+        cache.set('c', '3', expires_at)
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+
+    def test_delete_clears_both_tiers(self, fake_redis):
+        cc.cache_set('user:3', 3)
+        cc.cache_delete('user:3')
+        assert cc.cache_get('user:3') is None
+
+
+class TestInvalidation:
+
+    def test_delete_pattern_uses_scan(self, fake_redis, monkeypatch):
+        for i in range(20):
+            cc.cache_set(f'product:{i}', i)
+        cc.cache_set('user:1', 1)
+        monkeypatch.setattr(fake_redis, 'keys', lambda *a, **k: pytest.fail('KEYS used'))
+
+        assert cc.cache_delete_pattern('product:*') == 20
+        assert cc.cache_get('product:5') is None
+        assert cc.cache_get('user:1') == 1
+
+    def test_invalidate_tags(self):
+        cc.cache_set('dashboard:a', 1, tags=['dashboard'])
+        cc.cache_set('dashboard:b', 2, tags=['dashboard'])
+        cc.cache_set('other', 3)
+
+        assert cc.cache_invalidate_tags('dashboard') == 2
+        assert cc.cache_get('dashboard:a') is None
+        assert cc.cache_get('other') == 3
+
+
+class TestStampedeProtection:
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        @cc.cached(ttl=60)
+        def slow(x):
+            calls.append(x)
+            time.sleep(0.1)
+            return x * 2
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow(21))) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == [42] * 10
+        assert len(calls) == 1
+
+    def test_waits_for_other_process(self, fake_redis):
+        manager = cc.CacheManager('dash')
+        full_key = cc.get_cache_key('dash:stats')
+        fake_redis.set(f'{full_key}:__lock__', 'other-process')
+
+        def other_process_finishes():
+            time.sleep(0.1)
+            cc._cache_set_full(full_key, {'total': 1}, 60, delta=0.1)
+
+        threading.Thread(target=other_process_finishes).start()
+        cc.local_cache.clear()
+        assert manager.get_or_set('stats', lambda: pytest.fail('recomputed')) == {'total': 1}
+
+    def test_early_refresh_near_expiry(self):
+        manager = cc.CacheManager('dash')
+        full_key = cc.get_cache_key('dash:early')
+        cc._cache_set_full(full_key, 'old', ttl=1, delta=100)
+
+        assert manager.get_or_set('early', lambda: 'new', ttl=60) == 'new'
+        assert manager.get('early') == 'new'
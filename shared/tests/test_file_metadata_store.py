@@ -0,0 +1,150 @@
+"""
+shared/file_metadata_store 元数据索引单元测试
+Run with: pytest shared/tests/test_file_metadata_store.py -v
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from shared.file_metadata_store import SQLMetadataStore, migrate_sidecars
+from shared.file_storage_v2 import EnterpriseFileStorage, FileAccessLogger
+
+ENTITY = dict(system='portal', entity_type='projects', entity_id='PRJ-001', year=2025, month=3)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    store = SQLMetadataStore(f"sqlite:///{tmp_path / 'meta.db'}")
+    return EnterpriseFileStorage(str(tmp_path / 'storage'), metadata_store=store)
+
+
+def test_save_list_delete_and_counters(storage):
+    first = storage.save_file(b'a' * 10, 'a.pdf', **ENTITY)
+    storage.save_file(b'b' * 20, 'b.dwg', category='drawings', **ENTITY)
+
+    assert [f['name'] for f in storage.list_files(**ENTITY)] == ['a.pdf', 'b.dwg']
+    assert [f['name'] for f in storage.list_files(category='drawings', **ENTITY)] == ['b.dwg']
+    assert storage.get_file(file_id=first['file_id'], **ENTITY)['exists']
+    assert storage.find_files_by_hash(sha256=first['sha256'])[0]['id'] == first['file_id']
+
+    # 计数器未初始化时全量扫描一次，之后增量维护
+    assert storage.get_storage_stats()['by_status']['active'] == {'files': 2, 'size': 30}
+    storage.delete_file(file_id=first['file_id'], **ENTITY)
+    stats = storage.get_storage_stats()
+    assert stats['by_status']['active'] == {'files': 1, 'size': 20}
+    assert stats['by_status']['quarantine'] == {'files': 1, 'size': 10}
+    assert stats['by_system']['portal'] == {'files': 1, 'size': 20}
+    assert stats == storage.get_storage_stats(rebuild=True)
+
+    meta = storage.get_entity_meta(**ENTITY)
+    assert meta['total_files'] == 1 and meta['total_size_bytes'] == 20
+
+
+def test_versions_and_access_history(storage):
+    saved = storage.save_file(b'v1', 'spec.pdf', **ENTITY)
+    storage.save_file_version(b'v2', 'spec.pdf', file_id=saved['file_id'], new_version='2.0', **ENTITY)
+
+    meta = storage.get_entity_meta(**ENTITY)
+    assert meta['version_history'][saved['file_id']] == {'current': '2.0', 'versions': ['2.0']}
+    assert [f['is_latest'] for f in meta['files']] == [False, True]
+
+    logger = FileAccessLogger(storage)
+    for action in ('view', 'download'):
+        logger.log_action(saved['file_id'], action, **ENTITY)
+    history = logger.get_file_history(saved['file_id'], **ENTITY)
+    assert [r['action_type'] for r in history] == ['download', 'view']
+
+
+def test_concurrent_saves_do_not_lose_files(storage):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(
+            lambda i: storage.save_file(b'x' * i, f'{i}.txt', **ENTITY), range(1, 41)
+        ))
+    assert all(r['success'] for r in results)
+    assert len(storage.list_files(**ENTITY)) == 40
+    assert storage.get_entity_meta(**ENTITY)['total_size_bytes'] == sum(range(1, 41))
+
+
+def test_migrate_and_lazy_import_of_sidecars(tmp_path):
+    base = tmp_path / 'storage'
+    entity_dir = base / 'active' / 'portal' / '2025' / '03' / 'projects' / 'PRJ-001'
+    entity_dir.mkdir(parents=True)
+    (entity_dir / '_meta.json').write_text(json.dumps({
+        'entity_id': 'PRJ-001', 'entity_type': 'projects', 'system': 'portal',
+        'created_at': '2025-03-01T00:00:00', 'updated_at': '2025-03-01T00:00:00',
+        'files': [{'id': 'f1', 'name': 'old.pdf', 'path': 'documents/old.pdf',
+                   'category': 'documents', 'size': 5, 'sha256': 'abc'}],
+        'version_history': {}, 'access_history': [{'file_id': 'f1', 'action_type': 'view'}]
+    }), encoding='utf-8')
+
+    # 懒迁移：读取时自动导入
+    storage = EnterpriseFileStorage(str(base), metadata_store=SQLMetadataStore(
+        f"sqlite:///{tmp_path / 'lazy.db'}"))
+    store = SQLMetadataStore(f"sqlite:///{tmp_path / 'lazy.db'}", storage._get_entity_path_by_key)
+    key = ('portal', 'projects', 'PRJ-001', 2025, 3)
+    assert [f['id'] for f in store.list_files(key)] == ['f1']
+    assert store.get_access_history(key)[0]['action_type'] == 'view'
+
+    # 一次性迁移
+    bulk = SQLMetadataStore(f"sqlite:///{tmp_path / 'bulk.db'}")
+    assert migrate_sidecars(str(base), bulk) == {'migrated': 1, 'skipped': 0, 'failed': 0}
+    assert migrate_sidecars(str(base), bulk)['skipped'] == 1
+    assert bulk.find_files_by_hash(sha256='abc')[0]['entity_key'] == key
+    assert os.path.exists(entity_dir / '_meta.json')
+
+
+def test_counters_follow_temp_archive_and_restore(storage):
+    import io
+    from datetime import datetime, timedelta
+
+    storage.save_file(b'a' * 10, 'a.pdf', **ENTITY)
+    storage.get_storage_stats()  # 初始化计数器
+
+    # 分片上传的中转文件在 temp 下，计入 temp，合并后移出
+    upload = storage.create_chunked_upload('c.zip', 6, chunk_size=3, category='archives')
+    storage.save_upload_chunk(upload['upload_id'], 0, io.BytesIO(b'abc'))
+    stats = storage.get_storage_stats()
+    assert stats['by_status']['temp']['files'] >= 1 and stats == storage.get_storage_stats(rebuild=True)
+
+    storage.save_upload_chunk(upload['upload_id'], 1, io.BytesIO(b'def'))
+    storage.complete_chunked_upload(upload['upload_id'], **ENTITY)
+    assert storage.get_storage_stats() == storage.get_storage_stats(rebuild=True)
+
+    # 归档 → 恢复（保留压缩包）→ 再次归档（另存新版本）→ 恢复并删除压缩包：计数对称增减
+    args = {k: ENTITY[k] for k in ('system', 'entity_type', 'entity_id', 'year')}
+    first = storage.archive_entity(month=ENTITY['month'], **args)
+    assert first['success']
+    stats = storage.get_storage_stats()
+    assert stats['by_status']['archived']['files'] == 1 and stats['by_status']['active']['files'] == 0
+    assert stats == storage.get_storage_stats(rebuild=True)
+
+    restored = storage.restore_archive(**args)
+    assert restored['success'] and restored['archive_path'] == first['archive_path']
+    assert os.path.exists(first['archive_path'])
+    stats = storage.get_storage_stats()
+    assert stats['by_status']['archived']['files'] == 1 and stats['by_status']['active']['files'] == 2
+    assert stats == storage.get_storage_stats(rebuild=True)
+
+    storage.save_file(b'b' * 10, 'b.pdf', **ENTITY)
+    second = storage.archive_entity(month=ENTITY['month'], **args)
+    assert second['archive_path'] != first['archive_path'] and os.path.exists(first['archive_path'])
+    assert storage.get_storage_stats()['by_status']['archived']['files'] == 2
+
+    restored = storage.restore_archive(remove_archive=True, **args)
+    assert restored['archive_path'] == second['archive_path'] and not os.path.exists(second['archive_path'])
+    stats = storage.get_storage_stats()
+    assert stats['by_status']['archived']['files'] == 1 and stats['by_status']['active']['files'] == 3
+    assert stats == storage.get_storage_stats(rebuild=True)
+
+    # 清理过期 temp 后计数不为负
+    old = os.path.join(storage.base_path, 'temp', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
+    os.makedirs(old)
+    with open(os.path.join(old, 'stale.part'), 'wb') as f:
+        f.write(b'x' * 5)
+    assert storage.get_storage_stats()['by_status']['temp']['size'] >= 5
+    assert storage.cleanup_temp_files()['deleted_files'] == 1
+    stats = storage.get_storage_stats()
+    assert stats['by_status']['temp']['files'] >= 0 and stats == storage.get_storage_stats(rebuild=True)
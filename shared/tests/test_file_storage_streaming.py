@@ -0,0 +1,82 @@
+"""
+shared/file_storage_v2 流式写入、分片上传与去重单元测试
+Run with: pytest shared/tests/test_file_storage_streaming.py -v
+"""
+
+import hashlib
+import io
+import os
+
+import pytest
+
+from shared.file_metadata_store import SQLMetadataStore
+from shared.file_storage_v2 import EnterpriseFileStorage
+
+ENTITY = dict(system='portal', entity_type='projects', entity_id='PRJ-001')
+
+
+@pytest.fixture
+def storage(tmp_path):
+    store = SQLMetadataStore(f"sqlite:///{tmp_path / 'meta.db'}")
+    return EnterpriseFileStorage(str(tmp_path / 'storage'), metadata_store=store)
+
+
+def test_stream_save_hashes_and_dedupes(storage):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    first = storage.save_file(io.BytesIO(data), 'a.pdf', **ENTITY)
+    assert first['success'] and first['size'] == len(data)
+    assert first['md5'] == hashlib.md5(data).hexdigest()
+    assert first['sha256'] == hashlib.sha256(data).hexdigest()
+    assert not first['deduplicated']
+
+    second = storage.save_file(data, 'copy.pdf', **ENTITY)
+    assert second['deduplicated']
+    assert os.path.samefile(first['path'], second['path'])
+
+    # 删除一份不影响另一份
+    storage.delete_file(file_id=first['file_id'], **ENTITY)
+    with open(second['path'], 'rb') as f:
+        assert f.read() == data
+
+
+def test_stream_save_rejects_oversize_and_bad_hash(storage):
+    assert 'error' in storage.save_file(io.BytesIO(b'x' * 101), 'a.txt', max_size=100, **ENTITY)
+    assert 'error' in storage.save_file(b'abc', 'a.txt', expected_sha256='0' * 64, **ENTITY)
+    assert storage.list_files(**ENTITY) == []
+
+
+def test_chunked_upload_resume_and_complete(storage):
+    data = os.urandom(2500)
+    session = storage.create_chunked_upload('big.zip', len(data), chunk_size=1000, category='archives',
+                                            sha256=hashlib.sha256(data).hexdigest(),
+                                            extra={'project_id': 1})
+    upload_id = session['upload_id']
+    assert session['total_chunks'] == 3
+
+    storage.save_upload_chunk(upload_id, 2, data[2000:])
+    assert not storage.save_upload_chunk(upload_id, 0, data[:999])['success']
+    status = storage.get_upload_status(upload_id)
+    assert status['missing'] == [0, 1] and status['extra'] == {'project_id': 1}
+    assert storage.complete_chunked_upload(upload_id, **ENTITY)['missing'] == [0, 1]
+
+    # 续传缺失分片，重复上传同一分片可安全覆盖
+    for index in (0, 1, 1):
+        storage.save_upload_chunk(upload_id, index, io.BytesIO(data[index * 1000:(index + 1) * 1000]))
+    result = storage.complete_chunked_upload(upload_id, **ENTITY)
+    assert result['success'] and result['category'] == 'archives'
+    with open(result['path'], 'rb') as f:
+        assert f.read() == data
+    assert not storage.get_upload_status(upload_id)['success']
+
+
+@pytest.mark.parametrize('total_size, chunk_size', [(0, 1000), (-5, 1000), ('100', 1000),
+                                                   (100, 0), (100, -1), (100, '1000')])
+def test_chunked_upload_rejects_bad_sizes(storage, total_size, chunk_size):
+    result = storage.create_chunked_upload('big.zip', total_size, chunk_size=chunk_size, category='archives')
+    assert not result['success'] and result['error']
+
+
+def test_chunked_upload_rejects_bad_ids(storage):
+    with pytest.raises(ValueError):
+        storage._get_upload_path('../../etc')
+    assert not storage.get_upload_status('2025010100000000000000ff')['success']
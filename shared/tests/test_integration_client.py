@@ -0,0 +1,176 @@
+"""
+shared/integration 连接池、缓存、熔断与请求合并单元测试（本地桩 HTTP 服务）
+Run with: pytest shared/tests/test_integration_client.py -v
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from shared.http_client import CircuitBreaker, CircuitOpenError, RetryableHTTPClient
+from shared.integration import BatchLoader, HRClient, RequestCoalescer, clear_integration_cache
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        with server.lock:
+            server.hits.append(url.path)
+            server.ports.add(self.client_address[1])
+        time.sleep(server.delay)
+
+        if server.down:
+            return self._send(503, {'success': False})
+        if url.path == '/api/departments':
+            if self.headers.get('If-None-Match') == '"v1"':
+                return self._send(304)
+            return self._send(200, {'items': [{'id': 1, 'name': '销售'}]}, {'ETag': '"v1"'})
+        if url.path == '/api/employees/batch':
+            if not server.batch_supported:
+                return self._send(404, {'success': False})
+            ids = [int(i) for i in parse_qs(url.query)['ids'][0].split(',')]
+            return self._send(200, {'success': True, 'data': [{'id': i} for i in ids if i < 100]})
+        if url.path.startswith('/api/employees/'):
+            emp_id = int(url.path.rsplit('/', 1)[-1])
+            if emp_id >= 100:
+                return self._send(404, {'success': False})
+            return self._send(200, {'success': True, 'data': {'id': emp_id}})
+        return self._send(404, {'success': False})
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.hits, server.ports = [], set()
+    server.delay, server.down, server.batch_supported = 0, False, True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    clear_integration_cache()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_cache_revalidates_with_etag_and_reuses_connections(stub):
+    hr = HRClient(base_url=stub.url)
+    for _ in range(3):
+        assert hr.get_departments() == [{'id': 1, 'name': '销售'}]
+    assert stub.hits == ['/api/departments']
+
+    # 过期后条件请求，304 时返回缓存
+    for entry in hr._cache._entries.values():
+        entry.expires_at = 0
+    assert hr.get_departments()[0]['name'] == '销售'
+    assert len(stub.hits) == 2
+
+    for i in range(5):
+        hr.get_employee(i)
+    assert len(stub.ports) == 1
+
+
+def test_concurrent_identical_requests_are_coalesced(stub):
+    stub.delay = 0.2
+    hr = HRClient(base_url=stub.url)
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda _: hr.get_employee(7), range(10)))
+    assert all(r == {'success': True, 'data': {'id': 7}} for r in results)
+    assert stub.hits == ['/api/employees/7']
+
+
+def test_multi_get_and_fallback(stub):
+    hr = HRClient(base_url=stub.url)
+    assert hr.get_employees_by_ids([1, 2, 100, 2]) == {1: {'id': 1}, 2: {'id': 2}, 100: None}
+    assert stub.hits == ['/api/employees/batch']
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        loaded = list(pool.map(hr.load_employee, range(8)))
+    assert loaded == [{'id': i} for i in range(8)]
+    assert stub.hits.count('/api/employees/batch') <= 3
+
+    stub.batch_supported = False
+    clear_integration_cache()
+    stub.hits.clear()
+    assert hr.get_employees_by_ids([3, 4, 101]) == {3: {'id': 3}, 4: {'id': 4}, 101: None}
+    assert sorted(stub.hits) == ['/api/employees/101', '/api/employees/3',
+                                 '/api/employees/4', '/api/employees/batch']
+
+
+def test_circuit_breaker_opens_and_probes(stub):
+    breaker = CircuitBreaker('stub', failure_threshold=3, recovery_timeout=0.2)
+    client = RetryableHTTPClient(stub.url, max_retries=5, initial_delay=0.01,
+                                 circuit_breaker=breaker)
+    stub.down = True
+    with pytest.raises(CircuitOpenError):
+        client.get('/api/departments')
+    assert breaker.state == CircuitBreaker.OPEN
+    assert len(stub.hits) == 3
+
+    with pytest.raises(CircuitOpenError):
+        client.get('/api/departments')
+    assert len(stub.hits) == 3
+
+    # 半开状态只放行一个探测请求，成功后恢复
+    time.sleep(0.25)
+    assert breaker.allow_request() and not breaker.allow_request()
+    breaker.release_probe()
+    stub.down = False
+    assert client.get('/api/departments').status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stale_cache_served_when_service_down(stub):
+    hr = HRClient(base_url=stub.url, max_retries=1)
+    hr.get_departments()
+    for entry in hr._cache._entries.values():
+        entry.expires_at = 0
+    stub.down = True
+    assert hr.get_departments() == [{'id': 1, 'name': '销售'}]
+
+
+def test_coalescer_and_batch_loader_primitives():
+    calls = []
+    coalescer = RequestCoalescer()
+    gate = threading.Event()
+
+    def slow():
+        calls.append(1)
+        gate.wait(1)
+        return {'v': 1}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(coalescer.do, 'k', slow) for _ in range(5)]
+        time.sleep(0.1)
+        gate.set()
+        assert [f.result() for f in futures] == [{'v': 1}] * 5
+    assert len(calls) == 1
+
+    batches = []
+    loader = BatchLoader(lambda keys: batches.append(keys) or {k: k * 2 for k in keys},
+                         max_batch=4, window=0.05)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(loader.load, range(8))) == [k * 2 for k in range(8)]
+    assert sum(len(b) for b in batches) == 8 and len(batches) < 8
@@ -0,0 +1,185 @@
+"""
+shared/job_queue 持久化任务队列单元测试
+Run with: pytest shared/tests/test_job_queue.py -v
+"""
+
+import os
+import threading
+import time
+
+from shared.job_queue import JobQueue, UnitSpec, WorkerPool
+
+
+class StubTranslator:
+    """模拟逐页翻译：每页耗时 delay 秒，记录调用次数和最大并发"""
+
+    def __init__(self, delay=0.05, fail_pages=()):
+        self.delay = delay
+        self.fail_pages = set(fail_pages)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, job):
+        return [UnitSpec({'page': i + 1}, cache_key=f"page:{text}") for i, text in enumerate(job['payload']['pages'])]
+
+    def run_unit(self, job, unit):
+        with self._lock:
+            self.calls.append(unit['payload']['page'])
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if unit['payload']['page'] in self.fail_pages:
+                raise RuntimeError('backend error')
+            return job['payload']['pages'][unit['payload']['page'] - 1].upper()
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def finalize(self, job, units):
+        return [u['result'] if u['status'] == 'done' else None for u in units]
+
+
+def make_queue(tmp_path, **kwargs):
+    kwargs.setdefault('retry_backoff', 0)
+    return JobQueue(os.path.join(tmp_path, 'jobs.db'), **kwargs)
+
+
+def test_pages_run_concurrently_and_results_keep_order(tmp_path):
+    queue = make_queue(tmp_path)
+    translator = StubTranslator(delay=0.1)
+    pool = WorkerPool(queue, {'translate': translator}, concurrency=4, poll_interval=0.01)
+    job_id = queue.enqueue('translate', {'pages': [f'p{i}' for i in range(8)]})
+
+    start = time.time()
+    pool.start()
+    job = queue.wait(job_id, timeout=10)
+    elapsed = time.time() - start
+    pool.stop()
+
+    assert job['status'] == 'completed' and job['progress'] == 100
+    assert job['result'] == [f'P{i}' for i in range(8)]
+    assert translator.max_active == 4
+    assert elapsed < 0.8 * 0.1 * 4  # 8 页 4 并发约 0.2 秒，串行需 0.8 秒
+
+
+def test_repeated_pages_hit_cache(tmp_path):
+    queue = make_queue(tmp_path)
+    translator = StubTranslator(delay=0.02)
+    pool = WorkerPool(queue, {'translate': translator}, concurrency=3, poll_interval=0.01)
+    pool.start()
+
+    # 同一文档内重复页面只翻译一次
+    first = queue.enqueue('translate', {'pages': ['a', 'b', 'a', 'a']})
+    assert queue.wait(first, timeout=5)['result'] == ['A', 'B', 'A', 'A']
+    assert sorted(translator.calls) == [1, 2]
+
+    # 重新上传：全部命中缓存，不再调用翻译
+    second = queue.enqueue('translate', {'pages': ['b', 'a']})
+    job = queue.wait(second, timeout=5)
+    pool.stop()
+    assert job['result'] == ['B', 'A'] and job['cached_units'] == 2
+    assert len(translator.calls) == 2
+
+
+def test_resume_after_worker_crash(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.2)
+    translator = StubTranslator(delay=0)
+    job_id = queue.enqueue('translate', {'pages': ['a', 'b', 'c']})
+
+    # 崩溃的工作者：拆分完成、第 1 页完成、第 2 页领取后未提交
+    pool = WorkerPool(queue, {'translate': translator})
+    assert pool.run_once('dead-worker')
+    assert pool.run_once('dead-worker')
+    claim = queue.claim('dead-worker')
+    assert claim.stage == 'unit' and claim.unit['seq'] == 1
+    assert [u['status'] for u in queue.get_units(job_id)] == ['done', 'running', 'pending']
+
+    # 租约未到期前其他工作者不会重复执行第 2 页
+    other = WorkerPool(queue, {'translate': translator})
+    assert other.run_once('w2') and translator.calls == [1, 3]
+    assert not other.run_once('w2')
+
+    time.sleep(0.25)
+    while other.run_once('w2'):
+        pass
+    assert translator.calls == [1, 3, 2]  # 已完成的页面不会重做
+    assert queue.get_job(job_id)['result'] == ['A', 'B', 'C']
+    # 原工作者迟到的提交被忽略
+    assert not queue.complete_unit(job_id, 1, 'dead-worker', 'stale')
+
+
+def test_failed_pages_retry_then_reported(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    translator = StubTranslator(delay=0, fail_pages={2})
+    job_id = queue.enqueue('translate', {'pages': ['a', 'b']})
+    pool = WorkerPool(queue, {'translate': translator})
+    while pool.run_once('w1'):
+        pass
+
+    job = queue.get_job(job_id)
+    assert job['status'] == 'completed' and job['failed_units'] == 1
+    assert job['result'] == ['A', None]
+    assert translator.calls.count(2) == 2
+    assert queue.get_units(job_id)[1]['error'] == 'backend error'
+
+
+def test_global_concurrency_limit(tmp_path):
+    queue = make_queue(tmp_path, max_running=2)
+    translator = StubTranslator(delay=0.05)
+    pools = [WorkerPool(queue, {'translate': translator}, concurrency=3, poll_interval=0.01) for _ in range(2)]
+    job_id = queue.enqueue('translate', {'pages': [f'p{i}' for i in range(10)]})
+    for pool in pools:
+        pool.start()
+    job = queue.wait(job_id, timeout=10)
+    for pool in pools:
+        pool.stop()
+
+    assert job['status'] == 'completed'
+    assert translator.max_active <= 2
+
+
+def test_crashing_finalize_fails_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05, max_attempts=2)
+    translator = StubTranslator(delay=0)
+    job_id = queue.enqueue('translate', {'pages': ['a']})
+    pool = WorkerPool(queue, {'translate': translator})
+    assert pool.run_once('w1') and pool.run_once('w1')
+
+    # 汇总阶段每次领取后进程都崩溃，租约到期被重新领取，次数用尽后任务失败
+    for _ in range(2):
+        assert queue.claim('dead-worker').stage == 'finalize'
+        time.sleep(0.06)
+    assert queue.claim('dead-worker') is None
+    job = queue.get_job(job_id)
+    assert job['status'] == 'failed' and job['error'] == 'lease expired'
+
+
+class CleanupTranslator(StubTranslator):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.cleaned = []
+
+    def cleanup(self, job):
+        self.cleaned.append(job['id'])
+
+
+def test_cleanup_runs_only_after_result_saved(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05)
+    translator = CleanupTranslator(delay=0)
+    job_id = queue.enqueue('translate', {'pages': ['a']})
+    pool = WorkerPool(queue, {'translate': translator})
+    assert pool.run_once('w1') and pool.run_once('w1')
+
+    # 汇总期间租约被接管：结果未写入，不清理（接管者还需要任务文件）
+    finalize = translator.finalize
+    translator.finalize = lambda job, units: (time.sleep(0.06), queue.claim('w2'), finalize(job, units))[-1]
+    assert pool.run_once('w1')
+    assert translator.cleaned == [] and queue.get_job(job_id)['status'] == 'finalizing'
+
+    translator.finalize = finalize
+    time.sleep(0.06)
+    assert pool.run_once('w3')
+    assert translator.cleaned == [job_id] and queue.get_job(job_id)['status'] == 'completed'
@@ -0,0 +1,82 @@
+"""
+shared/pagination 游标分页单元测试
+Run with: pytest shared/tests/test_pagination.py -v
+"""
+
+import pytest
+
+pytest.importorskip('flask')
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from shared.pagination import InvalidCursorError, KeysetPaginator, decode_cursor, encode_cursor
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = 'items'
+    id = Column(Integer, primary_key=True)
+    category = Column(String(10), nullable=False)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    # 3 个分类各 10 条，分类内 id 递增
+    session.add_all(Item(id=i, category='abc'[i % 3]) for i in range(1, 31))
+    session.commit()
+    yield session
+    session.close()
+
+
+def collect(paginator):
+    ids, cursor = [], None
+    while True:
+        page = paginator.paginate(cursor)
+        ids.extend(item.id for item in page.items)
+        if not page.has_next:
+            return ids
+        cursor = page.next_cursor
+
+
+class TestKeysetPaginator:
+
+    def test_walk_matches_order_by_with_mixed_directions(self, session):
+        order_by = [(Item.category, 'asc'), (Item.id, 'desc')]
+        paginator = KeysetPaginator(session.query(Item), order_by, per_page=7)
+        expected = [i.id for i in session.query(Item).order_by(Item.category, Item.id.desc())]
+        assert collect(paginator) == expected
+
+    def test_prev_returns_previous_page(self, session):
+        paginator = KeysetPaginator(session.query(Item), [(Item.id, 'asc')], per_page=5)
+        first = paginator.paginate()
+        second = paginator.paginate(first.next_cursor)
+        back = paginator.paginate(second.prev_cursor, 'prev')
+        assert [i.id for i in back.items] == [1, 2, 3, 4, 5]
+        assert back.has_next and not back.has_prev
+
+    def test_totals(self, session):
+        query = session.query(Item).filter(Item.category == 'a')
+        page = KeysetPaginator(query, [(Item.id, 'asc')], total_mode='exact').paginate()
+        assert page.total == 10 and not page.total_is_estimate
+
+        cached = KeysetPaginator(query, [(Item.id, 'asc')], total_mode='cached')
+        cached.paginate()
+        assert cached.paginate().total_is_estimate
+
+
+class TestCursor:
+
+    def test_round_trip(self):
+        from datetime import datetime
+        values = [datetime(2024, 1, 2, 3, 4, 5), 42, 'x']
+        assert decode_cursor(encode_cursor(values)) == values
+
+    def test_tampered_cursor_rejected(self):
+        _, signature = encode_cursor([1]).split('.')
+        forged = encode_cursor([999]).split('.')[0]
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(f'{forged}.{signature}')
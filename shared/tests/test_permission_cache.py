@@ -0,0 +1,92 @@
+"""
+shared/auth/permission_cache 跨进程权限缓存单元测试
+Run with: pytest shared/tests/test_permission_cache.py -v
+"""
+
+import time
+
+import pytest
+
+permission_cache = pytest.importorskip('shared.auth.permission_cache')
+from shared import cache_config as cc
+
+PermissionCache = permission_cache.PermissionCache
+PermissionSet = permission_cache.PermissionSet
+
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    monkeypatch.setattr(cc.cache_config, 'is_available', lambda: False)
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip('fakeredis')
+    client = fakeredis.FakeRedis(decode_responses=True)
+    original = cc.cache_config._client
+    cc.cache_config._client = client
+    cc.local_cache.clear()
+    yield client
+    cc.cache_config._client = original
+    cc.local_cache.clear()
+
+
+class TestPermissionSet:
+
+    def test_lookups(self):
+        perms = PermissionSet(['hr:employee:read', 'crm:customer:read'], ['hr_admin'], 1)
+        assert perms.has('hr:employee:read')
+        assert not perms.has('hr:employee:delete')
+        assert perms.has_any(['x', 'crm:customer:read'])
+        assert not perms.has_all(['hr:employee:read', 'x'])
+        assert perms.has_module('crm')
+        assert not perms.has_module('scm')
+
+    def test_wildcard(self):
+        perms = PermissionSet(['*'], ['super_admin'], 1)
+        assert perms.has('anything') and perms.has_module('scm')
+
+
+class TestFileStampBroadcast:
+
+    def test_invalidation_reaches_other_worker(self, no_redis, tmp_path):
+        stamp = str(tmp_path / 'generation')
+        worker_a = PermissionCache(check_interval=0, stamp_file=stamp)
+        worker_b = PermissionCache(check_interval=0, stamp_file=stamp)
+
+        gen = worker_b.current_generation()
+        worker_b.put(1, ['hr:employee:read'], ['hr_admin'], gen)
+        assert worker_b.get(1) is not None
+
+        worker_a.invalidate(1)
+        assert worker_b.get(1) is None
+
+    def test_result_compiled_before_change_is_discarded(self, no_redis, tmp_path):
+        stamp = str(tmp_path / 'generation')
+        cache = PermissionCache(check_interval=0, stamp_file=stamp)
+
+        gen = cache.current_generation()
+        cache.bump()
+        cache.put(1, ['stale'], [], gen)
+        assert cache.get(1) is None
+
+
+class TestRedisBroadcast:
+
+    def test_pubsub_and_shared_tier(self, fake_redis, tmp_path):
+        stamp = str(tmp_path / 'generation')
+        worker_a = PermissionCache(check_interval=0, stamp_file=stamp)
+        worker_b = PermissionCache(check_interval=3600, stamp_file=stamp)
+        worker_b._last_check = 0
+        gen = worker_b.current_generation()
+
+        worker_a.put(1, ['hr:employee:read'], ['hr_admin'], worker_a.current_generation())
+        # worker_b 复用 worker_a 写入的共享缓存
+        assert worker_b.get(1).has('hr:employee:read')
+
+        worker_a.invalidate()
+        deadline = time.time() + 2
+        while worker_b.current_generation() == gen and time.time() < deadline:
+            time.sleep(0.01)
+        assert worker_b.current_generation() != gen
+        assert worker_b.get(1) is None
@@ -0,0 +1,111 @@
+"""
+shared/process_pool 常驻进程工作池单元测试
+Run with: pytest shared/tests/test_process_pool.py -v
+"""
+
+import os
+import time
+
+import pytest
+
+from shared.process_pool import JobTimeout, PoolClient, PoolServer, ProcessPool, WorkerError
+
+# 以下函数在工作进程中按 "test_process_pool:函数名" 导入
+_loaded = []
+
+
+def load_model(delay=0.0):
+    time.sleep(delay)
+    _loaded.append(os.getpid())
+
+
+def handle(payload):
+    action, value = payload
+    if action == 'echo':
+        return {'value': value, 'pid': os.getpid(), 'loads': len(_loaded)}
+    if action == 'sleep':
+        time.sleep(value)
+        return os.getpid()
+    if action == 'crash':
+        os._exit(3)
+    raise ValueError(value)
+
+
+def broken_init():
+    raise ImportError('no OCR engine')
+
+
+def make_pool(**kwargs):
+    kwargs.setdefault('size', 1)
+    return ProcessPool('test_process_pool:handle', initializer='test_process_pool:load_model', **kwargs)
+
+
+def test_model_loaded_once_and_errors_keep_worker():
+    with make_pool(size=2) as pool:
+        results = [pool.submit(('echo', i)).result() for i in range(6)]
+        assert [r['value'] for r in results] == list(range(6))
+        assert all(r['loads'] == 1 for r in results)
+        assert len({r['pid'] for r in results}) <= 2
+
+        pid = pool.run(('echo', 0))['pid']
+        with pytest.raises(WorkerError, match='ValueError: bad input'):
+            pool.run(('fail', 'bad input'))
+        stats = pool.stats()
+        assert stats['completed'] == 7 and stats['failed'] == 1 and stats['alive'] == 2
+        assert stats['run_ms']['p50'] is not None and stats['queue_depth'] == 0
+        assert pid in {pool.run(('echo', 0))['pid'] for _ in range(4)}
+
+
+def test_timeout_and_crash_restart_worker():
+    with make_pool(timeout=0.5) as pool:
+        first = pool.run(('echo', 1))['pid']
+        started = time.monotonic()
+        with pytest.raises(JobTimeout):
+            pool.run(('sleep', 30))
+        assert time.monotonic() - started < 10
+        second = pool.run(('echo', 2))['pid']
+        assert second != first
+
+        with pytest.raises(WorkerError, match='exitcode'):
+            pool.run(('crash', None))
+        assert pool.run(('echo', 3))['value'] == 3
+        stats = pool.stats()
+        assert stats['timeouts'] == 1 and stats['crashed'] == 1 and stats['alive'] == 1
+
+
+def test_recycle_by_jobs_and_memory():
+    with make_pool(max_jobs=2) as pool:
+        pids = [pool.run(('echo', i))['pid'] for i in range(4)]
+        assert pids[0] == pids[1] and pids[1] != pids[2] and pids[2] == pids[3]
+        assert pool.stats()['recycled'] == 2
+
+    with make_pool(max_rss_mb=1) as pool:
+        pids = [pool.run(('echo', i))['pid'] for i in range(2)]
+        assert pids[0] != pids[1] and pool.stats()['recycled'] == 2
+
+
+def test_initializer_failure():
+    pool = ProcessPool('test_process_pool:handle', initializer='test_process_pool:broken_init')
+    with pytest.raises(WorkerError, match='no OCR engine'):
+        pool.start()
+    with pytest.raises(WorkerError):
+        pool.run(('echo', 1))
+    pool.close()
+
+
+def test_server_and_client(tmp_path):
+    address = str(tmp_path / 'pool.sock')
+    with make_pool(timeout=0.5) as pool:
+        server = PoolServer(pool, address).start()
+        try:
+            client = PoolClient(address)
+            assert client.ping()
+            assert client.run(('echo', 'x'))['value'] == 'x'
+            with pytest.raises(JobTimeout):
+                client.run(('sleep', 5))
+            with pytest.raises(WorkerError, match='ValueError'):
+                client.run(('fail', 'oops'))
+            assert client.stats()['timeouts'] == 1
+        finally:
+            server.close()
+    assert not PoolClient(address).ping()
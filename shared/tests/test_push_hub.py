@@ -0,0 +1,96 @@
+"""
+shared/push_hub 推送分发中心单元测试
+Run with: pytest shared/tests/test_push_hub.py -v
+"""
+
+import json
+import threading
+
+from shared.push_hub import PushHub, format_sse, sse_stream
+
+
+def parse(message):
+    fields = dict(line.split(': ', 1) for line in message.strip().split('\n') if not line.startswith(':'))
+    if 'data' in fields:
+        fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+def test_publish_fans_out_to_user_subscriptions():
+    hub = PushHub()
+    tab1, _ = hub.subscribe(1)
+    tab2, _ = hub.subscribe(1)
+    other, _ = hub.subscribe(2)
+
+    hub.publish([1], 'chat.message', {'id': 10})
+    hub.publish([1, 2], 'chat.read', {'project_id': 3})
+
+    assert [e.type for e in tab1.get(0)] == ['chat.message', 'chat.read']
+    assert [e.type for e in tab2.get(0)] == ['chat.message', 'chat.read']
+    assert [e.data for e in other.get(0)] == [{'project_id': 3}]
+    assert other.get(0.01) == []
+    assert hub.stats()['connections'] == 3
+
+    hub.unsubscribe(tab1)
+    hub.publish([1], 'chat.message', {'id': 11})
+    assert tab1.get(0) == [] and len(tab2.get(0)) == 1
+
+
+def test_resume_from_last_event_id():
+    hub = PushHub(buffer_size=3)
+    hub.publish([1], 'a', 1)
+    hub.publish([2], 'b', 2)
+    hub.publish([1], 'c', 3)
+    first_id = f"{hub.instance_id}-1"
+
+    _, replay = hub.subscribe(1, first_id)
+    assert [e.data for e in replay] == [3]
+
+    # 服务重启（ID 前缀不同）或缓冲区已覆盖时无法续传
+    assert hub.subscribe(1, 'deadbeef-1')[1] is None
+    hub.publish([1], 'd', 4)
+    hub.publish([1], 'e', 5)
+    assert hub.subscribe(1, first_id)[1] is None
+    assert [e.data for e in hub.subscribe(1, f"{hub.instance_id}-3")[1]] == [4, 5]
+
+
+def test_stream_sends_snapshot_events_and_heartbeat():
+    hub = PushHub()
+    sub, replay = hub.subscribe(7)
+    stream = sse_stream(hub, sub, replay, snapshot={'unread': 2}, heartbeat=0.05)
+
+    assert next(stream).startswith('retry:')
+    snapshot = parse(next(stream))
+    assert snapshot['event'] == 'snapshot' and snapshot['data'] == {'unread': 2}
+
+    assert next(stream) == ': ping\n\n'
+    threading.Timer(0.01, hub.publish, ([7], 'notification.created', {'title': '新问题\n分配'})).start()
+    event = parse(next(stream))
+    assert event['event'] == 'notification.created' and event['id'] == f"{hub.instance_id}-1"
+    assert event['data'] == {'title': '新问题\n分配'}
+
+    # 客户端断开：服务器关闭生成器，订阅随之移除
+    stream.close()
+    assert hub.stats()['connections'] == 0
+
+
+def test_slow_consumer_gets_reset():
+    hub = PushHub(max_queue=2)
+    sub, replay = hub.subscribe(1)
+    for i in range(3):
+        hub.publish([1], 'chat.message', {'id': i})
+
+    messages = list(sse_stream(hub, sub, replay, heartbeat=0.05))
+    assert parse(messages[-1])['event'] == 'reset'
+    assert hub.stats()['connections'] == 0
+
+    # 无法续传且没有快照时直接通知客户端重置
+    sub, _ = hub.subscribe(1, 'unknown-5')
+    stream = sse_stream(hub, sub, None)
+    next(stream)
+    assert parse(next(stream))['event'] == 'reset'
+    stream.close()
+
+
+def test_format_sse():
+    assert format_sse('x', {'a': '中'}, 'id-1') == 'id: id-1\nevent: x\ndata: {"a": "中"}\n\n'
@@ -0,0 +1,74 @@
+"""
+shared/rendition_cache 预览图缓存单元测试
+Run with: pytest shared/tests/test_rendition_cache.py -v
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from shared import rendition_cache
+from shared.rendition_cache import RenditionCache, normalize_size, pregenerate, rendition_kind
+
+Image = pytest.importorskip('PIL.Image')
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = str(tmp_path / 'photo.png')
+    Image.new('RGBA', (2000, 1000), (200, 30, 30, 128)).save(path)
+    return path
+
+
+def test_sizes_and_kinds():
+    assert normalize_size('100') == 128
+    assert normalize_size(300) == 512
+    assert normalize_size(5000) == 1024
+    assert normalize_size(None) == 256
+    assert rendition_kind('a.JPG') == 'image'
+    assert rendition_kind('scan', 'image/tiff') == 'image'
+    assert rendition_kind('a.docx') is None
+
+
+def test_render_and_cache_hit(tmp_path, photo, monkeypatch):
+    cache = RenditionCache(str(tmp_path / 'cache'))
+    calls = []
+    original = rendition_cache.RENDERERS['image']
+    monkeypatch.setitem(rendition_cache.RENDERERS, 'image',
+                        lambda path, size: calls.append(size) or original(path, size))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        paths = list(pool.map(lambda _: cache.get_or_render('abc', photo, 'image', 256), range(4)))
+
+    assert len(set(paths)) == 1 and calls == [256]
+    with Image.open(paths[0]) as thumb:
+        assert thumb.format == 'JPEG' and thumb.size == (256, 128)
+    assert os.path.getsize(paths[0]) < os.path.getsize(photo)
+
+    # 内容哈希不同即重新生成
+    cache.get_or_render('def', photo, 'image', 256)
+    assert calls == [256, 256]
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = RenditionCache(str(tmp_path / 'cache'), max_bytes=3000)
+    for i, key in enumerate(('a1', 'b1', 'c1')):
+        path = cache.put(key, b'x' * 1000)
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    assert cache.get('a1')  # 最近使用
+
+    cache.put('d1', b'x' * 1000)
+    assert cache.get('b1') is None and cache.get('c1') is None
+    assert cache.get('a1') and cache.get('d1')
+    assert cache.stats()['bytes'] <= 3000
+
+
+def test_pregenerate(tmp_path, photo):
+    cache = RenditionCache(str(tmp_path / 'cache'))
+    pregenerate(cache, 'abc', photo, 'image', sizes=(128, 256)).result()
+    assert cache.get(cache.make_key('abc', 'image', 128))
+    assert cache.get(cache.make_key('abc', 'image', 256))
+    # 渲染失败不抛出
+    pregenerate(cache, 'zzz', str(tmp_path / 'missing.png'), 'image', background=False)
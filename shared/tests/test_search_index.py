@@ -0,0 +1,65 @@
+"""
+shared/search_index 全文检索索引单元测试
+Run with: pytest shared/tests/test_search_index.py -v
+"""
+
+import pytest
+
+from shared.search_index import FTS5Index, build_match_query, tokenize
+
+pytestmark = pytest.mark.skipif(not FTS5Index.available(), reason='SQLite 未编译 FTS5')
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FTS5Index(str(tmp_path / 'search.db'), ('name', 'content'), (5.0, 1.0),
+                      {'created_at': 'TEXT', 'size': 'INTEGER'})
+    index.upsert(1, {'name': '设计图纸_2J1030J.pdf', 'content': '检验标准'},
+                 facets={'project': 12, 'status': 'active'}, attrs={'created_at': '2025-01-05', 'size': 30})
+    index.upsert(2, {'name': '見積書.xlsx', 'content': '设计图纸 附件'},
+                 facets={'project': 13, 'status': 'active'}, attrs={'created_at': '2025-02-10', 'size': 10})
+    index.upsert(3, {'name': 'ＰＯ-2025-001 注文書.pdf'},
+                 facets={'project': 12, 'status': 'deleted'}, attrs={'created_at': '2025-03-01', 'size': 20})
+    return index
+
+
+def ids(result):
+    return [hit['id'] for hit in result[0]]
+
+
+def test_tokenizer_handles_cjk_and_codes():
+    assert tokenize('设计图纸') == ['设计', '计图', '图纸', '纸']
+    assert tokenize('ＰＯ-2J1030J') == ['po', '2j1030j', '1030']
+    assert build_match_query('图纸 2j10') == '"图纸" "2j10"*'
+    assert build_match_query('  --  ') is None
+
+
+def test_search_ranks_matches_and_supports_partial_terms(index):
+    # 文件名命中的权重高于正文
+    assert ids(index.search('设计图纸')) == [1, 2]
+    assert ids(index.search('1030')) == [1]
+    assert ids(index.search('po 2025')) == [3]
+    assert ids(index.search('見積')) == [2]
+    assert ids(index.search('纸')) == [1, 2]
+    assert ids(index.search('不存在')) == []
+
+
+def test_filters_are_applied_inside_index(index):
+    assert sorted(ids(index.search('pdf', facets={'project': 12}))) == [1, 3]
+    assert ids(index.search('pdf', facets={'project': [12]}, exclude_facets={'status': 'deleted'})) == [1]
+    assert ids(index.search(None, facets={'project': 12}, sort_by='size', sort_desc=False)) == [3, 1]
+    assert ids(index.search('设计', ranges={'created_at': ('2025-02-01', None)})) == [2]
+
+    hits, total = index.search(None, facets={'status': 'active'}, limit=1, columns=('size',))
+    assert total == 2 and set(hits[0]) == {'id', 'score', 'size'}
+
+
+def test_incremental_update_and_delete(index):
+    # 未传入的字段保留原内容
+    index.upsert(1, {'name': '旧图纸.pdf'}, facets={'project': 14, 'status': 'active'})
+    assert ids(index.search('检验')) == [1]
+    assert ids(index.search('pdf', facets={'project': 12})) == [3]
+
+    index.delete(1)
+    assert ids(index.search('检验')) == []
+    assert index.count() == 2
@@ -0,0 +1,81 @@
+"""
+shared/sequence 编号分配器单元测试
+Run with: pytest shared/tests/test_sequence.py -v
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from shared.sequence import SequenceAllocator
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'seq.db'}", connect_args={'timeout': 30})
+
+
+def test_concurrent_allocation_is_unique_across_allocators(engine):
+    # 两个分配器模拟两个进程，各自在内存中发放号段
+    allocators = [SequenceAllocator(engine, block_size=7), SequenceAllocator(engine, block_size=7)]
+    results = []
+
+    def worker(allocator):
+        values = [allocator.next_value('TR', '20250101') for _ in range(50)]
+        results.extend(values)
+
+    threads = [threading.Thread(target=worker, args=(allocators[i % 2],)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == len(set(results)) == 400
+    assert max(results) <= allocators[0].current_value('TR', '20250101')
+
+
+def test_seed_periods_and_ranges(engine):
+    allocator = SequenceAllocator(engine, block_size=1)
+    assert allocator.next_value('SHM', '20250101', seed=lambda: 41) == 42
+    assert allocator.next_value('SHM', '20250101', seed=lambda: 999) == 43
+    assert allocator.next_value('SHM', '20250102') == 1
+    assert allocator.next_values('SHM', '20250101', count=3) == [44, 45, 46]
+
+
+def test_session_mode_rolls_back_with_caller(engine):
+    allocator = SequenceAllocator(engine)
+    with Session(engine) as session:
+        assert allocator.next_value('PR', '20250101', session=session) == 1
+        session.rollback()
+    with Session(engine) as session:
+        assert allocator.next_value('PR', '20250101', session=session) == 1
+        session.commit()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT value FROM doc_sequences WHERE name = 'PR'")).scalar() == 1
+
+
+def test_default_block_has_no_restart_gaps(engine):
+    # 默认不预留号段：新分配器（模拟进程重启）接着上一个号继续
+    assert SequenceAllocator(engine).next_value('TR', '20250101') == 1
+    assert SequenceAllocator(engine).next_value('TR', '20250101') == 2
+    assert SequenceAllocator(engine).current_value('TR', '20250101') == 2
+
+
+def test_session_mode_does_not_run_ddl_on_caller_connection(engine):
+    allocator = SequenceAllocator(engine)
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+        caller = session.connection().connection.dbapi_connection
+        statements = []
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def record(conn, cursor, statement, *args):
+            statements.append((conn.connection.dbapi_connection is caller, statement))
+
+        assert allocator.next_value('PR', '20250101', session=session) == 1
+        session.commit()
+
+    assert any('CREATE TABLE' in sql for _, sql in statements)
+    assert not any(on_caller and 'CREATE' in sql for on_caller, sql in statements)
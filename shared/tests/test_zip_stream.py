@@ -0,0 +1,73 @@
+"""
+shared/zip_stream 流式 ZIP 生成单元测试
+Run with: pytest shared/tests/test_zip_stream.py -v
+"""
+
+import io
+import os
+import zipfile
+
+from shared.zip_stream import ArchiveLimiter, ZipEntry, stream_zip, unique_names
+
+
+def build_zip(entries, chunk_size=None):
+    return b''.join(stream_zip(entries, chunk_size))
+
+
+def test_round_trip_with_stored_and_deflated_entries(tmp_path):
+    text = ('检验报告 inspection report\n' * 2000).encode('utf-8')
+    image = os.urandom(300 * 1024)
+    (tmp_path / 'report.txt').write_bytes(text)
+    (tmp_path / 'photo.jpg').write_bytes(image)
+
+    data = build_zip([
+        ZipEntry('检验报告.txt', str(tmp_path / 'report.txt')),
+        ZipEntry('photo.jpg', str(tmp_path / 'photo.jpg')),
+        ZipEntry('dir/empty.csv', data=b''),
+    ], chunk_size=64 * 1024)
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        infos = {info.filename: info for info in zf.infolist()}
+        assert list(infos) == ['检验报告.txt', 'photo.jpg', 'dir/empty.csv']
+        # 已压缩格式直接存储，文本压缩
+        assert infos['photo.jpg'].compress_type == zipfile.ZIP_STORED
+        assert infos['检验报告.txt'].compress_type == zipfile.ZIP_DEFLATED
+        assert infos['检验报告.txt'].compress_size < len(text)
+        assert zf.read('检验报告.txt') == text
+        assert zf.read('photo.jpg') == image
+        assert zf.read('dir/empty.csv') == b''
+
+
+def test_stream_is_lazy():
+    created = []
+
+    def entries():
+        for name in ('a.txt', 'b.txt'):
+            created.append(name)
+            yield ZipEntry(name, data=b'x')
+
+    # 首个本地文件头在读取后续条目之前即可发出
+    stream = stream_zip(entries())
+    assert next(stream).startswith(b'PK\x03\x04')
+    assert created == ['a.txt']
+
+
+def test_unique_names():
+    assert unique_names(['a.pdf', 'A.pdf', 'a.pdf', 'b']) == ['a.pdf', 'A (1).pdf', 'a (2).pdf', 'b']
+
+
+def test_limiter_releases_on_exhaustion_and_close():
+    limiter = ArchiveLimiter(1)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    assert b''.join(limiter.wrap(stream_zip([ZipEntry('a.txt', data=b'a')]))).startswith(b'PK')
+    assert limiter.acquire()
+
+    # 客户端中途断开：WSGI 服务器调用 close()
+    stream = limiter.wrap(stream_zip([ZipEntry('a.txt', data=b'a')]))
+    next(stream)
+    stream.close()
+    stream.close()
+    assert limiter.acquire()
+    limiter.release()
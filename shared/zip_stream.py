@@ -0,0 +1,278 @@
+# shared/zip_stream.py
+# -*- coding: utf-8 -*-
+"""
+流式 ZIP 生成
+
+边读取文件边输出 ZIP 数据，不生成临时文件、不在内存中拼装整个压缩包，
+首字节在读取第一个文件时即可发出。
+
+- 每个条目使用数据描述符（通用标志位 3），CRC 和大小写在条目数据之后
+- 超过 4GB 的条目、偏移或超过 65535 个条目时自动使用 ZIP64
+- 已压缩格式（jpg/pdf/zip/dwg/Office 等）直接存储，不重复压缩
+- 文件名使用 UTF-8（通用标志位 11）
+
+用法:
+    from shared.zip_stream import ZipEntry, stream_zip
+
+    entries = [ZipEntry('图纸.pdf', '/path/a.pdf'), ZipEntry('说明.txt', data=b'...')]
+    return Response(stream_zip(entries), mimetype='application/zip')
+
+配置:
+    ZIP_MAX_CONCURRENT=4               同时生成的压缩包数量上限（每进程）
+    ZIP_MAX_TOTAL_BYTES=2147483648     单个压缩包源文件总大小上限
+"""
+
+import os
+import time
+import zlib
+import struct
+import threading
+from typing import Iterable, Iterator, List, Optional
+
+ZIP_CHUNK_SIZE = int(os.getenv('ZIP_CHUNK_SIZE', 256 * 1024))
+ZIP_COMPRESS_LEVEL = int(os.getenv('ZIP_COMPRESS_LEVEL', 6))
+ZIP_MAX_CONCURRENT = int(os.getenv('ZIP_MAX_CONCURRENT', 4))
+ZIP_MAX_TOTAL_BYTES = int(os.getenv('ZIP_MAX_TOTAL_BYTES', 2 * 1024 ** 3))
+
+# 已压缩格式，存储不压缩
+STORED_EXTENSIONS = {
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'heic', 'bmp',
+    'pdf', 'dwg', 'dxf',
+    'zip', 'rar', '7z', 'gz', 'tgz', 'bz2', 'xz', 'zst',
+    'docx', 'xlsx', 'pptx', 'odt', 'ods',
+    'mp3', 'mp4', 'mov', 'avi', 'mkv',
+}
+
+_ZIP32_LIMIT = 0xFFFFFFFF
+_ZIP64_ENTRY_THRESHOLD = 0xFFFF0000  # 预留压缩膨胀空间
+_ZIP32_MAX_ENTRIES = 0xFFFF
+
+_FLAG_DATA_DESCRIPTOR = 0x0008
+_FLAG_UTF8 = 0x0800
+_METHOD_STORED = 0
+_METHOD_DEFLATED = 8
+
+
+class ZipEntry:
+    """ZIP 条目（path 与 data 二选一）"""
+
+    __slots__ = ('name', 'path', 'data', 'mtime', 'compress', 'size')
+
+    def __init__(self, name: str, path: str = None, data: bytes = None,
+                 mtime: float = None, compress: Optional[bool] = None):
+        """
+        Args:
+            name: 压缩包内的文件名
+            path: 源文件路径
+            data: 源数据（小文件）
+            mtime: 修改时间，默认取文件修改时间或当前时间
+            compress: 是否压缩，默认按扩展名判断
+        """
+        self.name = name
+        self.path = path
+        self.data = data
+        if path is not None:
+            stat = os.stat(path)
+            self.size = stat.st_size
+            self.mtime = mtime or stat.st_mtime
+        else:
+            self.size = len(data or b'')
+            self.mtime = mtime or time.time()
+        if compress is None:
+            compress = os.path.splitext(name)[1].lower().lstrip('.') not in STORED_EXTENSIONS
+        self.compress = compress
+
+    def chunks(self, chunk_size: int) -> Iterator[bytes]:
+        if self.path is None:
+            data = self.data or b''
+            for i in range(0, len(data), chunk_size):
+                yield data[i:i + chunk_size]
+            return
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+
+def _dos_datetime(timestamp: float):
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dos_date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return dos_time, dos_date
+
+
+def unique_names(names: Iterable[str]) -> List[str]:
+    """重名文件追加序号: a.pdf, a (1).pdf, a (2).pdf"""
+    seen = set()
+    result = []
+    for name in names:
+        candidate = name
+        stem, ext = os.path.splitext(name)
+        n = 1
+        while candidate.lower() in seen:
+            candidate = f"{stem} ({n}){ext}"
+            n += 1
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+def stream_zip(entries: Iterable[ZipEntry], chunk_size: int = None) -> Iterator[bytes]:
+    """
+    生成 ZIP 数据流
+
+    Args:
+        entries: ZipEntry 列表（可为生成器）
+        chunk_size: 读取块大小
+
+    Yields:
+        ZIP 数据块
+    """
+    chunk_size = chunk_size or ZIP_CHUNK_SIZE
+    offset = 0
+    central = []
+
+    for entry in entries:
+        name = entry.name.replace('\\', '/').lstrip('/').encode('utf-8')
+        method = _METHOD_DEFLATED if entry.compress else _METHOD_STORED
+        dos_time, dos_date = _dos_datetime(entry.mtime)
+        flags = _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8
+        zip64 = entry.size >= _ZIP64_ENTRY_THRESHOLD
+        header_offset = offset
+
+        # 本地文件头：CRC 和大小置 0，写在数据描述符中
+        extra = struct.pack('<HHQQ', 0x0001, 16, 0, 0) if zip64 else b''
+        local_header = struct.pack(
+            '<IHHHHHIIIHH', 0x04034B50, 45 if zip64 else 20, flags, method, dos_time, dos_date,
+            0, _ZIP32_LIMIT if zip64 else 0, _ZIP32_LIMIT if zip64 else 0, len(name), len(extra)
+        ) + name + extra
+        yield local_header
+        offset += len(local_header)
+
+        crc = 0
+        raw_size = 0
+        compressed_size = 0
+        compressor = zlib.compressobj(ZIP_COMPRESS_LEVEL, zlib.DEFLATED, -15) if entry.compress else None
+        for chunk in entry.chunks(chunk_size):
+            crc = zlib.crc32(chunk, crc)
+            raw_size += len(chunk)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            compressed_size += len(chunk)
+            yield chunk
+        if compressor is not None:
+            tail = compressor.flush()
+            compressed_size += len(tail)
+            if tail:
+                yield tail
+        offset += compressed_size
+
+        if not zip64 and (raw_size > _ZIP32_LIMIT or compressed_size > _ZIP32_LIMIT):
+            raise ValueError(f"{entry.name} 在读取期间增长超过 4GB，无法写入")
+
+        # 数据描述符（ZIP64 条目使用 8 字节大小）
+        if zip64:
+            descriptor = struct.pack('<IIQQ', 0x08074B50, crc, compressed_size, raw_size)
+        else:
+            descriptor = struct.pack('<IIII', 0x08074B50, crc, compressed_size, raw_size)
+        yield descriptor
+        offset += len(descriptor)
+
+        central.append((name, method, dos_time, dos_date, flags, crc, compressed_size, raw_size,
+                        header_offset))
+
+    # 中央目录
+    cd_offset = offset
+    cd_size = 0
+    for name, method, dos_time, dos_date, flags, crc, compressed_size, raw_size, header_offset in central:
+        zip64_fields = []
+        sizes = [raw_size, compressed_size]
+        if raw_size >= _ZIP32_LIMIT or compressed_size >= _ZIP32_LIMIT:
+            zip64_fields += sizes
+            sizes = [_ZIP32_LIMIT, _ZIP32_LIMIT]
+        if header_offset >= _ZIP32_LIMIT:
+            zip64_fields.append(header_offset)
+            header_offset = _ZIP32_LIMIT
+        extra = b''
+        if zip64_fields:
+            extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001, 8 * len(zip64_fields), *zip64_fields)
+        version = 45 if zip64_fields else 20
+        record = struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014B50, (3 << 8) | version, version, flags, method,
+            dos_time, dos_date, crc, sizes[1], sizes[0], len(name), len(extra), 0, 0, 0,
+            0o100644 << 16, header_offset
+        ) + name + extra
+        cd_size += len(record)
+        yield record
+
+    count = len(central)
+    if count > _ZIP32_MAX_ENTRIES or cd_offset >= _ZIP32_LIMIT or cd_size >= _ZIP32_LIMIT:
+        zip64_eocd_offset = cd_offset + cd_size
+        yield struct.pack('<IQHHIIQQQQ', 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset)
+        yield struct.pack('<IIQI', 0x07064B50, 0, zip64_eocd_offset, 1)
+        yield struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, min(count, _ZIP32_MAX_ENTRIES),
+                          min(count, _ZIP32_MAX_ENTRIES), min(cd_size, _ZIP32_LIMIT),
+                          min(cd_offset, _ZIP32_LIMIT), 0)
+    else:
+        yield struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0)
+
+
+class ArchiveLimiter:
+    """
+    限制同时生成的压缩包数量（进程内）
+
+    用法:
+        if not limiter.acquire():
+            return 429
+        return Response(limiter.wrap(stream_zip(entries)))
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+
+    def acquire(self) -> bool:
+        return self._semaphore.acquire(blocking=False)
+
+    def release(self):
+        self._semaphore.release()
+
+    def wrap(self, stream: Iterator[bytes]) -> Iterator[bytes]:
+        """流结束、出错或响应关闭（客户端断开）时释放名额"""
+        return _ReleasingIterator(stream, self.release)
+
+
+class _ReleasingIterator:
+    """迭代结束或 close() 时调用一次 release（WSGI 服务器在响应结束后调用 close）"""
+
+    def __init__(self, stream: Iterator[bytes], release):
+        self._stream = iter(stream)
+        self._release = release
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self._stream)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            close = getattr(self._stream, 'close', None)
+            if close:
+                close()
+        finally:
+            self._release()
+
+
+# 进程内共享的压缩包并发限制
+archive_limiter = ArchiveLimiter(ZIP_MAX_CONCURRENT)
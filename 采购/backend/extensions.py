@@ -59,6 +59,13 @@ def init_celery(app):
             "tasks.notify_rfq",
             "tasks.classify_rfq_items",
         ),
+        # 定时派发到期的RFQ通知（含失败重试），需启动 celery beat
+        beat_schedule={
+            "dispatch-rfq-notifications": {
+                "task": "tasks.dispatch_rfq_notifications",
+                "schedule": float(os.getenv("NOTIFY_DISPATCH_INTERVAL", "60")),
+            },
+        },
     )
 
     class ContextTask(celery.Task):
@@ -43,3 +43,16 @@ preload_app = True
 # 最大请求数（防止内存泄漏）
 max_requests = 1000
 max_requests_jitter = 50
+
+
+def post_worker_init(worker):
+    """Worker 启动后载入物料知识库常驻索引（见 services/material_knowledge.py）"""
+    try:
+        from main import app
+        from services.material_knowledge import get_knowledge_service
+        service = get_knowledge_service()
+        if service.index is not None:
+            with app.app_context():
+                service.index.ensure_fresh()
+    except Exception as e:
+        worker.log.warning(f"物料知识库索引预加载失败: {e}")
@@ -0,0 +1,49 @@
+-- =============================================
+-- 物料知识库常驻索引
+-- 知识库表增加 updated_at（索引按修改时间增量刷新），并补建缺失的匹配缓存表
+-- =============================================
+
+USE caigou;
+
+-- 1. 知识库（已存在时只补 updated_at 列）
+CREATE TABLE IF NOT EXISTS material_knowledge_base (
+    id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    standard_name VARCHAR(200) NOT NULL COMMENT '标准物料名称',
+    category VARCHAR(100) NOT NULL COMMENT '品类（大类/子类）',
+    major_category VARCHAR(100) NULL,
+    minor_category VARCHAR(100) NULL,
+    spec_pattern VARCHAR(200) NULL COMMENT '规格模式',
+    synonyms TEXT NULL COMMENT '同义词（逗号分隔）',
+    keywords TEXT NULL COMMENT '关键词（逗号分隔）',
+    description TEXT NULL,
+    usage_scenario TEXT NULL,
+    match_priority INT NOT NULL DEFAULT 50,
+    source VARCHAR(20) NOT NULL DEFAULT 'manual',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_mkb_standard_name (standard_name),
+    INDEX idx_mkb_updated_at (updated_at),
+    FULLTEXT INDEX ft_mkb_text (keywords, synonyms, description)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+ALTER TABLE material_knowledge_base
+ADD COLUMN IF NOT EXISTS updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '修改时间（索引增量刷新）';
+
+CREATE INDEX IF NOT EXISTS idx_mkb_updated_at ON material_knowledge_base(updated_at);
+
+-- 2. 匹配缓存
+CREATE TABLE IF NOT EXISTS material_match_cache (
+    id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    input_text VARCHAR(500) NOT NULL,
+    input_hash CHAR(32) NOT NULL,
+    matched_category VARCHAR(100) NOT NULL,
+    matched_knowledge_id BIGINT UNSIGNED NULL,
+    match_score DECIMAL(5, 4) NULL,
+    match_method VARCHAR(20) NULL,
+    hit_count INT NOT NULL DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_hit_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_mmc_input_hash (input_hash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+SELECT '✅ 物料知识库索引字段和匹配缓存表已就绪' AS Result;
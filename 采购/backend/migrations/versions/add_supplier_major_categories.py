@@ -0,0 +1,51 @@
+"""add supplier_major_categories mapping table
+
+Revision ID: supplier_major_cat
+Revises: fix_dedup_2025
+Create Date: 2025-11-20 (Manual)
+
+RFQ 供应商匹配改为等值连接：
+- 新建 supplier_major_categories（大类 × 供应商，唯一索引 major_category + supplier_id）
+- 按 supplier_categories 回填（拆分逗号等分隔的 major_category）
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = 'supplier_major_cat'
+down_revision = 'fix_dedup_2025'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'supplier_major_categories',
+        sa.Column('id', mysql.BIGINT(unsigned=True), autoincrement=True, nullable=False),
+        sa.Column('supplier_id', mysql.BIGINT(unsigned=True), nullable=False),
+        sa.Column('major_category', sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(['supplier_id'], ['suppliers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('major_category', 'supplier_id', name='uq_smc_major_supplier'),
+    )
+    op.create_index('idx_smc_supplier', 'supplier_major_categories', ['supplier_id'], unique=False)
+
+    # 回填
+    from models.supplier_major_category import split_major_categories
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT supplier_id, major_category, category FROM supplier_categories"))
+    pairs = {}
+    for supplier_id, major_category, category in rows:
+        for major in split_major_categories(major_category, category):
+            pairs[(major, supplier_id)] = None
+    if pairs:
+        table = sa.table('supplier_major_categories', sa.column('major_category'), sa.column('supplier_id'))
+        op.bulk_insert(table, [{'major_category': m, 'supplier_id': s} for m, s in pairs])
+
+
+def downgrade():
+    op.drop_index('idx_smc_supplier', table_name='supplier_major_categories')
+    op.drop_table('supplier_major_categories')
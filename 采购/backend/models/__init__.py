@@ -2,6 +2,7 @@
 from .user import User  # noqa
 from .supplier import Supplier  # noqa
 from .supplier_category import SupplierCategory  # noqa
+from .supplier_major_category import SupplierMajorCategory  # noqa
 from .pr import PR  # noqa
 from .pr_item import PRItem  # noqa
 from .price_history import PriceHistory  # noqa
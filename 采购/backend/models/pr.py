@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import os
+import sys
 from datetime import datetime, timezone
 from sqlalchemy import ForeignKey, Numeric
 from sqlalchemy.orm import relationship
@@ -7,6 +9,11 @@ from sqlalchemy.exc import IntegrityError
 from extensions import db
 from .pr_counter import PRCounter
 
+# 添加 shared 模块路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..', '..'))
+
+from shared.sequence import get_allocator
+
 """
 PR状态流转：
   submitted → supervisor_approved → price_filled → admin_approved → [super_admin_approved] → completed
@@ -77,23 +84,19 @@ class PR(db.Model):
     def generate_pr_number(cls):
         """
         并发安全地产生 'YYMMDD + 3位流水'，例如 251027001。
-        利用 pr_counters(date_key) 行级锁（MySQL InnoDB）串行递增 seq。
+        使用共享编号分配器的事务模式：在当前事务内递增当日计数器并持有行锁，
+        PR 创建失败回滚时编号一起回滚，流水号保持连续。
         """
         yymmdd, yyyymmdd = cls._today_keys()
 
-        # 子事务：锁住当日计数器行（InnoDB 下 with_for_update 生效）
-        with db.session.begin_nested():
-            counter = (PRCounter.query
-                       .filter_by(date_key=yyyymmdd)
-                       .with_for_update()     # ⬅️ 行级锁
-                       .first())
-            if not counter:
-                counter = PRCounter(date_key=yyyymmdd, seq=0)
-                db.session.add(counter)
-                db.session.flush()
-            counter.seq += 1
-            seq = counter.seq
+        def legacy_seq():
+            # 切换前 pr_counters 中当天已用的序号
+            counter = PRCounter.query.filter_by(date_key=yyyymmdd).first()
+            return counter.seq if counter else 0
 
+        seq = get_allocator(db.engine).next_value(
+            "PR", yyyymmdd, seed=legacy_seq, session=db.session
+        )
         return f"{yymmdd}{seq:03d}"  # 251027 + 001
 
     def __repr__(self):
@@ -2,6 +2,8 @@
 from extensions import db
 from sqlalchemy.dialects.mysql import BIGINT, VARCHAR
 
+# PR 编号已改用 shared/sequence.py（doc_sequences 表），
+# 本表仅在切换当天作为起始序号读取
 class PRCounter(db.Model):
     __tablename__ = "pr_counters"
 
@@ -22,7 +22,7 @@ class RFQNotificationTask(db.Model):
     # 该供应商对应的品类（用于企微消息中展示）
     category = db.Column(VARCHAR(100), nullable=False)
     
-    # pending/sent/failed/success
+    # pending/sending/sent/failed/success（sending：已被派发器认领，next_retry_at 为租约到期时间）
     status = db.Column(VARCHAR(20), nullable=False, default='pending')
     
     # 重试相关
@@ -129,6 +129,13 @@ class Supplier(db.Model):
         lazy=True
     )
 
+    # 大类映射（由 categories 派生，见 sync_supplier_major_categories），随供应商删除
+    major_categories = db.relationship(
+        'SupplierMajorCategory',
+        cascade='all, delete-orphan',
+        lazy=True
+    )
+
     # ===== 方法 =====
     def __repr__(self):
         return f'<Supplier {self.company_name}>'
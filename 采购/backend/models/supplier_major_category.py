@@ -0,0 +1,82 @@
+# models/supplier_major_category.py
+# 供应商 × 大类 规范化映射（RFQ 按大类匹配供应商用）
+import re
+from typing import Iterable, List, Optional
+
+from sqlalchemy import ForeignKey, String, select
+from sqlalchemy.dialects.mysql import BIGINT
+from extensions import db
+
+# supplier_categories.major_category 可能是 "刀具, 五金劳保、电器气动" 这样的分隔字符串
+_MAJOR_SPLIT = re.compile(r"[,，、;；|]+")
+
+
+class SupplierMajorCategory(db.Model):
+    """
+    供应商大类映射：每个 (大类, 供应商) 一行
+
+    由 supplier_categories 派生（sync_supplier_major_categories），
+    RFQ 匹配供应商时按 major_category 等值连接，不再对分隔字符串做 FIND_IN_SET / LIKE。
+    """
+    __tablename__ = 'supplier_major_categories'
+    __table_args__ = (
+        # 唯一索引兼做匹配索引：WHERE major_category IN (...) → supplier_id
+        db.UniqueConstraint('major_category', 'supplier_id', name='uq_smc_major_supplier'),
+        db.Index('idx_smc_supplier', 'supplier_id'),
+    )
+
+    id = db.Column(BIGINT(unsigned=True), primary_key=True, autoincrement=True)
+    supplier_id = db.Column(BIGINT(unsigned=True), ForeignKey('suppliers.id', ondelete='CASCADE'), nullable=False)
+    major_category = db.Column(String(50), nullable=False)
+
+    def __repr__(self):
+        return f"<SupplierMajorCategory supplier_id={self.supplier_id} major='{self.major_category}'>"
+
+
+def split_major_categories(major_category: Optional[str], category: Optional[str] = None) -> List[str]:
+    """
+    拆出大类列表（去重保序）
+
+    "刀具, 五金劳保" → ["刀具", "五金劳保"]；major_category 为空时取 category 的大类
+    （"刀具/铣削刀具" → "刀具"）
+    """
+    raw = major_category if (major_category or "").strip() else (category or "")
+    majors = []
+    for part in _MAJOR_SPLIT.split(raw):
+        major = part.split('/')[0].strip()
+        if major and major not in majors:
+            majors.append(major[:50])
+    return majors
+
+
+def sync_supplier_major_categories(supplier_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    按 supplier_categories 重建映射（不提交，由调用方 commit）
+
+    Args:
+        supplier_ids: 只重建这些供应商；None 时重建全部
+
+    Returns:
+        写入的映射行数
+    """
+    from models.supplier_category import SupplierCategory
+
+    table = SupplierMajorCategory.__table__
+    query = select(SupplierCategory.supplier_id, SupplierCategory.major_category, SupplierCategory.category)
+    delete = table.delete()
+    if supplier_ids is not None:
+        supplier_ids = [int(sid) for sid in supplier_ids]
+        if not supplier_ids:
+            return 0
+        query = query.where(SupplierCategory.supplier_id.in_(supplier_ids))
+        delete = delete.where(table.c.supplier_id.in_(supplier_ids))
+
+    pairs = {}
+    for supplier_id, major_category, category in db.session.execute(query):
+        for major in split_major_categories(major_category, category):
+            pairs[(major, supplier_id)] = None
+
+    db.session.execute(delete)
+    if pairs:
+        db.session.execute(table.insert(), [{'major_category': m, 'supplier_id': s} for m, s in pairs])
+    return len(pairs)
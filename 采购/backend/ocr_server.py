@@ -0,0 +1,54 @@
+# ocr_server.py
+# -*- coding: utf-8 -*-
+"""
+常驻 OCR 服务
+
+启动 OCR_WORKERS 个工作进程（各加载一次 OCR 模型），在 OCR_SERVER_ADDRESS 上
+为所有 Web 进程提供识别服务，见 services/ocr_worker.py。
+
+用法:
+    python ocr_server.py
+    python ocr_server.py --stats     # 查看运行中服务的队列深度和耗时
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.ocr_worker import (OCR_SERVER_ADDRESS, OCR_SERVER_AUTHKEY, OCR_WORKERS,  # noqa: E402
+                                 create_pool)
+from shared.process_pool import PoolClient, PoolServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常驻 OCR 服务')
+    parser.add_argument('--stats', action='store_true', help='输出运行中服务的指标后退出')
+    args = parser.parse_args()
+
+    if args.stats:
+        print(json.dumps(PoolClient(OCR_SERVER_ADDRESS, OCR_SERVER_AUTHKEY).stats(), ensure_ascii=False, indent=2))
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    print(f"🚀 启动 OCR 服务: {OCR_WORKERS} 个工作进程，地址 {OCR_SERVER_ADDRESS}")
+    pool = create_pool().start()
+    print("✅ OCR 模型加载完成")
+    server = PoolServer(pool, OCR_SERVER_ADDRESS, OCR_SERVER_AUTHKEY)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -63,14 +63,10 @@ def classify_batch():
         if not items:
             return jsonify({"error": "items 不能为空"}), 400
         
-        # 分类每一项
+        # 批量分类（重复物料只算一次，向量兜底一次矩阵运算）
         classified_items = []
-        for item in items:
-            name = item.get("name", "")
-            spec = item.get("spec", "")
-            remark = item.get("remark", "")
-            
-            result = clf.classify(name, spec, remark)
+        results = clf.classify_batch(items)
+        for item, result in zip(items, results):
             category = result.get("category", "未分类")
             major_category = result.get("major_category", "")
             minor_category = result.get("minor_category", "")
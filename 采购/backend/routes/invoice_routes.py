@@ -14,6 +14,7 @@ from models.purchase_order import PurchaseOrder
 from models.supplier import Supplier
 from datetime import datetime, timedelta
 from sqlalchemy import or_, and_, func, extract
+from services.ocr_worker import OCR_POOL_ENABLED, engine_available, ocr_image, ocr_stats, pool_unavailable
 import traceback
 import subprocess
 import base64
@@ -1505,11 +1506,28 @@ def get_supplier_settlement_info():
 
 # ============ OCR 发票识别 ============
 
-# PaddleOCR 脚本路径
 PADDLE_OCR_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'ocr_paddle.py')
 
 
 def ocr_with_paddle(image_path):
+    """
+    识别图片中的文字，返回识别出的所有文字（按位置排序）
+
+    优先通过常驻 OCR 工作池（模型只加载一次，见 services/ocr_worker.py）；
+    工作池未启用、当前环境未安装 OCR 引擎或工作池不可用时，调用外部脚本识别
+    """
+    if OCR_POOL_ENABLED and engine_available():
+        result = ocr_image(image_path)
+        if result.get('success'):
+            return result.get('text')
+        if not pool_unavailable(result):
+            print(f"PaddleOCR 识别失败: {result.get('error')}")
+            return None
+        print(f"OCR 工作池不可用，改用外部脚本识别: {result.get('error')}")
+    return ocr_with_paddle_script(image_path)
+
+
+def ocr_with_paddle_script(image_path):
     """
     通过调用外部脚本使用 PaddleOCR 识别图片中的文字
     返回识别出的所有文字（按位置排序）
@@ -1549,6 +1567,17 @@ def ocr_with_paddle(image_path):
         return None
 
 
+@bp.route('/ocr/stats', methods=['GET', 'OPTIONS'])
+def ocr_pool_stats():
+    """OCR 工作池指标：队列深度、排队/识别耗时分位数、超时和回收次数"""
+    if request.method == 'OPTIONS':
+        return '', 200
+    try:
+        return jsonify(ocr_stats()), 200
+    except Exception as e:
+        return jsonify({'error': f'获取OCR工作池状态失败: {str(e)}'}), 503
+
+
 @bp.route('/ocr', methods=['POST', 'OPTIONS'])
 def ocr_invoice():
     """
@@ -4,6 +4,7 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models.supplier_category import SupplierCategory
+from models.supplier_major_category import sync_supplier_major_categories
 from models.supplier import Supplier
 import logging
 
@@ -92,6 +93,8 @@ def update_my_categories():
             )
             db.session.add(category)
 
+        # 同步供应商大类映射（RFQ 匹配供应商用）
+        sync_supplier_major_categories([supplier.id])
         db.session.commit()
 
         logger.info(f"✅ 供应商 {supplier.id} 的品类已更新")
@@ -47,6 +47,7 @@ def get_ocr_status():
             "ocr_type": ocr_service.ocr_type,
             "ollama_available": ocr_service.ollama_available,
             "ocr_engine_loaded": ocr_service.ocr_engine is not None,
+            "ocr_pool": ocr_service.use_ocr_pool,
             "use_cloud_api": ocr_service.use_cloud_api,
             "vision_model": getattr(ocr_service, 'ollama_vision_model', 'N/A'),
         }), 200
@@ -7,6 +7,7 @@ from datetime import datetime
 from extensions import db
 from models.supplier import Supplier, SUPPLIER_STATUS
 from models.supplier_category import SupplierCategory
+from models.supplier_major_category import sync_supplier_major_categories
 from models.supplier_quote import SupplierQuote
 from models.invoice import Invoice
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -111,6 +112,7 @@ def register_supplier():
 
         
         db.session.add(category)
+        sync_supplier_major_categories([supplier.id])
         db.session.commit()
         
         logger.info(f"✅ 供应商 {company_name} 注册成功")
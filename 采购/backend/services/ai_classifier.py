@@ -1,17 +1,41 @@
 # -*- coding: utf-8 -*-
-from typing import List, Dict, Optional
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import math
 import os
 import json
+import zlib
 import requests
 import logging
 from dotenv import load_dotenv
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    import ahocorasick  # pyahocorasick（可选，C 实现）
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    AHOCORASICK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # 加载环境变量
 load_dotenv()
 
+# 向量层后端：ngram（哈希字符 n-gram + 矩阵运算，需要 numpy）或 bow（原空格分词词袋）
+AI_EMBEDDING_BACKEND = os.getenv("AI_EMBEDDING_BACKEND", "ngram").lower()
+# classify_batch 向量层每次矩阵运算的条数
+CLASSIFY_BATCH_CHUNK = int(os.getenv("CLASSIFY_BATCH_CHUNK", 2048))
+# classify_batch 同时发给 Ollama 的请求数（配合 Ollama 的 OLLAMA_NUM_PARALLEL）
+OLLAMA_CONCURRENCY = int(os.getenv("OLLAMA_CONCURRENCY", 4))
+
 # 导入知识库服务（延迟导入，避免循环依赖）
 _knowledge_service = None
 
@@ -46,6 +70,182 @@ class EmbeddingBackend:
         return vecs
 
 
+class NgramEmbeddingBackend(EmbeddingBackend):
+    """
+    哈希字符 n-gram 向量（需要 numpy）
+
+    中文物料名称没有空格，词袋按空格分词时整段是一个词，几乎匹配不上原型；
+    字符 n-gram 在词内切分（不跨空格），哈希到 n_features 维，L2 归一化。
+    """
+    SEPARATORS = str.maketrans({"／": " ", "/": " ", "，": " ", ",": " "})
+
+    def __init__(self, ngram_range: Tuple[int, int] = (1, 3), n_features: int = 1 << 20):
+        self.ngram_range = ngram_range
+        self.n_features = n_features
+        self._columns = {}  # n-gram -> 列号（哈希结果缓存）
+
+    def _column(self, gram: str) -> int:
+        column = self._columns.get(gram)
+        if column is None:
+            column = zlib.crc32(gram.encode("utf-8")) % self.n_features
+            if len(self._columns) < 200000:
+                self._columns[gram] = column
+        return column
+
+    def _counts(self, text: str) -> Counter:
+        low, high = self.ngram_range
+        counts = Counter()
+        for tok in (text or "").lower().translate(self.SEPARATORS).split():
+            for n in range(low, min(high, len(tok)) + 1):
+                for i in range(len(tok) - n + 1):
+                    counts[self._column(tok[i:i + n])] += 1.0
+        return counts
+
+    def features(self, texts: List[str]):
+        """稀疏矩阵三元组 (行号, 列号, 值)，每行已 L2 归一化，同一行内列号不重复"""
+        rows, cols, vals = [], [], []
+        for row, t in enumerate(texts):
+            counts = self._counts(t)
+            norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+            for column, v in counts.items():
+                rows.append(row)
+                cols.append(column)
+                vals.append(v / norm)
+        return (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+                np.asarray(vals, dtype=np.float32))
+
+    def embed(self, texts: List[str]) -> List[Dict[int, float]]:
+        """与 EmbeddingBackend 相同的字典格式（可直接用 cosine()）"""
+        vecs = []
+        for t in texts:
+            counts = self._counts(t)
+            norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+            vecs.append({k: v / norm for k, v in counts.items()})
+        return vecs
+
+
+class PrototypeMatrix:
+    """
+    原型矩阵：原型向量预先按原型词表压缩成稠密矩阵 (词表, 原型)
+
+    一批文本只需把特征投影到原型词表（词表外的 n-gram 对点积没有贡献，
+    但已计入归一化），再做一次矩阵乘法得到 (文本, 原型) 余弦相似度。
+    """
+
+    def __init__(self, backend: NgramEmbeddingBackend, texts: List[str], labels: List[str]):
+        self.backend = backend
+        self.labels = list(labels)
+        rows, cols, vals = backend.features(texts)
+        self.vocab = np.unique(cols)
+        self.matrix = np.zeros((len(self.vocab), len(self.labels)), dtype=np.float32)
+        self.matrix[np.searchsorted(self.vocab, cols), rows] = vals
+
+    def scores(self, texts: List[str]):
+        """(len(texts), 原型数) 余弦相似度矩阵"""
+        rows, cols, vals = self.backend.features(texts)
+        features = np.zeros((len(texts), len(self.vocab)), dtype=np.float32)
+        if len(self.vocab) and len(cols):
+            pos = np.minimum(np.searchsorted(self.vocab, cols), len(self.vocab) - 1)
+            hit = self.vocab[pos] == cols
+            features[rows[hit], pos[hit]] = vals[hit]
+        return features @ self.matrix
+
+    def top_k(self, texts: List[str], k: int = 5) -> List[Dict[str, float]]:
+        """每条文本的 top-k {原型: 得分}，同分按原型顺序（与逐个比较的结果一致）"""
+        results = []
+        for start in range(0, len(texts), CLASSIFY_BATCH_CHUNK):
+            scores = self.scores(texts[start:start + CLASSIFY_BATCH_CHUNK])
+            order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+            top = np.take_along_axis(scores, order, axis=1)
+            for idx_row, score_row in zip(order.tolist(), top.tolist()):
+                results.append({self.labels[i]: score for i, score in zip(idx_row, score_row)})
+        return results
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick 多关键词匹配：每条文本只扫描一遍，与关键词数量无关
+
+    patterns 为 {值: [关键词, ...]}，match() 返回文本中出现的关键词里
+    在 patterns 中顺序最靠前的值（与按顺序逐个 `in` 判断的结果相同）。
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]]):
+        self.values = list(patterns)
+        priorities = {}
+        for priority, (value, words) in enumerate(patterns.items()):
+            for word in words:
+                word = word.lower()
+                if word and word not in priorities:
+                    priorities[word] = priority
+
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for word, priority in priorities.items():
+                self._automaton.add_word(word, priority)
+            self._automaton.make_automaton()
+            return
+
+        self._automaton = None
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [None]  # 该状态（含后缀）能匹配到的最高优先级
+        for word, priority in priorities.items():
+            state = 0
+            for ch in word:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                state = nxt
+            if self._out[state] is None or priority < self._out[state]:
+                self._out[state] = priority
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                inherited = self._out[self._fail[nxt]]
+                if inherited is not None and (self._out[nxt] is None or inherited < self._out[nxt]):
+                    self._out[nxt] = inherited
+
+    def match(self, text: str) -> Optional[str]:
+        t = (text or "").lower()
+        best = None
+        if self._automaton is not None:
+            for _, priority in self._automaton.iter(t):
+                if best is None or priority < best:
+                    best = priority
+        else:
+            goto, fail, out = self._goto, self._fail, self._out
+            state = 0
+            for ch in t:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                found = out[state]
+                if found is not None and (best is None or found < best):
+                    best = found
+                    if best == 0:
+                        break
+        return self.values[best] if best is not None else None
+
+
+def default_embedding_backend() -> EmbeddingBackend:
+    if AI_EMBEDDING_BACKEND == "ngram" and NUMPY_AVAILABLE:
+        return NgramEmbeddingBackend()
+    return EmbeddingBackend()
+
+
 class OllamaBackend:
     """
     Ollama 后端：调用本地大模型进行分类
@@ -202,7 +402,7 @@ class LocalClassifier:
     改进版：支持提取大类和子类，添加知识库索引层
     """
     def __init__(self, embedding: Optional[EmbeddingBackend] = None, use_ollama: bool = True, use_knowledge: bool = True):
-        self.embedding = embedding or EmbeddingBackend()
+        self.embedding = embedding or default_embedding_backend()
 
         # 从constants加载品类配置
         self._load_categories()
@@ -279,10 +479,17 @@ class LocalClassifier:
                 logger.warning(f"初始化 Ollama 失败: {e}")
                 self.ollama = None
         
+        # 规则关键词自动机
+        self.rule_matcher = KeywordMatcher(self.rules)
+
         # 向量层原型（作为备用）
         self.prototype_text = {cat: " ".join(words) for cat, words in self.rules.items()}
         self.prototype_vecs = self.embedding.embed(list(self.prototype_text.values()))
         self.prototype_index = list(self.prototype_text.keys())
+        self.prototype_matrix = None
+        if isinstance(self.embedding, NgramEmbeddingBackend):
+            self.prototype_matrix = PrototypeMatrix(self.embedding, list(self.prototype_text.values()),
+                                                    self.prototype_index)
         
         logger.info("✅ LocalClassifier 初始化完成")
 
@@ -298,17 +505,15 @@ class LocalClassifier:
             self.category_hierarchy = {}
 
     def rule_match(self, text: str) -> Optional[str]:
-        """规则匹配：优先级最高"""
-        t = (text or "").lower()
-        for cat, kws in self.rules.items():
-            for kw in kws:
-                if kw.lower() in t:
-                    return cat
-        return None
+        """规则匹配：优先级最高（多个分类命中时取规则表中靠前的）"""
+        return self.rule_matcher.match(text)
 
     def embed_match(self, text: str) -> Dict[str, float]:
         """向量匹配：作为大模型的备用方案"""
         try:
+            if self.prototype_matrix is not None:
+                return self.prototype_matrix.top_k([text], 5)[0]
+
             text_vec = self.embedding.embed([text])[0]
             scores = {}
             
@@ -348,6 +553,107 @@ class LocalClassifier:
         """公共方法：提取子类"""
         return self._extract_minor_category(full_category)
 
+    def _result(self, category: str, scores: Dict[str, float], source: str, text: str) -> Dict:
+        return {
+            "category": category,
+            "major_category": self._extract_major_category(category) if category != "未分类" else "",
+            "minor_category": self._extract_minor_category(category) if category != "未分类" else "",
+            "scores": scores,
+            "source": source,
+            "text": text
+        }
+
+    def _add_to_cache(self, text: str, category: str, score: float, method: str, label: str,
+                      pending: Optional[List] = None):
+        """写入知识库缓存；传入 pending 时只记录，由 _flush_cache 批量写入"""
+        if not self.knowledge_service:
+            return
+        if pending is not None:
+            pending.append((text, category, score, method))
+            return
+        try:
+            self.knowledge_service.add_to_cache(text, category, None, score, method)
+        except Exception as e:
+            logger.warning(f"添加{label}结果到缓存失败: {e}")
+
+    def _flush_cache(self, pending: List):
+        if not (self.knowledge_service and pending):
+            return
+        try:
+            if hasattr(self.knowledge_service, "add_many_to_cache"):
+                self.knowledge_service.add_many_to_cache(pending)
+            else:
+                for text, category, score, method in pending:
+                    self.knowledge_service.add_to_cache(text, category, None, score, method)
+        except Exception as e:
+            logger.warning(f"批量写入分类缓存失败: {e}")
+
+    def _rule_result(self, text: str, category: str, pending: Optional[List] = None) -> Dict:
+        # 如果规则匹配成功，也添加到知识库缓存
+        self._add_to_cache(text, category, 1.0, "rule", "规则匹配", pending)
+        return self._result(category, {category: 1.0}, "rule", text)
+
+    def cached_result(self, text: str, cached: Optional[Dict]) -> Optional[Dict]:
+        """知识库缓存记录转为分类结果（与 _knowledge_result 相同的置信度门槛）"""
+        if not cached or cached.get("score", 0) < 0.6:
+            return None
+        category = cached["category"]
+        source = "rule" if cached.get("method") == "rule" else f"knowledge_{cached.get('method')}"
+        return self._result(category, {category: cached["score"]}, source, text)
+
+    def _knowledge_result(self, name: str, spec: str, text: str, use_cache: bool = True) -> Optional[Dict]:
+        """知识库查询（基于历史数据和专家知识）"""
+        if not self.knowledge_service:
+            return None
+        try:
+            if use_cache:
+                kb_result = self.knowledge_service.search(name, spec)
+            else:
+                kb_result = self.knowledge_service.search(name, spec, use_cache=False)
+            if kb_result and kb_result.get("score", 0) >= 0.6:  # 只接受置信度 >= 0.6 的结果
+                category = kb_result["category"]
+                logger.info(f"✅ 知识库匹配: {name} -> {category} (方法: {kb_result['method']}, 得分: {kb_result['score']:.2f})")
+                return self._result(category, {category: kb_result["score"]}, f"knowledge_{kb_result['method']}", text)
+        except Exception as e:
+            logger.error(f"知识库查询失败: {e}")
+        return None
+
+    def _llm_scores(self, text: str) -> Optional[Dict[str, float]]:
+        """调用大模型（只做网络请求，不访问数据库，可在线程中执行）"""
+        if not (self.ollama and self.ollama.available):
+            return None
+        try:
+            categories = self.categories if self.categories else list(self.rules.keys())
+            return self.ollama.classify_with_llm(text, categories)
+        except Exception as e:
+            logger.error(f"大模型分类失败，降级到向量: {e}")
+            return None
+
+    def _llm_result(self, text: str, llm_scores: Optional[Dict[str, float]],
+                    pending: Optional[List] = None) -> Optional[Dict]:
+        """大模型分类（准确度高，需要网络）"""
+        if not llm_scores:
+            return None
+        top_cat = max(llm_scores, key=llm_scores.get)
+        top_score = llm_scores[top_cat]
+        # 添加到知识库缓存
+        if top_score >= 0.6:
+            self._add_to_cache(text, top_cat, top_score, "llm", "LLM", pending)
+        # 只返回 top-5
+        top_5 = dict(sorted(llm_scores.items(), key=lambda x: x[1], reverse=True)[:5])
+        return self._result(top_cat, top_5, "ollama", text)
+
+    def _vector_result(self, text: str, vector_scores: Dict[str, float], pending: Optional[List] = None) -> Dict:
+        """向量匹配（备用方案）"""
+        if not vector_scores:
+            return self._result("未分类", {}, "default", text)
+        top_cat = max(vector_scores, key=vector_scores.get)
+        top_score = vector_scores[top_cat]
+        # 添加到知识库缓存（向量匹配的置信度较低，仅作为备用）
+        if top_score >= 0.5:
+            self._add_to_cache(text, top_cat, top_score, "vector", "向量", pending)
+        return self._result(top_cat, vector_scores, "vector", text)
+
     def classify(self, name: str, spec: str = "", remark: str = "") -> Dict:
         """
         分类物料
@@ -373,113 +679,91 @@ class LocalClassifier:
         text = " ".join([name or "", spec or "", remark or ""]).strip()
 
         if not text:
-            return {
-                "category": "未分类",
-                "major_category": "",
-                "minor_category": "",
-                "scores": {},
-                "source": "empty",
-                "text": text
-            }
+            return self._result("未分类", {}, "empty", text)
 
         # ===== 策略 1：规则匹配（速度快，优先级高）=====
         rule_result = self.rule_match(text)
         if rule_result:
-            major = self._extract_major_category(rule_result)
-            minor = self._extract_minor_category(rule_result)
-            # 如果规则匹配成功，也添加到知识库缓存
-            if self.knowledge_service:
-                try:
-                    self.knowledge_service.add_to_cache(text, rule_result, None, 1.0, "rule")
-                except Exception as e:
-                    logger.warning(f"添加规则匹配结果到缓存失败: {e}")
-            return {
-                "category": rule_result,
-                "major_category": major,
-                "minor_category": minor,
-                "scores": {rule_result: 1.0},
-                "source": "rule",
-                "text": text
-            }
+            return self._rule_result(text, rule_result)
 
-        # ===== 策略 2：知识库查询（基于历史数据和专家知识）=====
-        if self.knowledge_service:
-            try:
-                kb_result = self.knowledge_service.search(name, spec)
-                if kb_result and kb_result.get("score", 0) >= 0.6:  # 只接受置信度 >= 0.6 的结果
-                    category = kb_result["category"]
-                    major = self._extract_major_category(category)
-                    minor = self._extract_minor_category(category)
-                    logger.info(f"✅ 知识库匹配: {name} -> {category} (方法: {kb_result['method']}, 得分: {kb_result['score']:.2f})")
-                    return {
-                        "category": category,
-                        "major_category": major,
-                        "minor_category": minor,
-                        "scores": {category: kb_result["score"]},
-                        "source": f"knowledge_{kb_result['method']}",
-                        "text": text
-                    }
-            except Exception as e:
-                logger.error(f"知识库查询失败: {e}")
-
-        # ===== 策略 3：大模型分类（准确度高，需要网络）=====
-        if self.ollama and self.ollama.available:
-            try:
-                categories = self.categories if self.categories else list(self.rules.keys())
-                llm_scores = self.ollama.classify_with_llm(text, categories)
-
-                if llm_scores:
-                    top_cat = max(llm_scores, key=llm_scores.get)
-                    top_score = llm_scores[top_cat]
-                    major = self._extract_major_category(top_cat)
-                    minor = self._extract_minor_category(top_cat)
-                    # 添加到知识库缓存
-                    if self.knowledge_service and top_score >= 0.6:
-                        try:
-                            self.knowledge_service.add_to_cache(text, top_cat, None, top_score, "llm")
-                        except Exception as e:
-                            logger.warning(f"添加LLM结果到缓存失败: {e}")
-                    # 只返回 top-5
-                    top_5 = dict(sorted(llm_scores.items(), key=lambda x: x[1], reverse=True)[:5])
-                    return {
-                        "category": top_cat,
-                        "major_category": major,
-                        "minor_category": minor,
-                        "scores": top_5,
-                        "source": "ollama",
-                        "text": text
-                    }
-            except Exception as e:
-                logger.error(f"大模型分类失败，降级到向量: {e}")
+        # ===== 策略 2：知识库查询 / 策略 3：大模型分类 =====
+        result = self._knowledge_result(name, spec, text) or self._llm_result(text, self._llm_scores(text))
+        if result:
+            return result
 
         # ===== 策略 4：向量匹配（备用方案）=====
-        vector_scores = self.embed_match(text)
-        if vector_scores:
-            top_cat = max(vector_scores, key=vector_scores.get)
-            top_score = vector_scores[top_cat]
-            major = self._extract_major_category(top_cat)
-            minor = self._extract_minor_category(top_cat)
-            # 添加到知识库缓存（向量匹配的置信度较低，仅作为备用）
-            if self.knowledge_service and top_score >= 0.5:
+        return self._vector_result(text, self.embed_match(text))
+
+    def classify_batch(self, items: List, cache_checked: bool = False) -> List[Dict]:
+        """
+        批量分类物料，结果与逐条 classify() 相同
+
+        - 相同的 (name, spec, remark) 只分类一次
+        - 规则层用关键词自动机逐条扫描一遍
+        - 知识库逐条查询，大模型以 OLLAMA_CONCURRENCY 个并发请求（仅对前几层未命中的）
+        - 剩余条目的向量层一次矩阵运算完成
+        - 写入知识库缓存的结果最后批量写入
+
+        Args:
+            items: [{"name", "spec", "remark"}, ...]，也可以是纯文本字符串
+            cache_checked: 调用方已批量查过知识库缓存（get_many_from_cache），知识库查询跳过缓存
+
+        Returns:
+            与 items 顺序一致的分类结果列表
+        """
+        keys = []
+        for item in items:
+            if isinstance(item, str):
+                keys.append((item, "", ""))
+            else:
+                keys.append((item.get("name") or "", item.get("spec") or "", item.get("remark") or ""))
+
+        unique = list(dict.fromkeys(keys))
+        results = {}
+        pending_cache = []
+        remaining = []  # 规则、知识库未命中的 (key, text)
+        for key in unique:
+            name, spec, remark = key
+            text = " ".join(key).strip()
+            if not text:
+                results[key] = self._result("未分类", {}, "empty", text)
+                continue
+            rule_result = self.rule_match(text)
+            if rule_result:
+                results[key] = self._rule_result(text, rule_result, pending_cache)
+                continue
+            result = self._knowledge_result(name, spec, text, use_cache=not cache_checked)
+            if result:
+                results[key] = result
+            else:
+                remaining.append((key, text))
+
+        pending = []  # 需要走向量层的 (key, text)
+        if remaining and self.ollama and self.ollama.available:
+            texts = [text for _, text in remaining]
+            with ThreadPoolExecutor(max_workers=max(1, min(OLLAMA_CONCURRENCY, len(texts)))) as executor:
+                llm_scores = list(executor.map(self._llm_scores, texts))
+            for (key, text), scores in zip(remaining, llm_scores):
+                result = self._llm_result(text, scores, pending_cache)
+                if result:
+                    results[key] = result
+                else:
+                    pending.append((key, text))
+        else:
+            pending = remaining
+
+        if pending:
+            texts = [text for _, text in pending]
+            if self.prototype_matrix is not None:
                 try:
-                    self.knowledge_service.add_to_cache(text, top_cat, None, top_score, "vector")
+                    vector_scores = self.prototype_matrix.top_k(texts, 5)
                 except Exception as e:
-                    logger.warning(f"添加向量结果到缓存失败: {e}")
-            return {
-                "category": top_cat,
-                "major_category": major,
-                "minor_category": minor,
-                "scores": vector_scores,
-                "source": "vector",
-                "text": text
-            }
-        
-        # ===== 默认：未分类 =====
-        return {
-            "category": "未分类",
-            "major_category": "",
-            "minor_category": "",
-            "scores": {},
-            "source": "default",
-            "text": text
-        }
\ No newline at end of file
+                    logger.error(f"批量向量匹配错误: {e}")
+                    vector_scores = [{}] * len(texts)
+            else:
+                vector_scores = [self.embed_match(text) for text in texts]
+            for (key, text), scores in zip(pending, vector_scores):
+                results[key] = self._vector_result(text, scores, pending_cache)
+
+        self._flush_cache(pending_cache)
+        return [dict(results[key]) for key in keys]
@@ -11,6 +11,8 @@ from datetime import datetime
 from typing import Dict, Optional, Tuple
 import base64
 
+from services.ocr_worker import OCR_POOL_ENABLED, engine_available, ocr_image, pool_unavailable
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,7 +21,8 @@ class InvoiceOCRService:
 
     def __init__(self):
         self.ocr_engine = None
-        self.ocr_type = None  # 'ollama_vision', 'rapidocr' or 'paddleocr'
+        self.ocr_type = None  # 'ollama_vision', 'ocr_pool', 'rapidocr' or 'paddleocr'
+        self.use_ocr_pool = False
         self.use_cloud_api = os.getenv('USE_BAIDU_OCR', 'false').lower() == 'true'
 
         # Ollama Vision配置
@@ -35,37 +38,48 @@ class InvoiceOCRService:
                 self.ocr_type = 'ollama_vision'
                 logger.info(f"✅ Ollama Vision OCR已启用 (模型: {self.ollama_vision_model})")
 
+        # 模型由常驻 OCR 工作池加载一次（services/ocr_worker.py），本进程不再加载
+        if not self.use_cloud_api and OCR_POOL_ENABLED and engine_available():
+            self.use_ocr_pool = True
+            if not self.ollama_available:
+                self.ocr_type = 'ocr_pool'
+            logger.info("✅ 使用常驻 OCR 工作池")
+
         # 尝试初始化传统OCR引擎（作为Ollama的备用方案）
-        if not self.use_cloud_api:
-            # 方案1: 尝试RapidOCR (现代化、轻量级、自带模型)
+        if not self.use_cloud_api and not self.use_ocr_pool:
+            self._init_local_engine()
+
+    def _init_local_engine(self):
+        """在本进程加载 OCR 引擎（未使用工作池，或工作池不可用时）"""
+        # 方案1: 尝试RapidOCR (现代化、轻量级、自带模型)
+        try:
+            from rapidocr_onnxruntime import RapidOCR
+
+            self.ocr_engine = RapidOCR()
+            if not self.ollama_available:
+                self.ocr_type = 'rapidocr'
+            logger.info(f"✅ RapidOCR初始化成功 (ONNX Runtime)")
+        except ImportError:
+            logger.info("ℹ️  RapidOCR未安装，尝试PaddleOCR...")
+
+            # 方案2: 回退到PaddleOCR
             try:
-                from rapidocr_onnxruntime import RapidOCR
+                from paddleocr import PaddleOCR
 
-                self.ocr_engine = RapidOCR()
+                # PaddleOCR 3.x 初始化（自动检测设备）
+                self.ocr_engine = PaddleOCR()
                 if not self.ollama_available:
-                    self.ocr_type = 'rapidocr'
-                logger.info(f"✅ RapidOCR初始化成功 (ONNX Runtime)")
+                    self.ocr_type = 'paddleocr'
+                logger.info(f"✅ PaddleOCR 3.x 初始化成功 (备用引擎)")
             except ImportError:
-                logger.info("ℹ️  RapidOCR未安装，尝试PaddleOCR...")
-
-                # 方案2: 回退到PaddleOCR
-                try:
-                    from paddleocr import PaddleOCR
-
-                    # PaddleOCR 3.x 初始化（自动检测设备）
-                    self.ocr_engine = PaddleOCR()
-                    if not self.ollama_available:
-                        self.ocr_type = 'paddleocr'
-                    logger.info(f"✅ PaddleOCR 3.x 初始化成功 (备用引擎)")
-                except ImportError:
-                    logger.warning("⚠️ OCR引擎未安装，将使用简单文本提取")
-                    self.ocr_engine = None
-                except Exception as e:
-                    logger.error(f"❌ PaddleOCR初始化失败: {str(e)}")
-                    self.ocr_engine = None
+                logger.warning("⚠️ OCR引擎未安装，将使用简单文本提取")
+                self.ocr_engine = None
             except Exception as e:
-                logger.error(f"❌ RapidOCR初始化失败: {str(e)}")
+                logger.error(f"❌ PaddleOCR初始化失败: {str(e)}")
                 self.ocr_engine = None
+        except Exception as e:
+            logger.error(f"❌ RapidOCR初始化失败: {str(e)}")
+            self.ocr_engine = None
 
     def extract_invoice_info(self, file_path: str) -> Dict:
         """
@@ -120,11 +134,11 @@ class InvoiceOCRService:
                 else:
                     # Vision失败，降级到传统OCR
                     logger.warning("⚠️  Ollama Vision识别失败，降级到传统OCR")
-                    if self.ocr_engine:
+                    if self.use_ocr_pool or self.ocr_engine:
                         return self._extract_with_paddleocr(file_path)
                     else:
                         return self._extract_with_fallback(file_path)
-            elif self.ocr_engine:
+            elif self.use_ocr_pool or self.ocr_engine:
                 return self._extract_with_paddleocr(file_path)
             else:
                 return self._extract_with_fallback(file_path)
@@ -150,6 +164,10 @@ class InvoiceOCRService:
 
     def _extract_with_paddleocr(self, file_path: str) -> Dict:
         """使用OCR引擎识别（支持RapidOCR和PaddleOCR 3.x）"""
+        if self.use_ocr_pool:
+            result = self._extract_with_ocr_pool(file_path)
+            if result is not None:
+                return result
         try:
             # RapidOCR和PaddleOCR的调用方式不同
             if self.ocr_type == 'rapidocr':
@@ -321,6 +339,42 @@ class InvoiceOCRService:
                 "raw_text": ""
             }
 
+    def _extract_with_ocr_pool(self, file_path: str) -> Optional[Dict]:
+        """
+        通过常驻 OCR 工作池识别（稳态无模型加载开销，单张有超时）
+
+        工作池不可用（OCR 服务未启动等）且本进程能加载引擎时返回 None，由进程内引擎识别
+        """
+        result = ocr_image(file_path)
+        if pool_unavailable(result):
+            logger.warning(f"⚠️ OCR工作池不可用，改用进程内OCR引擎: {result.get('error')}")
+            if self.ocr_engine is None:
+                self._init_local_engine()
+            if self.ocr_engine is not None:
+                return None
+        if not result.get('success'):
+            logger.warning(f"⚠️ OCR工作池识别失败: {result.get('error')}")
+            return {
+                "success": False,
+                "error": result.get('error') or "未识别到文本",
+                "invoice_number": "",
+                "amount": 0.0,
+                "date": "",
+                "confidence": 0.0,
+                "raw_text": ""
+            }
+
+        # 与进程内引擎一致，按引擎原始顺序拼接
+        full_text = "\n".join(line['text'] for line in result['lines'])
+        logger.info(f"📝 OCR识别文本({result['count']}行, {result.get('engine')}):")
+        logger.info(full_text)
+
+        invoice_info = self._parse_invoice_text(full_text)
+        invoice_info["success"] = True
+        invoice_info["raw_text"] = full_text
+        invoice_info["confidence"] = result['confidence'] if result['confidence'] > 0 else 0.85
+        return invoice_info
+
     def _extract_with_baidu_api(self, file_path: str) -> Dict:
         """使用百度云API识别（需要配置API Key）"""
         try:
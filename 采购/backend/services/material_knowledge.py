@@ -2,23 +2,350 @@
 """
 物料知识库服务
 提供基于知识库的物料分类和匹配功能
+
+常驻索引（MaterialIndex）:
+    每个进程首次使用时整表载入 material_knowledge_base，之后按 updated_at 增量刷新；
+    精确 / 前缀 / 模糊匹配在内存完成，索引不可用时退回原 SQL 查询。
+    material_match_cache 在内存中只保留最近使用的 MATERIAL_CACHE_SIZE 条，
+    内存未命中时查库（其他 Web 进程 / Celery Worker 写入的缓存也能命中）。
+
+配置:
+    MATERIAL_INDEX_ENABLED=true     是否启用常驻索引
+    MATERIAL_INDEX_REFRESH=60       增量刷新间隔（秒）
+    MATERIAL_CACHE_SIZE=50000       内存匹配缓存上限（条，超出时淘汰最久未用的）
 """
-from typing import Optional, Dict, List, Tuple
+from collections import Counter, OrderedDict
+from typing import Optional, Dict, List, Set, Tuple
 import hashlib
 import logging
-from sqlalchemy import text, or_, func
+import os
+import re
+import threading
+import time
+import unicodedata
+from sqlalchemy import bindparam, text, or_, func
 from extensions import db
 
 logger = logging.getLogger(__name__)
 
+MATERIAL_INDEX_ENABLED = os.getenv("MATERIAL_INDEX_ENABLED", "true").lower() == "true"
+MATERIAL_INDEX_REFRESH = float(os.getenv("MATERIAL_INDEX_REFRESH", 60))
+MATERIAL_CACHE_SIZE = int(os.getenv("MATERIAL_CACHE_SIZE", 50000))
+
+# 前缀匹配得分；模糊匹配得分不超过原 LIKE 匹配的 0.7
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.7
+FUZZY_MIN_OVERLAP = 0.5
+
+_TERM_SPLIT = re.compile(r"[,，;；、/|\s]+")
+
+
+def normalize_name(value: Optional[str]) -> str:
+    """全角转半角、转小写、去掉空白"""
+    if not value:
+        return ""
+    return "".join(unicodedata.normalize("NFKC", str(value)).lower().split())
+
+
+def split_terms(value: Optional[str]) -> List[str]:
+    """关键词 / 同义词字段（逗号、顿号等分隔）拆成规范化的词"""
+    if not value:
+        return []
+    return [t for t in (normalize_name(t) for t in _TERM_SPLIT.split(str(value))) if t]
+
+
+def trigrams(term: str) -> Set[str]:
+    """首尾加边界符的字符三元组（两个字的词也能命中）"""
+    if not term:
+        return set()
+    padded = f"\x02{term}\x03"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PrefixTrie:
+    """前缀树：查找作为输入前缀的最长键（物料编码、规格型号）"""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key: str, value: int):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(None, set()).add(value)
+
+    def remove(self, key: str, value: int):
+        node = self.root
+        for ch in key:
+            node = node.get(ch)
+            if node is None:
+                return
+        node.get(None, set()).discard(value)
+
+    def longest_prefix(self, query: str, min_length: int = 2) -> Set[int]:
+        node, found = self.root, set()
+        for depth, ch in enumerate(query, 1):
+            node = node.get(ch)
+            if node is None:
+                break
+            if depth >= min_length and node.get(None):
+                found = node[None]
+        return found
+
+
+class MaterialIndex:
+    """
+    物料知识库常驻索引
+
+    - names: 规范化标准名称 -> 记录 ID（精确匹配）
+    - name_trie / spec_trie: 标准名称、同义词、规格型号的前缀树
+    - grams: 三元组 -> 记录 ID（模糊匹配，代替 FULLTEXT / LIKE）
+    - cache: 匹配缓存（input_hash -> 结果），material_match_cache 最近使用部分的内存副本（LRU）
+    """
+
+    COLUMNS = ("id", "standard_name", "category", "spec_pattern", "synonyms", "keywords",
+               "description", "match_priority", "updated_at")
+
+    def __init__(self, refresh_interval: float = MATERIAL_INDEX_REFRESH, cache_size: int = MATERIAL_CACHE_SIZE):
+        self.refresh_interval = refresh_interval
+        self.cache_size = max(0, cache_size)
+        self.lock = threading.RLock()
+        self.ready = False
+        self.last_refresh = 0.0
+        self.since = None
+        self._clear()
+
+    def _clear(self):
+        self.entries: Dict[int, Dict] = {}
+        self.names: Dict[str, Set[int]] = {}
+        self.name_trie = PrefixTrie()
+        self.spec_trie = PrefixTrie()
+        self.grams: Dict[str, Set[int]] = {}
+        self.cache: "OrderedDict[str, Dict]" = OrderedDict()
+
+    # ---------- 载入与刷新 ----------
+
+    def ensure_fresh(self) -> bool:
+        """未载入时整表载入，超过刷新间隔时增量刷新；返回索引是否可用"""
+        if self.ready and time.monotonic() - self.last_refresh < self.refresh_interval:
+            return True
+        with self.lock:
+            if not self.ready or time.monotonic() - self.last_refresh >= self.refresh_interval:
+                try:
+                    self.refresh() if self.ready else self.load()
+                except Exception as e:
+                    db.session.rollback()
+                    self.last_refresh = time.monotonic()  # 间隔后再重试
+                    logger.error(f"物料知识库索引刷新失败: {e}")
+        return self.ready
+
+    def load(self):
+        """整表载入知识库，匹配缓存载入最近命中的 cache_size 条"""
+        started = time.perf_counter()
+        rows = db.session.execute(text(f"SELECT {', '.join(self.COLUMNS)} FROM material_knowledge_base")).fetchall()
+        with self.lock:
+            self._clear()
+            self.since = None
+            for row in rows:
+                self.upsert(dict(zip(self.COLUMNS, row)))
+            self._load_cache()
+            self.ready = True
+            self.last_refresh = time.monotonic()
+        logger.info(f"✅ 物料知识库索引已载入: {len(self.entries)} 条知识, {len(self.cache)} 条缓存, "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _load_cache(self):
+        if not self.cache_size:
+            return
+        try:
+            rows = db.session.execute(text("""
+                SELECT input_hash, matched_category, matched_knowledge_id, match_score, match_method
+                FROM material_match_cache
+                ORDER BY last_hit_at DESC
+                LIMIT :limit
+            """), {"limit": self.cache_size}).fetchall()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"匹配缓存表不可用，仅使用内存缓存: {e}")
+            return
+        # 最近命中的最后放入（LRU 末尾）
+        for row in reversed(rows):
+            self.cache_put(row[0], {
+                "category": row[1],
+                "knowledge_id": row[2],
+                "score": float(row[3]) if row[3] else 0.0,
+                "method": row[4]
+            })
+
+    def cache_get(self, input_hash: str) -> Optional[Dict]:
+        with self.lock:
+            cached = self.cache.get(input_hash)
+            if cached is not None:
+                self.cache.move_to_end(input_hash)
+            return cached
+
+    def cache_put(self, input_hash: str, result: Dict):
+        """写入内存缓存，超过上限时淘汰最久未用的"""
+        if not self.cache_size:
+            return
+        with self.lock:
+            self.cache[input_hash] = result
+            self.cache.move_to_end(input_hash)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def refresh(self):
+        """按 updated_at 增量刷新；条数对不上（有删除）时整表重建"""
+        if self.since is None:
+            return self.load()
+        query = text(f"SELECT {', '.join(self.COLUMNS)} FROM material_knowledge_base WHERE updated_at >= :since")
+        rows = db.session.execute(query, {"since": self.since}).fetchall()
+        total = db.session.execute(text("SELECT COUNT(*) FROM material_knowledge_base")).scalar()
+        with self.lock:
+            for row in rows:
+                self.upsert(dict(zip(self.COLUMNS, row)))
+            self.last_refresh = time.monotonic()
+        if total != len(self.entries):
+            logger.info(f"物料知识库记录数变化 ({len(self.entries)} -> {total})，重建索引")
+            self.load()
+        elif rows:
+            logger.info(f"物料知识库索引增量刷新: {len(rows)} 条")
+
+    # ---------- 维护 ----------
+
+    def upsert(self, entry: Dict):
+        """新增或替换一条知识（add_material 写库后就地更新）"""
+        with self.lock:
+            self.remove(entry["id"])
+            entry = dict(entry)
+            entry["_name"] = normalize_name(entry.get("standard_name"))
+            entry["_synonyms"] = split_terms(entry.get("synonyms"))
+            entry["_keywords"] = split_terms(entry.get("keywords"))
+            entry["_spec"] = normalize_name(entry.get("spec_pattern"))
+            self.entries[entry["id"]] = entry
+
+            if entry["_name"]:
+                self.names.setdefault(entry["_name"], set()).add(entry["id"])
+            for key in [entry["_name"]] + entry["_synonyms"]:
+                if key:
+                    self.name_trie.insert(key, entry["id"])
+            if entry["_spec"]:
+                self.spec_trie.insert(entry["_spec"], entry["id"])
+            for gram in self._entry_grams(entry):
+                self.grams.setdefault(gram, set()).add(entry["id"])
+
+            updated_at = entry.get("updated_at")
+            if updated_at is not None and (self.since is None or updated_at > self.since):
+                self.since = updated_at
+
+    def remove(self, knowledge_id: int):
+        with self.lock:
+            entry = self.entries.pop(knowledge_id, None)
+            if entry is None:
+                return
+            self.names.get(entry["_name"], set()).discard(knowledge_id)
+            for key in [entry["_name"]] + entry["_synonyms"]:
+                self.name_trie.remove(key, knowledge_id)
+            self.spec_trie.remove(entry["_spec"], knowledge_id)
+            for gram in self._entry_grams(entry):
+                postings = self.grams.get(gram)
+                if postings is not None:
+                    postings.discard(knowledge_id)
+                    if not postings:
+                        del self.grams[gram]
+
+    @staticmethod
+    def _entry_grams(entry: Dict) -> Set[str]:
+        terms = [entry["_name"]] + entry["_synonyms"] + entry["_keywords"] + split_terms(entry.get("description"))
+        grams = set()
+        for term in terms:
+            grams |= trigrams(term)
+        return grams
+
+    # ---------- 查询 ----------
+
+    def _best(self, ids) -> Optional[Dict]:
+        """match_priority 最高的记录（相同时取 ID 小的，结果稳定）"""
+        best = None
+        for kid in ids:
+            entry = self.entries.get(kid)
+            if entry and (best is None or (entry.get("match_priority") or 0, -kid) >
+                          (best.get("match_priority") or 0, -best["id"])):
+                best = entry
+        return best
+
+    def exact(self, name: str) -> Optional[Tuple[str, int, float]]:
+        """标准名称精确匹配（规范化后比较）"""
+        entry = self._best(self.names.get(normalize_name(name), ()))
+        return (entry["category"], entry["id"], 1.0) if entry else None
+
+    def prefix(self, name: str, spec: str = "") -> Optional[Tuple[str, int, float]]:
+        """标准名称 / 同义词是名称的前缀，或规格型号是规格的前缀"""
+        ids = self.name_trie.longest_prefix(normalize_name(name))
+        if not ids and spec:
+            ids = self.spec_trie.longest_prefix(normalize_name(spec))
+        entry = self._best(ids)
+        return (entry["category"], entry["id"], PREFIX_SCORE) if entry else None
+
+    def fuzzy(self, name: str) -> Optional[Tuple[str, int, float]]:
+        """
+        三元组模糊匹配
+
+        名称原样出现在标准名称 / 关键词 / 同义词中时得分 0.7（同原 LIKE 匹配），
+        否则按名称三元组命中比例打分，命中不足一半不算匹配
+        """
+        term = normalize_name(name)
+        query = trigrams(term)
+        if not query:
+            return None
+        with self.lock:
+            counts = Counter()
+            for gram in query:
+                counts.update(self.grams.get(gram, ()))
+        if not counts:
+            return None
+
+        full = [kid for kid, hits in counts.items() if hits == len(query)]
+        verbatim = [kid for kid in full if self._contains(self.entries[kid], term)]
+        if verbatim:
+            entry = self._best(verbatim)
+            return entry["category"], entry["id"], FUZZY_SCORE
+
+        top = max(counts.values())
+        overlap = top / len(query)
+        if overlap < FUZZY_MIN_OVERLAP:
+            return None
+        entry = self._best(kid for kid, hits in counts.items() if hits == top)
+        return entry["category"], entry["id"], round(FUZZY_SCORE * overlap, 4)
+
+    @staticmethod
+    def _contains(entry: Dict, term: str) -> bool:
+        return term in entry["_name"] or any(term in t for t in entry["_keywords"] + entry["_synonyms"])
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "entries": len(self.entries),
+            "grams": len(self.grams),
+            "cache": len(self.cache),
+            "since": str(self.since) if self.since is not None else None,
+        }
+
 
 class MaterialKnowledgeService:
     """物料知识库服务"""
 
-    def __init__(self):
+    def __init__(self, use_index: bool = MATERIAL_INDEX_ENABLED):
         self.cache_enabled = True
+        self.index = MaterialIndex() if use_index else None
         logger.info("✅ MaterialKnowledgeService 初始化完成")
 
+    def _ready_index(self) -> Optional[MaterialIndex]:
+        """可用的常驻索引（首次调用时载入，到期增量刷新）；不可用时返回 None，走 SQL 查询"""
+        if self.index is not None and self.index.ensure_fresh():
+            return self.index
+        return None
+
     def _compute_hash(self, text: str) -> str:
         """计算输入文本的MD5哈希"""
         return hashlib.md5(text.encode('utf-8')).hexdigest()
@@ -37,9 +364,15 @@ class MaterialKnowledgeService:
         if not self.cache_enabled:
             return None
 
-        try:
-            input_hash = self._compute_hash(input_text)
+        input_hash = self._compute_hash(input_text)
+        index = self._ready_index()
+        if index is not None:
+            cached = index.cache_get(input_hash)
+            if cached:
+                return dict(cached)
 
+        # 内存未命中时查库（可能是其他进程写入的缓存）
+        try:
             query = text("""
                 SELECT matched_category, matched_knowledge_id, match_score, match_method
                 FROM material_match_cache
@@ -62,12 +395,15 @@ class MaterialKnowledgeService:
 
                 logger.debug(f"✅ 缓存命中: {input_text} -> {result[0]}")
 
-                return {
+                cached = {
                     "category": result[0],
                     "knowledge_id": result[1],
                     "score": float(result[2]) if result[2] else 0.0,
                     "method": result[3]
                 }
+                if index is not None:
+                    index.cache_put(input_hash, dict(cached))
+                return cached
 
             return None
 
@@ -75,6 +411,69 @@ class MaterialKnowledgeService:
             logger.error(f"缓存查询失败: {e}")
             return None
 
+    def get_many_from_cache(self, input_texts: List[str]) -> Dict[str, Dict]:
+        """
+        批量查询缓存（一次 IN 查询，命中的统一更新命中统计）
+
+        Args:
+            input_texts: 输入文本列表（物料名称+规格）
+
+        Returns:
+            {输入文本: {"category", "knowledge_id", "score", "method"}}，只包含命中的
+        """
+        if not self.cache_enabled or not input_texts:
+            return {}
+
+        by_hash = {self._compute_hash(t): t for t in input_texts}
+        memory_hits = {}
+        index = self._ready_index()
+        if index is not None:
+            for input_hash, input_text in list(by_hash.items()):
+                cached = index.cache_get(input_hash)
+                if cached:
+                    memory_hits[input_text] = dict(cached)
+                    del by_hash[input_hash]
+            if not by_hash:
+                return memory_hits
+
+        # 内存未命中的查库（可能是其他进程写入的缓存）
+        try:
+            query = text("""
+                SELECT input_hash, matched_category, matched_knowledge_id, match_score, match_method
+                FROM material_match_cache
+                WHERE input_hash IN :hashes
+            """).bindparams(bindparam("hashes", expanding=True))
+
+            hits = {}
+            for row in db.session.execute(query, {"hashes": list(by_hash)}):
+                hits[by_hash[row[0]]] = {
+                    "category": row[1],
+                    "knowledge_id": row[2],
+                    "score": float(row[3]) if row[3] else 0.0,
+                    "method": row[4]
+                }
+
+            if hits:
+                update_query = text("""
+                    UPDATE material_match_cache
+                    SET hit_count = hit_count + 1,
+                        last_hit_at = CURRENT_TIMESTAMP
+                    WHERE input_hash IN :hashes
+                """).bindparams(bindparam("hashes", expanding=True))
+                db.session.execute(update_query, {"hashes": [self._compute_hash(t) for t in hits]})
+                db.session.commit()
+                if index is not None:
+                    for input_text, cached in hits.items():
+                        index.cache_put(self._compute_hash(input_text), dict(cached))
+
+            logger.debug(f"批量缓存查询: 内存 {len(memory_hits)} 条, 数据库 {len(hits)}/{len(by_hash)} 命中")
+            return {**memory_hits, **hits}
+
+        except Exception as e:
+            logger.error(f"批量缓存查询失败: {e}")
+            db.session.rollback()
+            return memory_hits
+
     def add_to_cache(self, input_text: str, category: str, knowledge_id: Optional[int] = None,
                      score: float = 1.0, method: str = "knowledge") -> None:
         """
@@ -90,9 +489,11 @@ class MaterialKnowledgeService:
         if not self.cache_enabled:
             return
 
-        try:
-            input_hash = self._compute_hash(input_text)
+        input_hash = self._compute_hash(input_text)
+        if not self._remember(input_hash, category, knowledge_id, score, method):
+            return  # 内存缓存中已有相同结果，不再写库
 
+        try:
             # 使用 INSERT ... ON DUPLICATE KEY UPDATE
             query = text("""
                 INSERT INTO material_match_cache
@@ -123,6 +524,66 @@ class MaterialKnowledgeService:
             logger.error(f"添加缓存失败: {e}")
             db.session.rollback()
 
+    def add_many_to_cache(self, entries: List[Tuple[str, str, float, str]]) -> None:
+        """
+        批量添加匹配结果到缓存（一次 executemany）
+
+        Args:
+            entries: [(输入文本, 品类, 得分, 匹配方法), ...]
+        """
+        if not self.cache_enabled or not entries:
+            return
+
+        try:
+            query = text("""
+                INSERT INTO material_match_cache
+                (input_text, input_hash, matched_category, matched_knowledge_id, match_score, match_method)
+                VALUES (:text, :hash, :category, NULL, :score, :method)
+                ON DUPLICATE KEY UPDATE
+                    matched_category = VALUES(matched_category),
+                    matched_knowledge_id = VALUES(matched_knowledge_id),
+                    match_score = VALUES(match_score),
+                    match_method = VALUES(match_method),
+                    hit_count = hit_count + 1,
+                    last_hit_at = CURRENT_TIMESTAMP
+            """)
+
+            rows = {}
+            for input_text, category, score, method in entries:
+                input_hash = self._compute_hash(input_text)
+                if not self._remember(input_hash, category, None, score, method):
+                    continue
+                rows[input_hash] = {
+                    "text": input_text[:500],
+                    "hash": input_hash,
+                    "category": category,
+                    "score": score,
+                    "method": method
+                }
+            if not rows:
+                return
+            db.session.execute(query, list(rows.values()))
+            db.session.commit()
+
+            logger.debug(f"✅ 批量添加缓存: {len(rows)} 条")
+
+        except Exception as e:
+            logger.error(f"批量添加缓存失败: {e}")
+            db.session.rollback()
+
+    def _remember(self, input_hash: str, category: str, knowledge_id: Optional[int], score: float,
+                  method: str) -> bool:
+        """写入索引的内存缓存；返回是否需要写库（无索引或结果有变化）"""
+        index = self._ready_index()
+        if index is None:
+            return True
+        cached = index.cache_get(input_hash)
+        if cached and cached["category"] == category and cached["method"] == method:
+            return False
+        index.cache_put(input_hash, {"category": category, "knowledge_id": knowledge_id, "score": score,
+                                     "method": method})
+        return True
+
     def search_exact(self, name: str, spec: str = "") -> Optional[Tuple[str, int, float]]:
         """
         精确匹配查询
@@ -134,6 +595,13 @@ class MaterialKnowledgeService:
         Returns:
             (category, knowledge_id, score) 元组，未找到返回 None
         """
+        index = self._ready_index()
+        if index is not None:
+            result = index.exact(name)
+            if result:
+                logger.info(f"✅ 知识库精确匹配: {name} -> {result[0]}")
+            return result
+
         try:
             # 构建查询文本
             query_text = f"{name} {spec}".strip()
@@ -170,6 +638,13 @@ class MaterialKnowledgeService:
         Returns:
             (category, knowledge_id, score) 元组，未找到返回 None
         """
+        index = self._ready_index()
+        if index is not None:
+            result = index.fuzzy(name)
+            if result:
+                logger.info(f"✅ 知识库模糊匹配: {name} -> {result[0]} (得分: {result[2]:.2f})")
+            return result
+
         try:
             # 构建查询文本
             query_text = f"{name} {spec}".strip()
@@ -214,20 +689,21 @@ class MaterialKnowledgeService:
             logger.error(f"模糊匹配查询失败: {e}")
             return None
 
-    def search(self, name: str, spec: str = "") -> Optional[Dict]:
+    def search(self, name: str, spec: str = "", use_cache: bool = True) -> Optional[Dict]:
         """
         综合搜索：先精确后模糊
 
         Args:
             name: 物料名称
             spec: 规格
+            use_cache: 是否先查缓存（调用方已用 get_many_from_cache 批量查过时传 False）
 
         Returns:
             {"category": str, "knowledge_id": int, "score": float, "method": str}
         """
         # 1. 先查缓存
         query_text = f"{name} {spec}".strip()
-        cached = self.get_from_cache(query_text)
+        cached = self.get_from_cache(query_text) if use_cache else None
         if cached:
             return cached
 
@@ -245,7 +721,20 @@ class MaterialKnowledgeService:
             self.add_to_cache(query_text, category, kid, score, "exact")
             return result
 
-        # 3. 模糊匹配
+        # 3. 前缀匹配（仅常驻索引）：标准名称/同义词是名称前缀，或规格型号是规格前缀
+        index = self._ready_index()
+        prefix_result = index.prefix(name, spec) if index is not None else None
+        if prefix_result:
+            category, kid, score = prefix_result
+            self.add_to_cache(query_text, category, kid, score, "prefix")
+            return {
+                "category": category,
+                "knowledge_id": kid,
+                "score": score,
+                "method": "prefix"
+            }
+
+        # 4. 模糊匹配
         fuzzy_result = self.search_fuzzy(name, spec)
         if fuzzy_result:
             category, kid, score = fuzzy_result
@@ -305,6 +794,20 @@ class MaterialKnowledgeService:
             })
             db.session.commit()
 
+            # 就地更新常驻索引（未载入时由首次载入读到）
+            if self.index is not None and self.index.ready:
+                self.index.upsert({
+                    "id": result.lastrowid,
+                    "standard_name": standard_name,
+                    "category": category,
+                    "spec_pattern": spec_pattern,
+                    "synonyms": synonyms,
+                    "keywords": keywords,
+                    "description": description,
+                    "match_priority": match_priority,
+                    "updated_at": None
+                })
+
             logger.info(f"✅ 添加知识库记录: {standard_name} -> {category}")
             return result.lastrowid
 
@@ -315,7 +818,7 @@ class MaterialKnowledgeService:
 
     def batch_add_materials(self, materials: List[Dict]) -> int:
         """
-        批量添加物料
+        批量添加物料（常驻索引随每条写入就地更新）
 
         Args:
             materials: 物料列表，每个元素是包含字段的字典
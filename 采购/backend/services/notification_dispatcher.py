@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+RFQ 通知批量派发器
+
+派发流程（dispatch_once）:
+    1. 认领：一条 SELECT ... FOR UPDATE SKIP LOCKED 取出一批到期任务（pending 且到了重试时间，
+       或 sending 租约已过期），一条 UPDATE 标记为 sending 并写入租约到期时间，立即提交。
+       多个 Worker 并发派发时互不阻塞、不重复认领；Worker 中途退出的任务租约到期后被重新认领，
+       重新认领计入 retry_count，达到 max_retries 直接标记 failed（避免导致 Worker 崩溃的消息无限重发）
+    2. 合并：一次 JOIN 查询取出任务对应的 RFQ 与供应商联系方式，按 (通道, 供应商) 分组，
+       同一供应商在本批的多条任务（多个 RFQ / 多个品类）合并为一条消息
+    3. 发送：每个通道一个线程池（并发上限 concurrency）+ 令牌桶限速（rate 条/秒），各通道并行；
+       站内信通道（bulk）不走线程池，结果记录时一条 executemany 批量写入 notifications
+    4. 记录：成功 / 重试 / 失败各一条 executemany UPDATE，一次提交；
+       失败任务按 NOTIFY_RETRY_BASE * 2^retry_count 指数退避，达到 max_retries 标记 failed
+
+通道选择：供应商已关注服务号（wechat_openid + is_subscribed）且服务号已配置 → wechat，否则 → in_app
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, text
+from extensions import db
+from models.notification import Notification
+
+logger = logging.getLogger(__name__)
+
+# 每批认领的任务数
+NOTIFY_CLAIM_BATCH = int(os.getenv("NOTIFY_CLAIM_BATCH", 200))
+# sending 状态的租约（秒），超时未记录结果的任务可被重新认领
+NOTIFY_LEASE_SECONDS = int(os.getenv("NOTIFY_LEASE_SECONDS", 300))
+# 重试退避：NOTIFY_RETRY_BASE * 2^retry_count 秒，最长 NOTIFY_RETRY_MAX 秒
+NOTIFY_RETRY_BASE = int(os.getenv("NOTIFY_RETRY_BASE", 60))
+NOTIFY_RETRY_MAX = int(os.getenv("NOTIFY_RETRY_MAX", 3600))
+# 微信服务号通道的并发与限速（条/秒）
+NOTIFY_WECHAT_CONCURRENCY = int(os.getenv("NOTIFY_WECHAT_CONCURRENCY", 4))
+NOTIFY_WECHAT_RATE = float(os.getenv("NOTIFY_WECHAT_RATE", 20))
+
+SUPPLIER_PORTAL_URL = os.getenv("SUPPLIER_PORTAL_URL", "")
+
+CLAIMABLE = """
+    ((status = 'pending' AND (next_retry_at IS NULL OR next_retry_at <= :now))
+     OR (status = 'sending' AND next_retry_at <= :now))
+"""
+
+CLAIM_UPDATE_SQL = text(f"""
+    UPDATE rfq_notification_tasks
+    SET retry_count = retry_count + CASE WHEN status = 'sending' THEN 1 ELSE 0 END,
+        status = 'sending', next_retry_at = :lease_until
+    WHERE id IN :ids AND {CLAIMABLE}
+""").bindparams(bindparam("ids", expanding=True))
+
+CLAIMED_SQL = text("""
+    SELECT id FROM rfq_notification_tasks
+    WHERE id IN :ids AND status = 'sending' AND next_retry_at = :lease_until
+    ORDER BY id
+""").bindparams(bindparam("ids", expanding=True))
+
+LOAD_SQL = text("""
+    SELECT t.id, t.rfq_id, t.supplier_id, t.category, t.retry_count, t.max_retries,
+           r.id AS rfq_found, s.id AS supplier_found, s.company_name, s.wechat_openid, s.is_subscribed
+    FROM rfq_notification_tasks t
+    LEFT JOIN rfqs r ON r.id = t.rfq_id
+    LEFT JOIN suppliers s ON s.id = t.supplier_id
+    WHERE t.id IN :ids
+    ORDER BY t.id
+""").bindparams(bindparam("ids", expanding=True))
+
+SENT_SQL = text("""
+    UPDATE rfq_notification_tasks
+    SET status = 'sent', sent_at = :sent_at, wecom_msg_id = :msg_id,
+        error_reason = NULL, next_retry_at = NULL
+    WHERE id = :task_id
+""")
+
+RETRY_SQL = text("""
+    UPDATE rfq_notification_tasks
+    SET status = :status, retry_count = :retry_count, error_reason = :error_reason,
+        next_retry_at = :next_retry_at
+    WHERE id = :task_id
+""")
+
+
+def _claim_sql(dialect: str, with_ids: bool):
+    sql = f"SELECT id FROM rfq_notification_tasks WHERE {CLAIMABLE}"
+    if with_ids:
+        sql += " AND id IN :task_ids"
+    sql += " ORDER BY id LIMIT :limit"
+    # sqlite 等单写库没有行锁，靠认领 UPDATE 的条件防重
+    if dialect in ("mysql", "mariadb", "postgresql"):
+        sql += " FOR UPDATE SKIP LOCKED"
+    stmt = text(sql)
+    return stmt.bindparams(bindparam("task_ids", expanding=True)) if with_ids else stmt
+
+
+def retry_delay(retry_count: int) -> int:
+    """第 retry_count 次失败后的退避秒数"""
+    return min(NOTIFY_RETRY_BASE * (2 ** retry_count), NOTIFY_RETRY_MAX)
+
+
+class TokenBucket:
+    """线程安全令牌桶：rate 条/秒，最多积攒 burst 个令牌；rate <= 0 不限速"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Channel:
+    """
+    发送通道
+
+    send(message) 成功返回消息ID（可为 None），失败抛异常；
+    bulk=True 的通道不调用 send，由派发器在记录结果时批量落库
+    """
+    name = ""
+    concurrency = 1
+    rate = 0.0
+    bulk = False
+
+    def accepts(self, recipient: Dict) -> bool:
+        return True
+
+    def send(self, message: Dict) -> Optional[str]:
+        raise NotImplementedError
+
+
+class WeChatChannel(Channel):
+    """微信服务号客服消息"""
+    name = "wechat"
+    concurrency = NOTIFY_WECHAT_CONCURRENCY
+    rate = NOTIFY_WECHAT_RATE
+
+    def __init__(self, service=None):
+        if service is None:
+            from services.wechat_official_service import get_wechat_official_service
+            service = get_wechat_official_service()
+        self.service = service
+
+    def accepts(self, recipient: Dict) -> bool:
+        return bool(recipient.get("wechat_openid") and recipient.get("is_subscribed")
+                    and self.service.is_enabled())
+
+    def send(self, message: Dict) -> Optional[str]:
+        if not self.service.send_text_message(message["recipient"]["wechat_openid"], message["content"]):
+            raise RuntimeError("微信服务号消息发送失败")
+        return None
+
+
+class InAppChannel(Channel):
+    """站内信（notifications 表），兜底通道"""
+    name = "in_app"
+    bulk = True
+
+    @staticmethod
+    def row(message: Dict, now: datetime) -> Dict:
+        return {
+            "recipient_id": message["supplier_id"],
+            "recipient_type": "supplier",
+            "notification_type": "rfq_invitation",
+            "title": message["title"],
+            "message": message["content"],
+            "related_type": "rfq",
+            "related_id": message["rfq_ids"][0],
+            "data": json.dumps({"rfqs": message["rfqs"]}, ensure_ascii=False),
+            "is_read": False,
+            "is_sent": True,
+            "sent_at": now,
+            "send_method": "in_app",
+            "created_at": now,
+        }
+
+
+def build_message(supplier_id: int, recipient: Dict, tasks: List[Dict]) -> Dict:
+    """同一供应商的多条任务合并为一条消息（按 RFQ 列出涉及品类）"""
+    rfqs: Dict[int, List[str]] = {}
+    for task in tasks:
+        categories = rfqs.setdefault(task["rfq_id"], [])
+        if task["category"] not in categories:
+            categories.append(task["category"])
+
+    name = recipient.get("company_name") or f"供应商#{supplier_id}"
+    lines = [f"RFQ#{rfq_id}：{'、'.join(categories)}" for rfq_id, categories in rfqs.items()]
+    title = f"新询价单 RFQ#{next(iter(rfqs))}" if len(rfqs) == 1 else f"{len(rfqs)} 个新询价单"
+    content = f"您好 {name}，您有{title}待报价：\n" + "\n".join(lines) + "\n请登录供应商门户查看并报价。"
+    if SUPPLIER_PORTAL_URL:
+        content += f"\n{SUPPLIER_PORTAL_URL}"
+    return {
+        "supplier_id": supplier_id,
+        "recipient": recipient,
+        "task_ids": [task["id"] for task in tasks],
+        "rfq_ids": list(rfqs),
+        "rfqs": {str(rfq_id): categories for rfq_id, categories in rfqs.items()},
+        "title": title,
+        "content": content,
+    }
+
+
+class NotificationDispatcher:
+    """RFQ 通知批量派发器"""
+
+    def __init__(self, channels: Optional[Sequence[Channel]] = None,
+                 batch_size: int = NOTIFY_CLAIM_BATCH,
+                 lease_seconds: int = NOTIFY_LEASE_SECONDS):
+        """
+        Args:
+            channels: 按优先级排列的通道，最后一个作兜底（默认 wechat → in_app）
+            batch_size: 每批认领的任务数
+            lease_seconds: sending 租约时长
+        """
+        self.channels = list(channels) if channels is not None else [WeChatChannel(), InAppChannel()]
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self._buckets = {channel.name: TokenBucket(channel.rate) for channel in self.channels}
+
+    # -----------------------------
+    # 1) 认领
+    # -----------------------------
+    def claim(self, limit: Optional[int] = None, task_ids: Optional[Sequence[int]] = None) -> List[int]:
+        """认领一批到期任务并标记为 sending（已提交），返回任务ID"""
+        now = datetime.utcnow()
+        params = {"now": now, "limit": limit or self.batch_size}
+        if task_ids is not None:
+            if not task_ids:
+                return []
+            params["task_ids"] = list(task_ids)
+        try:
+            stmt = _claim_sql(db.engine.dialect.name, task_ids is not None)
+            ids = [row[0] for row in db.session.execute(stmt, params)]
+            if ids:
+                lease_until = now + timedelta(seconds=self.lease_seconds)
+                result = db.session.execute(CLAIM_UPDATE_SQL, {"ids": ids, "now": now, "lease_until": lease_until})
+                if result.rowcount != len(ids):
+                    # 无行锁时可能被其他 Worker 抢先认领，只保留本次租约的任务
+                    ids = [row[0] for row in db.session.execute(CLAIMED_SQL, {"ids": ids, "lease_until": lease_until})]
+            db.session.commit()
+            return ids
+        except Exception:
+            db.session.rollback()
+            raise
+
+    # -----------------------------
+    # 2) 合并
+    # -----------------------------
+    def _route(self, recipient: Dict) -> Channel:
+        for channel in self.channels:
+            if channel.accepts(recipient):
+                return channel
+        return self.channels[-1]
+
+    def group(self, rows) -> Tuple[List[tuple], List[tuple]]:
+        """
+        按 (通道, 供应商) 合并任务
+
+        RFQ 或供应商已不存在、租约过期被重新认领次数达到 max_retries 的任务不发送，
+        以 (task, 原因) 返回，直接判失败
+        """
+        invalid, grouped, recipients = [], {}, {}
+        for row in rows:
+            task = dict(row._mapping)
+            if task["rfq_found"] is None or task["supplier_found"] is None:
+                invalid.append((task, "RFQ或Supplier不存在"))
+                continue
+            if task["retry_count"] >= task["max_retries"]:
+                invalid.append((task, "派发中断（租约过期）次数达到上限"))
+                continue
+            recipients.setdefault(task["supplier_id"], {
+                "company_name": task["company_name"],
+                "wechat_openid": task["wechat_openid"],
+                "is_subscribed": bool(task["is_subscribed"]),
+            })
+            grouped.setdefault(task["supplier_id"], []).append(task)
+
+        messages = []
+        for supplier_id, tasks in grouped.items():
+            recipient = recipients[supplier_id]
+            messages.append((self._route(recipient), build_message(supplier_id, recipient, tasks)))
+        return messages, invalid
+
+    # -----------------------------
+    # 3) 发送
+    # -----------------------------
+    def _send_one(self, channel: Channel, message: Dict):
+        self._buckets[channel.name].acquire()
+        try:
+            return True, channel.send(message)
+        except Exception as e:
+            return False, str(e)[:500]
+
+    def send(self, messages: List[tuple]) -> List[tuple]:
+        """各通道并行发送，返回 [(channel, message, ok, msg_id 或错误信息)]"""
+        by_channel: Dict[str, List[tuple]] = {}
+        for channel, message in messages:
+            by_channel.setdefault(channel.name, []).append((channel, message))
+
+        outcomes, executors, futures = [], [], []
+        try:
+            for items in by_channel.values():
+                channel = items[0][0]
+                if channel.bulk:
+                    outcomes.extend((channel, message, True, None) for _, message in items)
+                    continue
+                executor = ThreadPoolExecutor(max_workers=max(1, channel.concurrency),
+                                              thread_name_prefix=f"notify-{channel.name}")
+                executors.append(executor)
+                futures.extend((channel, message, executor.submit(self._send_one, channel, message))
+                               for _, message in items)
+            for channel, message, future in futures:
+                ok, detail = future.result()
+                outcomes.append((channel, message, ok, detail))
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+        return outcomes
+
+    # -----------------------------
+    # 4) 记录
+    # -----------------------------
+    def record(self, outcomes: List[tuple], tasks: Dict[int, Dict], invalid: List[tuple], stats: Dict):
+        """成功 / 重试 / 失败批量写回，站内信批量落库，一次提交"""
+        now = datetime.utcnow()
+        sent, retries, in_app = [], [], []
+
+        def fail(task, reason, permanent=False):
+            # 永久失败未实际发送，不再计数
+            retry_count = task["retry_count"] + (0 if permanent else 1)
+            exhausted = permanent or retry_count >= task["max_retries"]
+            retries.append({
+                "task_id": task["id"],
+                "status": "failed" if exhausted else "pending",
+                "retry_count": retry_count,
+                "error_reason": reason,
+                "next_retry_at": None if exhausted else now + timedelta(seconds=retry_delay(task["retry_count"])),
+            })
+            stats["failed" if exhausted else "retried"] += 1
+
+        for task, reason in invalid:
+            fail(task, reason, permanent=True)
+
+        for channel, message, ok, detail in outcomes:
+            if ok:
+                if channel.bulk:
+                    in_app.append(InAppChannel.row(message, now))
+                sent.extend({"task_id": task_id, "sent_at": now, "msg_id": detail}
+                            for task_id in message["task_ids"])
+                stats["messages"] += 1
+                stats["channels"][channel.name] = stats["channels"].get(channel.name, 0) + 1
+            else:
+                for task_id in message["task_ids"]:
+                    fail(tasks[task_id], f"[{channel.name}] {detail}")
+        stats["sent"] += len(sent)
+
+        try:
+            if in_app:
+                db.session.execute(Notification.__table__.insert(), in_app)
+            if sent:
+                db.session.execute(SENT_SQL, sent)
+            if retries:
+                db.session.execute(RETRY_SQL, retries)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def dispatch_once(self, task_ids: Optional[Sequence[int]] = None, stats: Optional[Dict] = None) -> Dict:
+        """认领并派发一批任务"""
+        stats = stats if stats is not None else new_stats()
+        ids = self.claim(task_ids=task_ids)
+        if not ids:
+            return stats
+        stats["claimed"] += len(ids)
+        stats["batches"] += 1
+
+        rows = db.session.execute(LOAD_SQL, {"ids": ids}).fetchall()
+        messages, invalid = self.group(rows)
+        tasks = {row.id: dict(row._mapping) for row in rows}
+        outcomes = self.send(messages)
+        self.record(outcomes, tasks, invalid, stats)
+        logger.info(f"[notification_dispatcher] 认领 {len(ids)} 条 → 合并 {len(messages)} 条消息，"
+                    f"累计 sent={stats['sent']} retried={stats['retried']} failed={stats['failed']}")
+        return stats
+
+    def drain(self, task_ids: Optional[Sequence[int]] = None, max_batches: Optional[int] = None) -> Dict:
+        """反复认领直到没有到期任务（或达到 max_batches）"""
+        stats = new_stats()
+        while max_batches is None or stats["batches"] < max_batches:
+            claimed = stats["claimed"]
+            self.dispatch_once(task_ids=task_ids, stats=stats)
+            if stats["claimed"] == claimed:
+                break
+        return stats
+
+
+def new_stats() -> Dict:
+    return {"claimed": 0, "batches": 0, "messages": 0, "sent": 0, "retried": 0, "failed": 0, "channels": {}}
+
+
+_dispatcher = None
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """获取派发器实例（单例，复用通道与令牌桶）"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = NotificationDispatcher()
+    return _dispatcher
@@ -0,0 +1,224 @@
+# services/ocr_worker.py
+# -*- coding: utf-8 -*-
+"""
+常驻 OCR 工作池
+
+原来每张发票都 subprocess.run(ocr_paddle.py)，每次都要启动解释器并加载模型（数秒）。
+这里由常驻工作进程加载一次 RapidOCR / PaddleOCR 模型，之后逐张识别:
+
+    - 生产环境单独运行 `python ocr_server.py`，所有 Web 进程通过本机 socket 共用一个工作池
+    - 连不上 OCR 服务时返回失败，调用方退回原方式（发票路由调用 ocr_paddle.py，
+      InvoiceOCRService 在进程内加载引擎）；OCR_LOCAL_POOL=true 时改为在当前进程内启动工作池
+      （每个 Web 进程各加载一份模型，只适合单进程的开发环境）
+    - 单张超时结束并重启工作进程；处理一定数量或内存超限后回收工作进程
+    - ocr_stats() 返回队列深度、排队/识别耗时等指标
+
+配置:
+    OCR_POOL_ENABLED=true           是否使用工作池（false 时按原方式识别）
+    OCR_WORKERS=1                   工作进程数（每个进程一份模型）
+    OCR_JOB_TIMEOUT=60              单张识别超时（秒）
+    OCR_WORKER_MAX_JOBS=500         每个工作进程识别多少张后回收
+    OCR_WORKER_MAX_RSS_MB=2048      工作进程内存超过该值后回收
+    OCR_SERVER_ADDRESS              OCR 服务地址，默认临时目录下 caigou-ocr.sock（Windows 为 127.0.0.1:8765）
+    OCR_SERVER_AUTHKEY              OCR 服务认证密钥（TCP 地址必填，默认取 SECRET_KEY）
+    OCR_LOCAL_POOL=false            连不上 OCR 服务时是否在本进程启动工作池
+"""
+import os
+import sys
+import logging
+import threading
+import importlib.util
+from typing import Dict, List, Optional
+
+# 添加 shared 模块路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from shared.process_pool import (JobTimeout, PoolClient, ProcessPool, WorkerError,
+                                 default_address)
+
+logger = logging.getLogger(__name__)
+
+OCR_POOL_ENABLED = os.getenv('OCR_POOL_ENABLED', 'true').lower() == 'true'
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', 1))
+OCR_JOB_TIMEOUT = float(os.getenv('OCR_JOB_TIMEOUT', 60))
+OCR_WORKER_MAX_JOBS = int(os.getenv('OCR_WORKER_MAX_JOBS', 500))
+OCR_WORKER_MAX_RSS_MB = float(os.getenv('OCR_WORKER_MAX_RSS_MB', 2048))
+OCR_SERVER_ADDRESS = os.getenv('OCR_SERVER_ADDRESS') or default_address('caigou-ocr')
+OCR_SERVER_AUTHKEY = (os.getenv('OCR_SERVER_AUTHKEY') or os.getenv('SECRET_KEY', '')).encode() or None
+OCR_LOCAL_POOL = os.getenv('OCR_LOCAL_POOL', 'false').lower() == 'true'
+
+OCR_TARGET = 'services.ocr_worker:recognize'
+OCR_INITIALIZER = 'services.ocr_worker:load_engine'
+
+# ============ 工作进程内 ============
+
+_engine = None
+_engine_type = None
+
+
+def engine_available() -> bool:
+    """是否安装了 OCR 引擎（不加载模型）"""
+    return any(importlib.util.find_spec(name) for name in ('rapidocr_onnxruntime', 'paddleocr'))
+
+
+def load_engine():
+    """加载 OCR 模型（工作进程启动时执行一次），优先 RapidOCR，其次 PaddleOCR"""
+    global _engine, _engine_type
+    if _engine is not None:
+        return
+    try:
+        from rapidocr_onnxruntime import RapidOCR
+        _engine, _engine_type = RapidOCR(), 'rapidocr'
+    except ImportError:
+        from paddleocr import PaddleOCR
+        _engine, _engine_type = PaddleOCR(use_angle_cls=True, lang='ch'), 'paddleocr'
+
+    # 空白图预热一次，推理会话的初始化不算到第一张发票上
+    try:
+        import numpy as np
+        _run_engine(np.full((32, 96, 3), 255, dtype=np.uint8))
+    except Exception as e:
+        logger.debug(f"OCR 预热跳过: {e}")
+    logger.info(f"✅ OCR 工作进程已加载 {_engine_type} (pid={os.getpid()})")
+
+
+def _run_engine(image):
+    if _engine_type == 'rapidocr':
+        result, _ = _engine(image)
+        return result
+    if hasattr(_engine, 'predict'):  # PaddleOCR 3.x
+        return _engine.predict(image)
+    return _engine.ocr(image, cls=True)  # PaddleOCR 2.x
+
+
+def _center(box):
+    try:
+        return (box[0][0] + box[2][0]) / 2, (box[0][1] + box[2][1]) / 2
+    except (TypeError, IndexError):
+        return 0.0, 0.0
+
+
+def _normalize(result) -> List[Dict]:
+    """各引擎输出统一为 [{'text', 'confidence', 'x', 'y'}]（引擎原始顺序）"""
+    if not result:
+        return []
+    lines = []
+    if _engine_type == 'rapidocr':
+        # [[bbox, text, score], ...]
+        for item in result:
+            if isinstance(item, (list, tuple)) and len(item) >= 3:
+                x, y = _center(item[0])
+                lines.append({'text': str(item[1]), 'confidence': float(item[2]), 'x': x, 'y': y})
+        return lines
+
+    page = result[0]
+    if page is None:
+        return []
+    if not isinstance(page, (list, tuple)):
+        # PaddleOCR 3.x: OCRResult / dict，含 rec_texts、rec_scores、rec_polys
+        data = page.json if hasattr(page, 'json') and isinstance(page.json, dict) else page
+        data = data.get('res', data)
+        texts = data.get('rec_texts') or []
+        scores = data.get('rec_scores') or [0.0] * len(texts)
+        polys = data.get('rec_polys')
+        polys = list(polys) if polys is not None else [None] * len(texts)
+        for text, score, poly in zip(texts, scores, polys):
+            x, y = _center(poly) if poly is not None else (0.0, 0.0)
+            lines.append({'text': str(text), 'confidence': float(score), 'x': float(x), 'y': float(y)})
+        return lines
+
+    # PaddleOCR 2.x: [[bbox, (text, score)], ...]
+    for line in page:
+        if isinstance(line, (list, tuple)) and len(line) >= 2 and line[1]:
+            x, y = _center(line[0])
+            lines.append({'text': str(line[1][0]), 'confidence': float(line[1][1]), 'x': x, 'y': y})
+    return lines
+
+
+def recognize(image_path: str) -> Dict:
+    """
+    识别图片文字（在工作进程中执行）
+
+    Returns:
+        {"success", "text"（按位置从上到下、从左到右拼接）, "lines"（引擎原始顺序）,
+         "count", "confidence"（平均置信度）, "engine"}
+    """
+    load_engine()
+    lines = _normalize(_run_engine(image_path))
+    if not lines:
+        return {'success': False, 'error': '未识别到文字', 'text': '', 'lines': [], 'count': 0,
+                'confidence': 0.0, 'engine': _engine_type}
+
+    ordered = sorted(lines, key=lambda t: (round(t['y'] / 30), t['x']))
+    return {
+        'success': True,
+        'text': '\n'.join(t['text'] for t in ordered),
+        'lines': [{'text': t['text'], 'confidence': t['confidence']} for t in lines],
+        'count': len(lines),
+        'confidence': sum(t['confidence'] for t in lines) / len(lines),
+        'engine': _engine_type,
+    }
+
+
+# ============ Web 进程内 ============
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def create_pool() -> ProcessPool:
+    return ProcessPool(OCR_TARGET, size=OCR_WORKERS, initializer=OCR_INITIALIZER,
+                       timeout=OCR_JOB_TIMEOUT, max_jobs=OCR_WORKER_MAX_JOBS,
+                       max_rss_mb=OCR_WORKER_MAX_RSS_MB, name='ocr')
+
+
+def get_ocr_client():
+    """OCR 服务客户端；连不上服务且允许时在本进程启动工作池（两者接口相同：run / stats）"""
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            client = PoolClient(OCR_SERVER_ADDRESS, OCR_SERVER_AUTHKEY)
+            if client.ping():
+                logger.info(f"✅ 使用 OCR 服务 {OCR_SERVER_ADDRESS}")
+                _client = client
+            elif OCR_LOCAL_POOL:
+                logger.info("ℹ️  OCR 服务未启动，在当前进程启动 OCR 工作池")
+                _client = create_pool().start(wait=False)
+            else:
+                raise ConnectionError(f'OCR 服务未启动: {OCR_SERVER_ADDRESS}')
+    return _client
+
+
+def ocr_image(image_path: str, timeout: Optional[float] = None) -> Dict:
+    """
+    通过工作池识别图片，失败时返回 {"success": False, "error": ...}
+
+    引擎给出的结果带 "engine"；超时带 "timeout"；两者都没有表示工作池不可用
+    （OCR 服务未启动、引擎加载失败等），调用方应退回原方式识别。
+    """
+    try:
+        return get_ocr_client().run(os.path.abspath(image_path), timeout or OCR_JOB_TIMEOUT)
+    except JobTimeout:
+        logger.warning(f"OCR 识别超时: {image_path}")
+        return {'success': False, 'error': 'OCR识别超时', 'timeout': True}
+    except ConnectionError as e:
+        logger.warning(f"OCR 工作池不可用: {e}")
+        return {'success': False, 'error': str(e)}
+    except WorkerError as e:
+        logger.error(f"OCR 工作池调用失败: {e}")
+        return {'success': False, 'error': str(e)}
+    except Exception as e:
+        logger.exception(f"OCR 工作池调用失败: {e}")
+        return {'success': False, 'error': str(e)}
+
+
+def pool_unavailable(result: Dict) -> bool:
+    """ocr_image 的失败是否因为工作池不可用（而不是引擎未识别到文字或超时）"""
+    return not result.get('success') and 'engine' not in result and not result.get('timeout')
+
+
+def ocr_stats() -> Dict:
+    """工作池指标：队列深度、排队/识别耗时分位数、超时/回收次数等"""
+    return get_ocr_client().stats()
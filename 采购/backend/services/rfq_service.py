@@ -11,14 +11,14 @@ import logging
 from typing import Dict, List, Set, Tuple, Optional
 from datetime import datetime
 
-from sqlalchemy import and_
+from sqlalchemy import DateTime, and_, func, literal, select
 from extensions import db
 from models.rfq import RFQ
 from models.rfq_item import RFQItem
 from models.rfq_notification_task import RFQNotificationTask
 from models.supplier_quote import SupplierQuote
 from models.supplier import Supplier
-from models.supplier_category import SupplierCategory
+from models.supplier_major_category import SupplierMajorCategory
 from services.ai_classifier import LocalClassifier
 from constants.categories import get_major_category
 
@@ -294,32 +294,38 @@ class RFQService:
                 logger.warning(f"[match_suppliers_by_category] 无法提取大类: category='{category}'")
                 return []
 
-            # 支持逗号分隔的品类：使用 FIND_IN_SET 或模糊匹配
-            # 注意：major_category 可能是单个值"刀具"，也可能是多个值"刀具, 五金劳保, 电器气动"
-            from sqlalchemy import or_, func
-            q = (
-                db.session.query(Supplier.id)
-                .join(SupplierCategory, Supplier.id == SupplierCategory.supplier_id)
-                .filter(
-                    Supplier.status == 'approved',
-                    or_(
-                        # 精确匹配（单个品类）
-                        SupplierCategory.major_category == major_category,
-                        # 逗号分隔列表匹配（MySQL FIND_IN_SET）
-                        func.find_in_set(major_category, SupplierCategory.major_category) > 0,
-                        # 兜底：包含匹配（防止有空格差异）
-                        SupplierCategory.major_category.like(f'%{major_category}%')
-                    )
-                )
-            )
-            supplier_ids = [sid for (sid,) in q.all()]
-            supplier_ids = list(dict.fromkeys(supplier_ids))  # 去重保序
+            supplier_ids = self._suppliers_by_majors([major_category]).get(major_category, [])
             logger.info(f"[match_suppliers_by_category] major='{major_category}' → {len(supplier_ids)}: {supplier_ids}")
             return supplier_ids
         except Exception as e:
             logger.error(f"[match_suppliers_by_category] ❌ 异常: {str(e)}", exc_info=True)
             return []
 
+    def _suppliers_by_majors(self, majors: List[str]) -> Dict[str, List[int]]:
+        """
+        一次查询多个大类的已审核供应商：{大类: [supplier_id, ...]}
+
+        走 supplier_major_categories 的 (major_category, supplier_id) 唯一索引等值连接，
+        逗号分隔的大类已在同步映射时拆开（见 models/supplier_major_category.py）
+        """
+        majors = list(dict.fromkeys(m for m in majors if m))
+        if not majors:
+            return {}
+        rows = (
+            db.session.query(SupplierMajorCategory.major_category, SupplierMajorCategory.supplier_id)
+            .join(Supplier, Supplier.id == SupplierMajorCategory.supplier_id)
+            .filter(
+                SupplierMajorCategory.major_category.in_(majors),
+                Supplier.status == 'approved'
+            )
+            .order_by(SupplierMajorCategory.supplier_id)
+            .all()
+        )
+        result: Dict[str, List[int]] = {m: [] for m in majors}
+        for major, sid in rows:
+            result[major].append(sid)
+        return result
+
     def match_suppliers_for_rfq(self, rfq: RFQ) -> Dict[str, List[int]]:
         """
         为 RFQ 的所有物料匹配供应商，按“完整品类”分组：
@@ -337,9 +343,13 @@ class RFQService:
                     continue
                 category_items.setdefault(cat, []).append(it)
 
+            # 所有品类的大类一次查询
+            majors = {cat: get_major_category(cat) for cat in category_items}
+            by_major = self._suppliers_by_majors(list(majors.values()))
+
             routes: Dict[str, List[int]] = {}
             for cat, items in category_items.items():
-                supplier_ids = self.match_suppliers_by_category(cat)
+                supplier_ids = list(by_major.get(majors[cat], [])) if majors[cat] else []
                 routes[cat] = supplier_ids
                 logger.debug(f"[match_suppliers_for_rfq] 品类 '{cat}'（{len(items)} 项）→ {len(supplier_ids)} 个供应商")
 
@@ -360,14 +370,13 @@ class RFQService:
         """
         为 routes 中的每个供应商 × 每个物料项创建 SupplierQuote（幂等）
         🔧 修复：所有物料都发送给所有匹配的供应商（不按分类过滤物料）
+
+        一条 INSERT ... SELECT 完成：rfq_items × suppliers 连接出全部 (物料, 供应商) 组合，
+        LEFT JOIN 已有报价行（反连接）排除已创建的，其余批量插入。
         返回新建条数
         """
         try:
-            items: List[RFQItem] = RFQItem.query.filter_by(rfq_id=rfq.id).all()
-            if not items:
-                logger.warning(f"[create_supplier_quotes_for_routes] RFQ#{rfq.id} 无 RFQItem，跳过")
-                return 0
-
+            rfq_id = rfq.id  # commit 后 rfq 过期，避免日志里再查一次
             # 收集所有需要通知的供应商ID（去重）
             all_supplier_ids: Set[int] = set()
             for supplier_ids in (routes or {}).values():
@@ -378,53 +387,48 @@ class RFQService:
                         pass
 
             if not all_supplier_ids:
-                logger.warning(f"[create_supplier_quotes_for_routes] RFQ#{rfq.id} 无匹配供应商")
+                logger.warning(f"[create_supplier_quotes_for_routes] RFQ#{rfq_id} 无匹配供应商")
                 return 0
 
-            created = 0
-            supplier_map: Dict[int, Optional[str]] = {}
-
-            # 🔧 关键修复：为每个物料 × 每个供应商创建报价（所有物料都发送）
-            for item in items:
-                category = (item.category or "未分类").strip()
-                for sid in all_supplier_ids:
-                    # 幂等检查：同一供应商 × 同一RFQ × 同一RFQItem
-                    exists = SupplierQuote.query.filter(
-                        and_(
-                            SupplierQuote.supplier_id == sid,
-                            SupplierQuote.rfq_id == rfq.id,
-                            SupplierQuote.rfq_item_id == item.id
-                        )
-                    ).first()
-                    if exists:
-                        continue
-
-                    # 获取供应商名称
-                    if sid not in supplier_map:
-                        s = Supplier.query.get(sid)
-                        supplier_map[sid] = s.company_name if s else None
-
-                    sq = SupplierQuote(
-                        rfq_id=rfq.id,
-                        rfq_item_id=item.id,
-                        supplier_id=sid,
-                        supplier_name=supplier_map.get(sid),
-                        category=category,
-                        status='pending',
-                        item_name=item.item_name or "",
-                        item_description=getattr(item, "item_spec", None) or "",
-                        quantity_requested=getattr(item, "quantity", None) or 1,
-                        unit=getattr(item, "unit", None) or "个",
-                        total_price=None,
-                        lead_time=None,
-                        quote_json=None,
-                        created_at=datetime.utcnow(),
-                    )
-                    db.session.add(sq)
-                    created += 1
-
+            items = RFQItem.__table__
+            suppliers = Supplier.__table__
+            quotes = SupplierQuote.__table__
+            existing = quotes.alias('existing')
+
+            category = func.trim(func.coalesce(func.nullif(items.c.category, ''), '未分类'))
+            pairs = (
+                select(
+                    items.c.rfq_id,
+                    items.c.id,
+                    suppliers.c.id,
+                    suppliers.c.company_name,
+                    category,
+                    literal('pending'),
+                    func.coalesce(items.c.item_name, ''),
+                    func.coalesce(items.c.item_spec, ''),
+                    func.coalesce(func.nullif(items.c.quantity, 0), 1),
+                    func.coalesce(func.nullif(items.c.unit, ''), '个'),
+                    literal(SupplierQuote.payment_terms.default.arg),
+                    literal(datetime.utcnow(), DateTime()),
+                )
+                .select_from(
+                    items.join(suppliers, suppliers.c.id.in_(sorted(all_supplier_ids)))
+                    .outerjoin(existing, and_(
+                        existing.c.rfq_id == items.c.rfq_id,
+                        existing.c.rfq_item_id == items.c.id,
+                        existing.c.supplier_id == suppliers.c.id
+                    ))
+                )
+                .where(items.c.rfq_id == rfq_id, existing.c.id.is_(None))
+            )
+            stmt = quotes.insert().from_select(
+                ['rfq_id', 'rfq_item_id', 'supplier_id', 'supplier_name', 'category', 'status', 'item_name',
+                 'item_description', 'quantity_requested', 'unit', 'payment_terms', 'created_at'],
+                pairs
+            )
+            created = db.session.execute(stmt).rowcount or 0
             db.session.commit()
-            logger.info(f"✅ [create_supplier_quotes_for_routes] RFQ#{rfq.id} 新建报价行 {created} 条（每物料单独创建）")
+            logger.info(f"✅ [create_supplier_quotes_for_routes] RFQ#{rfq_id} 新建报价行 {created} 条（每物料单独创建）")
             return created
 
         except Exception as e:
@@ -513,35 +517,17 @@ class RFQService:
 
     def _process_notification_tasks_sync(self, task_ids: List[int]) -> None:
         """
-        同步处理通知任务 - 简化版（直接标记为已发送）
+        同步派发通知任务：批量认领 → 按供应商合并 → 各通道限速并发发送 → 批量写回结果
+        （发送失败的任务按退避时间留给 tasks.dispatch_rfq_notifications 重试）
         """
-        from models.rfq_notification_task import RFQNotificationTask
+        from services.notification_dispatcher import get_dispatcher
 
-        for task_id in task_ids:
-            try:
-                task = RFQNotificationTask.query.get(task_id)
-                if not task or task.status != 'pending':
-                    continue
-
-                rfq = RFQ.query.get(task.rfq_id)
-                supplier = Supplier.query.get(task.supplier_id)
-                if not rfq or not supplier:
-                    task.status = 'failed'
-                    task.error_reason = "RFQ或Supplier不存在"
-                    db.session.commit()
-                    continue
-
-                # 直接标记任务完成（简化流程，不再验证报价行）
-                task.status = 'sent'
-                task.sent_at = datetime.utcnow()
-                task.error_reason = None
-                db.session.commit()
-
-                logger.info(f"✅ [同步通知] RFQ#{rfq.id} → {supplier.company_name} 已标记发送")
-
-            except Exception as e:
-                db.session.rollback()
-                logger.error(f"[_process_notification_tasks_sync] 处理任务 {task_id} 失败: {e}")
+        try:
+            stats = get_dispatcher().drain(task_ids=task_ids)
+            logger.info(f"✅ [同步通知] 任务 {len(task_ids)} 个：{stats}")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"[_process_notification_tasks_sync] 派发失败: {e}", exc_info=True)
 
     # -----------------------------
     # 6) 标记 RFQ 已发送
@@ -2,119 +2,186 @@
 """
 RFQ Items 分类异步任务
 用于在后台运行 AI 分类，避免阻塞用户请求
+
+分类流程（classify_items）:
+    1. 一次查询取出所有 RFQ 的物料项，按 (名称, 规格) 去重（跨 RFQ 也只分类一次）
+    2. 按 RFQ_CLASSIFY_CHUNK 分块：知识库缓存一次批量查询，未命中的走
+       LocalClassifier.classify_batch（规则 → 知识库 → 大模型 → 向量）
+    3. 每块分类结果一条 executemany UPDATE 写回并提交，回报进度
 """
+import os
 import logging
 import json
 from datetime import datetime
-from sqlalchemy import text
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import bindparam, text
 
 logger = logging.getLogger(__name__)
 
 
 from extensions import db, celery
 from models.rfq import RFQ
-from models.rfq_item import RFQItem
 from services.ai_classifier import LocalClassifier
 from constants.categories import get_major_category
 
-
-@celery.task(bind=True, max_retries=3, default_retry_delay=10, name="tasks.classify_rfq_items")
-def classify_rfq_items(self, rfq_id: int):
+# 每块去重后的物料数（一次缓存查询 + 一次批量分类 + 一次批量更新）
+RFQ_CLASSIFY_CHUNK = int(os.getenv("RFQ_CLASSIFY_CHUNK", 500))
+
+SELECT_SQL = text("""
+    SELECT id, item_name, item_spec FROM rfq_items
+    WHERE rfq_id IN :rfq_ids
+    ORDER BY id
+""").bindparams(bindparam("rfq_ids", expanding=True))
+
+UPDATE_SQL = text("""
+    UPDATE rfq_items
+    SET category = :category,
+        major_category = :major_category,
+        minor_category = :minor_category,
+        classification_source = :classification_source,
+        classification_score = :classification_score
+    WHERE id = :item_id
+""")
+
+_classifier = None
+
+
+def get_classifier() -> LocalClassifier:
+    """Worker 进程内复用分类器（初始化要检查 Ollama、构建原型矩阵）"""
+    global _classifier
+    if _classifier is None:
+        _classifier = LocalClassifier()
+    return _classifier
+
+
+def _update_params(result: Dict) -> Dict:
+    category = result.get('category', '未分类')
+    scores = result.get('scores', {}) or {}
+    # 只保存 top-3 评分
+    top_3_scores = dict(sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3])
+    return {
+        'category': category,
+        'major_category': result.get('major_category', get_major_category(category) or "") or '',
+        'minor_category': result.get('minor_category', '') or '',
+        'classification_source': result.get('source', 'vector'),
+        'classification_score': json.dumps(top_3_scores, ensure_ascii=False),
+    }
+
+
+def classify_items(rfq_ids: List[int], classifier: Optional[LocalClassifier] = None,
+                   chunk_size: int = RFQ_CLASSIFY_CHUNK,
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict:
     """
-    异步分类 RFQ 中的所有物料项
+    批量分类多个 RFQ 的物料项并写回 rfq_items
 
     Args:
-        rfq_id: RFQ ID
+        rfq_ids: RFQ ID 列表
+        classifier: 分类器（默认 get_classifier()）
+        chunk_size: 每块去重后的物料数
+        progress: 每块写入后回调 progress(已完成物料项数, 物料项总数)
 
     Returns:
         dict: 分类结果统计
     """
+    classifier = classifier or get_classifier()
+    rows = db.session.execute(SELECT_SQL, {"rfq_ids": list(rfq_ids)}).fetchall()
+
+    # 相同 (名称, 规格) 的物料项共用一次分类
+    groups = {}
+    for item_id, name, spec in rows:
+        groups.setdefault(((name or "").strip(), (spec or "").strip()), []).append(item_id)
+    keys = list(groups)
+
+    stats = {
+        "total_items": len(rows),
+        "unique_items": len(keys),
+        "cache_hits": 0,
+        "success": 0,
+        "errors": 0,
+        "sources": {},
+    }
+    knowledge = classifier.knowledge_service
+    done = 0
+
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        chunk_items = sum(len(groups[key]) for key in chunk)
+        try:
+            texts = {key: f"{key[0]} {key[1]}".strip() for key in chunk}
+            cached = knowledge.get_many_from_cache([t for t in texts.values() if t]) if knowledge else {}
+
+            results = {}
+            for key in chunk:
+                result = classifier.cached_result(texts[key], cached.get(texts[key]))
+                if result:
+                    results[key] = result
+            stats["cache_hits"] += len(results)
+
+            misses = [key for key in chunk if key not in results]
+            batch = classifier.classify_batch([{"name": name, "spec": spec} for name, spec in misses],
+                                              cache_checked=knowledge is not None)
+            results.update(zip(misses, batch))
+
+            params = []
+            for key in chunk:
+                values = _update_params(results[key])
+                stats["sources"][values['classification_source']] = \
+                    stats["sources"].get(values['classification_source'], 0) + len(groups[key])
+                params.extend({**values, 'item_id': item_id} for item_id in groups[key])
+
+            db.session.execute(UPDATE_SQL, params)
+            db.session.commit()
+            stats["success"] += chunk_items
+
+        except Exception as e:
+            db.session.rollback()
+            stats["errors"] += chunk_items
+            logger.error(f"物料分类失败（{len(chunk)} 种物料 / {chunk_items} 项）: {e}")
+
+        done += chunk_items
+        logger.info(f"RFQ {rfq_ids} 分类进度: {done}/{len(rows)}")
+        if progress:
+            progress(done, len(rows))
+
+    return stats
+
+
+def _run(task, rfq_ids: List[int]) -> Dict:
+    """任务主体：分类并更新 RFQ 分类状态，失败时重试"""
     from app import app
 
     with app.app_context():
         try:
-            logger.info(f"开始分类 RFQ {rfq_id} 的物料项...")
+            logger.info(f"开始分类 RFQ {rfq_ids} 的物料项...")
 
-            # 获取 RFQ
-            rfq = RFQ.query.get(rfq_id)
-            if not rfq:
-                logger.error(f"RFQ {rfq_id} 不存在")
+            rfqs = RFQ.query.filter(RFQ.id.in_(rfq_ids)).all()
+            if not rfqs:
+                logger.error(f"RFQ {rfq_ids} 不存在")
                 return {"error": "RFQ不存在"}
 
-            # 获取所有待分类的items
-            items = RFQItem.query.filter_by(rfq_id=rfq_id).all()
-            if not items:
-                logger.warning(f"RFQ {rfq_id} 没有物料项")
-                return {"error": "没有物料项"}
-
-            # 初始化分类器
-            classifier = LocalClassifier()
+            def report(done, total):
+                if task.request.id:
+                    task.update_state(state='PROGRESS', meta={"done": done, "total": total})
 
-            success_count = 0
-            error_count = 0
-
-            for item in items:
-                try:
-                    # 执行分类
-                    result = classifier.classify(
-                        name=item.item_name or "",
-                        spec=item.item_spec or "",
-                        remark=""  # RFQItem 没有 remark字段，可以从pr_item获取
-                    ) or {}
-
-                    category = result.get('category', '未分类')
-                    major_category = result.get('major_category', get_major_category(category) or "")
-                    minor_category = result.get('minor_category', '')
-                    source = result.get('source', 'vector')
-                    scores = result.get('scores', {}) or {}
-
-                    # 只保存 top-3 评分
-                    top_3_scores = dict(sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3])
-
-                    # 更新item分类信息
-                    update_sql = text("""
-                        UPDATE rfq_items
-                        SET category = :category,
-                            major_category = :major_category,
-                            minor_category = :minor_category,
-                            classification_source = :classification_source,
-                            classification_score = :classification_score
-                        WHERE id = :item_id
-                    """)
-
-                    db.session.execute(update_sql, {
-                        'category': category,
-                        'major_category': major_category or '',
-                        'minor_category': minor_category or '',
-                        'classification_source': source,
-                        'classification_score': json.dumps(top_3_scores, ensure_ascii=False),
-                        'item_id': item.id
-                    })
-
-                    success_count += 1
-                    logger.info(f"物料项 {item.id} 分类成功: {category} (来源: {source})")
-
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"物料项 {item.id} 分类失败: {str(e)}")
-
-            # 提交所有更新
-            db.session.commit()
+            stats = classify_items([rfq.id for rfq in rfqs], progress=report)
+            if not stats["total_items"]:
+                logger.warning(f"RFQ {rfq_ids} 没有物料项")
+                return {"error": "没有物料项"}
 
             # 更新RFQ状态为已分类
-            rfq.classification_status = 'completed'
-            rfq.classification_completed_at = datetime.utcnow()
+            now = datetime.utcnow()
+            for rfq in rfqs:
+                rfq.classification_status = 'completed'
+                rfq.classification_completed_at = now
             db.session.commit()
 
             result = {
-                "rfq_id": rfq_id,
-                "total_items": len(items),
-                "success": success_count,
-                "errors": error_count,
+                "rfq_id": rfq_ids[0] if len(rfq_ids) == 1 else rfq_ids,
+                **stats,
                 "status": "completed"
             }
 
-            logger.info(f"RFQ {rfq_id} 分类完成: {result}")
+            logger.info(f"RFQ {rfq_ids} 分类完成: {result}")
             return result
 
         except Exception as e:
@@ -123,14 +190,41 @@ def classify_rfq_items(self, rfq_id: int):
 
             # 重试机制
             try:
-                raise self.retry(exc=e)
-            except self.MaxRetriesExceededError:
+                raise task.retry(exc=e)
+            except task.MaxRetriesExceededError:
                 # 更新RFQ状态为失败
                 try:
-                    rfq = RFQ.query.get(rfq_id)
-                    if rfq:
-                        rfq.classification_status = 'failed'
-                        db.session.commit()
+                    RFQ.query.filter(RFQ.id.in_(rfq_ids)).update(
+                        {RFQ.classification_status: 'failed'}, synchronize_session=False)
+                    db.session.commit()
                 except:
                     pass
                 return {"error": str(e), "status": "failed"}
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=10, name="tasks.classify_rfq_items")
+def classify_rfq_items(self, rfq_id: int):
+    """
+    异步分类 RFQ 中的所有物料项
+
+    Args:
+        rfq_id: RFQ ID
+
+    Returns:
+        dict: 分类结果统计
+    """
+    return _run(self, [rfq_id])
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=10, name="tasks.classify_rfqs")
+def classify_rfqs(self, rfq_ids: List[int]):
+    """
+    异步分类多个 RFQ 的物料项（跨 RFQ 去重，相同物料只分类一次）
+
+    Args:
+        rfq_ids: RFQ ID 列表
+
+    Returns:
+        dict: 分类结果统计
+    """
+    return _run(self, list(rfq_ids))
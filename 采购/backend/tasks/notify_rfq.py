@@ -1,74 +1,40 @@
 # tasks/notify_rfq.py
 # -*- coding: utf-8 -*-
 import logging
-from datetime import datetime
-from extensions import celery, db
-from models.rfq_notification_task import RFQNotificationTask
-from models.rfq import RFQ
-from models.supplier import Supplier
-from models.supplier_quote import SupplierQuote
+from extensions import celery
+from services.notification_dispatcher import get_dispatcher
 
 logger = logging.getLogger(__name__)
 
 @celery.task(bind=True, max_retries=3, default_retry_delay=60, name="tasks.send_rfq_notification")
 def send_rfq_notification(self, task_id: int):
     """
-    发送RFQ通知任务（改进版）
+    发送单个RFQ通知任务（兼容旧调用，交给批量派发器处理）
 
     说明：
     - SupplierQuote 已在 rfq_service.create_supplier_quotes_for_routes() 中按品类创建
-    - 本任务只负责：验证数据存在 + 标记任务状态 + （可选）发送邮件通知
+    - 发送失败的重试由派发器按 next_retry_at 调度（见 dispatch_rfq_notifications）
     """
-    task = RFQNotificationTask.query.get(task_id)
-    if not task:
-        logger.error(f"[send_rfq_notification] 任务不存在: {task_id}")
-        return
-
     try:
-        rfq = RFQ.query.get(task.rfq_id)
-        supplier = Supplier.query.get(task.supplier_id)
-        if not rfq or not supplier:
-            task.status = 'failed'
-            task.error_message = "RFQ或Supplier不存在"
-            db.session.commit()
-            return
-
-        # 验证该供应商对应品类的报价是否已创建
-        category = task.category  # 任务关联的品类
-        quote = SupplierQuote.query.filter_by(
-            rfq_id=rfq.id,
-            supplier_id=supplier.id,
-            category=category
-        ).first()
-
-        if not quote:
-            task.status = 'failed'
-            task.error_message = f"未找到报价邀请（品类: {category}）"
-            db.session.commit()
-            logger.warning(f"[send_rfq_notification] 未找到报价: RFQ#{rfq.id} × S#{supplier.id} × {category}")
-            return
-
-        # TODO: 这里可以添加邮件通知逻辑
-        # send_email_to_supplier(supplier.contact_email, rfq, quote)
+        return get_dispatcher().dispatch_once(task_ids=[task_id])
+    except Exception as e:
+        logger.exception(f"[send_rfq_notification] 异常 task={task_id}: {e}")
+        raise self.retry(exc=e)
 
-        # 标记任务完成
-        task.status = 'sent'
-        task.sent_at = datetime.utcnow()
-        task.error_message = None
-        db.session.commit()
 
-        logger.info(f"✅ RFQ#{rfq.id} → Supplier#{supplier.id} ({category}) 通知完成")
+@celery.task(bind=True, max_retries=3, default_retry_delay=60, name="tasks.dispatch_rfq_notifications")
+def dispatch_rfq_notifications(self, max_batches: int = 50):
+    """
+    批量派发到期的RFQ通知任务（celery beat 定时触发）
 
+    每批认领 NOTIFY_CLAIM_BATCH 条，按供应商合并后经各通道限速并发发送，
+    最多处理 max_batches 批，剩余任务留给下一次触发
+    """
+    try:
+        stats = get_dispatcher().drain(max_batches=max_batches)
+        if stats["claimed"]:
+            logger.info(f"[dispatch_rfq_notifications] 完成: {stats}")
+        return stats
     except Exception as e:
-        db.session.rollback()
-        try:
-            task = RFQNotificationTask.query.get(task_id)
-            if task:
-                task.status = 'failed'
-                task.error_message = str(e)[:500]
-                task.failed_at = datetime.utcnow()
-                db.session.commit()
-        except Exception:
-            db.session.rollback()
-        logger.exception(f"[send_rfq_notification] 异常 task={task_id}: {e}")
+        logger.exception(f"[dispatch_rfq_notifications] 异常: {e}")
         raise self.retry(exc=e)
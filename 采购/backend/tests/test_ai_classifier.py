@@ -0,0 +1,104 @@
+"""
+物料分类器向量化路径单元测试：关键词自动机、原型矩阵、classify_batch 与逐条 classify 一致
+Run with: pytest tests/test_ai_classifier.py -v
+"""
+
+import random
+
+import pytest
+
+from services.ai_classifier import (KeywordMatcher, LocalClassifier, NgramEmbeddingBackend, PrototypeMatrix,
+                                    cosine)
+
+NAMES = ['硬质合金镗刀 Φ50mm', '不锈钢螺栓 M12×50', '液压油 68号 20L', '防护手套 耐磨型', '数控铣刀 Φ16mm R0.5',
+         'V形块 100mm', '深沟球轴承 6205', '铝合金型材 6063', '工业酒精 95%', '同步带轮 HTD5M', '六角扳手套装',
+         '', '气动快插接头 PC8-02', '不干胶标签 50x30', '铜排 TMY 40x4', '冲压模具 非标']
+
+
+class FakeKnowledge:
+    def __init__(self):
+        self.searches = []
+        self.cached = []
+
+    def search(self, name, spec):
+        self.searches.append((name, spec))
+        if name.startswith('铝合金'):
+            return {'category': '原材料/金属材料', 'score': 0.9, 'method': 'fulltext'}
+        return None
+
+    def add_to_cache(self, text, category, *args):
+        self.cached.append((text, category))
+
+
+class FakeLLM:
+    available = True
+
+    def __init__(self):
+        self.calls = []
+
+    def classify_with_llm(self, text, categories):
+        self.calls.append(text)
+        return {'化工辅料/清洗剂': 0.8, '五金劳保/工具类': 0.2} if '酒精' in text else {}
+
+
+@pytest.fixture
+def classifier():
+    return LocalClassifier(embedding=NgramEmbeddingBackend(), use_ollama=False, use_knowledge=False)
+
+
+def legacy_rule_match(rules, text):
+    t = (text or '').lower()
+    for cat, kws in rules.items():
+        for kw in kws:
+            if kw.lower() in t:
+                return cat
+    return None
+
+
+def test_keyword_matcher_matches_sequential_scan(classifier):
+    matcher = KeywordMatcher(classifier.rules)
+    keywords = [kw for kws in classifier.rules.values() for kw in kws]
+    rng = random.Random(7)
+    texts = NAMES + ['开关电源 24V 接头', '螺丝刀 工具 手套', 'v形块', 'abc']
+    for _ in range(300):
+        texts.append(''.join(rng.choice(keywords + ['x', '钢', ' ', 'M8']) for _ in range(rng.randint(0, 5))))
+    for text in texts:
+        assert matcher.match(text) == legacy_rule_match(classifier.rules, text), text
+
+
+def test_prototype_matrix_matches_pairwise_cosine(classifier):
+    backend = classifier.embedding
+    matrix = PrototypeMatrix(backend, list(classifier.prototype_text.values()), classifier.prototype_index)
+    texts = [n for n in NAMES if n] + ['完全无关的文字', 'zzz']
+    scores = matrix.scores(texts)
+    for row, text in enumerate(texts):
+        vec = backend.embed([text])[0]
+        for col, proto in enumerate(classifier.prototype_vecs):
+            assert scores[row, col] == pytest.approx(cosine(vec, proto), abs=1e-5)
+
+    top = matrix.top_k(['数控车刀片'], 3)[0]
+    assert list(top)[0] == '刀具/车削刀具' and len(top) == 3
+
+
+def test_classify_batch_equals_classify(classifier):
+    classifier.knowledge_service = FakeKnowledge()
+    classifier.ollama = FakeLLM()
+    items = [{'name': n, 'spec': 'S1' if i % 3 == 0 else '', 'remark': ''} for i, n in enumerate(NAMES)]
+    items += items[:5] + ['冲压模具 非标']
+
+    expected = [classifier.classify(i['name'], i['spec'], i['remark']) if isinstance(i, dict)
+                else classifier.classify(i) for i in items]
+    classifier.knowledge_service, classifier.ollama = FakeKnowledge(), FakeLLM()
+    results = classifier.classify_batch(items)
+
+    for got, want in zip(results, expected):
+        assert got['category'] == want['category'] and got['source'] == want['source']
+        assert got['scores'] == pytest.approx(want['scores'])
+    sources = {r['source'] for r in results}
+    assert {'rule', 'knowledge_fulltext', 'ollama', 'vector', 'empty'} <= sources
+
+    # 重复条目只查询一次，规则命中的不查询知识库和大模型
+    searched = classifier.knowledge_service.searches
+    assert len(searched) == len(set(searched))
+    assert all(legacy_rule_match(classifier.rules, ' '.join(s)) is None for s in searched)
+    assert len(classifier.ollama.calls) == len(set(classifier.ollama.calls))
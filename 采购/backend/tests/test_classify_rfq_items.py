@@ -0,0 +1,173 @@
+"""
+RFQ 物料批量分类任务测试：去重、批量缓存查询、分块批量写回，结果与逐条 classify() 一致
+Run with: pytest tests/test_classify_rfq_items.py -v
+"""
+
+import json
+import zlib
+
+import pytest
+from flask import Flask
+from sqlalchemy import event, text
+
+from extensions import db
+from services.ai_classifier import LocalClassifier, NgramEmbeddingBackend
+from tasks.classify_rfq_items import classify_items
+
+NAMES = [('硬质合金镗刀', 'Φ50mm'), ('铝合金型材', '6063'), ('工业酒精', '95%'), ('冲压模具', '非标'),
+         ('不锈钢螺栓', 'M12×50'), ('液压阀', ''), ('塑料托盘', '1200x1000'), ('', ''), ('胶水', '502'),
+         ('密封圈', 'O型 20x2'), ('深沟球轴承', '6205'), ('电磁阀', '24V')]
+
+
+class StubOllama:
+    """确定性大模型替身：按文本哈希给分，部分文本返回空（降级到向量层）"""
+    available = True
+
+    def __init__(self):
+        self.calls = []
+
+    def classify_with_llm(self, text, categories):
+        self.calls.append(text)
+        h = zlib.crc32(text.encode('utf-8'))
+        if h % 3 == 0:
+            return {}
+        return {categories[h % len(categories)]: 0.9, categories[(h // 7) % len(categories)]: 0.3}
+
+
+class FakeKnowledge:
+    """内存知识库：缓存 + 少量知识条目，search 与 MaterialKnowledgeService 一样先查缓存"""
+
+    def __init__(self, cache):
+        self.cache = dict(cache)
+        self.batch_lookups = 0
+        self.searches = []
+
+    def get_many_from_cache(self, texts):
+        self.batch_lookups += 1
+        return {t: self.cache[t] for t in texts if t in self.cache}
+
+    def search(self, name, spec='', use_cache=True):
+        self.searches.append((name, spec, use_cache))
+        query_text = f"{name} {spec}".strip()
+        if use_cache and query_text in self.cache:
+            return self.cache[query_text]
+        if name == '冲压模具':
+            return {'category': '机床附件/夹具治具', 'knowledge_id': 3, 'score': 1.0, 'method': 'exact'}
+        return None
+
+    def add_to_cache(self, text, category, knowledge_id=None, score=1.0, method='knowledge'):
+        self.cache[text] = {'category': category, 'knowledge_id': knowledge_id, 'score': score, 'method': method}
+
+    def add_many_to_cache(self, entries):
+        for text, category, score, method in entries:
+            self.add_to_cache(text, category, None, score, method)
+
+
+SEED_CACHE = {
+    '胶水 502': {'category': '化工辅料/脱模剂', 'knowledge_id': None, 'score': 0.9, 'method': 'llm'},
+    '密封圈 O型 20x2': {'category': '机械零部件/轴承', 'knowledge_id': None, 'score': 0.4, 'method': 'vector'},
+}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'caigou.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.session.execute(text("""
+            CREATE TABLE rfq_items (
+                id INTEGER PRIMARY KEY, rfq_id INTEGER NOT NULL, pr_item_id INTEGER NOT NULL,
+                item_name VARCHAR(200) NOT NULL, item_spec VARCHAR(200), quantity INTEGER, unit VARCHAR(50),
+                category VARCHAR(100) NOT NULL, major_category VARCHAR(100), minor_category VARCHAR(100),
+                classification_source VARCHAR(20) NOT NULL, classification_score TEXT)
+        """))
+        rows = []
+        for rfq_id in (1, 2, 3):
+            for i, (name, spec) in enumerate(NAMES * 2):
+                rows.append({'id': len(rows) + 1, 'rfq_id': rfq_id, 'pr_item_id': i, 'name': name, 'spec': spec})
+        db.session.execute(text("""
+            INSERT INTO rfq_items (id, rfq_id, pr_item_id, item_name, item_spec, category, classification_source)
+            VALUES (:id, :rfq_id, :pr_item_id, :name, :spec, '分类中...', 'pending')
+        """), rows)
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def make_classifier():
+    classifier = LocalClassifier(embedding=NgramEmbeddingBackend(), use_ollama=False, use_knowledge=False)
+    classifier.knowledge_service = FakeKnowledge(SEED_CACHE)
+    classifier.ollama = StubOllama()
+    return classifier
+
+
+def stored(rfq_ids):
+    query = text("SELECT id, item_name, item_spec, category, major_category, minor_category, "
+                 "classification_source, classification_score FROM rfq_items WHERE rfq_id IN (1, 2) ORDER BY id")
+    return [tuple(row) for row in db.session.execute(query)]
+
+
+def test_classify_items_matches_per_item_classify(app):
+    legacy = make_classifier()
+    expected = {}
+    for name, spec in NAMES:
+        result = legacy.classify(name, spec, "")
+        top_3 = dict(sorted(result['scores'].items(), key=lambda x: x[1], reverse=True)[:3])
+        expected[(name, spec)] = (result['category'], result['major_category'], result['minor_category'],
+                                  result['source'], top_3)
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement.strip().split()[0]))
+
+    classifier = make_classifier()
+    progress = []
+    stats = classify_items([1, 2], classifier=classifier, chunk_size=5,
+                           progress=lambda done, total: progress.append((done, total)))
+
+    assert stats['total_items'] == 2 * 2 * len(NAMES)
+    assert stats['unique_items'] == len(NAMES)
+    assert stats['success'] == stats['total_items'] and stats['errors'] == 0
+    assert stats['cache_hits'] == 1  # 低于 0.6 的缓存记录不采用
+
+    for _, name, spec, category, major, minor, source, score in stored([1, 2]):
+        want = expected[(name, spec)]
+        assert (category, major, minor, source) == want[:4], name
+        assert json.loads(score) == pytest.approx(want[4])
+
+    # 每块一次缓存批量查询、一条批量 UPDATE；RFQ 3 未处理
+    chunks = -(-len(NAMES) // 5)
+    assert classifier.knowledge_service.batch_lookups == chunks
+    assert statements.count('UPDATE') == chunks
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+    assert progress[-1] == (stats['total_items'], stats['total_items'])
+    assert db.session.execute(text("SELECT COUNT(*) FROM rfq_items WHERE rfq_id = 3 AND "
+                                   "classification_source = 'pending'")).scalar() == 2 * len(NAMES)
+
+    # 去重后每种物料只查询一次知识库 / 大模型，且已批量查过缓存
+    searches = classifier.knowledge_service.searches
+    assert len(searches) == len(set(searches)) and all(not use_cache for *_, use_cache in searches)
+    assert len(classifier.ollama.calls) == len(set(classifier.ollama.calls))
+    assert {'rule', 'knowledge_llm', 'knowledge_exact', 'ollama', 'vector', 'empty'} <= set(stats['sources'])
+
+
+def test_classify_items_reports_failed_chunk(app, monkeypatch):
+    classifier = make_classifier()
+    calls = []
+    original = classifier.classify_batch
+
+    def flaky(items, cache_checked=False):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise RuntimeError('boom')
+        return original(items, cache_checked)
+
+    monkeypatch.setattr(classifier, 'classify_batch', flaky)
+    stats = classify_items([3], classifier=classifier, chunk_size=6)
+
+    assert stats['errors'] + stats['success'] == stats['total_items'] == 2 * len(NAMES)
+    assert stats['errors'] == 2 * 6
+    pending = db.session.execute(text("SELECT COUNT(*) FROM rfq_items WHERE rfq_id = 3 AND "
+                                      "classification_source = 'pending'")).scalar()
+    assert pending == stats['errors']
@@ -0,0 +1,160 @@
+"""
+物料知识库常驻索引测试：精确/前缀/模糊匹配、内存缓存、增量刷新、batch_add_materials 就地更新
+Run with: pytest tests/test_material_knowledge.py -v
+"""
+
+import pytest
+from flask import Flask
+from sqlalchemy import event, text
+
+from extensions import db
+from services.material_knowledge import MaterialKnowledgeService, split_terms, trigrams
+
+MATERIALS = [
+    {'standard_name': '深沟球轴承', 'category': '机械零部件/轴承', 'major_category': '机械零部件',
+     'spec_pattern': '6205', 'synonyms': '球轴承，滚珠轴承', 'keywords': '轴承,滚动轴承', 'match_priority': 80},
+    {'standard_name': '硬质合金立铣刀', 'category': '刀具/铣削刀具', 'major_category': '刀具',
+     'synonyms': '合金铣刀', 'keywords': '铣刀,端铣刀,立铣刀', 'description': '钨钢 四刃', 'match_priority': 60},
+    {'standard_name': '工业酒精', 'category': '化工辅料/清洗剂', 'major_category': '化工辅料',
+     'synonyms': '乙醇、无水乙醇', 'keywords': '酒精,清洗', 'match_priority': 50},
+    {'standard_name': '内六角螺钉', 'category': '五金劳保/紧固件', 'major_category': '五金劳保',
+     'spec_pattern': 'GB70', 'keywords': '螺钉,杯头螺丝', 'match_priority': 50},
+]
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'caigou.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.session.execute(text("""
+            CREATE TABLE material_knowledge_base (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, standard_name VARCHAR(200) NOT NULL,
+                category VARCHAR(100) NOT NULL, major_category VARCHAR(100), minor_category VARCHAR(100),
+                spec_pattern VARCHAR(200), synonyms TEXT, keywords TEXT, description TEXT, usage_scenario TEXT,
+                match_priority INTEGER DEFAULT 50, source VARCHAR(20),
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)
+        """))
+        db.session.execute(text("""
+            CREATE TABLE material_match_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, input_text VARCHAR(500), input_hash CHAR(32) UNIQUE,
+                matched_category VARCHAR(100), matched_knowledge_id INTEGER, match_score DECIMAL(5, 4),
+                match_method VARCHAR(20), hit_count INTEGER DEFAULT 1, last_hit_at DATETIME)
+        """))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def queries(app):
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *a: statements.append(statement))
+    return statements
+
+
+def test_terms_and_trigrams():
+    assert split_terms('球轴承，滚珠轴承、 Ball Bearing;x') == ['球轴承', '滚珠轴承', 'ball', 'bearing', 'x']
+    assert trigrams('镗刀') == {'\x02镗刀', '镗刀\x03'}
+    assert trigrams('') == set()
+
+
+def test_index_lookups_without_queries(app, queries):
+    service = MaterialKnowledgeService()
+    assert service.batch_add_materials(MATERIALS) == len(MATERIALS)
+    service.index.ensure_fresh()
+    assert service.index.stats()['entries'] == len(MATERIALS)
+
+    del queries[:]
+    assert service.search_exact(' 深沟球 轴承 ')[0] == '机械零部件/轴承'
+    assert service.search('硬质合金立铣刀')['method'] == 'exact'
+    assert service.search('深沟球轴承6205-2RS')['method'] == 'prefix'          # 标准名称是前缀
+    assert service.search('轴承座', '6205-2RS') == {'category': '机械零部件/轴承', 'knowledge_id': 1,
+                                                    'score': 0.8, 'method': 'prefix'}  # 规格型号是前缀
+    fuzzy = service.search('杯头螺丝')
+    assert fuzzy['category'] == '五金劳保/紧固件' and fuzzy['method'] == 'fuzzy' and fuzzy['score'] == 0.7
+    assert service.search('完全不相关的物料') is None
+    # 知识匹配不查库；只有内存缓存未命中时查一次匹配缓存表
+    selects = [q for q in queries if q.lstrip().upper().startswith('SELECT')]
+    assert selects and all('material_match_cache' in q for q in selects)
+
+    # 命中内存缓存，且结果不变时不再写库
+    del queries[:]
+    assert service.search('杯头螺丝') == fuzzy
+    assert service.get_many_from_cache(['杯头螺丝']) == {'杯头螺丝': {k: fuzzy[k] for k in fuzzy}}
+    assert queries == []
+
+
+def test_cache_written_by_other_process_and_capped(app, queries):
+    service = MaterialKnowledgeService()
+    service.batch_add_materials(MATERIALS)
+    service.index.ensure_fresh()
+    service.index.cache_size = 2
+
+    # 其他进程（Celery Worker）在本进程载入索引之后写入的缓存
+    for input_text, category in [('六角扳手', '五金劳保/手动工具'), ('砂轮片', '磨具磨料/砂轮'),
+                                 ('切削液', '化工辅料/切削液')]:
+        db.session.execute(text("INSERT INTO material_match_cache (input_text, input_hash, matched_category, "
+                                "match_score, match_method) VALUES (:t, :h, :c, 0.9, 'llm')"),
+                           {'t': input_text, 'h': service._compute_hash(input_text), 'c': category})
+    db.session.commit()
+
+    assert service.get_from_cache('六角扳手')['category'] == '五金劳保/手动工具'
+    hits = service.get_many_from_cache(['砂轮片', '切削液', '不存在'])
+    assert {t: h['category'] for t, h in hits.items()} == {'砂轮片': '磨具磨料/砂轮', '切削液': '化工辅料/切削液'}
+
+    # 内存缓存只保留最近使用的 cache_size 条，之后命中不再查库
+    assert len(service.index.cache) == 2
+    del queries[:]
+    assert service.get_many_from_cache(['砂轮片', '切削液']).keys() == {'砂轮片', '切削液'}
+    assert queries == []
+    assert service.get_from_cache('六角扳手')['category'] == '五金劳保/手动工具'  # 已淘汰，查库
+    assert queries and len(service.index.cache) == 2
+
+
+def test_batch_add_updates_index_in_place(app, queries):
+    service = MaterialKnowledgeService()
+    service.batch_add_materials(MATERIALS[:2])
+    service.index.ensure_fresh()
+    assert service.search_exact('工业酒精') is None
+
+    del queries[:]
+    service.batch_add_materials(MATERIALS[2:])
+    assert not [q for q in queries if q.lstrip().upper().startswith('SELECT')]  # 不重新载入
+    assert service.search_exact('工业酒精')[0] == '化工辅料/清洗剂'
+    assert service.search('无水乙醇')['category'] == '化工辅料/清洗剂'
+
+
+def test_incremental_refresh_and_rebuild(app):
+    service = MaterialKnowledgeService()
+    service.batch_add_materials(MATERIALS)
+    index = service.index
+    index.ensure_fresh()
+
+    # 其他进程修改 / 新增知识
+    db.session.execute(text("UPDATE material_knowledge_base SET category = '刀具/铣刀', "
+                            "updated_at = '2999-01-01 00:00:00' WHERE id = 2"))
+    db.session.execute(text("INSERT INTO material_knowledge_base (standard_name, category, match_priority, "
+                            "updated_at) VALUES ('砂轮片', '磨具磨料/砂轮', 50, '2999-01-01 00:00:00')"))
+    db.session.commit()
+    assert service.search_exact('砂轮片') is None  # 未到刷新间隔
+
+    index.refresh_interval = 0
+    assert service.search_exact('砂轮片')[0] == '磨具磨料/砂轮'
+    assert service.search_exact('硬质合金立铣刀')[0] == '刀具/铣刀'
+    assert index.fuzzy('端铣刀')[0] == '刀具/铣刀'
+    assert len(index.entries) == len(MATERIALS) + 1
+
+    # 删除记录：条数对不上时整表重建
+    db.session.execute(text("DELETE FROM material_knowledge_base WHERE standard_name = '工业酒精'"))
+    db.session.commit()
+    assert service.search_exact('工业酒精') is None
+    assert len(index.entries) == len(MATERIALS)
+
+
+def test_sql_fallback_without_index(app):
+    service = MaterialKnowledgeService(use_index=False)
+    service.batch_add_materials(MATERIALS)
+    assert service.index is None
+    assert service.search_exact('工业酒精')[0] == '化工辅料/清洗剂'
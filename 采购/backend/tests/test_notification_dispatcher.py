@@ -0,0 +1,210 @@
+"""
+RFQ 通知批量派发器测试：认领租约、按供应商合并、通道并发/限速、批量写回与重试退避
+（通道用本地替身，不访问微信接口）
+Run with: pytest tests/test_notification_dispatcher.py -v
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.dialects.mysql import BIGINT
+from sqlalchemy.ext.compiler import compiles
+
+import models  # noqa: F401
+import models.purchase_order  # noqa: F401  (Contract 关系依赖，main.py 经路由导入)
+import models.rfq_item  # noqa: F401  (RFQ / PurchaseOrder 关系依赖)
+import models.supplier_quote  # noqa: F401
+from extensions import db
+from models.notification import Notification
+from models.rfq import RFQ
+from models.rfq_notification_task import RFQNotificationTask
+from models.supplier import Supplier
+from services.notification_dispatcher import (Channel, InAppChannel, NotificationDispatcher, TokenBucket,
+                                              retry_delay)
+
+
+@compiles(BIGINT, 'sqlite')
+def _sqlite_bigint(element, compiler, **kw):
+    return 'INTEGER'  # sqlite 只有 INTEGER PRIMARY KEY 自增
+
+
+TABLES = [Supplier, RFQ, RFQNotificationTask, Notification]
+
+
+class StubChannel(Channel):
+    """本地替身通道：记录消息、模拟延迟与失败、统计最大并发"""
+
+    def __init__(self, name='wechat', concurrency=4, rate=0.0, latency=0.0, fail_suppliers=()):
+        self.name, self.concurrency, self.rate, self.latency = name, concurrency, rate, latency
+        self.fail_suppliers = set(fail_suppliers)
+        self.sent, self.in_flight, self.max_in_flight = [], 0, 0
+        self._lock = threading.Lock()
+
+    def accepts(self, recipient):
+        return bool(recipient.get('wechat_openid') and recipient.get('is_subscribed'))
+
+    def send(self, message):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if message['supplier_id'] in self.fail_suppliers:
+                raise RuntimeError('stub 503')
+            with self._lock:
+                self.sent.append(message)
+            return f"msg-{message['supplier_id']}"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'caigou.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[model.__table__ for model in TABLES])
+        for i in range(1, 13):
+            subscribed = i % 2 == 1
+            db.session.add(Supplier(id=i, company_name=f'供应商{i}', code=f'S{i}', email=f's{i}@x.com',
+                                    password_hash='x', tax_id=f'T{i}', contact_phone='13800000000',
+                                    contact_email=f's{i}@x.com', status='approved',
+                                    wechat_openid=f'openid-{i}' if subscribed else None, is_subscribed=subscribed))
+        db.session.add_all([RFQ(id=1, pr_id=1, status='sent'), RFQ(id=2, pr_id=2, status='sent')])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def add_tasks(*specs):
+    """specs: (rfq_id, supplier_id, category[, retry_count])"""
+    tasks = [RFQNotificationTask(rfq_id=spec[0], supplier_id=spec[1], category=spec[2], status='pending',
+                                 retry_count=spec[3] if len(spec) > 3 else 0, max_retries=3)
+             for spec in specs]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return [task.id for task in tasks]
+
+
+def statuses():
+    db.session.expire_all()
+    return {task.id: task for task in RFQNotificationTask.query}
+
+
+def test_coalesce_route_and_record(app):
+    ids = add_tasks((1, 1, '刀具'), (1, 1, '五金劳保'), (2, 1, '刀具'),  # 供应商1（已关注）三条合并一条
+                    (1, 2, '刀具'), (2, 2, '轴承'),                      # 供应商2（未关注）→ 站内信
+                    (1, 999, '刀具'))                                     # 供应商不存在
+    wechat = StubChannel()
+    stats = NotificationDispatcher([wechat, InAppChannel()]).drain(task_ids=ids)
+
+    assert stats['claimed'] == 6 and stats['sent'] == 5 and stats['failed'] == 1
+    assert stats['messages'] == 2 and stats['channels'] == {'wechat': 1, 'in_app': 1}
+
+    [message] = wechat.sent
+    assert sorted(message['task_ids']) == ids[:3]
+    assert 'RFQ#1：刀具、五金劳保' in message['content'] and 'RFQ#2：刀具' in message['content']
+
+    tasks = statuses()
+    assert all(tasks[i].status == 'sent' and tasks[i].sent_at for i in ids[:5])
+    assert tasks[ids[0]].wecom_msg_id == 'msg-1'
+    assert tasks[ids[5]].status == 'failed' and tasks[ids[5]].error_reason == 'RFQ或Supplier不存在'
+
+    [notification] = Notification.query.all()
+    assert notification.recipient_id == 2 and notification.notification_type == 'rfq_invitation'
+    assert json.loads(notification.data) == {'rfqs': {'1': ['刀具'], '2': ['轴承']}}
+
+
+def test_failure_schedules_retry_then_fails(app):
+    ids = add_tasks((1, 3, '刀具'), (1, 5, '刀具', 2), (1, 7, '刀具'))
+    wechat = StubChannel(fail_suppliers={3, 5})
+    dispatcher = NotificationDispatcher([wechat, InAppChannel()])
+    before = datetime.utcnow()
+    stats = dispatcher.drain()
+
+    assert (stats['sent'], stats['retried'], stats['failed']) == (1, 1, 1)
+    tasks = statuses()
+    retried, exhausted = tasks[ids[0]], tasks[ids[1]]
+    assert retried.status == 'pending' and retried.retry_count == 1 and 'stub 503' in retried.error_reason
+    assert retried.next_retry_at >= before + timedelta(seconds=retry_delay(0) - 1)
+    assert exhausted.status == 'failed' and exhausted.retry_count == 3 and exhausted.next_retry_at is None
+    assert tasks[ids[2]].status == 'sent'
+
+    # 未到重试时间不会被认领；到期后重发成功
+    assert dispatcher.drain()['claimed'] == 0
+    RFQNotificationTask.query.filter_by(id=ids[0]).update({'next_retry_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    wechat.fail_suppliers.clear()
+    assert dispatcher.drain()['sent'] == 1
+    assert statuses()[ids[0]].status == 'sent'
+
+
+def test_claim_lease(app):
+    ids = add_tasks(*[(1, i, '刀具') for i in range(1, 6)])
+    dispatcher = NotificationDispatcher([InAppChannel()], batch_size=3)
+
+    first = dispatcher.claim()
+    assert first == ids[:3]
+    assert dispatcher.claim() == ids[3:]  # 已认领的不会被重复认领
+    assert dispatcher.claim() == []
+
+    # 租约过期（Worker 中途退出）后重新认领
+    RFQNotificationTask.query.filter(RFQNotificationTask.id.in_(first)).update(
+        {'next_retry_at': datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+    db.session.commit()
+    assert dispatcher.claim() == first
+    tasks = statuses()
+    assert [tasks[i].retry_count for i in first] == [1, 1, 1] and tasks[ids[3]].retry_count == 0
+
+
+def test_reclaim_bounded_by_max_retries(app):
+    """导致 Worker 退出的消息每次重新认领都计数，达到 max_retries 后不再发送"""
+    [task_id] = add_tasks((1, 1, '刀具'))
+    wechat = StubChannel()
+    dispatcher = NotificationDispatcher([wechat, InAppChannel()])
+
+    def expire():
+        RFQNotificationTask.query.filter_by(id=task_id).update({'next_retry_at': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+
+    for _ in range(3):  # max_retries=3：认领后 Worker 崩溃（不记录结果），租约过期
+        assert dispatcher.claim() == [task_id]
+        expire()
+    stats = dispatcher.dispatch_once()
+
+    assert stats['failed'] == 1 and stats['sent'] == 0 and wechat.sent == []
+    task = statuses()[task_id]
+    assert task.status == 'failed' and task.retry_count == 3 and '上限' in task.error_reason
+    assert dispatcher.drain()['claimed'] == 0
+
+
+def test_channel_concurrency_and_batch_statements(app):
+    add_tasks(*[(rfq_id, supplier_id, '刀具') for rfq_id in (1, 2) for supplier_id in range(1, 13)])
+    wechat = StubChannel(concurrency=2, latency=0.02)
+    dispatcher = NotificationDispatcher([wechat, InAppChannel()], batch_size=100)
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    stats = dispatcher.dispatch_once()
+    executed = len(statements)
+
+    assert stats['sent'] == 24 and stats['messages'] == 12
+    assert len(wechat.sent) == 6 and wechat.max_in_flight == 2
+    assert Notification.query.count() == 6
+    # 认领 SELECT + UPDATE、加载、站内信 INSERT、结果 UPDATE，与任务数无关
+    assert executed == 5
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=100, burst=1)
+    start = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.perf_counter() - start >= 0.09
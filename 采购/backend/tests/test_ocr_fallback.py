@@ -0,0 +1,71 @@
+"""
+发票 OCR 识别退回测试：工作池未启用、未安装引擎或不可用时调用 ocr_paddle.py，
+引擎自身的识别结果（含未识别到文字）和超时不再退回（外部脚本用本地替身，不加载模型）
+Run with: pytest tests/test_ocr_fallback.py -v
+"""
+
+import json
+import subprocess
+
+import pytest
+
+import routes.invoice_routes as invoice_routes
+from services import ocr_worker
+
+
+@pytest.fixture
+def script_calls(monkeypatch):
+    calls = []
+
+    def fake_run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout=json.dumps({'success': True, 'text': '脚本识别'}),
+                                           stderr='')
+
+    monkeypatch.setattr(invoice_routes.subprocess, 'run', fake_run)
+    monkeypatch.setattr(invoice_routes, 'OCR_POOL_ENABLED', True)
+    monkeypatch.setattr(invoice_routes, 'engine_available', lambda: True)
+    return calls
+
+
+def use_pool(monkeypatch, result):
+    monkeypatch.setattr(invoice_routes, 'ocr_image', lambda path: result)
+
+
+def test_pool_result_is_used(monkeypatch, script_calls):
+    use_pool(monkeypatch, {'success': True, 'text': '工作池识别', 'engine': 'paddleocr'})
+    assert invoice_routes.ocr_with_paddle('a.png') == '工作池识别'
+    assert script_calls == []
+
+
+@pytest.mark.parametrize('result', [
+    {'success': False, 'error': '未识别到文字', 'engine': 'paddleocr'},
+    {'success': False, 'error': 'OCR识别超时', 'timeout': True},
+])
+def test_engine_failure_is_not_retried(monkeypatch, script_calls, result):
+    use_pool(monkeypatch, result)
+    assert invoice_routes.ocr_with_paddle('a.png') is None
+    assert script_calls == []
+
+
+def test_unavailable_pool_falls_back_to_script(monkeypatch, script_calls):
+    use_pool(monkeypatch, {'success': False, 'error': 'OCR 服务未启动'})
+    assert invoice_routes.ocr_with_paddle('a.png') == '脚本识别'
+    assert script_calls == [['python', invoice_routes.PADDLE_OCR_SCRIPT, 'a.png']]
+
+
+@pytest.mark.parametrize('enabled, available', [(False, True), (True, False)])
+def test_disabled_pool_or_missing_engine_uses_script(monkeypatch, script_calls, enabled, available):
+    monkeypatch.setattr(invoice_routes, 'OCR_POOL_ENABLED', enabled)
+    monkeypatch.setattr(invoice_routes, 'engine_available', lambda: available)
+    use_pool(monkeypatch, {'success': True, 'text': '工作池识别', 'engine': 'paddleocr'})
+    assert invoice_routes.ocr_with_paddle('a.png') == '脚本识别'
+    assert len(script_calls) == 1
+
+
+def test_ocr_image_reports_unreachable_server(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_worker, '_client', None)
+    monkeypatch.setattr(ocr_worker, 'OCR_LOCAL_POOL', False)
+    monkeypatch.setattr(ocr_worker, 'OCR_SERVER_ADDRESS', str(tmp_path / 'missing.sock'))
+    result = ocr_worker.ocr_image('a.png')
+    assert not result['success'] and ocr_worker.pool_unavailable(result)
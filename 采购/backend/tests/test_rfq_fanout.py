@@ -0,0 +1,137 @@
+"""
+RFQ 报价行扇出测试：大类映射同步、按大类匹配供应商、INSERT ... SELECT 批量创建报价行（幂等）
+Run with: pytest tests/test_rfq_fanout.py -v
+"""
+
+import pytest
+from flask import Flask
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.mysql import BIGINT, LONGTEXT
+from sqlalchemy.ext.compiler import compiles
+
+import models  # noqa: F401
+import models.purchase_order  # noqa: F401  (Contract 关系依赖，main.py 经路由导入)
+from extensions import db
+from models.rfq import RFQ
+from models.rfq_item import RFQItem
+from models.supplier import Supplier
+from models.supplier_category import SupplierCategory
+from models.supplier_major_category import (SupplierMajorCategory, split_major_categories,
+                                            sync_supplier_major_categories)
+from models.supplier_quote import SupplierQuote
+from services.rfq_service import RFQService
+
+
+@compiles(BIGINT, 'sqlite')
+def _sqlite_bigint(element, compiler, **kw):
+    return 'INTEGER'  # sqlite 只有 INTEGER PRIMARY KEY 自增
+
+
+@compiles(LONGTEXT, 'sqlite')
+def _sqlite_longtext(element, compiler, **kw):
+    return 'TEXT'
+
+
+TABLES = [Supplier, SupplierCategory, SupplierMajorCategory, RFQ, RFQItem, SupplierQuote]
+SUPPLIERS = [
+    # (公司, 状态, [(category, major_category)])
+    ('刀具供应商', 'approved', [('刀具/铣削刀具', '刀具')]),
+    ('综合五金', 'approved', [('刀具, 五金劳保、电器气动', '刀具, 五金劳保、电器气动')]),
+    ('待审核刀具', 'pending', [('刀具', '刀具')]),
+    ('轴承厂', 'approved', [('机械零部件/轴承', None)]),
+    ('刀具附件厂', 'approved', [('刀具附件', '刀具附件')]),
+]
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'caigou.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[model.__table__ for model in TABLES])
+        for i, (name, status, categories) in enumerate(SUPPLIERS, 1):
+            db.session.add(Supplier(id=i, company_name=name, code=f'S{i}', email=f's{i}@x.com', password_hash='x',
+                                    tax_id=f'T{i}', contact_phone='13800000000', contact_email=f's{i}@x.com',
+                                    status=status))
+            db.session.flush()
+            for category, major in categories:
+                db.session.add(SupplierCategory(supplier_id=i, category=category, major_category=major))
+        db.session.add(RFQ(id=1, pr_id=1, status='draft'))
+        for i, (name, category) in enumerate([('立铣刀', '刀具/铣削刀具'), ('手套', '五金劳保/劳保防护'),
+                                              ('轴承', '机械零部件/轴承'), ('未知', '  ')], 1):
+            db.session.add(RFQItem(id=i, rfq_id=1, pr_item_id=i, item_name=name, item_spec=f'spec{i}',
+                                   quantity=0 if i == 2 else i, unit='' if i == 3 else '件', category=category,
+                                   classification_source='rule'))
+        db.session.commit()
+        sync_supplier_major_categories()
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def service():
+    return RFQService.__new__(RFQService)  # 不初始化分类器
+
+
+def test_split_major_categories():
+    assert split_major_categories('刀具, 五金劳保、电器气动;刀具') == ['刀具', '五金劳保', '电器气动']
+    assert split_major_categories(None, '机械零部件/轴承') == ['机械零部件']
+    assert split_major_categories(' ', '') == []
+
+
+def test_match_suppliers_by_major_category(app, service):
+    pairs = sorted((m.major_category, m.supplier_id) for m in SupplierMajorCategory.query)
+    assert ('刀具', 2) in pairs and ('五金劳保', 2) in pairs and ('机械零部件', 4) in pairs
+
+    assert service.match_suppliers_by_category('刀具/车削刀具') == [1, 2]  # 不含待审核、"刀具附件"
+    assert service.match_suppliers_by_category('', '电器气动') == [2]
+    rfq = db.session.get(RFQ, 1)
+    assert service.match_suppliers_for_rfq(rfq) == {'刀具/铣削刀具': [1, 2], '五金劳保/劳保防护': [2],
+                                                     '机械零部件/轴承': [4]}
+
+    # 修改供应商品类后重新同步
+    SupplierCategory.query.filter_by(supplier_id=2).delete()
+    db.session.add(SupplierCategory(supplier_id=2, category='机械零部件/轴承', major_category='机械零部件'))
+    sync_supplier_major_categories([2])
+    db.session.commit()
+    assert service.match_suppliers_by_category('刀具/车削刀具') == [1]
+    assert service.match_suppliers_by_category('机械零部件/轴承') == [2, 4]
+
+
+
+def test_delete_supplier_removes_major_categories(app):
+    # 删除供应商时 ORM 会加载所有关联表（合同、评估、发票等）
+    db.metadata.create_all(db.engine, tables=[rel.target for rel in inspect(Supplier).relationships])
+    [fk] = SupplierMajorCategory.__table__.c.supplier_id.foreign_keys
+    assert fk.ondelete == 'CASCADE'
+
+    db.session.delete(db.session.get(Supplier, 2))
+    db.session.commit()
+    assert SupplierMajorCategory.query.filter_by(supplier_id=2).count() == 0
+    assert SupplierMajorCategory.query.filter_by(supplier_id=1).count() == 1
+
+def test_create_supplier_quotes_in_one_statement(app, service):
+    rfq = db.session.get(RFQ, 1)
+    routes = {'刀具/铣削刀具': [1, 2], '五金劳保/劳保防护': ['2'], '机械零部件/轴承': [4]}
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *a: statements.append(statement.split()[0].upper()))
+    assert service.create_supplier_quotes_for_routes(rfq, routes) == 4 * 3
+    assert statements.count('INSERT') == 1 and 'SELECT' not in statements
+
+    quotes = {(q.rfq_item_id, q.supplier_id): q for q in SupplierQuote.query}
+    assert len(quotes) == 12
+    glove, bearing, unknown = quotes[(2, 1)], quotes[(3, 4)], quotes[(4, 2)]
+    assert (glove.supplier_name, glove.category, glove.status) == ('刀具供应商', '五金劳保/劳保防护', 'pending')
+    assert (glove.item_name, glove.item_description, glove.quantity_requested, glove.unit) == ('手套', 'spec2', 1, '件')
+    assert (bearing.quantity_requested, bearing.unit, bearing.payment_terms) == (3, '个', 90)
+    assert unknown.category == '' and bearing.created_at is not None
+
+    # 幂等：已有报价行被排除，只补新供应商
+    assert service.create_supplier_quotes_for_routes(rfq, routes) == 0
+    assert service.create_supplier_quotes_for_routes(rfq, {'x': [1, 5]}) == 4
+    assert SupplierQuote.query.count() == 16
+    assert service.create_supplier_quotes_for_routes(rfq, {}) == 0